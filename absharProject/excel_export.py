@@ -0,0 +1,200 @@
+import datetime
+import tempfile
+from decimal import Decimal
+
+from django.db.models import QuerySet
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# تعداد ردیف‌هایی که در هر رفت‌وبرگشت به دیتابیس خوانده می‌شود
+EXPORT_CHUNK_SIZE = 500
+
+TITLE_FONT = Font(bold=True, size=18)
+CENTER = Alignment(horizontal="center", vertical="center")
+HEADER_FILL = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
+HEADER_FONT = Font(bold=True, color="000000")  # Black bold text
+BOLD_FONT = Font(bold=True)
+
+# نوع‌هایی که openpyxl مستقیم می‌نویسد؛ بقیه (مثلاً یک مدل) به متن تبدیل می‌شوند
+_CELL_TYPES = (str, int, float, Decimal, bool, datetime.date, datetime.datetime, datetime.time, Cell)
+
+
+def _cell_value(value):
+    if value is None or isinstance(value, _CELL_TYPES):
+        return value
+    return str(value)
+
+
+# -------------------------------
+# تعریف ستون‌ها
+# -------------------------------
+def resolve_path(obj, path):
+    """
+    مقدار مسیر نقطه‌دار روی obj؛ اگر یکی از رابطه‌های میانی خالی باشد None
+    """
+    for attr in path.split('.'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    return obj
+
+
+def first_of(list_attr, path):
+    """
+    مقدار path روی اولین عضو یک لیست پیش‌خوانده‌شده (to_attr یک Prefetch)،
+    تا ستون‌های یک رابطه چندتایی بدون کوئری جدا برای هر ردیف پر شوند.
+    """
+
+    def value(obj):
+        items = getattr(obj, list_attr)
+        return resolve_path(items[0], path) if items else None
+
+    return value
+
+
+class Column:
+    """
+    یک ستون خروجی: عنوان و مقدار آن برای هر ردیف.
+    value یا مسیر نقطه‌دار یک فیلد است ('bank.bank_name') یا تابعی که ردیف را می‌گیرد؛
+    formatter (مثلاً show_jalali) در صورت وجود روی مقدار به‌دست‌آمده اعمال می‌شود.
+    """
+
+    def __init__(self, title, value=None, formatter=None):
+        self.title = title
+        self.value = value
+        self.formatter = formatter
+
+    def resolve(self, obj, index):
+        if callable(self.value):
+            value = self.value(obj)
+        else:
+            value = resolve_path(obj, self.value)
+        if self.formatter:
+            value = self.formatter(value)
+        return value
+
+
+class RowNumber(Column):
+    """
+    ستون شماره ردیف (از ۱)
+    """
+
+    def __init__(self, title='#'):
+        super().__init__(title)
+
+    def resolve(self, obj, index):
+        return index
+
+
+# -------------------------------
+# نوشتن شیت در حالت write-only
+# -------------------------------
+class ExcelSheetWriter:
+    """
+    یک شیت راست‌به‌چپ در workbook حالت write-only؛ ردیف‌ها به ترتیب نوشته می‌شوند و
+    openpyxl آن‌ها را همان لحظه روی فایل موقت می‌ریزد، پس حافظه به تعداد ردیف‌ها بستگی ندارد.
+    """
+
+    def __init__(self, sheet_title='Sheet'):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_title)
+        self.sheet.sheet_view.rightToLeft = True
+        self.row_count = 0
+
+    def cell(self, value, font=None, fill=None, alignment=None):
+        """
+        سلول دارای استایل برای append
+        """
+        cell = WriteOnlyCell(self.sheet, value=_cell_value(value))
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        if alignment:
+            cell.alignment = alignment
+        return cell
+
+    def append(self, values):
+        self.sheet.append([_cell_value(value) for value in values])
+        self.row_count += 1
+
+    def blank(self):
+        self.append([])
+
+    def merged(self, text, span, font=BOLD_FONT, alignment=None):
+        """
+        یک ردیف که سلول اول آن روی span ستون ادغام می‌شود
+        """
+        self.row_count += 1
+        self.sheet.append([self.cell(text, font=font, alignment=alignment)])
+        if span > 1:
+            self.sheet.merged_cells.add(f'A{self.row_count}:{get_column_letter(span)}{self.row_count}')
+
+    def title(self, text, span):
+        self.merged(text, span, font=TITLE_FONT, alignment=CENTER)
+
+    def header(self, titles):
+        self.sheet.append([self.cell(title, font=HEADER_FONT, fill=HEADER_FILL) for title in titles])
+        self.row_count += 1
+
+    def response(self, filename):
+        """
+        فایل نهایی در یک فایل موقت ذخیره و تکه تکه به کاربر فرستاده می‌شود
+        """
+        stream = tempfile.TemporaryFile()
+        self.workbook.save(stream)
+        stream.seek(0)
+        return FileResponse(stream, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+# -------------------------------
+# خروجی جدولی اعلانی
+# -------------------------------
+class ExcelExport:
+    """
+    خروجی اکسل یک لیست: عنوان ادغام‌شده در ردیف اول، سرستون طلایی در ردیف دوم و داده‌ها از ردیف سوم.
+    اگر منبع QuerySet باشد با select_related / prefetch_related داده‌شده و به‌صورت iterator
+    دسته به دسته خوانده می‌شود.
+    """
+
+    def __init__(self, *, columns, filename, title=None, sheet_title='Sheet',
+                 select_related=(), prefetch_related=(), chunk_size=EXPORT_CHUNK_SIZE):
+        self.columns = columns
+        self.filename = filename
+        self.title = title
+        self.sheet_title = sheet_title
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+        self.chunk_size = chunk_size
+
+    def iter_objects(self, source):
+        if not isinstance(source, QuerySet):
+            return iter(source)
+        if self.select_related:
+            source = source.select_related(*self.select_related)
+        if self.prefetch_related:
+            source = source.prefetch_related(*self.prefetch_related)
+        return source.iterator(chunk_size=self.chunk_size)
+
+    def rows(self, source):
+        for index, obj in enumerate(self.iter_objects(source), start=1):
+            yield [column.resolve(obj, index) for column in self.columns]
+
+    def write(self, writer, source):
+        if self.title:
+            writer.title(self.title, len(self.columns))
+        else:
+            writer.blank()
+        writer.header([column.title for column in self.columns])
+        for values in self.rows(source):
+            writer.append(values)
+
+    def response(self, source):
+        writer = ExcelSheetWriter(self.sheet_title)
+        self.write(writer, source)
+        return writer.response(self.filename)
@@ -0,0 +1,308 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from admin_panel.models import UnifiedCharge, Announcement, MessageReadStatus, SmsCredit, \
+    MiddleMessageReadStatus, SmsManagement, Subscription
+from home.models import FreeRequest, ContactUs
+from polls_app.models import Poll
+from user_app.models import MyHouse, Unit, Renter, User
+
+# مدت اعتبار snapshot هدر؛ سیگنال‌ها زودتر از این آن را باطل می‌کنند
+HEADER_STATE_TIMEOUT = 60 * 5
+
+# مقادیر پیش‌فرض برای کاربر مهمان یا بخش‌هایی که به کاربر مربوط نیستند
+HEADER_STATE_DEFAULTS = {
+    'current_house': None,
+    'current_unit': None,
+    'is_unit_owner': False,
+    'house': None,
+    'houses': [],
+    'new_user_charges_count': 0,
+    'new_user_messages_count': 0,
+    'marquee_announcements': [],
+    'user_polls_without_vote': 0,
+    'middle_house': None,
+    'current_subscription': None,
+    'total_days': 1,
+    'remaining_days': 0,
+    'sub_status': 'inactive',
+    'plan': None,
+    'subscription_warning': True,
+    'redirect_to_buy': False,
+    'progress_dashoffset': 345,
+    'renter_expire_notifications': [],
+    'has_renter_expire_warning': False,
+    'middle_new_messages_count': 0,
+    'middle_current_credit': Decimal('0'),
+    'admin_new_messages_count': 0,
+    'admin_new_consultant': 0,
+    'admin_new_comment': 0,
+}
+
+
+def header_state_key(user_id, day=None):
+    """
+    کلید کش snapshot هدر هر کاربر؛ تاریخ روز در کلید است تا روزهای باقی‌مانده
+    اشتراک و هشدار پایان اجاره با شروع روز جدید خودبه‌خود تازه شوند.
+    """
+    day = day or timezone.now().date()
+    return f"header_state:{user_id}:{day.isoformat()}"
+
+
+def get_header_state(user):
+    """
+    snapshot هدر کاربر را از کش برمی‌گرداند و در صورت نبودن، یک بار می‌سازد
+    """
+    if not user.is_authenticated:
+        return HEADER_STATE_DEFAULTS
+
+    key = header_state_key(user.pk)
+    state = cache.get(key)
+    if state is None:
+        state = build_header_state(user)
+        cache.set(key, state, HEADER_STATE_TIMEOUT)
+    return state
+
+
+def build_header_state(user):
+    state = dict(HEADER_STATE_DEFAULTS)
+    state.update(_resident_state(user))
+    state.update(_middle_state(user))
+    if user.is_superuser:
+        state.update(_admin_state())
+    return state
+
+
+# ------------------------------------------------------------------
+# بخش ساکنین (مالک / مستاجر)
+# ------------------------------------------------------------------
+def _resident_state(user):
+    houses = list(
+        MyHouse.objects.filter(
+            Q(units__user=user) |
+            Q(units__renters__user=user)
+        ).distinct().order_by('-created_at')
+    )
+
+    current_house = MyHouse.objects.filter(
+        Q(units__user=user) |
+        Q(units__renters__user=user, units__renters__renter_is_active=True)
+    ).distinct().order_by('-created_at').first()
+
+    current_unit = None
+    is_unit_owner = False
+
+    if current_house:
+        current_unit = Unit.objects.filter(
+            Q(user=user) |
+            Q(renters__user=user, renters__renter_is_active=True),
+            myhouse=current_house
+        ).distinct().first()
+
+        if current_unit and current_unit.user_id == user.id:
+            is_unit_owner = True
+
+    user_unit_ids = list(
+        Unit.objects.filter(
+            Q(user=user) |
+            Q(renters__user=user, renters__renter_is_active=True),
+            is_active=True
+        ).values_list('id', flat=True).distinct()
+    )
+
+    user_polls_without_vote = 0
+    new_user_charges_count = 0
+    new_user_messages_count = 0
+
+    if user_unit_ids:
+        user_polls_without_vote = Poll.objects.filter(
+            house__units__in=user_unit_ids,
+            is_active=True
+        ).exclude(
+            vote__unit__in=user_unit_ids
+        ).distinct().count()
+
+        new_user_charges_count = UnifiedCharge.objects.filter(
+            unit__in=user_unit_ids,
+            is_paid=False,
+            send_notification=True
+        ).count()
+
+        # پیام‌های خوانده‌نشده
+        new_user_messages_count = MessageReadStatus.objects.filter(
+            unit__in=user_unit_ids,
+            is_read=False
+        ).values('message').distinct().count()
+
+    announcement_owner = user if user.is_middle_admin else user.manager
+    marquee_announcements = []
+    if announcement_owner:
+        marquee_announcements = list(
+            Announcement.objects
+            .filter(user=announcement_owner, is_active=True)
+            .order_by('-created_at')[:5]
+        )
+
+    return {
+        'current_house': current_house,
+        'current_unit': current_unit,
+        'is_unit_owner': is_unit_owner,
+        'house': houses[0] if houses else None,
+        'houses': houses,
+        'new_user_charges_count': new_user_charges_count,
+        'new_user_messages_count': new_user_messages_count,
+        'marquee_announcements': marquee_announcements,
+        'user_polls_without_vote': user_polls_without_vote,
+    }
+
+
+# ------------------------------------------------------------------
+# بخش مدیر ساختمان
+# ------------------------------------------------------------------
+def _middle_state(user):
+    state = {
+        'middle_house': MyHouse.objects.filter(
+            user=user,
+            is_active=True
+        ).order_by('-created_at').first(),
+    }
+
+    last_sub = Subscription.objects.select_related('plan').filter(user=user).order_by('-created_at').first()
+
+    if last_sub:
+        last_sub.expire_if_needed()
+
+        state['current_subscription'] = last_sub
+        state['plan'] = last_sub.plan
+        state['total_days'] = last_sub.total_days
+        state['remaining_days'] = last_sub.days_remaining
+
+        if last_sub.status == "active":
+            state['sub_status'] = "trial" if last_sub.is_trial else "paid"
+
+            remaining = last_sub.days_remaining
+            state['subscription_warning'] = (0 < remaining <= 3)
+
+            ratio = min(max(remaining / last_sub.total_days, 0), 1)
+            state['progress_dashoffset'] = int(345 - (ratio * 345))
+
+    today = timezone.now().date()
+    expire_warning_date = today + timedelta(days=1)
+
+    expiring_renters = (
+        Renter.objects
+        .select_related('unit', 'myhouse')
+        .filter(
+            myhouse__user=user,
+            renter_is_active=True,
+            end_date__isnull=False,
+            end_date__lte=expire_warning_date
+        )
+        .order_by('end_date')
+    )
+
+    renter_expire_notifications = []
+    for renter in expiring_renters:
+        remaining_days = (renter.end_date - today).days
+
+        if remaining_days < 0:
+            status = "expired"
+        elif remaining_days == 0:
+            status = "today"
+        else:
+            status = "warning"
+
+        renter_expire_notifications.append({
+            "renter": renter,
+            "unit": renter.unit,
+            "remaining_days": remaining_days,
+            "status": status,
+        })
+
+    state['renter_expire_notifications'] = renter_expire_notifications
+    state['has_renter_expire_warning'] = bool(renter_expire_notifications)
+
+    # پیام‌های خوانده‌نشده
+    state['middle_new_messages_count'] = MiddleMessageReadStatus.objects.filter(
+        user=user,
+        is_read=False
+    ).values('message').distinct().count()
+
+    # اعتبار پیامک مدیر ساختمان
+    state['middle_current_credit'] = (
+            SmsCredit.objects
+            .filter(user=user, is_paid=True)
+            .aggregate(total=Sum('amount'))['total']
+            or Decimal('0')
+    )
+    return state
+
+
+# ------------------------------------------------------------------
+# بخش مدیر کل
+# ------------------------------------------------------------------
+def _admin_state():
+    return {
+        'admin_new_messages_count': SmsManagement.objects.filter(
+            is_approved=False,
+            is_active=True
+        ).count(),
+        'admin_new_consultant': FreeRequest.objects.filter(is_call=False).count(),
+        'admin_new_comment': ContactUs.objects.filter(is_read=False).count(),
+    }
+
+
+# ------------------------------------------------------------------
+# ابطال کش
+# ------------------------------------------------------------------
+def invalidate_header_state(*user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+    day = timezone.now().date()
+    cache.delete_many([header_state_key(user_id, day) for user_id in user_ids])
+
+
+def invalidate_unit_header_state(*unit_ids):
+    """
+    ابطال هدر مالک، مستاجرین و مدیر ساختمانِ واحدهای داده شده
+    """
+    unit_ids = [unit_id for unit_id in unit_ids if unit_id]
+    if not unit_ids:
+        return
+
+    user_ids = set()
+    for owner_id, manager_id in Unit.objects.filter(pk__in=unit_ids).values_list('user_id', 'myhouse__user_id'):
+        user_ids.update((owner_id, manager_id))
+    user_ids.update(Renter.objects.filter(unit_id__in=unit_ids).values_list('user_id', flat=True))
+    invalidate_header_state(*user_ids)
+
+
+def invalidate_house_header_state(house_id):
+    """
+    ابطال هدر همه ساکنین و مدیر یک ساختمان
+    """
+    if not house_id:
+        return
+    user_ids = set(MyHouse.objects.filter(pk=house_id).values_list('user_id', flat=True))
+    user_ids.update(Unit.objects.filter(myhouse_id=house_id).values_list('user_id', flat=True))
+    user_ids.update(Renter.objects.filter(unit__myhouse_id=house_id).values_list('user_id', flat=True))
+    invalidate_header_state(*user_ids)
+
+
+def invalidate_managed_header_state(manager_id):
+    """
+    ابطال هدر مدیر و همه کاربرانی که زیر نظر او هستند
+    """
+    if not manager_id:
+        return
+    user_ids = set(User.objects.filter(manager_id=manager_id).values_list('id', flat=True))
+    invalidate_header_state(manager_id, *user_ids)
+
+
+def invalidate_admin_header_state():
+    invalidate_header_state(*User.objects.filter(is_superuser=True).values_list('id', flat=True))
@@ -0,0 +1,204 @@
+import datetime
+import json
+from decimal import Decimal
+
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'keyset-pagination'
+
+
+class CursorSerializer:
+    """
+    مقادیر تاریخ با دقت کامل (میکروثانیه) در cursor می‌مانند تا مقایسه برابری درست باشد
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), default=self.encode_value).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+class KeysetPaginator:
+    """
+    صفحه‌بندی seek: به‌جای OFFSET، صفحه بعد با شرط «بعد از آخرین ردیف صفحه فعلی» روی ستون‌های
+    ordering خوانده می‌شود، پس هزینه صفحه صدم با صفحه اول یکی است. ستون‌ها باید NOT NULL باشند و
+    آخرین آن‌ها یکتا (معمولاً id). تعداد کل فقط با count=True یک بار در صفحه اول شمرده می‌شود و
+    در cursor همراه صفحه‌های بعد می‌ماند (تقریبی؛ ردیف‌های جدید تا بازگشت به صفحه اول دیده نمی‌شوند).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.with_count = count
+        self.count = None
+        self.fields = []
+        for name in self.ordering:
+            field = queryset.model._meta.get_field(name.lstrip('-'))
+            if field.null:
+                raise ImproperlyConfigured(f"Keyset field '{field.name}' must not be nullable.")
+            self.fields.append((field, name.startswith('-')))
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
+
+    # -------------------------------
+    # cursor
+    # -------------------------------
+    def encode_cursor(self, row, backwards, start, count):
+        values = [getattr(row, field.attname) for field, _descending in self.fields]
+        return signing.dumps({'v': values, 'b': backwards, 'i': start, 'c': count},
+                             salt=CURSOR_SALT, serializer=CursorSerializer, compress=True)
+
+    def decode_cursor(self, cursor):
+        state = signing.loads(cursor, salt=CURSOR_SALT, serializer=CursorSerializer)
+        state['v'] = [field.to_python(value) for (field, _descending), value in zip(self.fields, state['v'])]
+        return state
+
+    def _seek_filter(self, values, backwards):
+        """
+        (a, b) < (x, y) به شکل a < x OR (a = x AND b < y)، با جهت هر ستون
+        """
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{field.name}__{lookup}': value})
+            equal &= Q(**{field.name: value})
+        return condition
+
+    # -------------------------------
+    # صفحه
+    # -------------------------------
+    def get_page(self, cursor=None):
+        """
+        cursor نامعتبر یا دستکاری‌شده مثل Paginator.get_page صفحه اول را برمی‌گرداند
+        """
+        state = None
+        if cursor:
+            try:
+                state = self.decode_cursor(cursor)
+            except (signing.BadSignature, ValidationError, ValueError, TypeError, KeyError):
+                state = None
+        return self.page(state)
+
+    def page(self, state=None):
+        backwards = bool(state and state['b'])
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+        qs = self.queryset.order_by(*ordering)
+        if state:
+            qs = qs.filter(self._seek_filter(state['v'], backwards))
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if state and not rows:
+            # ردیف‌های صفحه حذف شده‌اند؛ از ابتدا
+            return self.page(None)
+
+        if state is None:
+            self.count = self.queryset.count() if self.with_count else None
+        else:
+            self.count = state.get('c')
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+            start = state['i'] if has_more else 1
+        else:
+            has_next, has_previous = has_more, state is not None
+            start = state['i'] if state else 1
+        return KeysetPage(rows, self, start, has_next, has_previous)
+
+
+class KeysetPage:
+    """
+    هم‌خوان با Page جنگو در قالب‌ها (has_next، start_index، ...)؛ به‌جای شماره صفحه cursor دارد
+    """
+
+    def __init__(self, object_list, paginator, start, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.start = start
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<KeysetPage {self.start_index()}-{self.end_index()}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def number(self):
+        return (self.start - 1) // self.paginator.per_page + 1
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def start_index(self):
+        return self.start if self.object_list else 0
+
+    def end_index(self):
+        return self.start + len(self.object_list) - 1
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], False, self.start + len(self.object_list),
+                                            self.paginator.count)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], True, max(self.start - self.paginator.per_page, 1),
+                                            self.paginator.count)
+
+
+class KeysetPaginationMixin:
+    """
+    جایگزین صفحه‌بندی OFFSET در ListView؛ page_obj یک KeysetPage است و لینک‌ها با
+    partials/keyset_pagination.html و پارامتر cursor ساخته می‌شوند
+    """
+    keyset_ordering = ('-created_at', '-id')
+    keyset_count = False
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering(), count=self.keyset_count)
+        page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
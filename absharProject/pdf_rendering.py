@@ -0,0 +1,140 @@
+import mimetypes
+import os
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import HttpResponse
+from django.http.request import validate_host
+from django.utils._os import safe_join
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+# فونت‌های مشترک همه خروجی‌ها؛ یک بار در هر پردازه از پوشه static خوانده و ثبت می‌شوند
+PDF_FONTS = (
+    ('BYekan', 'fonts/BYekan.ttf', 'normal'),
+    ('Vazir', 'fonts/Vazir.ttf', 'normal'),
+    ('Vazir', 'fonts/Vazir-Bold.ttf', 'bold'),
+    ('VazirB1', 'fonts/Vazir-Light.ttf', 'normal'),
+    ('VazirB2', 'fonts/Vazir.ttf', 'normal'),
+)
+
+# مثل Django در حالت DEBUG اگر ALLOWED_HOSTS خالی باشد
+_LOCAL_HOSTS = ['.localhost', '127.0.0.1', '[::1]']
+
+
+# -------------------------------
+# خواندن فایل‌های خود سایت از دیسک
+# -------------------------------
+def static_path(relative_path):
+    """
+    مسیر روی دیسک یک فایل استاتیک (پوشه collectstatic یا منابع STATICFILES_DIRS)
+    """
+    try:
+        if settings.STATIC_ROOT:
+            candidate = safe_join(settings.STATIC_ROOT, relative_path)
+            if os.path.isfile(candidate):
+                return candidate
+        return finders.find(relative_path)
+    except SuspiciousFileOperation:
+        return None
+
+
+def media_path(relative_path):
+    try:
+        candidate = safe_join(settings.MEDIA_ROOT, relative_path)
+    except SuspiciousFileOperation:
+        return None
+    return candidate if os.path.isfile(candidate) else None
+
+
+def local_path(url):
+    """
+    مسیر محلی یک نشانی static/media همین سایت؛ برای نشانی‌های بیرونی None
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        return None
+    if not validate_host(parts.hostname or '', settings.ALLOWED_HOSTS or _LOCAL_HOSTS):
+        return None
+
+    path = unquote(parts.path)
+    if path.startswith(settings.STATIC_URL):
+        return static_path(path[len(settings.STATIC_URL):])
+    if path.startswith(settings.MEDIA_URL):
+        return media_path(path[len(settings.MEDIA_URL):])
+    return None
+
+
+class LocalURLFetcher(URLFetcher):
+    """
+    فونت‌ها، تصاویر و فایل‌های static/media که با نشانی کامل سایت در قالب آمده‌اند
+    به‌جای درخواست HTTP به سرور خودمان مستقیم از دیسک خوانده می‌شوند؛ بقیه نشانی‌ها
+    مثل قبل دریافت می‌شوند.
+    """
+
+    def fetch(self, url, headers=None):
+        path = local_path(url)
+        if path is None:
+            return super().fetch(url, headers)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return URLFetcherResponse(Path(path).as_uri(), body=open(path, 'rb'), headers={'Content-Type': content_type})
+
+
+# -------------------------------
+# منابع مشترک هر پردازه
+# -------------------------------
+@lru_cache(maxsize=None)
+def font_config():
+    return FontConfiguration()
+
+
+def fonts_css():
+    faces = []
+    for family, relative_path, weight in PDF_FONTS:
+        path = static_path(relative_path)
+        if path:
+            faces.append(
+                f"@font-face {{ font-family: '{family}'; src: url('{Path(path).as_uri()}'); font-weight: {weight}; }}"
+            )
+    return '\n'.join(faces)
+
+
+@lru_cache(maxsize=128)
+def compiled_stylesheet(css):
+    """
+    CSS کامپایل‌شده؛ هر رشته CSS فقط یک بار در هر پردازه پارس و فونت‌هایش ثبت می‌شود
+    """
+    return CSS(string=css, font_config=font_config(), url_fetcher=LocalURLFetcher())
+
+
+@lru_cache(maxsize=None)
+def shared_stylesheets():
+    return (compiled_stylesheet(fonts_css()),)
+
+
+# -------------------------------
+# رندر
+# -------------------------------
+def render_pdf(html, stylesheets=(), base_url=None):
+    """
+    بایت‌های PDF یک سند HTML؛ stylesheets رشته‌های CSS هستند
+    """
+    return HTML(string=html, base_url=base_url, url_fetcher=LocalURLFetcher()).write_pdf(
+        stylesheets=[*shared_stylesheets(), *(compiled_stylesheet(css) for css in stylesheets)],
+        font_config=font_config(),
+    )
+
+
+def pdf_response(request, html, *, filename, stylesheets=()):
+    """
+    پاسخ دانلود PDF برای خروجی‌های کوچک تک‌سندی
+    """
+    response = HttpResponse(render_pdf(html, stylesheets, request.build_absolute_uri()),
+                            content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -112,13 +114,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'absharProject.context_processors.current_house',
-                'absharProject.context_processors.user_header_notifications',
-                'absharProject.context_processors.current_middle_house',
-                'absharProject.context_processors.middle_header_notifications',
-                'absharProject.context_processors.admin_header_notifications',
-                'absharProject.context_processors.impersonation_banner',
-                'absharProject.context_processors.user_unit_context',
+                'absharProject.context_processors.header_state',
 
             ],
         },
@@ -242,6 +238,14 @@ JALALI_DATE_DEFAULTS = {
 
 # Redis
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
+
+# کش مشترک بین workerها (هدر، زیردامنه‌ها و ...)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
@@ -251,8 +255,27 @@ CELERY_TIMEZONE = 'Asia/Tehran'
 
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# تسک‌های دوره‌ای؛ DatabaseScheduler هنگام اجرای beat آن‌ها را در جدول PeriodicTask ثبت می‌کند
+CELERY_BEAT_SCHEDULE = {
+    # آمار ساختمان‌هایی که mark_stale شده‌اند (داشبورد مدیر کل و گزارش‌های بدهکاران و مالی)
+    'refresh-house-analytics': {
+        'task': 'admin_panel.tasks.refresh_house_analytics',
+        'schedule': crontab(minute='*/10'),
+    },
+    'purge-old-pdf-jobs': {
+        'task': 'reports.tasks.purge_old_pdf_jobs',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
 SMS_PRICE = 219
 
+# تعداد پردازه‌های موازی برای رندر صفحه‌های PDF (صورتحساب گروهی واحدها)
+PDF_RENDER_WORKERS = 4
+
+# backend جستجوی متنی سندهای مالی (مسیر کلاس)؛ None یعنی FTS5 در SQLite و pg_trgm در PostgreSQL
+DOCUMENT_SEARCH_BACKEND = None
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -1,6 +1,7 @@
 from kavenegar import KavenegarAPI, APIException, HTTPException
 from absharProject.settings import Kavenegar_API
-from user_app.models import User, MyHouse
+from home import subdomains
+from user_app.models import User
 
 
 def send_notify_user_by_sms(mobile, name, amount):
@@ -124,10 +125,5 @@ def send_sms_to_middle(mobile, message, full_name, otp=None):
 
 
 def get_house_by_subdomain(subdomain):
-    if not subdomain:
-        return None
-
-    try:
-        return MyHouse.objects.get(subdomain=subdomain, is_active=True)
-    except MyHouse.DoesNotExist:
-        return None
\ No newline at end of file
+    # همان کش زیردامنه‌ای که SubdomainMiddleware استفاده می‌کند
+    return subdomains.get_house_by_subdomain(subdomain)
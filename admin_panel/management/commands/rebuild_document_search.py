@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.services.document_search import SOURCES_BY_KEY, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "بازسازی ایندکس جستجوی متنی سندهای مالی (صندوق، هزینه، درآمد، دریافت و پرداخت)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=sorted(SOURCES_BY_KEY), help='فقط یک نوع سند')
+
+    def handle(self, *args, **options):
+        count = rebuild_index(source_key=options.get('source'))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} documents."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.services.house_analytics import refresh_analytics
+
+
+class Command(BaseCommand):
+    help = "محاسبه دوباره آمار ساختمان‌ها برای گزارش‌های ادمین کل (پیش‌فرض فقط ساختمان‌های تغییرکرده)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--house', type=int, help='فقط یک ساختمان')
+        parser.add_argument('--full', action='store_true', help='همه ساختمان‌ها')
+
+    def handle(self, *args, **options):
+        count = refresh_analytics(full=options['full'], house_id=options.get('house'))
+        self.stdout.write(self.style.SUCCESS(f"Refreshed analytics for {count} houses."))
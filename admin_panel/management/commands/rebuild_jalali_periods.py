@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.services.jalali_periods import PERIOD_SOURCES, rebuild_periods
+
+
+class Command(BaseCommand):
+    help = "پرکردن دوباره ستون‌های سال و ماه شمسی سندها از روی تاریخ‌هایشان"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(PERIOD_SOURCES), help='فقط یک مدل')
+
+    def handle(self, *args, **options):
+        changed = rebuild_periods(model_name=options.get('model'))
+        for name, count in changed.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Updated Jalali periods for {sum(changed.values())} rows."))
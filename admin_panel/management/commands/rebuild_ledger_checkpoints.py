@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.services.ledger_checkpoints import rebuild_checkpoints
+
+
+class Command(BaseCommand):
+    help = "بازسازی نقاط کنترل ماهانه مانده صندوق از روی سندهای ثبت‌شده"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--house', type=int, help='فقط یک ساختمان')
+
+    def handle(self, *args, **options):
+        count = rebuild_checkpoints(house_id=options.get('house'))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} ledger checkpoints."))
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rebuild_ledger_final_amounts(apps, schema_editor):
+    """
+    final_amount قبلاً یک مانده سراسری بین همه ساختمان‌ها بود؛ از این پس مانده هر
+    دفتر (ساختمان + حساب بانکی) جداگانه است و سندهای موجود یک بار بازمحاسبه می‌شوند.
+    """
+    Fund = apps.get_model('admin_panel', 'Fund')
+
+    pending = []
+    partition = None
+    running_total = 0
+
+    funds = (
+        Fund.objects
+        .order_by('house_id', 'bank_id', 'doc_number', 'id')
+        .values_list('id', 'house_id', 'bank_id', 'debtor_amount', 'creditor_amount')
+    )
+    for fund_id, house_id, bank_id, debtor, creditor in funds.iterator(chunk_size=2000):
+        if (house_id, bank_id) != partition:
+            partition = (house_id, bank_id)
+            running_total = 0
+        running_total += (debtor or 0) - (creditor or 0)
+        pending.append(Fund(id=fund_id, final_amount=running_total))
+
+        if len(pending) >= 1000:
+            Fund.objects.bulk_update(pending, ['final_amount'])
+            pending = []
+
+    if pending:
+        Fund.objects.bulk_update(pending, ['final_amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_delete_commentsite'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('last_doc_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['house', 'bank', 'doc_number'], name='admin_panel_house_i_4a0f19_idx'),
+        ),
+        migrations.AddField(
+            model_name='fundsequence',
+            name='house',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fund_sequences', to='user_app.myhouse'),
+        ),
+        migrations.RunPython(rebuild_ledger_final_amounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:31
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+import jdatetime
+from django.db import migrations, models
+
+
+def build_checkpoints(apps, schema_editor):
+    """
+    نقاط کنترل سندهای موجود؛ معادل دستور rebuild_ledger_checkpoints
+    """
+    Fund = apps.get_model('admin_panel', 'Fund')
+    LedgerCheckpoint = apps.get_model('admin_panel', 'LedgerCheckpoint')
+
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    rows = Fund.objects.order_by().values_list('house_id', 'bank_id', 'created_at', 'debtor_amount', 'creditor_amount')
+    for house_id, bank_id, created_at, debit, credit in rows.iterator(chunk_size=2000):
+        jalali = jdatetime.date.fromgregorian(date=created_at.date())
+        month_totals = totals[(house_id, bank_id, (jalali.year, jalali.month))]
+        month_totals[0] += debit or 0
+        month_totals[1] += credit or 0
+
+    objects = []
+    running = {}
+    for (house_id, bank_id, (year, month)), (debit, credit) in sorted(
+            totals.items(), key=lambda item: (str(item[0][0]), str(item[0][1]), item[0][2])
+    ):
+        opening = running.get((house_id, bank_id), Decimal('0'))
+        objects.append(LedgerCheckpoint(
+            key=f"house:{house_id or 'none'}:bank:{bank_id or 'none'}",
+            house_id=house_id,
+            bank_id=bank_id,
+            jalali_year=year,
+            jalali_month=month,
+            opening_balance=opening,
+            debit=debit,
+            credit=credit,
+        ))
+        running[(house_id, bank_id)] = opening + debit - credit
+
+    LedgerCheckpoint.objects.bulk_create(objects, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0005_fund_sequence'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('jalali_year', models.PositiveSmallIntegerField()),
+                ('jalali_month', models.PositiveSmallIntegerField()),
+                ('opening_balance', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('debit', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('credit', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_checkpoints', to='user_app.bank')),
+                ('house', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_checkpoints', to='user_app.myhouse')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('key', 'jalali_year', 'jalali_month'), name='unique_ledger_checkpoint')],
+            },
+        ),
+        migrations.RunPython(build_checkpoints, migrations.RunPython.noop),
+    ]
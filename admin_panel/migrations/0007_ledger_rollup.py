@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_rollups(apps, schema_editor):
+    """
+    جدول تجمیعی سندهای موجود؛ معادل دستور rebuild_ledger_rollups
+    """
+    from admin_panel.services.ledger_rollups import rebuild_rollups
+
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0006_ledger_checkpoint'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('jalali_year', models.PositiveSmallIntegerField()),
+                ('jalali_month', models.PositiveSmallIntegerField()),
+                ('category', models.CharField(max_length=30)),
+                ('flow', models.CharField(choices=[('in', 'ورودی'), ('out', 'خروجی')], max_length=3)),
+                ('amount', models.DecimalField(decimal_places=0, default=0, max_digits=16)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rollups', to='user_app.bank')),
+                ('house', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rollups', to='user_app.myhouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['house', 'jalali_year', 'jalali_month'], name='admin_panel_house_i_57804f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('key', 'jalali_year', 'jalali_month', 'category', 'flow'), name='unique_ledger_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_analytics(apps, schema_editor):
+    """
+    آمار اولیه همه ساختمان‌ها؛ معادل دستور rebuild_house_analytics --full
+    """
+    from admin_panel.services.house_analytics import refresh_analytics
+
+    refresh_analytics(full=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0007_ledger_rollup'),
+        ('notifications', '0002_initial'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('owner_unit_count', models.PositiveIntegerField(default=0)),
+                ('renter_unit_count', models.PositiveIntegerField(default=0)),
+                ('debt_total', models.DecimalField(decimal_places=0, default=0, max_digits=16)),
+                ('debt_unit_count', models.PositiveIntegerField(default=0)),
+                ('debt_charge_count', models.PositiveIntegerField(default=0)),
+                ('fund_count', models.PositiveIntegerField(default=0)),
+                ('fund_debtor_total', models.DecimalField(decimal_places=0, default=0, max_digits=16)),
+                ('fund_creditor_total', models.DecimalField(decimal_places=0, default=0, max_digits=16)),
+                ('admin_fund_count', models.PositiveIntegerField(default=0)),
+                ('ticket_count', models.PositiveIntegerField(default=0)),
+                ('open_ticket_count', models.PositiveIntegerField(default=0)),
+                ('is_stale', models.BooleanField(db_index=True, default=False)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('house', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='user_app.myhouse')),
+            ],
+        ),
+        migrations.RunPython(build_analytics, migrations.RunPython.noop),
+    ]
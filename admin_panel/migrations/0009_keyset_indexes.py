@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0008_house_analytics'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'created_at'], name='admin_panel_user_id_2f4c65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['house', 'created_at'], name='admin_panel_house_i_624723_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['unit', 'created_at'], name='admin_panel_unit_id_85315d_idx'),
+        ),
+    ]
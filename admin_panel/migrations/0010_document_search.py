@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    """
+    جدول ایندکس جستجو و متن سندهای موجود؛ معادل دستور rebuild_document_search
+    """
+    from admin_panel.services.document_search import rebuild_index
+
+    rebuild_index(apps=apps, connection=schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from admin_panel.services.document_search import get_backend
+
+    get_backend(schema_editor.connection).uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
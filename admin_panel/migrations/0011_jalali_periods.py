@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_periods(apps, schema_editor):
+    """
+    ستون‌های ماه شمسی سندهای موجود؛ معادل دستور rebuild_jalali_periods
+    """
+    from admin_panel.services.jalali_periods import rebuild_periods
+
+    rebuild_periods(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0010_document_search'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankfund',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='bankfund',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='civilinstallment',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='civilinstallment',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='fund',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='fund',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='sewageinstallment',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='sewageinstallment',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddField(
+            model_name='unifiedcharge',
+            name='jalali_month',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='ماه شمسی'),
+        ),
+        migrations.AddField(
+            model_name='unifiedcharge',
+            name='jalali_year',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='سال شمسی'),
+        ),
+        migrations.AddIndex(
+            model_name='bankfund',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__f813a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='civilinstallment',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__b91556_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__cd3b35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__a31e3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__9ce07b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sewageinstallment',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__1b9c33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unifiedcharge',
+            index=models.Index(fields=['jalali_year', 'jalali_month'], name='admin_panel_jalali__362ccb_idx'),
+        ),
+        migrations.RunPython(build_periods, migrations.RunPython.noop),
+    ]
@@ -14,13 +14,91 @@ from django.db.models import Count
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 from jalali_date import date2jalali
 
+from admin_panel.services.penalties import calculate_penalty, calculate_total, effective_penalty_expression, \
+    payable_total_expression
+from admin_panel.services.jalali_periods import PERIOD_SOURCES, SYNC_BATCH_SIZE, filtered_fields, period_filter, \
+    period_of, source_fields, sync_periods
 from user_app.models import Unit, User, Bank, MyHouse
 
 
+# ======================= Jalali Period Columns ==========================
+class JalaliPeriodQuerySet(models.QuerySet):
+    """
+    ستون‌های ماه شمسی را در نوشتن‌های گروهی (update، bulk_create، bulk_update) همگام نگه می‌دارد
+    """
+
+    def _period_source(self):
+        return PERIOD_SOURCES[self.model._meta.object_name]
+
+    def in_jalali_period(self, start, end=None):
+        """
+        ردیف‌های ماه(های) شمسی؛ start و end به شکل (سال، ماه) یا فقط سال، مثل period_filter
+        """
+        return self.filter(period_filter(start, end))
+
+    def update(self, **kwargs):
+        if 'jalali_year' in kwargs or not set(kwargs) & source_fields(self._period_source()):
+            return super().update(**kwargs)
+        # اگر update ستونی از شرط فیلتر را عوض نکند، همان queryset بعد از آن هم همان ردیف‌ها را برمی‌گرداند
+        updated_fields = {self.model._meta.get_field(name).name for name in kwargs}
+        if not updated_fields & filtered_fields(self):
+            with transaction.atomic(using=self.db):
+                rows = super().update(**kwargs)
+                sync_periods(self._chain())
+            return rows
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            base = self.model._base_manager.using(self.db)
+            for start in range(0, len(pks), SYNC_BATCH_SIZE):
+                sync_periods(base.filter(pk__in=pks[start:start + SYNC_BATCH_SIZE]))
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_jalali_period()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if set(fields) & source_fields(self._period_source()):
+            objs = list(objs)
+            for obj in objs:
+                obj.set_jalali_period()
+            fields = [*fields, 'jalali_year', 'jalali_month']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
+class JalaliPeriodModel(models.Model):
+    """
+    سال و ماه شمسی سند (طبق PERIOD_SOURCES) در دو ستون عددی؛ گروه‌بندی ماهانه و فیلتر بازه
+    ماه‌های شمسی بدون تبدیل تاریخ در پایتون با مقایسه ساده روی ایندکس انجام می‌شود
+    """
+    jalali_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name='سال شمسی')
+    jalali_month = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name='ماه شمسی')
+
+    objects = JalaliPeriodQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def set_jalali_period(self):
+        self.jalali_year, self.jalali_month = period_of(self, PERIOD_SOURCES[self._meta.object_name])
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.set_jalali_period()
+        elif set(update_fields) & source_fields(PERIOD_SOURCES[self._meta.object_name]):
+            self.set_jalali_period()
+            kwargs['update_fields'] = {*update_fields, 'jalali_year', 'jalali_month'}
+        super().save(*args, **kwargs)
+
+
 class Announcement(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     house = models.ForeignKey(MyHouse, on_delete=models.CASCADE)
@@ -143,7 +221,7 @@ class ExpenseCategory(models.Model):
         return self.title
 
 
-class Expense(models.Model):
+class Expense(JalaliPeriodModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE, verbose_name='شماره حساب', null=True, blank=True)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, null=True, blank=True)
@@ -173,6 +251,14 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
     is_active = models.BooleanField(default=True, verbose_name='فعال/غیرفعال')
 
+    class Meta:
+        indexes = [
+            # صفحه‌بندی keyset گزارش هزینه‌ها (absharProject.keyset_pagination)
+            models.Index(fields=['user', 'created_at']),
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def __str__(self):
         return str(self.doc_no)
 
@@ -200,7 +286,7 @@ class IncomeCategory(models.Model):
         return self.subject
 
 
-class Income(models.Model):
+class Income(JalaliPeriodModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE, verbose_name='شماره حساب', null=True, blank=True)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, null=True, blank=True)
@@ -229,6 +315,12 @@ class Income(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
     is_active = models.BooleanField(default=True, verbose_name='فعال/غیرفعال')
 
+    class Meta:
+        indexes = [
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def __str__(self):
         return str(self.doc_number)
 
@@ -538,7 +630,7 @@ class SewageDocument(models.Model):
         return str(self.sewage.name)
 
 
-class SewageInstallment(models.Model):
+class SewageInstallment(JalaliPeriodModel):
     sewage_manage = models.ForeignKey('SewageManage', on_delete=models.CASCADE, related_name='sewage_installments')
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE, verbose_name='شماره حساب', null=True, blank=True)
     house = models.ForeignKey(
@@ -571,6 +663,12 @@ class SewageInstallment(models.Model):
         verbose_name="تاریخ ارسال اعلان"
     )
 
+    class Meta:
+        indexes = [
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def __str__(self):
         return f"قسط شماره {self.installment_number} از {self.sewage_manage.name}"
 
@@ -632,7 +730,7 @@ class CivilDocument(models.Model):
         return str(self.civil.name)
 
 
-class CivilInstallment(models.Model):
+class CivilInstallment(JalaliPeriodModel):
     civil_manage = models.ForeignKey('CivilManage', on_delete=models.CASCADE, related_name='installments')
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE, verbose_name='شماره حساب', null=True, blank=True)
     house = models.ForeignKey(
@@ -665,6 +763,12 @@ class CivilInstallment(models.Model):
         verbose_name="تاریخ ارسال اعلان"
     )
 
+    class Meta:
+        indexes = [
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def __str__(self):
         return f"قسط شماره {self.installment_number} از {self.civil_manage.name}"
 
@@ -797,7 +901,108 @@ class ChargeByExpense(BaseCharge):
     display_fields = ['unit_power_amount', 'unit_water_amount', 'unit_gas_amount', 'extra_parking_amount', ]
 
 
-class UnifiedCharge(models.Model):
+# فیلدهایی که update گروهی آن‌ها داشبورد مدیر ساختمان را کهنه می‌کند
+DASHBOARD_CHARGE_FIELDS = {'is_paid', 'send_notification', 'payment_date', 'send_notification_date',
+                           'unit', 'unit_id', 'house', 'house_id'}
+
+
+class UnifiedChargeQuerySet(JalaliPeriodQuerySet):
+
+    def update(self, **kwargs):
+        # update و bulk_create سیگنال ندارند؛ نسخه داشبورد ساختمان‌ها و هدر ساکنین واحدهای درگیر
+        # (تعداد شارژهای جدید) همین‌جا عوض می‌شود
+        if not DASHBOARD_CHARGE_FIELDS & set(kwargs):
+            return super().update(**kwargs)
+        rows_before = list(self.order_by().values_list('house_id', 'unit_id').distinct())
+        rows = super().update(**kwargs)
+
+        unit_ids = {unit_id for _, unit_id in rows_before}
+        if 'unit' in kwargs or 'unit_id' in kwargs:
+            new_unit = kwargs.get('unit_id', kwargs.get('unit'))
+            unit_ids.add(getattr(new_unit, 'pk', new_unit))
+        self._charges_changed({house_id for house_id, _ in rows_before}, unit_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._charges_changed({obj.house_id for obj in created}, {obj.unit_id for obj in created})
+        return created
+
+    @staticmethod
+    def _charges_changed(house_ids, unit_ids):
+        from absharProject.header_state import invalidate_unit_header_state
+        from middleAdmin_panel.services.dashboard_snapshot import touch_dashboards
+        touch_dashboards(house_ids=house_ids)
+        invalidate_unit_header_state(*unit_ids)
+
+    def with_penalty(self, as_of=None):
+        """
+        جریمه و مبلغ قابل پرداخت در تاریخ as_of را داخل همان SELECT محاسبه می‌کند
+        (effective_penalty و payable_total) بدون اینکه چیزی در دیتابیس ذخیره شود.
+        ذخیره‌سازی فقط در تسک شبانه و هنگام پرداخت انجام می‌شود.
+        """
+        as_of = as_of or timezone.now().date()
+        return self.annotate(
+            effective_penalty=effective_penalty_expression(as_of),
+            payable_total=payable_total_expression(as_of),
+        )
+
+    def previous_debt_by_type(self, units, cutoff, as_of=None):
+        """
+        بدهی‌های پرداخت‌نشده قبلیِ چند واحد، تفکیک شده بر اساس نوع شارژ، با یک کوئری گروه‌بندی‌شده:
+        {unit_id: {charge_type: مبلغ}}
+
+        cutoff یک تاریخ برای همه واحدها یا یک dict از unit_id → تاریخ است؛
+        بدهی‌هایی حساب می‌شوند که مهلت پرداختشان قبل از cutoff همان واحد باشد.
+        مبلغ هر بدهی با جریمه در تاریخ as_of (پیش‌فرض امروز) محاسبه می‌شود.
+        """
+        unit_ids = [getattr(unit, 'pk', unit) for unit in units]
+        if not unit_ids:
+            return {}
+
+        if isinstance(cutoff, dict):
+            cutoffs = {unit_id: cutoff.get(unit_id) for unit_id in unit_ids}
+        else:
+            cutoffs = {unit_id: cutoff for unit_id in unit_ids}
+
+        # واحدهای با cutoff یکسان در یک شرط OR جمع می‌شوند
+        units_by_cutoff = defaultdict(list)
+        for unit_id, unit_cutoff in cutoffs.items():
+            if unit_cutoff:
+                units_by_cutoff[_as_date(unit_cutoff)].append(unit_id)
+        if not units_by_cutoff:
+            return {}
+
+        condition = models.Q()
+        for unit_cutoff, ids in units_by_cutoff.items():
+            condition |= models.Q(unit_id__in=ids, payment_deadline_date__lt=unit_cutoff)
+
+        rows = (
+            self.filter(condition, is_paid=False, send_notification=True)
+            .with_penalty(as_of)
+            .order_by()
+            .values('unit_id', 'charge_type')
+            .annotate(total=models.Sum('payable_total'))
+        )
+
+        result = defaultdict(dict)
+        for row in rows:
+            result[row['unit_id']][row['charge_type']] = row['total'] or 0
+        return dict(result)
+
+
+def _as_date(value):
+    """
+    همان تبدیلی که Django هنگام مقایسه DateField با datetime انجام می‌دهد
+    """
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+class UnifiedCharge(JalaliPeriodModel):
     class ChargeType(models.TextChoices):
         FIX = 'fix', 'ثابت'  # Fixed Charge → ثابت
         AREA = 'area', 'متراژی'  # Area Charge → متراژ
@@ -921,6 +1126,14 @@ class UnifiedCharge(models.Model):
     # تاریخ ایجاد
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UnifiedChargeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def save(self, *args, **kwargs):
         if self.unit:
             self.house = self.unit.myhouse
@@ -1029,14 +1242,12 @@ class UnifiedCharge(models.Model):
                     self.save(update_fields=['penalty_amount', 'total_charge_month'])
             return
 
-        # 5️⃣ محاسبه جریمه
-        delay_days = (today - self.payment_deadline_date).days
-        base = self.base_charge or 0
-        new_penalty = int(base * self.penalty_percent / 100 * delay_days)
+        # 5️⃣ محاسبه جریمه (همان فرمول تسک شبانه)
+        new_penalty = calculate_penalty(self.base_charge, self.penalty_percent, self.payment_deadline_date, today)
 
         if new_penalty != (self.penalty_amount or 0):
             self.penalty_amount = new_penalty
-            self.total_charge_month = base + new_penalty
+            self.total_charge_month = calculate_total(self.base_charge, new_penalty)
             if save:
                 self.save(update_fields=['penalty_amount', 'total_charge_month'])
 
@@ -1051,7 +1262,7 @@ class UnifiedCharge(models.Model):
             return None
 
         # مستاجر فعال
-        renter = self.unit.renters.filter(renter_is_active=True).first()
+        renter = self.unit.get_active_renter()
         if renter and renter.renter_mobile:
             return renter.renter_mobile
 
@@ -1094,25 +1305,13 @@ class UnifiedCharge(models.Model):
         """
         محاسبه بدهی‌های پرداخت‌نشده قبلی همان واحد، تفکیک شده بر اساس نوع شارژ
         """
-        if not self.unit:
+        if not self.unit_id:
             return {}
 
-        today = timezone.now().date()
-
-        # همه بدهی‌های قبلی که پرداخت نشده و قبل از این شارژ ایجاد شده‌اند
-        previous_charges = UnifiedCharge.objects.filter(
-            unit=self.unit,
-            is_paid=False,
-            send_notification=True,
-            payment_deadline_date__lt=self.created_at
-        )
-
-        result = defaultdict(int)
-        for charge in previous_charges:
-            charge.update_penalty(save=False)
-            result[charge.charge_type] += charge.total_charge_month or 0
-
-        return dict(result)
+        # همه بدهی‌های قبلی که پرداخت نشده و مهلتشان قبل از ایجاد این شارژ بوده است
+        return UnifiedCharge.objects.previous_debt_by_type(
+            [self.unit_id], self.created_at
+        ).get(self.unit_id, {})
 
     @property
     def total_previous_debt(self):
@@ -1131,7 +1330,46 @@ class UnifiedCharge(models.Model):
         return current + self.total_previous_debt
 
 
-class Fund(models.Model):
+class FundSequence(models.Model):
+    """
+    شمارنده شماره سند صندوق برای هر ساختمان. ثبت سند فقط ردیف ساختمان خودش را
+    قفل می‌کند و با سایر ساختمان‌ها رقابتی ندارد.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    house = models.ForeignKey(MyHouse, on_delete=models.CASCADE, null=True, blank=True, related_name='fund_sequences')
+    last_doc_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.last_doc_number}"
+
+    @staticmethod
+    def key_for(house_id):
+        return f"house:{house_id or 'none'}"
+
+    @classmethod
+    def lock(cls, house_id):
+        """
+        ردیف شمارنده ساختمان را با select_for_update برمی‌گرداند (داخل تراکنش صدا زده شود).
+        ردیف برای ساختمان‌های قدیمی از بزرگ‌ترین شماره سند موجود همان ساختمان شروع می‌شود.
+        """
+        key = cls.key_for(house_id)
+        try:
+            return cls.objects.select_for_update().get(key=key)
+        except cls.DoesNotExist:
+            pass
+
+        cls.objects.get_or_create(
+            key=key,
+            defaults={
+                'house_id': house_id,
+                'last_doc_number': lambda: Fund.objects.filter(house_id=house_id).aggregate(
+                    models.Max('doc_number'))['doc_number__max'] or 0,
+            }
+        )
+        return cls.objects.select_for_update().get(key=key)
+
+
+class Fund(JalaliPeriodModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, null=True, blank=True, related_name='funds')
     house = models.ForeignKey(
@@ -1175,16 +1413,36 @@ class Fund(models.Model):
         if self.final_amount < 0:
             raise ValidationError("موجودی صندوق کافی نیست. ثبت این تراکنش باعث منفی شدن موجودی می‌شود.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['house', 'bank', 'doc_number']),
+            # صفحه‌بندی keyset گزارش‌های گردش (absharProject.keyset_pagination)
+            models.Index(fields=['house', 'created_at']),
+            models.Index(fields=['unit', 'created_at']),
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
+    def ledger_funds(self):
+        """
+        سندهای همان دفتر (ساختمان + حساب بانکی)؛ مانده final_amount در هر دفتر جداگانه است
+        """
+        return Fund.objects.filter(house_id=self.house_id, bank_id=self.bank_id)
+
     @transaction.atomic
     def save(self, *args, **kwargs):
-        # تعیین شماره سند فقط برای رکورد جدید
+        # تعیین شماره سند و مانده فقط برای رکورد جدید
         if not self.pk:
+            # قفل شمارنده ساختمان؛ نویسنده‌های همزمان همین ساختمان پشت سر هم اجرا می‌شوند
+            sequence = FundSequence.lock(self.house_id)
             if not self.doc_number:
-                last_doc_number = Fund.objects.aggregate(models.Max('doc_number'))['doc_number__max']
-                self.doc_number = (last_doc_number or 0) + 1
+                self.doc_number = sequence.last_doc_number + 1
+            if self.doc_number > sequence.last_doc_number:
+                sequence.last_doc_number = self.doc_number
+                sequence.save(update_fields=['last_doc_number'])
 
-            # محاسبه final_amount فقط برای رکورد جدید
-            last_fund = Fund.objects.order_by('-doc_number').first()
+            # مانده قبلی همین دفتر (ساختمان + حساب بانکی)
+            last_fund = self.ledger_funds().order_by('-doc_number').only('final_amount').first()
             previous_final = Decimal(last_fund.final_amount if last_fund and last_fund.final_amount is not None else 0)
             self.final_amount = previous_final + (self.debtor_amount or 0) - (self.creditor_amount or 0)
 
@@ -1196,26 +1454,155 @@ class Fund(models.Model):
         super().save(*args, **kwargs)
 
     @classmethod
-    def recalc_final_amounts_from(cls, fund):
+    def recalc_final_amounts_from(cls, fund, chunk_size=1000):
         """
-        بازمحاسبه final_amount فقط از Fund داده شده به بعد
+        بازمحاسبه final_amount از Fund داده شده به بعد، فقط داخل دفتر همان Fund.
+        جمع تجمعی با Window در خود دیتابیس محاسبه می‌شود و فقط ردیف‌هایی که مانده‌شان
+        تغییر کرده با bulk_update دسته‌ای نوشته می‌شوند. اگر مانده در جایی منفی شود،
+        قبل از هر نوشتنی خطا برمی‌گردد. تعداد ردیف‌های بروزرسانی‌شده را برمی‌گرداند.
         """
+        ledger = fund.ledger_funds()
+        ordering = ('doc_number', 'id')
+
         with transaction.atomic():
             # موجودی قبل از fund
-            last_before = cls.objects.filter(doc_number__lt=fund.doc_number).order_by('-doc_number').first()
-            running_total = Decimal(last_before.final_amount if last_before else 0)
+            opening = ledger.filter(doc_number__lt=fund.doc_number).order_by('-doc_number').values_list(
+                'final_amount', flat=True
+            ).first()
+            opening = Decimal(opening or 0)
+
+            rows = ledger.filter(doc_number__gte=fund.doc_number).annotate(
+                running_total=models.Window(
+                    models.Sum(models.F('debtor_amount') - models.F('creditor_amount')),
+                    order_by=[models.F(field).asc() for field in ordering],
+                )
+            )
+
+            # اولین سندی که مانده را منفی می‌کند
+            first_negative = (
+                rows.filter(running_total__lt=-opening)
+                .order_by(*ordering)
+                .values_list('doc_number', flat=True)
+                .first()
+            )
+            if first_negative is not None:
+                raise ValidationError(f"خطا: موجودی صندوق در سند شماره {first_negative} منفی شد!")
+
+            updated = 0
+            pending = []
+            for pk, final_amount, running_total in (
+                    rows.order_by(*ordering)
+                    .values_list('pk', 'final_amount', 'running_total')
+                    .iterator(chunk_size=chunk_size)
+            ):
+                new_final = opening + running_total
+                if final_amount != new_final:
+                    pending.append(cls(pk=pk, final_amount=new_final))
+
+                if len(pending) >= chunk_size:
+                    cls.objects.bulk_update(pending, ['final_amount'])
+                    updated += len(pending)
+                    pending = []
+
+            if pending:
+                cls.objects.bulk_update(pending, ['final_amount'])
+                updated += len(pending)
+
+        return updated
+
+
+class LedgerCheckpoint(models.Model):
+    """
+    مانده ابتدای هر ماه شمسی برای هر دفتر صندوق (ساختمان + حساب بانکی) به همراه جمع
+    بدهکار و بستانکار همان ماه. با هر ثبت سند به‌صورت افزایشی به‌روزرسانی می‌شود
+    تا گزارش‌های صفحه‌بندی‌شده بدون پیمایش کل تاریخچه مانده درست را نشان دهند.
+    """
+    key = models.CharField(max_length=50)
+    house = models.ForeignKey(MyHouse, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='ledger_checkpoints')
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_checkpoints')
+    jalali_year = models.PositiveSmallIntegerField()
+    jalali_month = models.PositiveSmallIntegerField()
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    debit = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'jalali_year', 'jalali_month'], name='unique_ledger_checkpoint'),
+        ]
 
-            # بروزرسانی این Fund و بعدی‌ها
-            qs = cls.objects.filter(doc_number__gte=fund.doc_number).order_by('doc_number')
-            for f in qs:
-                running_total += (f.debtor_amount or 0) - (f.creditor_amount or 0)
-                if running_total < 0:
-                    raise ValidationError(f"خطا: موجودی صندوق در سند شماره {f.doc_number} منفی شد!")
-                f.final_amount = running_total
-                f.save(update_fields=['final_amount'])
+    def __str__(self):
+        return f"{self.key} {self.jalali_year}/{self.jalali_month}: {self.opening_balance}"
 
+    @property
+    def closing_balance(self):
+        return self.opening_balance + self.debit - self.credit
+
+    @staticmethod
+    def key_for(house_id, bank_id):
+        return f"house:{house_id or 'none'}:bank:{bank_id or 'none'}"
+
+
+class LedgerRollup(models.Model):
+    """
+    جمع ماهانه مبالغ گزارش تراز ساختمان به تفکیک ساختمان، حساب بانکی، ماه شمسی، گروه و جهت گردش.
+    ماه 0 برای سندهایی است که تاریخ ندارند. تعریف گروه‌ها در admin_panel.services.ledger_rollups است.
+    """
+    FLOW_CHOICES = (
+        ('in', 'ورودی'),
+        ('out', 'خروجی'),
+    )
+
+    key = models.CharField(max_length=50)
+    house = models.ForeignKey(MyHouse, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_rollups')
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_rollups')
+    jalali_year = models.PositiveSmallIntegerField()
+    jalali_month = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=30)
+    flow = models.CharField(max_length=3, choices=FLOW_CHOICES)
+    amount = models.DecimalField(max_digits=16, decimal_places=0, default=0)
 
-class BankFund(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'jalali_year', 'jalali_month', 'category', 'flow'],
+                                    name='unique_ledger_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['house', 'jalali_year', 'jalali_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.jalali_year}/{self.jalali_month} {self.category}:{self.flow} = {self.amount}"
+
+
+class HouseAnalytics(models.Model):
+    """
+    آمار هر ساختمان برای صفحه‌های گزارش ادمین کل (بدهی، واحدها، مالک/مستاجر، صندوق و تیکت‌ها).
+    با تغییر داده‌های یک ساختمان is_stale می‌شود و تسک دوره‌ای فقط همان ساختمان‌ها را دوباره حساب می‌کند؛
+    محاسبه در admin_panel.services.house_analytics است.
+    """
+    house = models.OneToOneField(MyHouse, on_delete=models.CASCADE, related_name='analytics')
+    unit_count = models.PositiveIntegerField(default=0)
+    owner_unit_count = models.PositiveIntegerField(default=0)
+    renter_unit_count = models.PositiveIntegerField(default=0)
+    debt_total = models.DecimalField(max_digits=16, decimal_places=0, default=0)
+    debt_unit_count = models.PositiveIntegerField(default=0)
+    debt_charge_count = models.PositiveIntegerField(default=0)
+    fund_count = models.PositiveIntegerField(default=0)
+    fund_debtor_total = models.DecimalField(max_digits=16, decimal_places=0, default=0)
+    fund_creditor_total = models.DecimalField(max_digits=16, decimal_places=0, default=0)
+    admin_fund_count = models.PositiveIntegerField(default=0)
+    ticket_count = models.PositiveIntegerField(default=0)
+    open_ticket_count = models.PositiveIntegerField(default=0)
+    is_stale = models.BooleanField(default=False, db_index=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.house_id}: {self.unit_count} units, debt {self.debt_total}"
+
+
+class BankFund(JalaliPeriodModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, null=True, blank=True, related_name='banks_funds')
     house = models.ForeignKey(
@@ -1266,6 +1653,12 @@ class BankFund(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_paid = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # گروه‌بندی و فیلتر ماه شمسی (JalaliPeriodModel)
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
     def __str__(self):
         return f"Fund: {self.payment_description} for {self.content_object}"
 
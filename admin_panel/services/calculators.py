@@ -1,13 +1,93 @@
+from collections import namedtuple
+
 from django.utils import timezone
 
+try:
+    import numpy as np
+except ImportError:  # numpy اختیاری است؛ بدون آن محاسبه دسته‌ای با پایتون خالص انجام می‌شود
+    np = None
+
+
+# -------------------------------
+# Unit Columns
+# -------------------------------
+# ستون‌های مورد نیاز محاسبه شارژ برای همه واحدهای یک ساختمان
+UnitColumns = namedtuple('UnitColumns', ['unit_ids', 'area', 'people_count', 'parking_counts'])
+
+# نتیجه محاسبه دسته‌ای؛ هر فیلد یک لیست هم‌ترتیب با unit_ids است
+ChargeBatch = namedtuple('ChargeBatch', ['unit_ids', 'base', 'civil', 'other', 'total'])
+
+UNIT_COLUMN_FIELDS = ('id', 'area', 'people_count', 'parking_counts')
+
+
+def unit_columns(units):
+    """
+    ستون‌های محاسبه را از یک QuerySet واحد (با یک کوئری values_list و بدون ساخت آبجکت)
+    یا از یک لیست آبجکت Unit می‌سازد. مقادیر خالی صفر در نظر گرفته می‌شوند.
+    """
+    if hasattr(units, 'values_list'):
+        rows = units.order_by().values_list(*UNIT_COLUMN_FIELDS)
+    else:
+        rows = [tuple(getattr(unit, field, 0) for field in UNIT_COLUMN_FIELDS) for unit in units]
+
+    unit_ids, area, people_count, parking_counts = [], [], [], []
+    for unit_id, unit_area, people, parking in rows:
+        unit_ids.append(unit_id)
+        area.append(unit_area or 0)
+        people_count.append(people or 0)
+        parking_counts.append(parking or 0)
+    return UnitColumns(unit_ids, area, people_count, parking_counts)
+
 
 # -------------------------------
 # Base Calculator
 # -------------------------------
 class BaseCalculator:
+    """
+    همه انواع شارژ خطی هستند: ثابت + متراژ × نرخ + نفرات × نرخ + پارکینگ × نرخ.
+    هر Calculator فقط ضرایب خود را در rates تعریف می‌کند و محاسبه تکی و دسته‌ای
+    از همین ضرایب استفاده می‌کنند تا نتیجه هر دو یکسان باشد.
+    """
+
+    def rates(self, charge_obj):
+        """ضرایب شارژ: (مبلغ ثابت، نرخ متراژ، نرخ نفر، نرخ پارکینگ)"""
+        raise NotImplementedError
+
     def calculate(self, unit, charge_obj):
         """محاسبه مبلغ پایه شارژ هر واحد"""
-        raise NotImplementedError
+        fix, area_rate, person_rate, parking_rate = self.rates(charge_obj)
+        area = getattr(unit, 'area', 0) or 0
+        people = getattr(unit, 'people_count', 0) or 0
+        parking = getattr(unit, 'parking_counts', 0) or 0
+        return fix + (area * area_rate) + (people * person_rate) + (parking * parking_rate)
+
+    def calculate_batch(self, columns, charge_obj):
+        """
+        محاسبه مبلغ پایه، عمرانی، سایر هزینه‌ها و جمع کل همه واحدها در یک مرحله.
+        columns خروجی unit_columns است؛ در صورت نصب بودن numpy محاسبه برداری انجام می‌شود.
+        """
+        fix, area_rate, person_rate, parking_rate = self.rates(charge_obj)
+        civil = charge_obj.civil or 0
+        other = charge_obj.other_cost_amount or 0
+        count = len(columns.unit_ids)
+
+        if np is not None and count:
+            base = (
+                    fix
+                    + np.asarray(columns.area, dtype=np.int64) * area_rate
+                    + np.asarray(columns.people_count, dtype=np.int64) * person_rate
+                    + np.asarray(columns.parking_counts, dtype=np.int64) * parking_rate
+            )
+            total = base + (civil + other)
+            base, total = base.tolist(), total.tolist()
+        else:
+            base = [
+                fix + (area * area_rate) + (people * person_rate) + (parking * parking_rate)
+                for area, people, parking in zip(columns.area, columns.people_count, columns.parking_counts)
+            ]
+            total = [amount + civil + other for amount in base]
+
+        return ChargeBatch(list(columns.unit_ids), base, [civil] * count, [other] * count, total)
 
     def calculate_penalty(self, charge_obj, base_total):
         """محاسبه جریمه دیرکرد"""
@@ -28,92 +108,83 @@ class BaseCalculator:
 # 1️⃣ Fixed Charge
 # -------------------------------
 class FixedChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        return charge_obj.fix_amount or 0
+    def rates(self, charge_obj):
+        return charge_obj.fix_amount or 0, 0, 0, 0
 
 
 # -------------------------------
 # 2️⃣ Area Charge
 # -------------------------------
 class AreaChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        area = getattr(unit, 'area', 0) or 0
-        return area * (charge_obj.area_amount or 0)
+    def rates(self, charge_obj):
+        return 0, charge_obj.area_amount or 0, 0, 0
 
 
 # -------------------------------
 # 3️⃣ Person Charge
 # -------------------------------
 class PersonChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        people = getattr(unit, 'people_count', 0) or 0
-        return people * (charge_obj.person_amount or 0)
+    def rates(self, charge_obj):
+        return 0, 0, charge_obj.person_amount or 0, 0
 
 
 # -------------------------------
 # 4️⃣ Fixed Person Charge
 # -------------------------------
 class FixPersonChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        people = getattr(unit, 'people_count', 0) or 0
-        fix = charge_obj.fix_charge_amount or 0
-        variable = charge_obj.person_amount or 0
-        return fix + (people * variable)
+    def rates(self, charge_obj):
+        return charge_obj.fix_charge_amount or 0, 0, charge_obj.person_amount or 0, 0
 
 
 # -------------------------------
 # 5️⃣ Fixed Area Charge
 # -------------------------------
 class FixAreaChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        area = getattr(unit, 'area', 0) or 0
-        fix = charge_obj.fix_charge_amount or 0
-        variable = charge_obj.area_amount or 0
-        return fix + (area * variable)
+    def rates(self, charge_obj):
+        return charge_obj.fix_charge_amount or 0, charge_obj.area_amount or 0, 0, 0
 
 
 # -------------------------------
 # 6️⃣ Charge by Person + Area
 # -------------------------------
 class ChargeByPersonAreaCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        area = getattr(unit, 'area', 0) or 0
-        people = getattr(unit, 'people_count', 0) or 0
-        return (area * (charge_obj.area_amount or 0)) + (people * (charge_obj.person_amount or 0))
+    def rates(self, charge_obj):
+        return 0, charge_obj.area_amount or 0, charge_obj.person_amount or 0, 0
 
 
 # -------------------------------
 # 7️⃣ Charge by Fixed Person + Area
 # -------------------------------
 class ChargeByFixPersonAreaCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        area = getattr(unit, 'area', 0) or 0
-        people = getattr(unit, 'people_count', 0) or 0
-        fix = charge_obj.fix_charge_amount or 0
-        return fix + (area * (charge_obj.area_amount or 0)) + (people * (charge_obj.person_amount or 0))
+    def rates(self, charge_obj):
+        return (
+            charge_obj.fix_charge_amount or 0,
+            charge_obj.area_amount or 0,
+            charge_obj.person_amount or 0,
+            0,
+        )
 
 
 # -------------------------------
 # 8️⃣ Charge Fix + Variable
 # -------------------------------
 class ChargeFixVariableCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        area = getattr(unit, 'area', 0) or 0
-        people = getattr(unit, 'people_count', 0) or 0
-        fix = charge_obj.unit_fix_amount or 0
-        person_var = charge_obj.unit_variable_person_amount or 0
-        area_var = charge_obj.unit_variable_area_amount or 0
+    def rates(self, charge_obj):
         # extra_parking = charge_obj.extra_parking_amount or 0
-
-        return fix + (people * person_var) + (area * area_var)
+        return (
+            charge_obj.unit_fix_amount or 0,
+            charge_obj.unit_variable_area_amount or 0,
+            charge_obj.unit_variable_person_amount or 0,
+            0,
+        )
 
 
 # -------------------------------
 # 89⃣ Charge Expense Charge
 # -------------------------------
 class ExpenseChargeCalculator(BaseCalculator):
-    def calculate(self, unit, charge_obj):
-        return charge_obj.expense_amount or 0
+    def rates(self, charge_obj):
+        return charge_obj.expense_amount or 0, 0, 0, 0
 
     def calculate_penalty(self, charge_obj, base_total):
         # مثال: جریمه ثابت 10٪
@@ -0,0 +1,332 @@
+from collections import namedtuple
+from datetime import date
+
+import jdatetime
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# جدول ایندکس متنی مشترک همه سندهای مالی
+SEARCH_TABLE = 'admin_panel_document_search'
+# ایندکس trigram فقط برای عبارت‌های سه‌حرفی و بلندتر استفاده می‌شود
+TRIGRAM_MIN_LENGTH = 3
+REINDEX_BATCH_SIZE = 2000
+
+# key: نام منبع، code: شناسه عددی منبع در جدول ایندکس، text_fields: فیلدهای متنی (با lookup رابطه‌ها)،
+# number_fields: مبلغ‌ها و شماره‌ها که با و بدون جداکننده هزارگان ایندکس می‌شوند، date_fields: تاریخ‌ها
+# (میلادی و شمسی)
+SearchSource = namedtuple('SearchSource', 'key code model text_fields number_fields date_fields')
+
+SEARCH_SOURCES = (
+    SearchSource(
+        'fund', 1, 'admin_panel.Fund',
+        ('payment_description', 'payer_name', 'receiver_name', 'transaction_no', 'payment_gateway',
+         'bank__bank_name', 'unit__unit'),
+        ('doc_number', 'amount', 'debtor_amount', 'creditor_amount'),
+        ('payment_date',),
+    ),
+    SearchSource(
+        'expense', 2, 'admin_panel.Expense',
+        ('description', 'receiver_name', 'details', 'transaction_reference', 'category__title', 'bank__bank_name',
+         'unit__unit'),
+        ('doc_no', 'amount'),
+        ('date', 'payment_date'),
+    ),
+    SearchSource(
+        'income', 3, 'admin_panel.Income',
+        ('description', 'payer_name', 'details', 'transaction_reference', 'category__subject', 'bank__bank_name',
+         'unit__unit'),
+        ('doc_number', 'amount'),
+        ('doc_date', 'payment_date'),
+    ),
+    SearchSource(
+        'receive_money', 4, 'admin_panel.ReceiveMoney',
+        ('description', 'payer_name', 'details', 'transaction_reference', 'bank__bank_name', 'unit__unit'),
+        ('doc_number', 'amount'),
+        ('doc_date', 'payment_date'),
+    ),
+    SearchSource(
+        'pay_money', 5, 'admin_panel.PayMoney',
+        ('description', 'receiver_name', 'details', 'transaction_reference', 'bank__bank_name', 'unit__unit'),
+        ('document_number', 'amount'),
+        ('document_date', 'payment_date'),
+    ),
+)
+SOURCES_BY_MODEL = {source.model: source for source in SEARCH_SOURCES}
+SOURCES_BY_KEY = {source.key: source for source in SEARCH_SOURCES}
+
+# ارقام فارسی/عربی و حروف عربی رایج به شکل یکسان ذخیره و جستجو می‌شوند
+_NORMALIZE = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩يك', '01234567890123456789یک')
+
+
+def normalize(text):
+    return ' '.join(str(text).translate(_NORMALIZE).lower().split())
+
+
+def _number_terms(value):
+    value = int(value)
+    return [str(value), f'{value:,}']
+
+
+def _date_terms(value):
+    if isinstance(value, date):
+        return [value.isoformat(), jdatetime.date.fromgregorian(date=value).strftime('%Y/%m/%d')]
+    return [str(value)]
+
+
+def document_rows(source, queryset):
+    """
+    (id, متن ایندکس) سندهای queryset؛ مقادیر با یک values_list خوانده می‌شوند
+    """
+    fields = (*source.text_fields, *source.number_fields, *source.date_fields)
+    text_count = len(source.text_fields)
+    number_count = len(source.number_fields)
+
+    for pk, *values in queryset.order_by().values_list('pk', *fields).iterator(chunk_size=REINDEX_BATCH_SIZE):
+        terms = []
+        for index, value in enumerate(values):
+            if value in (None, ''):
+                continue
+            if index < text_count:
+                terms.append(str(value))
+            elif index < text_count + number_count:
+                terms.extend(_number_terms(value))
+            else:
+                terms.extend(_date_terms(value))
+        # هر مقدار در یک خط؛ عبارت جستجو خط جدید ندارد پس بین دو فیلد منطبق نمی‌شود
+        yield pk, '\n'.join(normalize(term) for term in terms)
+
+
+# -------------------------------
+# backend ها
+# -------------------------------
+class SearchBackend:
+    """
+    backend جستجو: ایندکس متن سندها را نگه می‌دارد و queryset را به سندهای منطبق محدود می‌کند
+    """
+    indexed = True
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def replace(self, source, rows):
+        raise NotImplementedError
+
+    def delete(self, source, doc_ids):
+        raise NotImplementedError
+
+    def clear(self, source):
+        raise NotImplementedError
+
+    def match_sql(self, source, query):
+        """
+        (sql, params) یک SELECT از id سندهای منطبق
+        """
+        raise NotImplementedError
+
+    def filter(self, queryset, source, query):
+        sql, params = self.match_sql(source, query)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+class Fts5SearchBackend(SearchBackend):
+    """
+    جدول مجازی FTS5 با tokenizer سه‌حرفی (trigram) در SQLite؛ جستجوی زیررشته مثل icontains
+    ولی از روی ایندکس. rowid هر ردیف از روی id سند و کد منبع ساخته می‌شود تا بروزرسانی یک سند
+    بدون پیمایش جدول انجام شود.
+    """
+
+    def _rowid(self, source, doc_id):
+        return doc_id * 16 + source.code
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(body, tokenize='trigram')"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def replace(self, source, rows):
+        rows = [(self._rowid(source, doc_id), body) for doc_id, body in rows]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(rowid,) for rowid, _body in rows])
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (%s, %s)", rows)
+
+    def delete(self, source, doc_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                               [(self._rowid(source, doc_id),) for doc_id in doc_ids])
+
+    def clear(self, source):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid %% 16 = %s", [source.code])
+
+    def match_sql(self, source, query):
+        if len(query) >= TRIGRAM_MIN_LENGTH:
+            condition, term = f"{SEARCH_TABLE} MATCH %s", '"' + query.replace('"', '""') + '"'
+        else:
+            condition, term = "instr(body, %s) > 0", query
+        return (
+            f"SELECT rowid / 16 FROM {SEARCH_TABLE} WHERE {condition} AND rowid %% 16 = %s",
+            [term, source.code],
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    جدول معمولی با ایندکس GIN از pg_trgm؛ LIKE روی آن از ایندکس استفاده می‌کند
+    """
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"source smallint NOT NULL, doc_id bigint NOT NULL, body text NOT NULL, "
+                f"PRIMARY KEY (source, doc_id))"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_body_trgm ON {SEARCH_TABLE} USING gin (body gin_trgm_ops)"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def replace(self, source, rows):
+        rows = [(source.code, doc_id, body) for doc_id, body in rows]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (source, doc_id, body) VALUES (%s, %s, %s) "
+                f"ON CONFLICT (source, doc_id) DO UPDATE SET body = EXCLUDED.body",
+                rows,
+            )
+
+    def delete(self, source, doc_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE source = %s AND doc_id = ANY(%s)",
+                           [source.code, list(doc_ids)])
+
+    def clear(self, source):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE source = %s", [source.code])
+
+    def match_sql(self, source, query):
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return f"SELECT doc_id FROM {SEARCH_TABLE} WHERE source = %s AND body LIKE %s", [source.code, pattern]
+
+
+class OrmSearchBackend(SearchBackend):
+    """
+    بدون ایندکس (دیتابیس‌های دیگر): همان فیلتر icontains روی فیلدهای منبع
+    """
+    indexed = False
+
+    def replace(self, source, rows):
+        pass
+
+    def delete(self, source, doc_ids):
+        pass
+
+    def clear(self, source):
+        pass
+
+    def filter(self, queryset, source, query):
+        condition = Q()
+        for field in (*source.text_fields, *source.number_fields, *source.date_fields):
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+
+VENDOR_BACKENDS = {
+    'sqlite': Fts5SearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    """
+    backend تعیین‌شده در DOCUMENT_SEARCH_BACKEND یا backend پیش‌فرض دیتابیس
+    """
+    connection = connection or default_connection
+    path = getattr(settings, 'DOCUMENT_SEARCH_BACKEND', None)
+    backend_class = import_string(path) if path else VENDOR_BACKENDS.get(connection.vendor, OrmSearchBackend)
+    return backend_class(connection)
+
+
+# -------------------------------
+# ایندکس و جستجو
+# -------------------------------
+def index_documents(model_label, doc_ids, apps=None):
+    """
+    بروزرسانی متن ایندکس چند سند (بعد از ذخیره)؛ سندهای حذف‌شده از ایندکس پاک می‌شوند
+    """
+    source = SOURCES_BY_MODEL[model_label]
+    backend = get_backend()
+    if not backend.indexed:
+        return
+    model = (apps or django_apps).get_model(source.model)
+    rows = list(document_rows(source, model.objects.filter(pk__in=doc_ids)))
+    backend.replace(source, rows)
+    missing = set(doc_ids) - {doc_id for doc_id, _body in rows}
+    if missing:
+        backend.delete(source, missing)
+
+
+def unindex_documents(model_label, doc_ids):
+    get_backend().delete(SOURCES_BY_MODEL[model_label], doc_ids)
+
+
+def rebuild_index(source_key=None, apps=None, connection=None):
+    """
+    ساخت دوباره ایندکس همه سندها (یا یک منبع)؛ تعداد سندهای ایندکس‌شده را برمی‌گرداند
+    """
+    apps = apps or django_apps
+    backend = get_backend(connection)
+    if not backend.indexed:
+        return 0
+
+    backend.install()
+    count = 0
+    for source in SEARCH_SOURCES:
+        if source_key and source.key != source_key:
+            continue
+        backend.clear(source)
+        rows = []
+        for row in document_rows(source, apps.get_model(source.model).objects.all()):
+            rows.append(row)
+            if len(rows) >= REINDEX_BATCH_SIZE:
+                backend.replace(source, rows)
+                count += len(rows)
+                rows = []
+        backend.replace(source, rows)
+        count += len(rows)
+    return count
+
+
+def search_documents(queryset, query):
+    """
+    محدود کردن queryset سندهای مالی به سندهایی که query در متن جستجوی آن‌ها هست
+    (شرح، پرداخت‌کننده/گیرنده، شماره تراکنش و سند، نام بانک، مبلغ با یا بدون جداکننده و تاریخ)
+    """
+    query = normalize(query)
+    if not query:
+        return queryset
+    source = SOURCES_BY_MODEL[queryset.model._meta.label]
+    return get_backend().filter(queryset, source, query)
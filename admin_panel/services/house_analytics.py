@@ -0,0 +1,148 @@
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from admin_panel.services.occupancy import occupancy_by_house
+
+# اندازه دسته ساختمان‌ها در هر دور محاسبه
+ANALYTICS_BATCH_SIZE = 200
+
+ANALYTICS_FIELDS = (
+    'unit_count', 'owner_unit_count', 'renter_unit_count',
+    'debt_total', 'debt_unit_count', 'debt_charge_count',
+    'fund_count', 'fund_debtor_total', 'fund_creditor_total',
+    'admin_fund_count', 'ticket_count', 'open_ticket_count',
+)
+
+
+def mark_stale(*house_ids):
+    """
+    علامت‌گذاری آمار ساختمان‌ها برای محاسبه دوباره در دور بعدی تسک
+    """
+    house_ids = {house_id for house_id in house_ids if house_id}
+    if house_ids:
+        django_apps.get_model('admin_panel', 'HouseAnalytics').objects.filter(
+            house_id__in=house_ids, is_stale=False
+        ).update(is_stale=True)
+
+
+def _grouped(queryset, house_field, house_ids, **aggregates):
+    """
+    {house_id: {name: value}} با یک کوئری GROUP BY برای همه ساختمان‌های دسته
+    """
+    rows = (
+        queryset
+        .filter(**{f'{house_field}__in': house_ids})
+        .order_by()
+        .values(house_field)
+        .annotate(**aggregates)
+    )
+    return {row.pop(house_field): row for row in rows}
+
+
+def compute_analytics(house_ids, apps=None):
+    """
+    آمار چند ساختمان؛ هر شاخص با یک کوئری گروه‌بندی‌شده برای کل دسته حساب می‌شود
+    """
+    apps = apps or django_apps
+    Unit = apps.get_model('user_app', 'Unit')
+    UnifiedCharge = apps.get_model('admin_panel', 'UnifiedCharge')
+    Fund = apps.get_model('admin_panel', 'Fund')
+    AdminFund = apps.get_model('admin_panel', 'AdminFund')
+    AdminTicket = apps.get_model('notifications', 'AdminTicket')
+
+    occupancy = occupancy_by_house(Unit.objects.filter(myhouse_id__in=house_ids), apps=apps)
+    debts = _grouped(
+        UnifiedCharge.objects.filter(is_paid=False, unit__isnull=False), 'unit__myhouse_id', house_ids,
+        total=Sum('total_charge_month'), units=Count('unit_id', distinct=True), charges=Count('id'),
+    )
+    funds = _grouped(
+        Fund.objects.all(), 'house_id', house_ids,
+        count=Count('id'), debtor=Sum('debtor_amount'), creditor=Sum('creditor_amount'),
+    )
+    admin_funds = _grouped(AdminFund.objects.all(), 'house_id', house_ids, count=Count('id'))
+    tickets = _grouped(
+        AdminTicket.objects.all(), 'house_id', house_ids,
+        count=Count('id'), open=Count('id', filter=Q(is_closed=False)),
+    )
+
+    empty = {}
+    analytics = {}
+    for house_id in house_ids:
+        unit_count = occupancy.get(house_id, empty).get('total', 0)
+        renter_unit_count = occupancy.get(house_id, empty).get('renter', 0)
+        debt = debts.get(house_id, empty)
+        fund = funds.get(house_id, empty)
+        ticket = tickets.get(house_id, empty)
+        analytics[house_id] = {
+            'unit_count': unit_count,
+            'owner_unit_count': unit_count - renter_unit_count,
+            'renter_unit_count': renter_unit_count,
+            'debt_total': debt.get('total') or 0,
+            'debt_unit_count': debt.get('units', 0),
+            'debt_charge_count': debt.get('charges', 0),
+            'fund_count': fund.get('count', 0),
+            'fund_debtor_total': fund.get('debtor') or 0,
+            'fund_creditor_total': fund.get('creditor') or 0,
+            'admin_fund_count': admin_funds.get(house_id, empty).get('count', 0),
+            'ticket_count': ticket.get('count', 0),
+            'open_ticket_count': ticket.get('open', 0),
+        }
+    return analytics
+
+
+def _save_analytics(house_ids, apps):
+    analytics_model = apps.get_model('admin_panel', 'HouseAnalytics')
+
+    with transaction.atomic():
+        # ردیف‌ها اول ساخته و قفل می‌شوند تا تغییری که حین محاسبه رخ می‌دهد (mark_stale)
+        # پس از پایان همین تراکنش دوباره stale کند و از دست نرود
+        analytics_model.objects.bulk_create(
+            [analytics_model(house_id=house_id, is_stale=True) for house_id in house_ids],
+            ignore_conflicts=True,
+        )
+        rows = list(analytics_model.objects.select_for_update().filter(house_id__in=house_ids))
+        values = compute_analytics(house_ids, apps=apps)
+
+        now = timezone.now()
+        for row in rows:
+            for name, value in values[row.house_id].items():
+                setattr(row, name, value)
+            row.is_stale = False
+            row.refreshed_at = now
+        analytics_model.objects.bulk_update(rows, [*ANALYTICS_FIELDS, 'is_stale', 'refreshed_at'])
+    return len(rows)
+
+
+def refresh_analytics(full=False, house_id=None, apps=None):
+    """
+    محاسبه دوباره آمار: ساختمان‌های stale و ساختمان‌هایی که هنوز ردیف ندارند،
+    یا با full=True همه ساختمان‌ها. تعداد ساختمان‌های به‌روزشده را برمی‌گرداند.
+    """
+    apps = apps or django_apps
+    MyHouse = apps.get_model('user_app', 'MyHouse')
+
+    houses = MyHouse.objects.all()
+    if house_id:
+        houses = houses.filter(pk=house_id)
+    elif not full:
+        houses = houses.filter(Q(analytics__isnull=True) | Q(analytics__is_stale=True))
+
+    return _refresh_houses(houses, apps)
+
+
+def ensure_analytics():
+    """
+    ساختمان‌های تازه‌ای که هنوز ردیف آمار ندارند پیش از نمایش گزارش حساب می‌شوند
+    """
+    MyHouse = django_apps.get_model('user_app', 'MyHouse')
+    return _refresh_houses(MyHouse.objects.filter(analytics__isnull=True), django_apps)
+
+
+def _refresh_houses(houses, apps):
+    house_ids = list(houses.order_by('pk').values_list('pk', flat=True))
+    refreshed = 0
+    for start in range(0, len(house_ids), ANALYTICS_BATCH_SIZE):
+        refreshed += _save_analytics(house_ids[start:start + ANALYTICS_BATCH_SIZE], apps)
+    return refreshed
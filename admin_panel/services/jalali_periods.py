@@ -0,0 +1,133 @@
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+import jdatetime
+from django.apps import apps as django_apps
+from django.db.models import Q
+from django.db.models.expressions import Col
+from django.db.models.sql import Query
+
+# اندازه دسته شناسه‌ها در هر UPDATE همگام‌سازی
+SYNC_BATCH_SIZE = 500
+
+# date_field: تاریخ ماه سند؛ unpaid_date_field: اگر تعیین شده باشد ردیف پرداخت‌نشده
+# (is_paid=False) با این تاریخ در ماه می‌نشیند، مثل شارژ اعلام‌شده یا قسط سررسیدشده
+PeriodSource = namedtuple('PeriodSource', 'model date_field unpaid_date_field')
+
+PERIOD_SOURCES = {
+    source.model: source for source in (
+        PeriodSource('UnifiedCharge', 'payment_date', 'send_notification_date'),
+        PeriodSource('Fund', 'payment_date', None),
+        PeriodSource('BankFund', 'payment_date', None),
+        PeriodSource('Expense', 'date', None),
+        PeriodSource('Income', 'doc_date', None),
+        PeriodSource('CivilInstallment', 'payment_date', 'due_date'),
+        PeriodSource('SewageInstallment', 'payment_date', 'due_date'),
+    )
+}
+
+
+def jalali_period(value):
+    """
+    (سال، ماه) شمسی یک تاریخ یا datetime
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    jalali = jdatetime.date.fromgregorian(date=value)
+    return jalali.year, jalali.month
+
+
+def source_fields(source):
+    """
+    فیلدهایی که تغییرشان ماه شمسی ردیف را عوض می‌کند
+    """
+    if source.unpaid_date_field:
+        return {source.date_field, source.unpaid_date_field, 'is_paid'}
+    return {source.date_field}
+
+
+def period_of(row, source):
+    """
+    (jalali_year، jalali_month) یک ردیف؛ بدون تاریخ (None، None)
+    """
+    value = getattr(row, source.date_field)
+    if source.unpaid_date_field and not row.is_paid:
+        value = getattr(row, source.unpaid_date_field)
+    return jalali_period(value) if value else (None, None)
+
+
+def period_filter(start, end=None):
+    """
+    شرط بازه ماه‌های شمسی (شامل هر دو سر) روی ستون‌های jalali_year و jalali_month؛
+    start و end به شکل (سال، ماه) یا فقط سال هستند
+    """
+    end = end or start
+    if isinstance(start, int):
+        start = (start, 1)
+    if isinstance(end, int):
+        end = (end, 12)
+    (start_year, start_month), (end_year, end_month) = start, end
+
+    if start_year == end_year:
+        return Q(jalali_year=start_year, jalali_month__gte=start_month, jalali_month__lte=end_month)
+    return (
+        Q(jalali_year=start_year, jalali_month__gte=start_month)
+        | Q(jalali_year__gt=start_year, jalali_year__lt=end_year)
+        | Q(jalali_year=end_year, jalali_month__lte=end_month)
+    )
+
+
+def filtered_fields(queryset):
+    """
+    نام ستون‌هایی که شرط WHERE کوئری (با زیرکوئری‌هایش) به آن‌ها وابسته است
+    """
+    fields = set()
+    pending = [queryset.query.where]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Query):
+            pending.append(node.where)
+            continue
+        if isinstance(node, Col):
+            fields.update((node.target.name, node.target.attname))
+        pending.extend(getattr(node, 'children', ()))
+        for attr in ('lhs', 'rhs'):
+            if hasattr(node, attr):
+                pending.append(getattr(node, attr))
+        if hasattr(node, 'get_source_expressions'):
+            pending.extend(node.get_source_expressions())
+    return fields
+
+
+def sync_periods(queryset):
+    """
+    ستون‌های ماه شمسی ردیف‌های queryset از روی تاریخ‌هایشان؛ فقط ردیف‌هایی که ماهشان عوض شده
+    نوشته می‌شوند، با یک UPDATE برای هر ماه متمایز. تعداد ردیف‌های تغییرکرده را برمی‌گرداند.
+    """
+    source = PERIOD_SOURCES[queryset.model._meta.object_name]
+    fields = ['pk', 'jalali_year', 'jalali_month', *source_fields(source)]
+
+    changed = defaultdict(list)
+    for row in queryset.order_by().only(*fields).iterator(chunk_size=2000):
+        period = period_of(row, source)
+        if period != (row.jalali_year, row.jalali_month):
+            changed[period].append(row.pk)
+
+    # update مستقیم روی QuerySet پایه؛ update مدل دوباره همگام‌سازی را صدا نمی‌زند
+    base = queryset.model._base_manager
+    for (year, month), pks in changed.items():
+        for start in range(0, len(pks), SYNC_BATCH_SIZE):
+            base.filter(pk__in=pks[start:start + SYNC_BATCH_SIZE]).update(jalali_year=year, jalali_month=month)
+    return sum(len(pks) for pks in changed.values())
+
+
+def rebuild_periods(model_name=None, apps=None):
+    """
+    پرکردن ستون‌های ماه شمسی همه ردیف‌ها (یا فقط یک مدل)؛ {نام مدل: تعداد تغییرکرده}
+    """
+    apps = apps or django_apps
+    names = [model_name] if model_name else list(PERIOD_SOURCES)
+    return {
+        name: sync_periods(apps.get_model('admin_panel', name)._base_manager.all())
+        for name in names
+    }
@@ -0,0 +1,248 @@
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+import jdatetime
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from admin_panel.models import Fund, LedgerCheckpoint
+from admin_panel.services.jalali_periods import jalali_period
+
+
+# -------------------------------
+# ماه شمسی
+# -------------------------------
+def period_bounds(year, month):
+    """
+    ابتدای ماه شمسی و ابتدای ماه بعد به‌صورت datetime میلادی
+    """
+    start = jdatetime.date(year, month, 1).togregorian()
+    if month == 12:
+        end = jdatetime.date(year + 1, 1, 1).togregorian()
+    else:
+        end = jdatetime.date(year, month + 1, 1).togregorian()
+    return datetime.combine(start, time.min), datetime.combine(end, time.min)
+
+
+def _after(year, month):
+    return Q(jalali_year__gt=year) | Q(jalali_year=year, jalali_month__gt=month)
+
+
+def _up_to(year, month):
+    return Q(jalali_year__lt=year) | Q(jalali_year=year, jalali_month__lte=month)
+
+
+# -------------------------------
+# ثبت افزایشی
+# -------------------------------
+def apply_posting(house_id, bank_id, period, debit=0, credit=0):
+    """
+    اثر یک سند (یا برگشت آن با مقادیر منفی) روی نقطه کنترل ماه خودش و مانده ابتدای ماه‌های بعد
+    """
+    debit = Decimal(debit or 0)
+    credit = Decimal(credit or 0)
+    if not debit and not credit:
+        return
+
+    key = LedgerCheckpoint.key_for(house_id, bank_id)
+    year, month = period
+    checkpoints = LedgerCheckpoint.objects.filter(key=key)
+
+    with transaction.atomic():
+        if not checkpoints.filter(jalali_year=year, jalali_month=month).exists():
+            previous = checkpoints.filter(_up_to(year, month)).order_by('-jalali_year', '-jalali_month').first()
+            LedgerCheckpoint.objects.get_or_create(
+                key=key,
+                jalali_year=year,
+                jalali_month=month,
+                defaults={
+                    'house_id': house_id,
+                    'bank_id': bank_id,
+                    'opening_balance': previous.closing_balance if previous else 0,
+                }
+            )
+
+        checkpoints.filter(jalali_year=year, jalali_month=month).update(
+            debit=F('debit') + debit,
+            credit=F('credit') + credit,
+        )
+        checkpoints.filter(_after(year, month)).update(
+            opening_balance=F('opening_balance') + debit - credit,
+        )
+
+
+def fund_posting(fund):
+    """
+    کلید دفتر، ماه و مبالغ یک Fund برای apply_posting
+    """
+    return (
+        fund.house_id,
+        fund.bank_id,
+        jalali_period(fund.created_at),
+        fund.debtor_amount or 0,
+        fund.creditor_amount or 0,
+    )
+
+
+# -------------------------------
+# خواندن مانده
+# -------------------------------
+def opening_balance_at(house_id, bank_id, period):
+    """
+    مانده ابتدای ماه شمسی period با خواندن فقط یک نقطه کنترل
+    """
+    year, month = period
+    checkpoint = (
+        LedgerCheckpoint.objects
+        .filter(_up_to(year, month), key=LedgerCheckpoint.key_for(house_id, bank_id))
+        .order_by('-jalali_year', '-jalali_month')
+        .first()
+    )
+    if not checkpoint:
+        return Decimal('0')
+    if (checkpoint.jalali_year, checkpoint.jalali_month) == (year, month):
+        return checkpoint.opening_balance
+    return checkpoint.closing_balance
+
+
+def ledger_balance(house_id, bank_id):
+    checkpoint = (
+        LedgerCheckpoint.objects
+        .filter(key=LedgerCheckpoint.key_for(house_id, bank_id))
+        .order_by('-jalali_year', '-jalali_month')
+        .first()
+    )
+    return checkpoint.closing_balance if checkpoint else Decimal('0')
+
+
+def bank_balances(banks):
+    """
+    مانده فعلی همه دفترهای هر حساب بانکی با یک کوئری: {bank_id: مانده}
+    """
+    balances = {bank.id: Decimal('0') for bank in banks}
+    rows = (
+        LedgerCheckpoint.objects
+        .filter(bank_id__in=balances)
+        .values('bank_id')
+        .annotate(balance=Sum(F('debit') - F('credit')))
+    )
+    for row in rows:
+        balances[row['bank_id']] = row['balance'] or Decimal('0')
+    return balances
+
+
+def bank_opening_balance_at(bank_id, period):
+    """
+    مانده ابتدای ماه شمسی period برای همه دفترهای یک حساب بانکی (از جمله سندهای بدون ساختمان)؛
+    از هر دفتر فقط آخرین نقطه کنترل تا آن ماه خوانده می‌شود
+    """
+    year, month = period
+    checkpoints = (
+        LedgerCheckpoint.objects
+        .filter(_up_to(year, month), bank_id=bank_id)
+        .order_by('key', '-jalali_year', '-jalali_month')
+    )
+    balance = Decimal('0')
+    seen = set()
+    for checkpoint in checkpoints:
+        if checkpoint.key in seen:
+            continue
+        seen.add(checkpoint.key)
+        if (checkpoint.jalali_year, checkpoint.jalali_month) == (year, month):
+            balance += checkpoint.opening_balance
+        else:
+            balance += checkpoint.closing_balance
+    return balance
+
+
+def bank_ledger_balance(bank_id):
+    """
+    مانده فعلی همه دفترهای یک حساب بانکی
+    """
+    balance = (
+        LedgerCheckpoint.objects
+        .filter(bank_id=bank_id)
+        .aggregate(balance=Sum(F('debit') - F('credit')))['balance']
+    )
+    return balance or Decimal('0')
+
+
+# ترتیب سندهای صورت‌حساب؛ ماه نقطه کنترل هم از created_at است، پس مانده ابتدای صفحه
+# و جمع جزئی داخل ماه با همین کلید سازگارند (doc_number از سری‌های دیگر کپی می‌شود و ترتیب ندارد)
+STATEMENT_ORDERING = ('created_at', 'id')
+
+
+def statement_funds(bank):
+    """
+    سندهای صورت‌حساب یک حساب بانکی به ترتیب STATEMENT_ORDERING
+    """
+    return Fund.objects.filter(bank=bank).order_by(*STATEMENT_ORDERING)
+
+
+def statement_opening_balance(fund):
+    """
+    مانده حساب بانکی درست قبل از fund (ابتدای یک صفحه از صورت‌حساب): مانده ابتدای ماه از
+    نقاط کنترل به‌علاوه سندهای همان ماه که به ترتیب (created_at، id) قبل از fund هستند.
+    """
+    year, month = jalali_period(fund.created_at)
+    start, end = period_bounds(year, month)
+
+    month_totals = Fund.objects.filter(
+        Q(created_at__lt=fund.created_at) | Q(created_at=fund.created_at, id__lt=fund.id),
+        bank_id=fund.bank_id,
+        created_at__gte=start,
+        created_at__lt=end,
+    ).aggregate(debit=Sum('debtor_amount'), credit=Sum('creditor_amount'))
+
+    return (
+            bank_opening_balance_at(fund.bank_id, (year, month))
+            + (month_totals['debit'] or 0)
+            - (month_totals['credit'] or 0)
+    )
+
+
+# -------------------------------
+# بازسازی کامل
+# -------------------------------
+def rebuild_checkpoints(house_id=None):
+    """
+    ساخت دوباره نقاط کنترل از روی سندهای صندوق (همه ساختمان‌ها یا یک ساختمان).
+    تعداد نقاط کنترل ساخته‌شده را برمی‌گرداند.
+    """
+    funds = Fund.objects.all()
+    checkpoints = LedgerCheckpoint.objects.all()
+    if house_id:
+        funds = funds.filter(house_id=house_id)
+        checkpoints = checkpoints.filter(house_id=house_id)
+
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    rows = funds.order_by().values_list('house_id', 'bank_id', 'created_at', 'debtor_amount', 'creditor_amount')
+    for fund_house_id, bank_id, created_at, debit, credit in rows.iterator(chunk_size=2000):
+        month_totals = totals[(fund_house_id, bank_id, jalali_period(created_at))]
+        month_totals[0] += debit or 0
+        month_totals[1] += credit or 0
+
+    objects = []
+    running = {}
+    for (fund_house_id, bank_id, (year, month)), (debit, credit) in sorted(
+            totals.items(), key=lambda item: (str(item[0][0]), str(item[0][1]), item[0][2])
+    ):
+        opening = running.get((fund_house_id, bank_id), Decimal('0'))
+        objects.append(LedgerCheckpoint(
+            key=LedgerCheckpoint.key_for(fund_house_id, bank_id),
+            house_id=fund_house_id,
+            bank_id=bank_id,
+            jalali_year=year,
+            jalali_month=month,
+            opening_balance=opening,
+            debit=debit,
+            credit=credit,
+        ))
+        running[(fund_house_id, bank_id)] = opening + debit - credit
+
+    with transaction.atomic():
+        checkpoints.delete()
+        LedgerCheckpoint.objects.bulk_create(objects, batch_size=1000)
+
+    return len(objects)
@@ -0,0 +1,317 @@
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+import jdatetime
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from admin_panel.models import LedgerRollup
+from admin_panel.services.ledger_checkpoints import jalali_period
+
+UTILITY_EXPENSE_TITLES = ('هزینه آب', 'هزینه برق', 'هزینه گاز')
+SALARY_EXPENSE_TITLES = ('هزینه حقوق و دستمزد',)
+INSURANCE_EXPENSE_TITLES = ('هزینه بیمه',)
+SPECIAL_EXPENSE_TITLES = UTILITY_EXPENSE_TITLES + SALARY_EXPENSE_TITLES + INSURANCE_EXPENSE_TITLES
+
+# ماه سندهای بدون تاریخ؛ فقط وقتی بازه تاریخ انتخاب نشده باشد در جمع‌ها می‌آیند
+UNDATED_PERIOD = (0, 0)
+
+# name: نام گروه، flow: جهت گردش، amount: فیلد مبلغ، date_field: فیلد تاریخ گروه‌بندی ماهانه،
+# condition: شرط ردیف، by_bank: آیا فیلتر حساب بانکی گزارش روی این گروه اعمال می‌شود
+RollupCategory = namedtuple('RollupCategory', 'name flow amount date_field condition by_bank')
+RollupSource = namedtuple('RollupSource', 'model categories')
+
+
+def _category(name, flow, amount='amount', date_field='payment_date', condition=None, by_bank=True):
+    return RollupCategory(name, flow, amount, date_field, condition or Q(), by_bank)
+
+
+PAID = Q(is_paid=True)
+UNPAID = Q(is_paid=False)
+
+ROLLUP_SOURCES = (
+    RollupSource('admin_panel.Fund', (
+        _category('fund', 'in', amount='debtor_amount'),
+        _category('fund', 'out', amount='creditor_amount'),
+    )),
+    RollupSource('admin_panel.UnifiedCharge', (
+        _category('charge', 'in', amount='total_charge_month', condition=PAID),
+    )),
+    RollupSource('admin_panel.CivilInstallment', (
+        _category('civil', 'in', condition=PAID),
+    )),
+    RollupSource('admin_panel.SewageInstallment', (
+        _category('sewage', 'out', condition=PAID),
+    )),
+    RollupSource('admin_panel.Income', (
+        _category('income', 'in', condition=PAID),
+        _category('income_unpaid', 'in', date_field='doc_date', condition=UNPAID, by_bank=False),
+    )),
+    RollupSource('admin_panel.ReceiveMoney', (
+        _category('receive_money', 'in', condition=PAID),
+        _category('receive_money_unpaid', 'in', condition=UNPAID),
+    )),
+    RollupSource('user_app.UserPayMoney', (
+        _category('unit_pay', 'in'),
+    )),
+    RollupSource('admin_panel.Expense', (
+        _category('expense', 'out', condition=PAID & Q(category__is_default=False)
+                                             & ~Q(category__title__in=SPECIAL_EXPENSE_TITLES)),
+        _category('expense_default', 'out', condition=PAID & Q(category__is_default=True)
+                                                     & ~Q(category__title__in=SPECIAL_EXPENSE_TITLES)),
+        _category('expense_utility', 'out', condition=PAID & Q(category__title__in=UTILITY_EXPENSE_TITLES)),
+        _category('expense_salary', 'out', condition=PAID & Q(category__title__in=SALARY_EXPENSE_TITLES)),
+        _category('expense_insurance', 'out', condition=PAID & Q(category__title__in=INSURANCE_EXPENSE_TITLES)),
+        _category('expense_unpaid', 'out', date_field='date', condition=UNPAID, by_bank=False),
+    )),
+    RollupSource('admin_panel.PayMoney', (
+        _category('pay_money', 'out', condition=PAID),
+        _category('pay_money_unpaid', 'out', condition=UNPAID),
+    )),
+    RollupSource('admin_panel.Maintenance', (
+        _category('maintenance', 'out', amount='maintenance_price', condition=PAID),
+    )),
+    RollupSource('admin_panel.Property', (
+        _category('property', 'out', amount='property_price', condition=PAID),
+    )),
+)
+
+# همه هزینه‌های پرداخت‌شده، بدون توجه به گروه
+PAID_EXPENSE_CATEGORIES = ('expense', 'expense_default', 'expense_utility', 'expense_salary', 'expense_insurance')
+
+SOURCES_BY_MODEL = {source.model: source for source in ROLLUP_SOURCES}
+
+
+def rollup_key(house_id, bank_id):
+    return f"house:{house_id or 'none'}:bank:{bank_id or 'none'}"
+
+
+def _period(value):
+    return jalali_period(value) if value else UNDATED_PERIOD
+
+
+def _date_fields(source):
+    return sorted({category.date_field for category in source.categories})
+
+
+# -------------------------------
+# محاسبه سهم ردیف‌ها
+# -------------------------------
+def collect_postings(source, queryset):
+    """
+    سهم ردیف‌های queryset در جدول تجمیعی: {(house_id, bank_id, (سال، ماه), گروه، جهت): مبلغ}
+    با یک کوئری گروه‌بندی‌شده روی خود جدول منبع.
+    """
+    aliases = {f'rollup_{index}': category for index, category in enumerate(source.categories)}
+    rows = (
+        queryset
+        .order_by()
+        .values('house_id', 'bank_id', *_date_fields(source))
+        .annotate(**{
+            alias: Sum(category.amount, filter=category.condition)
+            for alias, category in aliases.items()
+        })
+    )
+
+    postings = defaultdict(Decimal)
+    for row in rows:
+        for alias, category in aliases.items():
+            if row[alias]:
+                key = (row['house_id'], row['bank_id'], _period(row[category.date_field]),
+                       category.name, category.flow)
+                postings[key] += row[alias]
+    return postings
+
+
+def instance_postings(source, instance):
+    """
+    سهم فعلی یک ردیف ذخیره‌شده (از دیتابیس خوانده می‌شود تا با شرط‌های گروه‌ها یکی باشد)
+    """
+    if not instance.pk:
+        return {}
+    return collect_postings(source, type(instance)._default_manager.filter(pk=instance.pk))
+
+
+def apply_postings(old, new):
+    """
+    اعمال تفاوت سهم قبلی و جدید یک ردیف روی جدول تجمیعی با عبارت F
+    """
+    deltas = defaultdict(Decimal)
+    for key, amount in (old or {}).items():
+        deltas[key] -= amount
+    for key, amount in (new or {}).items():
+        deltas[key] += amount
+
+    with transaction.atomic():
+        for (house_id, bank_id, (year, month), category, flow), delta in deltas.items():
+            if not delta:
+                continue
+            lookup = {
+                'key': rollup_key(house_id, bank_id),
+                'jalali_year': year,
+                'jalali_month': month,
+                'category': category,
+                'flow': flow,
+            }
+            rows = LedgerRollup.objects.filter(**lookup)
+            if rows.update(amount=F('amount') + delta):
+                continue
+            _, created = LedgerRollup.objects.get_or_create(
+                **lookup, defaults={'house_id': house_id, 'bank_id': bank_id, 'amount': delta}
+            )
+            if not created:
+                rows.update(amount=F('amount') + delta)
+
+
+# -------------------------------
+# خواندن جمع‌ها
+# -------------------------------
+def _month_start(value):
+    return jdatetime.date.fromgregorian(date=value).replace(day=1).togregorian()
+
+
+def _next_month_start(value):
+    jalali = jdatetime.date.fromgregorian(date=value)
+    if jalali.month == 12:
+        return jdatetime.date(jalali.year + 1, 1, 1).togregorian()
+    return jdatetime.date(jalali.year, jalali.month + 1, 1).togregorian()
+
+
+def _split_range(start_date, end_date):
+    """
+    بازه گزارش را به ماه‌های کامل (از جدول تجمیعی) و روزهای ماه‌های ناقص ابتدا و انتهای بازه
+    (از جدول‌های منبع) تقسیم می‌کند.
+    خروجی: (اولین ماه کامل یا None، آخرین ماه کامل یا None، لیست بازه‌های ناقص)
+    """
+    partial = []
+    first_full = jalali_period(start_date) if start_date else None
+    last_full = jalali_period(end_date) if end_date else None
+
+    if start_date and start_date != _month_start(start_date):
+        month_end = _next_month_start(start_date) - timedelta(days=1)
+        partial.append((start_date, min(month_end, end_date) if end_date else month_end))
+        first_full = jalali_period(_next_month_start(start_date))
+
+    if end_date and end_date != _next_month_start(end_date) - timedelta(days=1):
+        month_start = _month_start(end_date)
+        if not start_date or month_start > start_date:
+            partial.append((month_start, end_date))
+        last_full = jalali_period(month_start - timedelta(days=1))
+
+    return first_full, last_full, partial
+
+
+def balance_totals(house_id, start_date=None, end_date=None, bank_id=None):
+    """
+    جمع هر گروه گزارش تراز برای یک ساختمان: {(گروه، جهت): مبلغ}
+    ماه‌های کامل بازه با یک کوئری روی جدول تجمیعی خوانده می‌شوند؛ فقط اگر ابتدا یا انتهای بازه
+    وسط ماه باشد، روزهای همان ماه از جدول‌های منبع جمع زده می‌شوند.
+    """
+    bank_id = int(bank_id) if bank_id else None
+    first_full, last_full, partial = _split_range(start_date, end_date)
+    dated = bool(start_date or end_date)
+    by_bank_categories = {
+        category.name for source in ROLLUP_SOURCES for category in source.categories if category.by_bank
+    }
+
+    totals = defaultdict(Decimal)
+    rows = LedgerRollup.objects.filter(house_id=house_id).values_list(
+        'bank_id', 'jalali_year', 'jalali_month', 'category', 'flow', 'amount'
+    )
+    for row_bank_id, year, month, category, flow, amount in rows:
+        period = (year, month)
+        if dated and (
+                period == UNDATED_PERIOD
+                or (first_full and period < first_full)
+                or (last_full and period > last_full)
+        ):
+            continue
+        if bank_id and category in by_bank_categories and row_bank_id != bank_id:
+            continue
+        totals[category, flow] += amount
+
+    if partial:
+        for (category, flow), amount in partial_totals(house_id, partial, bank_id).items():
+            totals[category, flow] += amount
+
+    return totals
+
+
+def partial_totals(house_id, ranges, bank_id=None):
+    """
+    جمع گروه‌ها در بازه‌های روزانه داده‌شده مستقیماً از جدول‌های منبع (یک کوئری برای هر منبع)
+    """
+    totals = defaultdict(Decimal)
+    for source in ROLLUP_SOURCES:
+        aliases = {}
+        for index, category in enumerate(source.categories):
+            condition = category.condition
+            in_range = Q()
+            for start, end in ranges:
+                in_range |= Q(**{f'{category.date_field}__gte': start, f'{category.date_field}__lte': end})
+            condition &= in_range
+            if bank_id and category.by_bank:
+                condition &= Q(bank_id=bank_id)
+            aliases[f'rollup_{index}'] = (category, condition)
+
+        result = django_apps.get_model(source.model)._default_manager.filter(house_id=house_id).aggregate(**{
+            alias: Sum(category.amount, filter=condition) for alias, (category, condition) in aliases.items()
+        })
+        for alias, (category, _) in aliases.items():
+            totals[category.name, category.flow] += result[alias] or 0
+    return totals
+
+
+def sum_categories(totals, *categories, flow=None):
+    return sum(
+        (amount for (category, category_flow), amount in totals.items()
+         if category in categories and (flow is None or category_flow == flow)),
+        Decimal('0')
+    )
+
+
+# -------------------------------
+# بازسازی کامل
+# -------------------------------
+def rebuild_rollups(house_id=None, apps=None):
+    """
+    ساخت دوباره جدول تجمیعی از روی جدول‌های منبع (همه ساختمان‌ها یا یک ساختمان).
+    apps برای اجرا داخل migration (مدل‌های تاریخی) قابل تعویض است. تعداد ردیف‌ها را برمی‌گرداند.
+    """
+    apps = apps or django_apps
+    rollup_model = apps.get_model('admin_panel', 'LedgerRollup')
+
+    postings = defaultdict(Decimal)
+    for source in ROLLUP_SOURCES:
+        queryset = apps.get_model(source.model)._default_manager.all()
+        if house_id:
+            queryset = queryset.filter(house_id=house_id)
+        for key, amount in collect_postings(source, queryset).items():
+            postings[key] += amount
+
+    objects = [
+        rollup_model(
+            key=rollup_key(row_house_id, bank_id),
+            house_id=row_house_id,
+            bank_id=bank_id,
+            jalali_year=year,
+            jalali_month=month,
+            category=category,
+            flow=flow,
+            amount=amount,
+        )
+        for (row_house_id, bank_id, (year, month), category, flow), amount in postings.items()
+        if amount
+    ]
+
+    rollups = rollup_model.objects.all()
+    if house_id:
+        rollups = rollups.filter(house_id=house_id)
+
+    with transaction.atomic():
+        rollups.delete()
+        rollup_model.objects.bulk_create(objects, batch_size=1000)
+
+    return len(objects)
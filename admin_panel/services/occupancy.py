@@ -0,0 +1,53 @@
+from django.apps import apps as django_apps
+from django.db.models import Count, Exists, OuterRef, Q
+
+OCCUPANCY_BUCKETS = ('total', 'owner', 'renter', 'empty')
+
+
+def _occupancy_aggregates():
+    """
+    شمارش شرطی روی annotation مستاجر فعال؛ واحد خالی با مستاجر فعال در هر دو دسته
+    renter و empty می‌آید و مالک‌نشین واحدی است که نه خالی است نه مستاجر فعال دارد
+    """
+    return {
+        'total': Count('pk'),
+        'owner': Count('pk', filter=Q(has_active_renter=False) & ~Q(status_residence='empty')),
+        'renter': Count('pk', filter=Q(has_active_renter=True)),
+        'empty': Count('pk', filter=Q(status_residence='empty')),
+    }
+
+
+def occupancy_queryset(units=None, apps=None):
+    """
+    واحدهای فعال با annotation has_active_renter (EXISTS روی مستاجرین فعال، بدون join و distinct)
+    """
+    apps = apps or django_apps
+    Unit = apps.get_model('user_app', 'Unit')
+    Renter = apps.get_model('user_app', 'Renter')
+
+    units = Unit.objects.all() if units is None else units
+    return units.filter(is_active=True).annotate(
+        has_active_renter=Exists(Renter.objects.filter(unit=OuterRef('pk'), renter_is_active=True))
+    ).order_by()
+
+
+def occupancy_stats(units=None, apps=None):
+    """
+    {'total', 'owner', 'renter', 'empty'} واحدهای فعال (پیش‌فرض کل سامانه) با یک کوئری
+    """
+    return occupancy_queryset(units, apps).aggregate(**_occupancy_aggregates())
+
+
+def occupancy_by_house(units=None, apps=None):
+    """
+    {house_id: {'total', 'owner', 'renter', 'empty'}} با یک کوئری GROUP BY
+    """
+    rows = occupancy_queryset(units, apps).values('myhouse_id').annotate(**_occupancy_aggregates())
+    return {row.pop('myhouse_id'): row for row in rows}
+
+
+def sum_occupancy(stats):
+    """
+    جمع آمار چند ساختمان (خروجی occupancy_by_house)
+    """
+    return {bucket: sum(row[bucket] for row in stats) for bucket in OCCUPANCY_BUCKETS}
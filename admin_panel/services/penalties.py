@@ -0,0 +1,145 @@
+from django.db.models import BigIntegerField, Case, DateField, F, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+
+# -------------------------------
+# فرمول مشترک جریمه دیرکرد
+# -------------------------------
+# مبنای جریمه base_charge است که در زمان صدور شارژ، عمرانی و سایر هزینه‌ها را هم
+# شامل می‌شود؛ بنابراین مبلغ کل = base_charge + جریمه.
+# محاسبه با اعداد صحیح انجام می‌شود تا پایتون و دیتابیس دقیقاً یک عدد بدهند.
+
+def calculate_penalty(base_charge, penalty_percent, deadline, as_of):
+    """
+    جریمه دیرکرد یک شارژ در تاریخ as_of
+    """
+    if not deadline or not penalty_percent or as_of <= deadline:
+        return 0
+    delay_days = (as_of - deadline).days
+    return (base_charge or 0) * penalty_percent * delay_days // 100
+
+
+def calculate_total(base_charge, penalty_amount):
+    return (base_charge or 0) + (penalty_amount or 0)
+
+
+class DelayDays(Func):
+    """
+    تعداد روزهای بین ستون تاریخ و تاریخ ثابت as_of، داخل خود کوئری
+    """
+    output_field = IntegerField()
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+
+    def __init__(self, expression, as_of, **extra):
+        super().__init__(Value(as_of, output_field=DateField()), expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ',
+                           **extra_context)
+
+
+def penalty_expression(as_of):
+    """
+    معادل calculate_penalty برای شارژهایی که مهلتشان گذشته است
+    """
+    base = Cast(Coalesce(F('base_charge'), Value(0)), BigIntegerField())
+    percent = Cast(Coalesce(F('penalty_percent'), Value(0)), BigIntegerField())
+    return base * percent * DelayDays('payment_deadline_date', as_of) / Value(100)
+
+
+def total_expression(as_of):
+    return Coalesce(F('base_charge'), Value(0)) + penalty_expression(as_of)
+
+
+def effective_penalty_expression(as_of):
+    """
+    جریمه مؤثر در تاریخ as_of با همان قواعد UnifiedCharge.update_penalty:
+    پرداخت‌شده یا فاقد مهلت/درصد → مقدار ذخیره‌شده، بخشیده‌شده یا قبل از مهلت → صفر
+    """
+    return Case(
+        When(is_paid=True, then=Coalesce(F('penalty_amount'), Value(0))),
+        When(is_penalty_waived=True, then=Value(0)),
+        When(
+            Q(payment_deadline_date__isnull=True) | Q(penalty_percent__isnull=True) | Q(penalty_percent=0),
+            then=Coalesce(F('penalty_amount'), Value(0))
+        ),
+        When(payment_deadline_date__gte=as_of, then=Value(0)),
+        default=penalty_expression(as_of),
+        output_field=BigIntegerField(),
+    )
+
+
+def payable_total_expression(as_of):
+    """
+    مبلغ قابل پرداخت در تاریخ as_of (همتای total_charge_month بعد از update_penalty)
+    """
+    return Case(
+        When(
+            Q(is_paid=True) |
+            Q(is_penalty_waived=False, payment_deadline_date__isnull=True) |
+            Q(is_penalty_waived=False, penalty_percent__isnull=True) |
+            Q(is_penalty_waived=False, penalty_percent=0),
+            then=Coalesce(F('total_charge_month'), Value(0))
+        ),
+        When(
+            Q(is_penalty_waived=True) | Q(payment_deadline_date__gte=as_of),
+            then=Coalesce(F('base_charge'), Value(0))
+        ),
+        default=total_expression(as_of),
+        output_field=BigIntegerField(),
+    )
+
+
+# -------------------------------
+# موتور دسته‌ای جریمه
+# -------------------------------
+def penalty_candidates(queryset, as_of):
+    """
+    شارژهایی که در تاریخ as_of مشمول جریمه هستند
+    """
+    return queryset.filter(
+        is_paid=False,
+        is_penalty_waived=False,
+        payment_deadline_date__lt=as_of,
+        penalty_percent__gt=0,
+    )
+
+
+def apply_penalties(queryset, as_of, chunk_size=1000):
+    """
+    جریمه و total_charge_month را با پیمایش keyset روی کلید اصلی و یک UPDATE
+    برای هر دسته در دیتابیس محاسبه می‌کند. تعداد ردیف‌های بروزرسانی‌شده را برمی‌گرداند.
+    """
+    qs = penalty_candidates(queryset, as_of).order_by('pk')
+    updated = 0
+    last_pk = 0
+
+    while True:
+        chunk = list(qs.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            break
+
+        first_pk, last_pk = chunk[0], chunk[-1]
+
+        updated += (
+            penalty_candidates(queryset, as_of)
+            .filter(pk__gte=first_pk, pk__lte=last_pk)
+            .update(
+                penalty_amount=penalty_expression(as_of),
+                total_charge_month=total_expression(as_of),
+            )
+        )
+
+        if len(chunk) < chunk_size:
+            break
+
+    return updated
@@ -1,8 +1,23 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from admin_panel.models import CivilManage, CivilInstallment
+
+from absharProject.header_state import invalidate_header_state, invalidate_unit_header_state, \
+    invalidate_house_header_state, invalidate_managed_header_state, invalidate_admin_header_state
+from admin_panel.models import CivilManage, CivilInstallment, UnifiedCharge, MessageReadStatus, Announcement, \
+    MiddleMessageReadStatus, SmsCredit, Subscription, SmsManagement, Fund, AdminFund, Expense, Income, \
+    ExpenseCategory, IncomeCategory
+from admin_panel.services.document_search import SEARCH_SOURCES, index_documents, unindex_documents
+from admin_panel.services.house_analytics import mark_stale
+from admin_panel.services.ledger_checkpoints import apply_posting, fund_posting
+from admin_panel.services.ledger_rollups import ROLLUP_SOURCES, SOURCES_BY_MODEL, apply_postings, collect_postings, \
+    instance_postings
+from home.models import FreeRequest, ContactUs
+from middleAdmin_panel.services.dashboard_snapshot import touch_dashboards
+from notifications.models import AdminTicket, SupportUser
+from polls_app.models import Poll, Vote
+from user_app.models import MyHouse, Unit, Renter, User, Bank
 
 
 # @receiver(post_save, sender=CivilManage)
@@ -27,3 +42,303 @@ from admin_panel.models import CivilManage, CivilInstallment
 #                 amount=per_installment,
 #                 due_date=due_date
 #             )
+
+
+# ------------------------------------------------------------------
+# ابطال snapshot هدر (absharProject.header_state)
+# ------------------------------------------------------------------
+@receiver([post_save, post_delete], sender=UnifiedCharge)
+@receiver([post_save, post_delete], sender=MessageReadStatus)
+@receiver([post_save, post_delete], sender=Vote)
+def invalidate_unit_header(sender, instance, **kwargs):
+    invalidate_unit_header_state(instance.unit_id)
+
+
+@receiver([post_save, post_delete], sender=Unit)
+def invalidate_unit_owner_header(sender, instance, **kwargs):
+    invalidate_header_state(instance.user_id)
+    invalidate_unit_header_state(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Renter)
+def invalidate_renter_header(sender, instance, **kwargs):
+    invalidate_header_state(instance.user_id)
+    invalidate_unit_header_state(instance.unit_id)
+
+
+@receiver(post_delete, sender=Renter)
+def sync_unit_active_renter(sender, instance, **kwargs):
+    # حذف مستاجر فعال؛ مستاجر فعال دیگر واحد (اگر باشد) جایگزین می‌شود
+    Unit.objects.filter(pk=instance.unit_id).sync_active_renters()
+
+
+@receiver([post_save, post_delete], sender=MyHouse)
+@receiver([post_save, post_delete], sender=Poll)
+def invalidate_house_header(sender, instance, **kwargs):
+    house_id = instance.pk if sender is MyHouse else instance.house_id
+    invalidate_house_header_state(house_id)
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def invalidate_announcement_header(sender, instance, **kwargs):
+    invalidate_managed_header_state(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=MiddleMessageReadStatus)
+@receiver([post_save, post_delete], sender=SmsCredit)
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_user_header(sender, instance, **kwargs):
+    invalidate_header_state(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_self_header(sender, instance, **kwargs):
+    invalidate_header_state(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SmsManagement)
+@receiver([post_save, post_delete], sender=FreeRequest)
+@receiver([post_save, post_delete], sender=ContactUs)
+def invalidate_admin_header(sender, instance, **kwargs):
+    invalidate_admin_header_state()
+
+
+# ------------------------------------------------------------------
+# نقاط کنترل ماهانه مانده صندوق (admin_panel.services.ledger_checkpoints)
+# ------------------------------------------------------------------
+# فیلدهایی که روی مانده دفتر اثر دارند؛ ذخیره فقط final_amount نیازی به بروزرسانی ندارد
+FUND_POSTING_FIELDS = {'house', 'house_id', 'bank', 'bank_id', 'debtor_amount', 'creditor_amount'}
+
+
+def _affects_posting(update_fields):
+    return not update_fields or bool(FUND_POSTING_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Fund)
+def remember_fund_posting(sender, instance, update_fields=None, **kwargs):
+    instance._old_posting = None
+    if instance.pk and _affects_posting(update_fields):
+        old = Fund.objects.filter(pk=instance.pk).only(
+            'house_id', 'bank_id', 'created_at', 'debtor_amount', 'creditor_amount'
+        ).first()
+        if old:
+            instance._old_posting = fund_posting(old)
+
+
+@receiver(post_save, sender=Fund)
+def update_ledger_checkpoint(sender, instance, created, update_fields=None, **kwargs):
+    if not created and not _affects_posting(update_fields):
+        return
+
+    old = getattr(instance, '_old_posting', None)
+    new = fund_posting(instance)
+    if old == new:
+        return
+
+    if old:
+        house_id, bank_id, period, debit, credit = old
+        apply_posting(house_id, bank_id, period, debit=-debit, credit=-credit)
+    house_id, bank_id, period, debit, credit = new
+    apply_posting(house_id, bank_id, period, debit=debit, credit=credit)
+
+
+@receiver(post_delete, sender=Fund)
+def revert_ledger_checkpoint(sender, instance, **kwargs):
+    house_id, bank_id, period, debit, credit = fund_posting(instance)
+    apply_posting(house_id, bank_id, period, debit=-debit, credit=-credit)
+
+
+# ------------------------------------------------------------------
+# جدول تجمیعی ماهانه گزارش تراز (admin_panel.services.ledger_rollups)
+# ------------------------------------------------------------------
+def _rollup_source(sender):
+    return SOURCES_BY_MODEL[sender._meta.label]
+
+
+def remember_rollup_postings(sender, instance, raw=False, **kwargs):
+    instance._old_rollup_postings = None if raw else instance_postings(_rollup_source(sender), instance)
+
+
+def update_ledger_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_postings(
+        getattr(instance, '_old_rollup_postings', None),
+        instance_postings(_rollup_source(sender), instance),
+    )
+
+
+def revert_ledger_rollup(sender, instance, **kwargs):
+    apply_postings(getattr(instance, '_old_rollup_postings', None), None)
+
+
+for _source in ROLLUP_SOURCES:
+    pre_save.connect(remember_rollup_postings, sender=_source.model)
+    post_save.connect(update_ledger_rollup, sender=_source.model)
+    pre_delete.connect(remember_rollup_postings, sender=_source.model)
+    post_delete.connect(revert_ledger_rollup, sender=_source.model)
+
+
+def _category_expense_postings(category):
+    return collect_postings(SOURCES_BY_MODEL['admin_panel.Expense'], Expense.objects.filter(category=category))
+
+
+@receiver(pre_save, sender=ExpenseCategory)
+def remember_category_rollup_postings(sender, instance, raw=False, **kwargs):
+    instance._old_category_postings = None
+    if raw or not instance.pk:
+        return
+    old = ExpenseCategory.objects.filter(pk=instance.pk).values('title', 'is_default').first()
+    if old and (old['title'], old['is_default']) != (instance.title, instance.is_default):
+        instance._old_category_postings = _category_expense_postings(instance)
+
+
+@receiver(post_save, sender=ExpenseCategory)
+def repost_category_expenses(sender, instance, raw=False, **kwargs):
+    # گروه تراز هزینه‌ها از عنوان و پیش‌فرض بودن گروهشان است؛ فقط با تغییر آن‌ها دوباره ثبت می‌شوند
+    old = getattr(instance, '_old_category_postings', None)
+    if raw or old is None:
+        return
+    apply_postings(old, _category_expense_postings(instance))
+
+
+# ------------------------------------------------------------------
+# آمار ساختمان‌ها در گزارش‌های ادمین کل (admin_panel.services.house_analytics)
+# ------------------------------------------------------------------
+def _unit_house_id(unit_id):
+    if not unit_id:
+        return None
+    return Unit.objects.filter(pk=unit_id).values_list('myhouse_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Unit)
+def mark_unit_analytics_stale(sender, instance, **kwargs):
+    mark_stale(instance.myhouse_id)
+
+
+@receiver([post_save, post_delete], sender=Renter)
+def mark_renter_analytics_stale(sender, instance, **kwargs):
+    mark_stale(instance.myhouse_id or _unit_house_id(instance.unit_id))
+
+
+@receiver([post_save, post_delete], sender=UnifiedCharge)
+def mark_charge_analytics_stale(sender, instance, **kwargs):
+    mark_stale(instance.house_id or _unit_house_id(instance.unit_id))
+
+
+@receiver([post_save, post_delete], sender=Fund)
+@receiver([post_save, post_delete], sender=AdminFund)
+@receiver([post_save, post_delete], sender=AdminTicket)
+def mark_house_analytics_stale(sender, instance, **kwargs):
+    mark_stale(instance.house_id)
+
+
+# ------------------------------------------------------------------
+# نسخه snapshot داشبورد مدیر ساختمان (middleAdmin_panel.services.dashboard_snapshot)
+# ------------------------------------------------------------------
+@receiver([post_save, post_delete], sender=Unit)
+def touch_unit_dashboard(sender, instance, **kwargs):
+    touch_dashboards(house_ids=[instance.myhouse_id])
+
+
+@receiver([post_save, post_delete], sender=Renter)
+def touch_renter_dashboard(sender, instance, **kwargs):
+    touch_dashboards(house_ids=[instance.myhouse_id or _unit_house_id(instance.unit_id)])
+
+
+@receiver([post_save, post_delete], sender=UnifiedCharge)
+def touch_charge_dashboard(sender, instance, **kwargs):
+    touch_dashboards(house_ids=[instance.house_id or _unit_house_id(instance.unit_id)])
+
+
+@receiver([post_save, post_delete], sender=Fund)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Income)
+@receiver([post_save, post_delete], sender=Announcement)
+def touch_house_dashboard(sender, instance, **kwargs):
+    touch_dashboards(house_ids=[instance.house_id], user_ids=[instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=ExpenseCategory)
+@receiver([post_save, post_delete], sender=IncomeCategory)
+def touch_category_dashboard(sender, instance, **kwargs):
+    touch_dashboards(user_ids=[instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=MyHouse)
+def touch_owner_dashboard(sender, instance, **kwargs):
+    touch_dashboards(house_ids=[instance.pk], user_ids=[instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=SupportUser)
+def touch_ticket_dashboard(sender, instance, **kwargs):
+    # تیکت ساختمان ندارد؛ داشبورد خود کاربر و مدیرش
+    manager_id = User.objects.filter(pk=instance.user_id).values_list('manager_id', flat=True).first()
+    touch_dashboards(user_ids=[instance.user_id, manager_id])
+
+
+# ------------------------------------------------------------------
+# ایندکس جستجوی سندهای مالی (admin_panel.services.document_search)
+# ------------------------------------------------------------------
+def index_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_documents(sender._meta.label, [instance.pk])
+
+
+def unindex_document(sender, instance, **kwargs):
+    unindex_documents(sender._meta.label, [instance.pk])
+
+
+for _source in SEARCH_SOURCES:
+    post_save.connect(index_document, sender=_source.model)
+    post_delete.connect(unindex_document, sender=_source.model)
+
+
+# نام‌هایی از مدل‌های مرتبط که در متن ایندکس سندها هستند: مدل → (رابطه در سند، فیلد نام)
+INDEXED_RELATED_NAMES = {
+    Bank: ('bank', 'bank_name'),
+    ExpenseCategory: ('category', 'title'),
+    IncomeCategory: ('category', 'subject'),
+    Unit: ('unit', 'unit'),
+}
+
+
+def _reindex_related_documents(sender, instance):
+    relation, name_field = INDEXED_RELATED_NAMES[sender]
+    for source in SEARCH_SOURCES:
+        if f'{relation}__{name_field}' not in source.text_fields:
+            continue
+        model = sender._meta.apps.get_model(source.model)
+        if model._meta.get_field(relation).related_model is not sender:
+            continue
+        doc_ids = list(model.objects.filter(**{relation: instance}).values_list('pk', flat=True))
+        if doc_ids:
+            index_documents(source.model, doc_ids)
+
+
+@receiver(pre_save, sender=Bank)
+@receiver(pre_save, sender=ExpenseCategory)
+@receiver(pre_save, sender=IncomeCategory)
+@receiver(pre_save, sender=Unit)
+def remember_indexed_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    _, name_field = INDEXED_RELATED_NAMES[sender]
+    instance._old_indexed_name = getattr(instance, name_field)
+    if raw or not instance.pk or (update_fields is not None and name_field not in update_fields):
+        return
+    if isinstance(instance, Unit):
+        # واحد مقادیر قبلی را خودش نگه می‌دارد؛ کوئری اضافه لازم نیست
+        instance._old_indexed_name = instance.get_previous_value(name_field)
+    else:
+        instance._old_indexed_name = sender.objects.filter(pk=instance.pk).values_list(name_field, flat=True).first()
+
+
+@receiver(post_save, sender=Bank)
+@receiver(post_save, sender=ExpenseCategory)
+@receiver(post_save, sender=IncomeCategory)
+@receiver(post_save, sender=Unit)
+def reindex_renamed_documents(sender, instance, created, raw=False, **kwargs):
+    # نام بانک، گروه هزینه/درآمد و شماره واحد در متن سندها هست؛ فقط با تغییرشان دوباره ایندکس می‌شوند
+    _, name_field = INDEXED_RELATED_NAMES[sender]
+    if raw or created or getattr(instance, '_old_indexed_name', None) == getattr(instance, name_field):
+        return
+    _reindex_related_documents(sender, instance)
@@ -1,6 +1,11 @@
-from celery import shared_task
+from datetime import date
+
+from celery import group, shared_task
 from django.utils import timezone
+
 from .models import UnifiedCharge
+from .services.house_analytics import mark_stale, refresh_analytics
+from .services.penalties import apply_penalties, penalty_candidates
 
 
 @shared_task(
@@ -10,36 +15,51 @@ from .models import UnifiedCharge
     retry_kwargs={'max_retries': 3},
 )
 def calculate_daily_penalties(self):
+    """
+    تقسیم کار جریمه شبانه به یک زیرتسک موازی برای هر ساختمان
+    """
     today = timezone.now().date()
 
-    qs = UnifiedCharge.objects.filter(
-        is_paid=False,
-        payment_deadline_date__lt=today,
-        penalty_percent__gt=0
+    house_ids = (
+        penalty_candidates(UnifiedCharge.objects.all(), today)
+        .order_by()
+        .values_list('house_id', flat=True)
+        .distinct()
     )
 
-    CHUNK_SIZE = 1000
-    start = 0
-    while True:
-        chunk = qs[start:start + CHUNK_SIZE]
-        if not chunk:
-            break
+    group(
+        calculate_house_penalties.s(house_id, today.isoformat())
+        for house_id in house_ids
+    ).apply_async()
 
-        to_update = []
-        for charge in chunk:
-            base_total = charge.base_charge or 0
-            percent = charge.penalty_percent or 0
-            delay_days = (today - charge.payment_deadline_date).days
 
-            new_penalty = int((base_total * percent / 100) * delay_days)
-
-            if new_penalty != (charge.penalty_amount or 0):
-                charge.penalty_amount = new_penalty
-                charge.total_charge_month = base_total + new_penalty + (charge.other_cost_amount or 0) + (charge.civil or 0)
-                to_update.append(charge)
+@shared_task(
+    bind=True,
+    name='admin_panel.tasks.calculate_house_penalties',
+    autoretry_for=(Exception,),
+    retry_kwargs={'max_retries': 3},
+)
+def calculate_house_penalties(self, house_id, as_of):
+    if house_id is None:
+        qs = UnifiedCharge.objects.filter(house__isnull=True)
+    else:
+        qs = UnifiedCharge.objects.filter(house_id=house_id)
 
-        if to_update:
-            UnifiedCharge.objects.bulk_update(to_update, ['penalty_amount', 'total_charge_month'], batch_size=500)
+    updated = apply_penalties(qs, date.fromisoformat(as_of))
+    # update دسته‌ای سیگنال ندارد
+    if updated:
+        mark_stale(house_id)
+    return updated
 
-        start += CHUNK_SIZE
 
+@shared_task(
+    bind=True,
+    name='admin_panel.tasks.refresh_house_analytics',
+    autoretry_for=(Exception,),
+    retry_kwargs={'max_retries': 3},
+)
+def refresh_house_analytics(self):
+    """
+    محاسبه دوباره آمار ساختمان‌هایی که از دور قبل تغییر کرده‌اند؛ هر ده دقیقه از CELERY_BEAT_SCHEDULE اجرا می‌شود
+    """
+    return refresh_analytics()
@@ -6,6 +6,7 @@ from admin_panel import views
 
 urlpatterns = [
     path('', views.admin_dashboard, name='admin_dashboard'),
+    path('occupancy-stats/', views.admin_occupancy_stats, name='admin_occupancy_stats'),
     path('login-admin/', views.admin_login_view, name='login_admin'),
     path('log-out-admin/', views.logout_admin, name='logout_admin'),
     path('user-management/', views.UserManagementListView.as_view(), name='user_management'),
@@ -131,7 +132,7 @@ urlpatterns = [
     path('expense/edit/<int:pk>/', views.expense_edit, name='expense_edit'),
     path('expense/delete/<int:pk>/', views.expense_delete, name='expense_delete'),
     path('expense/delete-document/', views.delete_expense_document, name='delete_expense_document'),
-    path('expense/export/excel/', views.export_units_excel, name='export_expense_excel'),
+    path('expense/export/excel/', views.export_expense_excel, name='export_expense_excel'),
     path('expense/export/pdf/', views.export_expense_pdf, name='export_expense_pdf'),
 
     # Income_category Urls
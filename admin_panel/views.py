@@ -1,4 +1,3 @@
-import io
 import json
 import os
 from datetime import timedelta
@@ -12,7 +11,6 @@ from django.contrib.contenttypes.models import ContentType
 from django.db.models.functions import Cast
 from django.utils import timezone
 import jdatetime
-import openpyxl
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -29,10 +27,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, UpdateView, DetailView, ListView, TemplateView
 from django.views.generic.edit import FormMixin
-from openpyxl.styles import PatternFill, Font, Alignment
-from pypdf import PdfWriter
-from weasyprint import HTML, CSS
 
+from absharProject.excel_export import ExcelExport, Column, RowNumber, first_of
+from absharProject.keyset_pagination import KeysetPaginationMixin
 from absharProject.settings import LOGIN_URL_ADMIN
 from admin_panel import helper
 from admin_panel.forms import announcementForm, UnitForm, ExpenseForm, ExpenseCategoryForm, \
@@ -47,7 +44,14 @@ from admin_panel.models import Announcement, Expense, ExpenseCategory, ExpenseDo
     ChargeByFixPersonArea, FixCharge, AreaCharge, PersonCharge, \
     FixPersonCharge, FixAreaCharge, ChargeFixVariable, \
     SmsManagement, Fund, UnifiedCharge, AdminSmsManagement, SmsCredit, ImpersonationLog, SubscriptionPlan, Subscription, \
-    AdminFund, Coupon
+    AdminFund, Coupon, HouseAnalytics
+from admin_panel.services.document_search import search_documents
+from admin_panel.services.house_analytics import ensure_analytics
+from admin_panel.services.ledger_checkpoints import bank_balances, bank_ledger_balance, statement_funds, \
+    statement_opening_balance
+from admin_panel.services.ledger_rollups import PAID_EXPENSE_CATEGORIES, balance_totals, sum_categories
+from admin_panel.services.occupancy import occupancy_stats
+from reports.services.pdf_jobs import PdfJob
 from home.forms import ArticleForm
 from home.models import SliderText, ContactUs, FreeRequest, Articles, CommentSite
 from notifications.models import AdminTicket
@@ -82,16 +86,15 @@ def admin_dashboard(request):
         .order_by()
     )
 
-    units = Unit.objects.filter(
-        is_active=True
-    ).distinct()
-
-    renter_units = units.filter(renters__renter_is_active=True).distinct()
-    owner_units = units.exclude(id__in=renter_units.values_list('id', flat=True))
+    ensure_analytics()
+    unit_totals = HouseAnalytics.objects.aggregate(
+        owner=Sum('owner_unit_count'),
+        renter=Sum('renter_unit_count'),
+    )
 
     owner_renter_stats = {
-        'owner': owner_units.count(),
-        'renter': renter_units.count(),
+        'owner': unit_totals['owner'] or 0,
+        'renter': unit_totals['renter'] or 0,
     }
 
     context = {
@@ -107,6 +110,18 @@ def admin_dashboard(request):
     return render(request, 'shared/home_template.html', context)
 
 
+
+@admin_required
+def admin_occupancy_stats(request):
+    """
+    آمار سکونت واحدهای کل سامانه (یا با ?house= یک ساختمان) با یک کوئری
+    """
+    units = Unit.objects.all()
+    house_id = request.GET.get('house', '')
+    if house_id.isdigit():
+        units = units.filter(myhouse_id=house_id)
+    return JsonResponse(occupancy_stats(units))
+
 def admin_login_view(request):
     if request.method == 'POST':
         mobile = request.POST.get('mobile')
@@ -1241,8 +1256,9 @@ class UnitRegisterView(ListView):
         query = self.request.GET.get('q', '')
 
         # حالا خانه‌ها را با تعداد واحد فعال
-        qs = MyHouse.objects.annotate(
-            total_units=Count('units', filter=Q(units__is_active=True))
+        ensure_analytics()
+        qs = MyHouse.objects.select_related('user').annotate(
+            total_units=F('analytics__unit_count')
         ).filter(total_units__gt=0)
 
         if query:
@@ -1347,7 +1363,7 @@ def to_jalali(date_obj):
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
 def export_units_excel(request, house_id):
     # پایه: همان واحدهایی که در لیست دیده می‌شوند
-    qs = Unit.objects.filter(myhouse_id=house_id, is_active=True).prefetch_related('renters').order_by('unit')
+    qs = Unit.objects.filter(myhouse_id=house_id, is_active=True).order_by('unit')
 
     params = request.GET
     filters = Q()
@@ -1373,64 +1389,37 @@ def export_units_excel(request, house_id):
 
     qs = qs.filter(filters).distinct()
 
-    # آماده کردن مستاجرهای فعال
-    for unit in qs:
-        unit.active_renters = unit.renters.filter(renter_is_active=True)
-
-    # ساخت فایل اکسل
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # عنوان
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=22)
-    title_cell = ws.cell(row=1, column=1, value="لیست واحدهای ساختمان")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # سرستون‌ها
-    headers = [
-        'واحد', 'طبقه', 'متراژ', 'تعداد خواب', 'شماره تلفن',
-        'وضعیت سکونت', 'نام مالک', 'تلفن مالک', 'تعداد نفرات مالک',
-        'نام مستاجر', 'تلفن مستاجر', 'کد ملی مستاجر',
-        'تاریخ اجاره', 'تاریخ پایان', 'شماره قرارداد'
-    ]
-
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-
-    # داده‌ها
-    for row_num, unit in enumerate(qs, start=3):
-        ws.cell(row=row_num, column=1, value=unit.unit)
-        ws.cell(row=row_num, column=2, value=unit.floor_number)
-        ws.cell(row=row_num, column=3, value=unit.area)
-        ws.cell(row=row_num, column=4, value=unit.bedrooms_count)
-        ws.cell(row=row_num, column=5, value=unit.unit_phone)
-        ws.cell(row=row_num, column=6, value=unit.status_residence)
-        ws.cell(row=row_num, column=7, value=unit.owner_name)
-        ws.cell(row=row_num, column=8, value=unit.owner_mobile)
-        ws.cell(row=row_num, column=9, value=unit.owner_people_count)
-
-        # فقط اولین مستاجر فعال (می‌توان همه مستاجرها را هم اضافه کرد)
-        renter = unit.active_renters.first()
-        if renter:
-            ws.cell(row=row_num, column=10, value=renter.renter_name)
-            ws.cell(row=row_num, column=11, value=renter.renter_mobile)
-            ws.cell(row=row_num, column=12, value=renter.renter_national_code)
-            ws.cell(row=row_num, column=13, value=to_jalali(renter.start_date) if renter.start_date else '')
-            ws.cell(row=row_num, column=14, value=to_jalali(renter.end_date) if renter.end_date else '')
-            ws.cell(row=row_num, column=15, value=renter.contract_number)
-
-    # ارسال فایل
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # ساخت فایل اکسل؛ اولین مستاجر فعال همه واحدها با یک کوئری پیش‌خوانده می‌شود
+    export = ExcelExport(
+        title="لیست واحدهای ساختمان",
+        sheet_title="units",
+        filename=f'units_house_{house_id}.xlsx',
+        prefetch_related=(
+            Prefetch(
+                'renters',
+                queryset=Renter.objects.filter(renter_is_active=True).order_by('pk'),
+                to_attr='active_renters'
+            ),
+        ),
+        columns=[
+            Column('واحد', 'unit'),
+            Column('طبقه', 'floor_number'),
+            Column('متراژ', 'area'),
+            Column('تعداد خواب', 'bedrooms_count'),
+            Column('شماره تلفن', 'unit_phone'),
+            Column('وضعیت سکونت', 'status_residence'),
+            Column('نام مالک', 'owner_name'),
+            Column('تلفن مالک', 'owner_mobile'),
+            Column('تعداد نفرات مالک', 'owner_people_count'),
+            Column('نام مستاجر', first_of('active_renters', 'renter_name')),
+            Column('تلفن مستاجر', first_of('active_renters', 'renter_mobile')),
+            Column('کد ملی مستاجر', first_of('active_renters', 'renter_national_code')),
+            Column('تاریخ اجاره', first_of('active_renters', 'start_date'), to_jalali),
+            Column('تاریخ پایان', first_of('active_renters', 'end_date'), to_jalali),
+            Column('شماره قرارداد', first_of('active_renters', 'contract_number')),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=units_house_{house_id}.xlsx'
-    wb.save(response)
-    return response
+    return export.response(qs)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -1471,41 +1460,30 @@ def export_units_pdf(request, house_id):
         'units': qs,
         'house_id': house_id,
     }
-    html_content = template.render(context)
 
     # تنظیم فونت و راست‌چین
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 4px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # ساخت PDF
-    pdf_file = io.BytesIO()
-    HTML(string=html_content, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="units_house_{house_id}.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename=f'units_house_{house_id}.pdf',
+                  stylesheets=[css]).response()
 
 
 # ================================= Expense Views ==============================
@@ -1759,39 +1737,20 @@ def export_expense_pdf(request):
     print(expenses)
 
     # Font setup
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # Render HTML template
     template = get_template("expense_templates/expense_pdf.html")
     context = {
         'expenses': expenses,
-        'font_path': font_url,
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="expenses.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='expenses.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -1827,47 +1786,22 @@ def export_expense_excel(request):
     except ValueError:
         expenses = Expense.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "expenses"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست هزینه‌ها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع هزینه', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, expense in enumerate(expenses, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=expense.category.title)
-        ws.cell(row=row_num, column=3, value=expense.description)
-        ws.cell(row=row_num, column=4, value=expense.doc_no)
-        ws.cell(row=row_num, column=5, value=expense.amount)
-        jalali_date = jdatetime.date.fromgregorian(date=expense.date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=6, value=jalali_date)
-        ws.cell(row=row_num, column=7, value=expense.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست هزینه‌ها",
+        sheet_title="expenses",
+        filename='expenses.xlsx',
+        select_related=('category',),
+        columns=[
+            RowNumber(),
+            Column('موضوع هزینه', 'category.title'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_no'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'date', to_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=expenses.xlsx'
-    wb.save(response)
-    return response
+    return export.response(expenses)
 
 
 # =========================== Income Views =========================
@@ -2122,40 +2056,21 @@ def export_income_pdf(request):
         incomes = Income.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("income_templates/income_pdf.html")
     context = {
         'incomes': incomes,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="incomes.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='incomes.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -2189,49 +2104,24 @@ def export_income_excel(request):
             to_date = jdatetime.datetime.strptime(to_date_str, '%Y/%m/%d').togregorian().date()
             incomes = incomes.filter(doc_date__lte=to_date)
     except ValueError:
-        expenses = Expense.objects.none()
+        incomes = Income.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "incomes"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست درآمدها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع درآمد', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, income in enumerate(incomes, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=income.category.subject)
-        ws.cell(row=row_num, column=3, value=income.description)
-        ws.cell(row=row_num, column=4, value=income.doc_number)
-        ws.cell(row=row_num, column=5, value=income.amount)
-        jalali_date = jdatetime.date.fromgregorian(date=income.doc_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=6, value=jalali_date)
-        ws.cell(row=row_num, column=7, value=income.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست درآمدها",
+        sheet_title="incomes",
+        filename='incomes.xlsx',
+        select_related=('category',),
+        columns=[
+            RowNumber(),
+            Column('موضوع درآمد', 'category.subject'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'doc_date', to_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=incomes.xlsx'
-    wb.save(response)
-    return response
+    return export.response(incomes)
 
 
 # ============================ ReceiveMoneyView ==========================
@@ -2431,40 +2321,21 @@ def export_receive_pdf(request):
         receives = ReceiveMoney.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("receiveMoney/receive_pdf.html")
     context = {
         'receives': receives,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="receives.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='receives.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -2500,52 +2371,23 @@ def export_receive_excel(request):
     except ValueError:
         receives = ReceiveMoney.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "receives"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اسناد دریافتنی")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=8)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شماره جساب', 'دریافت کننده', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, receive in enumerate(receives, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        bank_account = ""
-        if receive.bank and receive.bank.account_number:
-            bank_account = str(receive.bank.account_number)
-
-        ws.cell(row=row_num, column=2, value=bank_account)
-        ws.cell(row=row_num, column=3, value=receive.payer_name)
-        ws.cell(row=row_num, column=4, value=receive.description)
-        ws.cell(row=row_num, column=5, value=receive.doc_number)
-        ws.cell(row=row_num, column=6, value=receive.amount)
-        jalali_date = jdatetime.date.fromgregorian(date=receive.doc_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=7, value=jalali_date)
-        ws.cell(row=row_num, column=8, value=receive.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اسناد دریافتنی",
+        sheet_title="receives",
+        filename='receive.xlsx',
+        select_related=('bank',),
+        columns=[
+            RowNumber(),
+            Column('شماره جساب', 'bank.account_no'),
+            Column('دریافت کننده', 'payer_name'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'doc_date', to_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=receive.xlsx'
-    wb.save(response)
-    return response
+    return export.response(receives)
 
 
 # ============================ PaymentMoneyView ==========================
@@ -2741,40 +2583,21 @@ def export_pay_pdf(request):
         payments = PayMoney.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("payMoney/pay_pdf.html")
     context = {
         'payments': payments,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="payments.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='payments.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -2810,52 +2633,23 @@ def export_pay_excel(request):
     except ValueError:
         payments = PayMoney.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "payments"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اسناد پرداختنی")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=8)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شماره جساب', 'دریافت کننده', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, payment in enumerate(payments, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        bank_account = ""
-        if payment.bank and payment.bank.account_number:
-            bank_account = str(payment.bank.account_number)
-
-        ws.cell(row=row_num, column=2, value=bank_account)
-        ws.cell(row=row_num, column=3, value=payment.receiver_name)
-        ws.cell(row=row_num, column=4, value=payment.description)
-        ws.cell(row=row_num, column=5, value=payment.document_number)
-        ws.cell(row=row_num, column=6, value=payment.amount)
-        jalali_date = jdatetime.date.fromgregorian(date=payment.document_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=7, value=jalali_date)
-        ws.cell(row=row_num, column=8, value=payment.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اسناد پرداختنی",
+        sheet_title="payments",
+        filename='payment.xlsx',
+        select_related=('bank',),
+        columns=[
+            RowNumber(),
+            Column('شماره جساب', 'bank.account_no'),
+            Column('دریافت کننده', 'receiver_name'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'document_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'document_date', to_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=payment.xlsx'
-    wb.save(response)
-    return response
+    return export.response(payments)
 
 
 # ============================ PropertyView ==========================
@@ -3048,40 +2842,21 @@ def export_property_pdf(request):
         properties = Property.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("property/property_pdf.html")
     context = {
         'properties': properties,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="properties.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='properties.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -3118,48 +2893,22 @@ def export_property_excel(request):
     except ValueError:
         properties = Property.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "properties"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اموال ساختمان")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=8)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'نام اموال', 'واحد', ' شماره اموال', ' موقعیت ', 'ارزش', 'تاریخ خرید', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, property in enumerate(properties, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=property.property_name)
-        ws.cell(row=row_num, column=3, value=property.property_unit)
-        ws.cell(row=row_num, column=4, value=property.property_code)
-        ws.cell(row=row_num, column=5, value=property.property_location)
-        ws.cell(row=row_num, column=6, value=property.property_price)
-        jalali_date = jdatetime.date.fromgregorian(date=property.property_purchase_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=7, value=jalali_date)
-        ws.cell(row=row_num, column=8, value=property.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اموال ساختمان",
+        sheet_title="properties",
+        filename='properties.xlsx',
+        columns=[
+            RowNumber(),
+            Column('نام اموال', 'property_name'),
+            Column('واحد', 'property_unit'),
+            Column(' شماره اموال', 'property_code'),
+            Column(' موقعیت ', 'property_location'),
+            Column('ارزش', 'property_price'),
+            Column('تاریخ خرید', 'property_purchase_date', to_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=properties.xlsx'
-    wb.save(response)
-    return response
+    return export.response(properties)
 
 
 # ============================ MaintenanceView ==========================
@@ -3351,40 +3100,21 @@ def export_maintenance_pdf(request):
                 maintenances = maintenances.filter(**{lookup: value.strip()})
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("maintenance/maintenance_pdf.html")
     context = {
         'maintenances': maintenances,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="maintenances.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='maintenances.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -3412,51 +3142,23 @@ def export_maintenance_excel(request):
             else:
                 maintenances = maintenances.filter(**{lookup: value.strip()})
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "maintenances"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست هزینه های تعمیرات و نگهداری")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شرح کار', 'تاریخ شروع', ' تاریخ پایان', ' اجرت/دستمزد ', 'شرکت خدماتی', 'شماره فاکتور',
-               'توضیحات', 'آخرین وضعیت']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, maintenance in enumerate(maintenances, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=maintenance.maintenance_description)
-        jalali_date = jdatetime.date.fromgregorian(date=maintenance.maintenance_start_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=3, value=jalali_date)
-        jalali_date = jdatetime.date.fromgregorian(date=maintenance.maintenance_end_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=4, value=jalali_date)
-        ws.cell(row=row_num, column=5, value=maintenance.maintenance_price)
-        ws.cell(row=row_num, column=6, value=maintenance.service_company)
-        ws.cell(row=row_num, column=7, value=maintenance.maintenance_document_no)
-        ws.cell(row=row_num, column=8, value=maintenance.details)
-        ws.cell(row=row_num, column=9, value=maintenance.maintenance_status)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست هزینه های تعمیرات و نگهداری",
+        sheet_title="maintenances",
+        filename='maintenances.xlsx',
+        columns=[
+            RowNumber(),
+            Column('شرح کار', 'maintenance_description'),
+            Column('تاریخ شروع', 'maintenance_start_date', to_jalali),
+            Column(' تاریخ پایان', 'maintenance_end_date', to_jalali),
+            Column(' اجرت/دستمزد ', 'maintenance_price'),
+            Column('شرکت خدماتی', 'service_company'),
+            Column('شماره فاکتور', 'maintenance_document_no'),
+            Column('توضیحات', 'details'),
+            Column('آخرین وضعیت', 'maintenance_status'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=maintenances.xlsx'
-    wb.save(response)
-    return response
+    return export.response(maintenances)
 
 
 # ======================== Charge Views ======================================
@@ -4110,12 +3812,11 @@ def admin_send_sms(request, pk):
 
     # GET → نمایش فرم انتخاب واحدها و مدیران
     units_with_details = []
-    units = Unit.objects.filter(is_active=True, user__manager=request.user).prefetch_related('renters').order_by('unit')
+    units = Unit.objects.filter(is_active=True, user__manager=request.user).with_active_renter().order_by('unit')
     for unit in units:
-        active_renter = unit.renters.filter(renter_is_active=True).first()
         units_with_details.append({
             'unit': unit,
-            'active_renter': active_renter
+            'active_renter': unit.active_renter
         })
 
     managers = User.objects.filter(is_middle_admin=True, is_active=True)
@@ -4347,6 +4048,8 @@ class middleReportSmsDetailView(ListView):
 
             )
 
+        # برچسب واحدهای ارسالی (get_label) بدون کوئری جدا برای مستاجر هر واحد
+        qs = qs.prefetch_related(Prefetch('notified_units', queryset=Unit.objects.with_active_renter()))
         return qs.order_by('-created_at')
 
     def get_context_data(self, **kwargs):
@@ -4580,13 +4283,14 @@ class AdminFinanceByHouse(ListView):
     def get_queryset(self):
         query = self.request.GET.get('q', '')
 
+        ensure_analytics()
         qs = (
             MyHouse.objects
-            .filter(admin_houses__id__isnull=False)
+            .select_related('user')
+            .filter(analytics__admin_fund_count__gt=0)
             .annotate(
-                total_finances=Count('admin_houses')
+                total_finances=F('analytics__admin_fund_count')
             )
-            .distinct()
         )
 
         if query:
@@ -4657,13 +4361,14 @@ class AdminFundReport(ListView):
     def get_queryset(self):
         query = self.request.GET.get('q', '')
 
+        ensure_analytics()
         qs = (
             MyHouse.objects
-            .filter(house_funds__id__isnull=False)
+            .select_related('user')
+            .filter(analytics__fund_count__gt=0)
             .annotate(
-                total_fund=Count('house_funds')
+                total_fund=F('analytics__fund_count')
             )
-            .distinct()
         )
 
         if query:
@@ -4682,7 +4387,7 @@ class AdminFundReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminFundReportDetailView(ListView):
+class AdminFundReportDetailView(KeysetPaginationMixin, ListView):
     model = Fund
     template_name = "report/admin_fund_detail.html"
     context_object_name = "funds"
@@ -4702,13 +4407,7 @@ class AdminFundReportDetailView(ListView):
         )
 
         if query:
-            qs = qs.filter(
-                Q(payment_description__icontains=query) |
-                Q(payer_name__icontains=query) |
-                Q(receiver_name__icontains=query) |
-                Q(creditor_amount__icontains=query) |
-                Q(debtor_amount__icontains=query)
-            )
+            qs = search_documents(qs, query)
 
         return qs.order_by('-created_at')
 
@@ -4805,37 +4504,12 @@ class AdminBanksListReportView(ListView):
             id=self.kwargs['house_id']
         ).first()
 
-        banks = context['banks'].prefetch_related(
-            Prefetch(
-                'fund_set',
-                queryset=Fund.objects.order_by('doc_number')
-            )
-        )
-
-        bank_transactions = {}
-
-        for bank in banks:
-            running_total = Decimal('0')
-            transactions = []
-
-            for f in bank.fund_set.all():
-                running_total += (
-                        (f.debtor_amount or Decimal('0')) -
-                        (f.creditor_amount or Decimal('0'))
-                )
-
-                transactions.append({
-                    'date': f.payment_date,
-                    'description': f.payment_description,
-                    'debit': f.debtor_amount,
-                    'credit': f.creditor_amount,
-                    'balance': running_total
-                })
-
-            bank_transactions[bank.id] = {
-                'transactions': transactions,
-                'balance': running_total
-            }
+        # مانده هر حساب از نقاط کنترل ماهانه، بدون پیمایش تاریخچه سندها
+        balances = bank_balances(context['banks'])
+        bank_transactions = {
+            bank_id: {'balance': balance}
+            for bank_id, balance in balances.items()
+        }
 
         context['bank_transactions'] = bank_transactions
         return context
@@ -4843,17 +4517,10 @@ class AdminBanksListReportView(ListView):
 
 @login_required
 def admin_bank_detail_view(request, bank_id):
-    bank = get_object_or_404(
-        Bank.objects.prefetch_related(
-            Prefetch(
-                'fund_set',
-                queryset=Fund.objects.order_by('doc_number')
-            )
-        ),
-        id=bank_id
-    )
+    bank = get_object_or_404(Bank, id=bank_id)
 
-    funds = bank.fund_set.all()
+    # همه سندهای این حساب بانکی (مثل bank.fund_set) به ترتیب ثبت
+    funds = statement_funds(bank)
 
     # -------- paginate --------
     page_number = request.GET.get('page', 1)
@@ -4861,12 +4528,12 @@ def admin_bank_detail_view(request, bank_id):
     page_obj = paginator.get_page(page_number)
     # --------------------------
 
-    running_total = Decimal('0')
+    # مانده ابتدای صفحه از نقطه کنترل ماه اولین سند صفحه
+    page_funds = list(page_obj)
+    running_total = statement_opening_balance(page_funds[0]) if page_funds else Decimal('0')
     transactions = []
 
-    # محاسبه running balance فقط برای آیتم‌های همین صفحه
-    # (اگر running کل تاریخچه میخوای پایین‌تر توضیح دادم)
-    for f in page_obj:
+    for f in page_funds:
         running_total += (
                 (f.debtor_amount or Decimal('0')) -
                 (f.creditor_amount or Decimal('0'))
@@ -4885,7 +4552,7 @@ def admin_bank_detail_view(request, bank_id):
         'house': bank.house,
         'transactions': transactions,
         'page_obj': page_obj,
-        'balance': running_total,
+        'balance': bank_ledger_balance(bank.id),
     }
 
     return render(request, 'report/admin_bank_detail.html', context)
@@ -4909,8 +4576,9 @@ class AdminUnitFundReport(ListView):
         query = self.request.GET.get('q', '')
 
         # حالا خانه‌ها را با تعداد واحد فعال
-        qs = MyHouse.objects.annotate(
-            total_units=Count('units', filter=Q(units__is_active=True))
+        ensure_analytics()
+        qs = MyHouse.objects.select_related('user').annotate(
+            total_units=F('analytics__unit_count')
         ).filter(total_units__gt=0)
 
         if query:
@@ -5114,7 +4782,7 @@ class ChargeIssuedDetailView(ListView):
         qs = UnifiedCharge.objects.filter(
             house_id=house_id,
             send_notification=True
-        )
+        ).select_related('unit', 'unit__active_renter').with_penalty()
 
         if query:
             qs = qs.annotate(
@@ -5137,8 +4805,6 @@ class ChargeIssuedDetailView(ListView):
         context['paginate'] = self.request.GET.get('paginate', '20')
         # اضافه کردن اطلاعات خانه
         context['house'] = MyHouse.objects.filter(id=self.kwargs['house_id']).first()
-        for charge in context['unified_charges']:
-            charge.update_penalty()
         return context
 
 
@@ -5157,11 +4823,9 @@ class AdminDebtorReport(ListView):
 
     def get_queryset(self):
         query = self.request.GET.get('q', '')
-        qs = MyHouse.objects.annotate(
-            total_debtors=Count(
-                'units__unified_charges',
-                filter=Q(units__unified_charges__is_paid=False)
-            )
+        ensure_analytics()
+        qs = MyHouse.objects.select_related('user', 'analytics').annotate(
+            total_debtors=F('analytics__debt_charge_count')
         ).filter(total_debtors__gt=0)
 
         if query:
@@ -5180,20 +4844,10 @@ class AdminDebtorReport(ListView):
         houses_data = []
 
         for house in context['houses']:
-            total_debt_house = UnifiedCharge.objects.filter(
-                is_paid=False,
-                unit__myhouse=house
-            ).aggregate(total=Sum('total_charge_month'))['total'] or 0
-
-            debt_units_count = UnifiedCharge.objects.filter(
-                is_paid=False,
-                unit__myhouse=house
-            ).values('unit').distinct().count()
-
             houses_data.append({
                 'house': house,
-                'total_debt_house': total_debt_house,
-                'debt_units_count': debt_units_count
+                'total_debt_house': house.analytics.debt_total,
+                'debt_units_count': house.analytics.debt_unit_count
             })
 
         context['houses_data'] = houses_data
@@ -5258,8 +4912,9 @@ class AdminUnitHistoryReport(ListView):
         query = self.request.GET.get('q', '')
 
         # حالا خانه‌ها را با تعداد واحد فعال
-        qs = MyHouse.objects.annotate(
-            total_units=Count('units', filter=Q(units__is_active=True))
+        ensure_analytics()
+        qs = MyHouse.objects.select_related('user').annotate(
+            total_units=F('analytics__unit_count')
         ).filter(total_units__gt=0)
 
         if query:
@@ -5414,7 +5069,7 @@ class AdminExpenseReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminExpensesDetailView(ListView):
+class AdminExpensesDetailView(KeysetPaginationMixin, ListView):
     model = Expense
     template_name = "report/admin_expense_detail.html"
     context_object_name = "expenses"
@@ -5434,14 +5089,7 @@ class AdminExpensesDetailView(ListView):
         )
 
         if query:
-            qs = qs.filter(
-                Q(category__id__icontains=query) |
-                Q(amount__icontains=query) |
-                Q(description__icontains=query) |
-                Q(doc_no__icontains=query) |
-                Q(details__icontains=query) |
-                Q(receiver_name__icontains=query)
-            )
+            qs = search_documents(qs, query)
 
         return qs.order_by('-created_at')
 
@@ -5493,7 +5141,7 @@ class AdminIncomeReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminIncomesDetailView(ListView):
+class AdminIncomesDetailView(KeysetPaginationMixin, ListView):
     model = Income
     template_name = "report/admin_income_detail.html"
     context_object_name = "incomes"
@@ -5513,15 +5161,7 @@ class AdminIncomesDetailView(ListView):
         )
 
         if query:
-            qs = qs.filter(
-                Q(category__id__icontains=query) |
-                Q(unit__id__icontains=query) |
-                Q(amount__icontains=query) |
-                Q(description__icontains=query) |
-                Q(doc_number__icontains=query) |
-                Q(details__icontains=query) |
-                Q(payer_name__icontains=query)
-            )
+            qs = search_documents(qs, query)
 
         return qs.order_by('-created_at')
 
@@ -5574,7 +5214,7 @@ class AdminReceiveReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminReceiveDetailView(ListView):
+class AdminReceiveDetailView(KeysetPaginationMixin, ListView):
     model = ReceiveMoney
     template_name = "report/receive_report_detail.html"
     context_object_name = "receives"
@@ -5594,15 +5234,7 @@ class AdminReceiveDetailView(ListView):
         )
 
         if query:
-            qs = qs.filter(
-                Q(property_name__icontains=query) |
-                Q(property_unit__icontains=query) |
-                Q(property_location__icontains=query) |
-                Q(property_code__icontains=query) |
-                Q(property_price__icontains=query) |
-                Q(details__icontains=query)
-
-            )
+            qs = search_documents(qs, query)
 
         return qs.order_by('-created_at')
 
@@ -5655,7 +5287,7 @@ class AdminPayReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminPayDetailView(ListView):
+class AdminPayDetailView(KeysetPaginationMixin, ListView):
     model = PayMoney
     template_name = "report/pay_report_detail.html"
     context_object_name = "payments"
@@ -5675,15 +5307,7 @@ class AdminPayDetailView(ListView):
         )
 
         if query:
-            qs = qs.filter(
-                Q(property_name__icontains=query) |
-                Q(property_unit__icontains=query) |
-                Q(property_location__icontains=query) |
-                Q(property_code__icontains=query) |
-                Q(property_price__icontains=query) |
-                Q(details__icontains=query)
-
-            )
+            qs = search_documents(qs, query)
 
         return qs.order_by('-created_at')
 
@@ -5735,10 +5359,12 @@ class AdminPropertyReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminPropertyDetailView(ListView):
+class AdminPropertyDetailView(KeysetPaginationMixin, ListView):
     model = Property
     template_name = "report/admin_property_detail.html"
     context_object_name = "all_property"
+    # created_at در Property می‌تواند خالی باشد
+    keyset_ordering = ('-id',)
 
     def get_paginate_by(self, queryset):
         paginate = self.request.GET.get('paginate')
@@ -5815,7 +5441,7 @@ class AdminMaintenanceReport(ListView):
 
 
 @method_decorator(admin_required, name='dispatch')
-class AdminMaintenanceDetailView(ListView):
+class AdminMaintenanceDetailView(KeysetPaginationMixin, ListView):
     model = Maintenance
     template_name = "report/admin_maintenance_detail.html"
 
@@ -5872,7 +5498,7 @@ class AdminBillanReport(ListView):
     def get_queryset(self):
         query = self.request.GET.get('q', '')
 
-        qs = MyHouse.objects.all()
+        qs = MyHouse.objects.select_related('user')
 
         if query:
             qs = qs.filter(
@@ -5892,7 +5518,7 @@ class AdminBillanReport(ListView):
         return context
 
 
-@method_decorator(admin_required, name='dispatch')
+@admin_required
 def admin_house_balance(request, house_id):
     house = get_object_or_404(MyHouse, id=house_id)
     bank_id = request.GET.get('bank')
@@ -5929,63 +5555,25 @@ def admin_house_balance(request, house_id):
     if end_date:
         doc_expense_filter['date__lte'] = end_date
 
-    # ---------- کوئری‌ها ----------
+    # ---------- جمع‌ها از جدول تجمیعی ماهانه (admin_panel.services.ledger_rollups) ----------
 
-    total_incomes_exclude_unpaid = Income.objects.filter(
-        is_paid=False,
-        house=house,
-        **doc_income_filter
-    ).aggregate(Sum('amount'))[
-        'amount__sum']
+    totals = balance_totals(house.id, start_date, end_date, bank_id)
 
-    total_expenses_exclude_unpaid = Expense.objects.filter(
-        is_paid=False,
-        house=house,
-        **doc_expense_filter
-    ).aggregate(Sum('amount'))[
-        'amount__sum']
-
-    total_incomes = Income.objects.filter(
-        house=house,
-        is_paid=True,
-        **payment_filter,
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    total_expenses = Expense.objects.filter(
-        house=house,
-        is_paid=True,
-        **payment_filter,
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    total_pay_money = PayMoney.objects.filter(
-        house=house,
-        is_paid=True,
-        **payment_filter,
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    total_incomes_exclude_unpaid = totals['income_unpaid', 'in']
+    total_expenses_exclude_unpaid = totals['expense_unpaid', 'out']
 
-    total_receive_money = ReceiveMoney.objects.filter(
-        house=house,
-        is_paid=True,
-        **payment_filter,
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    total_incomes = totals['income', 'in']
+    total_expenses = sum_categories(totals, *PAID_EXPENSE_CATEGORIES)
+    total_pay_money = totals['pay_money', 'out']
+    total_receive_money = totals['receive_money', 'in']
 
     total_assets = total_incomes + total_receive_money
     total_debts = total_pay_money + total_expenses
     total_amount_assets_debts = total_assets - total_debts
 
-    funds = Fund.objects.filter(
-        house=house,
-        **payment_filter,
-
-    )
-
-    totals = funds.aggregate(
-        total_income=Sum('debtor_amount'),
-        total_expense=Sum('creditor_amount'),
-    )
-
-    balance = (totals['total_income'] or 0) - (totals['total_expense'] or 0)
+    balance = totals['fund', 'in'] - totals['fund', 'out']
 
+    # شارژهای پرداخت نشده با جریمه روزانه تغییر می‌کنند و مستقیم خوانده می‌شوند
     total_charge_unpaid = UnifiedCharge.objects.filter(
         house=house,
         is_paid=False
@@ -1,32 +1,35 @@
-from user_app.models import MyHouse
+from django.conf import settings
+
+from home.subdomains import get_house_by_subdomain
 
 
 class SubdomainMiddleware:
 
     def __init__(self, get_response):
         self.get_response = get_response
+        # درخواست‌های فایل‌های استاتیک و مدیا به ساختمان نیازی ندارند
+        self.skip_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL) if prefix
+        )
 
     def __call__(self, request):
 
-        host = request.get_host().split(':')[0]  # بدون پورت
-        parts = host.split('.')
-
         request.subdomain = None
         request.house = None
 
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        host = request.get_host().split(':')[0].lower()  # بدون پورت؛ نام دامنه به بزرگی و کوچکی حروف حساس نیست
+        parts = host.split('.')
+
         if len(parts) >= 2:  # حالا >=2 برای لوکال هم جواب میده
             subdomain = parts[0]
 
             if subdomain != "www":
                 request.subdomain = subdomain
-                try:
-                    house = MyHouse.objects.get(
-                        subdomain=subdomain,
-                        is_active=True
-                    )
-                    request.house = house
-                except MyHouse.DoesNotExist:
-                    request.house = None
+                # ساختمان lazy: فیلدهای پایه از کش، ردیف کامل فقط در صورت نیاز
+                request.house = get_house_by_subdomain(subdomain)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,20 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from home.subdomains import invalidate_subdomain
+from user_app.models import MyHouse
+
+
+@receiver(pre_save, sender=MyHouse)
+def remember_old_subdomain(sender, instance, **kwargs):
+    # اگر زیردامنه عوض شود، کش زیردامنه قبلی هم باید پاک شود
+    instance._old_subdomain = None
+    if instance.pk:
+        instance._old_subdomain = (
+            MyHouse.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=MyHouse)
+def invalidate_house_subdomain(sender, instance, **kwargs):
+    invalidate_subdomain(instance.subdomain, getattr(instance, '_old_subdomain', None))
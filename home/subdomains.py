@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+from user_app.models import MyHouse
+
+# فیلدهای حداقلی ساختمان که بدون مراجعه به دیتابیس در دسترس هستند
+HOUSE_FIELDS = ('id', 'name', 'subdomain', 'user_id', 'is_active')
+
+SUBDOMAIN_CACHE_TIMEOUT = 60 * 60
+# زیردامنه‌های ناشناخته کوتاه‌تر نگه داشته می‌شوند تا ساختمان تازه ثبت‌شده زود دیده شود
+SUBDOMAIN_NEGATIVE_TIMEOUT = 60
+# حافظه محلی هر worker؛ کوتاه است چون ابطال سایر workerها فقط از کش مشترک عبور می‌کند
+LOCAL_CACHE_TIMEOUT = 30
+LOCAL_CACHE_SIZE = 1024
+
+
+class _LocalLRU:
+    """
+    LRU کوچک و thread-safe درون پروسه با انقضای زمانی
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_local_cache = _LocalLRU(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def subdomain_cache_key(subdomain):
+    return f"subdomain_house:{subdomain.lower()}"
+
+
+def resolve_subdomain(subdomain):
+    """
+    زیردامنه → اطلاعات حداقلی ساختمان فعال (dict) یا None.
+    ترتیب جستجو: LRU محلی، کش مشترک، دیتابیس. نبودِ ساختمان هم کش می‌شود ({}).
+    زیردامنه‌ها با حروف کوچک ذخیره می‌شوند؛ کلید کش و جستجو هر دو از همان مقدار کوچک‌شده ساخته می‌شوند.
+    """
+    if not subdomain:
+        return None
+
+    subdomain = subdomain.lower()
+    key = subdomain_cache_key(subdomain)
+
+    data = _local_cache.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            row = (
+                MyHouse.objects
+                .filter(subdomain=subdomain, is_active=True)
+                .values(*HOUSE_FIELDS)
+                .first()
+            )
+            data = row or {}
+            cache.set(key, data, SUBDOMAIN_CACHE_TIMEOUT if row else SUBDOMAIN_NEGATIVE_TIMEOUT)
+        _local_cache.set(key, data)
+
+    return data or None
+
+
+def invalidate_subdomain(*subdomains):
+    keys = [subdomain_cache_key(subdomain) for subdomain in subdomains if subdomain]
+    for key in keys:
+        _local_cache.delete(key)
+    if keys:
+        cache.delete_many(keys)
+
+
+class LazyHouse(SimpleLazyObject):
+    """
+    ساختمانی که فیلدهای حداقلی (id، name، user_id، ...) را از کش پاسخ می‌دهد
+    و فقط وقتی به ردیف کامل نیاز باشد از دیتابیس خوانده می‌شود.
+    """
+
+    def __init__(self, data):
+        self.__dict__['_house_data'] = data
+        super().__init__(lambda: MyHouse.objects.get(pk=data['id']))
+
+    def __getattr__(self, name):
+        data = self.__dict__['_house_data']
+        if self._wrapped is empty:
+            if name == 'pk':
+                return data['id']
+            if name in data:
+                return data[name]
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        if self._wrapped is empty:
+            return self.__dict__['_house_data']['name']
+        return str(self._wrapped)
+
+    def __repr__(self):
+        return f"<LazyHouse: {self}>"
+
+
+def get_house_by_subdomain(subdomain):
+    data = resolve_subdomain(subdomain)
+    return LazyHouse(data) if data else None
@@ -4,89 +4,154 @@ from decimal import Decimal
 import jdatetime
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import F
 from django.contrib.contenttypes.models import ContentType
 
 from user_app.models import Bank
 from admin_panel.models import BankFund
 
 
-class BankTransactionService:
+class BankPosting:
+    """
+    یک ردیف ثبت در حساب بانکی برای BankTransactionService.post
+    transaction_type: 'deposit' (واریز) یا 'withdraw' (برداشت)
+    """
 
-    @staticmethod
-    @transaction.atomic
-    def deposit(*, user, bank: Bank,unit, amount: Decimal, description: str,
-                content_object=None, payment_date=None, payer_name=None,
-                transaction_no=None, gateway="پرداخت الکترونیک", house=None, transfer_group_id=None):
+    def __init__(self, *, bank: Bank, amount: Decimal, description: str, transaction_type='deposit', unit=None,
+                 content_object=None, payment_date=None, payer_name=None, receiver_name=None,
+                 transaction_no=None, gateway="پرداخت الکترونیک", house=None, transfer_group_id=None):
+        if transaction_type not in ('deposit', 'withdraw'):
+            raise ValueError("Unknown transaction type")
         if amount <= 0:
             raise ValueError("Amount must be positive")
 
-        # آپدیت موجودی
-        bank.current_balance += amount
-        bank.save(update_fields=['current_balance'])
+        self.bank = bank
+        self.amount = amount
+        self.description = description
+        self.transaction_type = transaction_type
+        self.unit = unit
+        self.content_object = content_object
+        self.payment_date = payment_date
+        self.payer_name = payer_name
+        self.receiver_name = receiver_name
+        self.transaction_no = transaction_no
+        self.gateway = gateway
+        self.house = house
+        self.transfer_group_id = transfer_group_id
+
+    @property
+    def delta(self):
+        return self.amount if self.transaction_type == 'deposit' else -self.amount
 
-        content_type = ContentType.objects.get_for_model(content_object or bank)
 
-        # ثبت تراکنش
-        return BankFund.objects.create(
-            user=user,
+class BankTransactionService:
+
+    @staticmethod
+    @transaction.atomic
+    def post(*, user, postings):
+        """
+        ثبت دسته‌ای واریز/برداشت در یک تراکنش:
+        حساب‌ها به ترتیب id قفل می‌شوند، مانده هر حساب با یک UPDATE و عبارت F تغییر می‌کند
+        و همه ردیف‌های BankFund با یک bulk_create ساخته می‌شوند.
+        ردیف‌های BankFund (با balance_after محاسبه‌شده) به ترتیب postings برگردانده می‌شوند.
+        """
+        postings = list(postings)
+        if not postings:
+            return []
+
+        bank_ids = sorted({posting.bank.pk for posting in postings})
+        locked = {
+            bank.pk: bank
+            for bank in Bank.objects.select_for_update().filter(pk__in=bank_ids).order_by('pk')
+        }
+
+        balances = {bank_id: locked[bank_id].current_balance for bank_id in bank_ids}
+        content_types = {}
+        funds = []
+
+        for posting in postings:
+            bank = locked[posting.bank.pk]
+
+            if posting.transaction_type == 'withdraw' and balances[bank.pk] < posting.amount:
+                raise ValueError("Insufficient bank balance")
+            balances[bank.pk] += posting.delta
+
+            target = posting.content_object or bank
+            model = type(target)
+            if model not in content_types:
+                content_types[model] = ContentType.objects.get_for_model(model)
+
+            funds.append(BankFund(
+                user=user,
+                bank=bank,
+                unit=posting.unit,
+                payer_name=posting.payer_name,
+                receiver_name=posting.receiver_name,
+                house=posting.house or bank.house,
+                amount=posting.amount,
+                payment_gateway=posting.gateway,
+                transaction_no=posting.transaction_no,
+                payment_date=posting.payment_date,
+                payment_description=posting.description,
+                transaction_type=posting.transaction_type,
+                content_type=content_types[model],
+                object_id=target.pk,
+                balance_after=balances[bank.pk],
+                is_paid=True,
+                transfer_group_id=posting.transfer_group_id,
+            ))
+
+        # آپدیت موجودی با عبارت دیتابیسی؛ هیچ مقدار کهنه‌ای از حافظه نوشته نمی‌شود
+        for bank_id in bank_ids:
+            delta = balances[bank_id] - locked[bank_id].current_balance
+            if delta:
+                Bank.objects.filter(pk=bank_id).update(current_balance=F('current_balance') + delta)
+
+        # نمونه‌هایی که فراخواننده در اختیار دارد هم مانده جدید را ببینند
+        for posting in postings:
+            posting.bank.current_balance = balances[posting.bank.pk]
+
+        return BankFund.objects.bulk_create(funds)
+
+    @staticmethod
+    def deposit(*, user, bank: Bank, unit, amount: Decimal, description: str,
+                content_object=None, payment_date=None, payer_name=None,
+                transaction_no=None, gateway="پرداخت الکترونیک", house=None, transfer_group_id=None):
+        return BankTransactionService.post(user=user, postings=[BankPosting(
             bank=bank,
+            amount=amount,
+            description=description,
+            transaction_type='deposit',
             unit=unit,
+            content_object=content_object,
+            payment_date=payment_date,
             payer_name=payer_name,
-            house=house or bank.house,
-            amount=amount,
-            payment_gateway=gateway,
             transaction_no=transaction_no,
-            payment_date=payment_date,
-            payment_description=description,
-            transaction_type='deposit',
-            content_type=content_type,
-            object_id=(content_object.pk if content_object else bank.pk),
-            balance_after=bank.current_balance,
-            is_paid=True,
+            gateway=gateway,
+            house=house,
             transfer_group_id=transfer_group_id,
-        )
-
+        )])[0]
 
     @staticmethod
-    @transaction.atomic
     def withdraw(*, user, bank: Bank, unit, amount: Decimal, description: str,
                  content_object=None, payment_date=None, transaction_no=None, receiver_name=None,
                  gateway="پرداخت الکترونیک", house=None, transfer_group_id=None):
-
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-
-        if bank.current_balance < amount:
-            raise ValueError("Insufficient bank balance")
-
-        # آپدیت موجودی
-        bank.current_balance -= amount
-        bank.save(update_fields=['current_balance'])
-
-        content_type = ContentType.objects.get_for_model(content_object or bank)
-
-        # ثبت تراکنش
-        return BankFund.objects.create(
-            user=user,
+        return BankTransactionService.post(user=user, postings=[BankPosting(
             bank=bank,
-            unit=unit,
-            house=house or bank.house,
             amount=amount,
-            payment_gateway=gateway,
-            transaction_no=transaction_no,
-            payment_date=payment_date,
-            payment_description=description,
+            description=description,
             transaction_type='withdraw',
-            content_type=content_type,
-            object_id=(content_object.pk if content_object else bank.pk),
-            balance_after=bank.current_balance,
+            unit=unit,
+            content_object=content_object,
+            payment_date=payment_date,
             receiver_name=receiver_name,
+            transaction_no=transaction_no,
+            gateway=gateway,
+            house=house,
             transfer_group_id=transfer_group_id,
-            is_paid=True
-        )
+        )])[0]
 
     @staticmethod
-    @transaction.atomic
     def transfer(*, user, from_bank: Bank, to_bank: Bank, unit, amount: Decimal,
                  description: str, payment_date=None, transaction_no=None, content_object=None, transfer_group_id=None):
 
@@ -96,39 +161,39 @@ class BankTransactionService:
         if from_bank.id == to_bank.id:
             raise ValueError("Banks cannot be the same")
 
-        from_bank = Bank.objects.select_for_update().get(pk=from_bank.pk)
-        to_bank = Bank.objects.select_for_update().get(pk=to_bank.pk)
-
-        if from_bank.current_balance < amount:
-            raise ValueError("Insufficient balance in source bank")
-
         group_id = uuid.uuid4()
 
-        BankTransactionService.withdraw(
-            user=user,
-            bank=from_bank,
-            unit=unit,
-            amount=amount,
-            transaction_no=transaction_no,
-            description=f"انتقال به {to_bank.bank_name} - {description}",
-            payment_date=payment_date,
-            content_object=content_object,
-            transfer_group_id=group_id,
-            # object_id=content_object.pk,
-        )
-
-        BankTransactionService.deposit(
-            user=user,
-            bank=to_bank,
-            unit=unit,
-            amount=amount,
-            transaction_no=transaction_no,
-            description=f"دریافت از {from_bank.bank_name} - {description}",
-            payment_date=payment_date,
-            content_object=content_object,
-            transfer_group_id=group_id,
-            # object_id=content_object.pk,
-        )
+        try:
+            BankTransactionService.post(user=user, postings=[
+                BankPosting(
+                    bank=from_bank,
+                    amount=amount,
+                    description=f"انتقال به {to_bank.bank_name} - {description}",
+                    transaction_type='withdraw',
+                    unit=unit,
+                    content_object=content_object,
+                    payment_date=payment_date,
+                    transaction_no=transaction_no,
+                    house=from_bank.house,
+                    transfer_group_id=group_id,
+                ),
+                BankPosting(
+                    bank=to_bank,
+                    amount=amount,
+                    description=f"دریافت از {from_bank.bank_name} - {description}",
+                    transaction_type='deposit',
+                    unit=unit,
+                    content_object=content_object,
+                    payment_date=payment_date,
+                    transaction_no=transaction_no,
+                    house=to_bank.house,
+                    transfer_group_id=group_id,
+                ),
+            ])
+        except ValueError as e:
+            if str(e) == "Insufficient bank balance":
+                raise ValueError("Insufficient balance in source bank")
+            raise
 
         return True
 
@@ -0,0 +1,170 @@
+import uuid
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from admin_panel.models import UnifiedCharge, FixCharge, AreaCharge, PersonCharge, FixAreaCharge, FixPersonCharge, \
+    ChargeByPersonArea, ChargeByFixPersonArea, ChargeFixVariable
+from admin_panel.services.calculators import CALCULATORS, unit_columns
+from admin_panel.services.house_analytics import mark_stale
+from user_app.models import Unit
+
+# مدل‌های شارژی که صفحه اطلاع‌رسانی مشترک دارند، بر اساس charge_type
+ISSUABLE_CHARGE_MODELS = {
+    model.charge_type: model
+    for model in (
+        FixCharge, AreaCharge, PersonCharge, FixAreaCharge, FixPersonCharge,
+        ChargeByPersonArea, ChargeByFixPersonArea, ChargeFixVariable,
+    )
+}
+
+# بیشتر از این تعداد واحد جدید، صدور به Celery سپرده می‌شود و درخواست منتظر نمی‌ماند
+ISSUANCE_ASYNC_THRESHOLD = 200
+ISSUANCE_BATCH_SIZE = 500
+# اگر worker از کار بیفتد، وضعیت صدور بعد از این مدت پاک می‌شود تا بتوان دوباره صادر کرد
+ISSUANCE_STATE_TIMEOUT = 60 * 30
+
+
+def issuance_state_key(content_type_id, charge_id):
+    return f"charge_issuance:{content_type_id}:{charge_id}"
+
+
+def get_issuance_state(content_type_id, charge_id):
+    """
+    وضعیت صدور در حال اجرا: {'task_id', 'state', 'done', 'total'} یا None اگر کاری در جریان نیست
+    """
+    return cache.get(issuance_state_key(content_type_id, charge_id))
+
+
+class ChargeIssuanceService:
+    """
+    ساخت ردیف‌های UnifiedCharge یک شارژ برای واحدهایی که هنوز ردیف ندارند:
+    مبالغ با calculate_batch یکجا محاسبه و با bulk_create درج می‌شوند.
+    """
+
+    def __init__(self, *, charge, user):
+        self.charge = charge
+        self.user = user
+        self.content_type = ContentType.objects.get_for_model(type(charge))
+
+    @property
+    def state_key(self):
+        return issuance_state_key(self.content_type.id, self.charge.id)
+
+    def units(self):
+        return Unit.objects.filter(
+            is_active=True
+        ).filter(
+            Q(user=self.user) | Q(user__manager=self.user)
+        ).distinct()
+
+    def missing_units(self):
+        existing_unit_ids = UnifiedCharge.objects.filter(
+            content_type=self.content_type,
+            object_id=self.charge.id,
+            unit__isnull=False
+        ).values('unit_id')
+        return self.units().exclude(id__in=existing_unit_ids)
+
+    def start(self):
+        """
+        نقطه ورود view: ساختمان‌های کوچک همین‌جا صادر می‌شوند و برای ساختمان‌های بزرگ
+        یک تسک Celery (فقط یک بار برای هر شارژ) ثبت می‌شود؛ اگر صف در دسترس نباشد همین‌جا صادر می‌شود.
+        وضعیت صدور در جریان را برمی‌گرداند.
+        """
+        state = cache.get(self.state_key)
+        # صدور ناموفق قبلی جلوی تلاش دوباره را نمی‌گیرد
+        if state and state['state'] == 'failed':
+            cache.delete(self.state_key)
+        elif state:
+            return state
+
+        missing = self.missing_units().count()
+        if not missing:
+            return None
+
+        if missing < ISSUANCE_ASYNC_THRESHOLD:
+            self.issue()
+            return None
+
+        state = {'task_id': str(uuid.uuid4()), 'state': 'pending', 'done': 0, 'total': missing}
+        # cache.add اتمیک است؛ درخواست‌های همزمان فقط یک تسک ثبت می‌کنند
+        if not cache.add(self.state_key, state, ISSUANCE_STATE_TIMEOUT):
+            return cache.get(self.state_key)
+
+        from middleAdmin_panel.tasks import issue_charge_units
+        try:
+            issue_charge_units.apply_async(
+                args=(self.content_type.id, self.charge.id, self.user.id),
+                task_id=state['task_id'],
+            )
+        except Exception:
+            # صف در دسترس نیست؛ همین‌جا صادر می‌شود
+            cache.delete(self.state_key)
+            self.issue()
+            return None
+        return cache.get(self.state_key)
+
+    def issue(self, progress=None):
+        """
+        درج ردیف‌های جا افتاده؛ قفل روی ردیف شارژ اجرای همزمان را پشت سر هم می‌اندازد
+        و واحدهای بدون ردیف داخل همان قفل دوباره خوانده می‌شوند، پس تکرار آن بی‌خطر است.
+        تعداد ردیف‌های ساخته‌شده را برمی‌گرداند.
+        """
+        calculator = CALCULATORS.get(self.charge.charge_type)
+        if not calculator:
+            raise ValueError(f"Unsupported charge type: {self.charge.charge_type}")
+
+        charge = self.charge
+        with transaction.atomic():
+            type(charge).objects.select_for_update().filter(pk=charge.pk).first()
+
+            missing = self.missing_units().order_by('pk')
+            house_ids = dict(missing.values_list('id', 'myhouse_id'))
+            if not house_ids:
+                return 0
+
+            batch = calculator.calculate_batch(unit_columns(Unit.objects.filter(pk__in=house_ids)), charge)
+            total = len(batch.unit_ids)
+            created = 0
+
+            for start in range(0, total, ISSUANCE_BATCH_SIZE):
+                end = start + ISSUANCE_BATCH_SIZE
+                UnifiedCharge.objects.bulk_create([
+                    UnifiedCharge(
+                        user=self.user,
+                        unit_id=unit_id,
+                        house_id=house_ids[unit_id],
+                        bank=None,
+                        amount=base,
+                        charge_type=charge.charge_type,
+                        base_charge=amount_total,
+                        main_charge=charge,
+                        penalty_percent=charge.payment_penalty_amount,
+                        civil=civil,
+                        other_cost_amount=other,
+                        penalty_amount=0,
+                        total_charge_month=amount_total,
+                        details=charge.details or '',
+                        title=charge.name,
+                        send_notification=False,
+                        send_notification_date=None,
+                        payment_deadline_date=charge.payment_deadline,
+                        content_type=self.content_type,
+                        object_id=charge.id,
+                    )
+                    for unit_id, base, civil, other, amount_total in zip(
+                        batch.unit_ids[start:end], batch.base[start:end], batch.civil[start:end],
+                        batch.other[start:end], batch.total[start:end]
+                    )
+                ])
+                created = min(end, total)
+                if progress:
+                    progress(created, total)
+
+            # bulk_create سیگنال post_save ندارد
+            mark_stale(*house_ids.values())
+
+        return created
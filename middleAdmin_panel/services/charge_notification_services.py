@@ -0,0 +1,62 @@
+from django.db.models import Prefetch, prefetch_related_objects
+
+from admin_panel.models import UnifiedCharge
+from user_app.models import Renter
+
+
+def build_notification_rows(page_units, content_type, charge):
+    """
+    ردیف‌های صفحه اطلاع‌رسانی شارژ را با تعداد ثابتی کوئری می‌سازد:
+    شارژهای این صفحه، مستاجرین فعال و بدهی‌های معوقه همه واحدها هر کدام با یک کوئری.
+    object_list صفحه با dictهای آماده برای قالب جایگزین می‌شود.
+    """
+    units = list(page_units.object_list)
+
+    prefetch_related_objects(
+        units,
+        Prefetch(
+            'renters',
+            queryset=Renter.objects.filter(renter_is_active=True).order_by('pk'),
+            to_attr='active_renters'
+        )
+    )
+
+    uc_map = {
+        uc.unit_id: uc
+        for uc in UnifiedCharge.objects.filter(
+            content_type=content_type,
+            object_id=charge.id,
+            unit__in=units
+        ).select_related('unit', 'unit__user')
+    }
+
+    # بدهی معوقه هر واحد نسبت به تاریخ ایجاد شارژ همان واحد
+    previous_debts = UnifiedCharge.objects.previous_debt_by_type(
+        uc_map.keys(),
+        {unit_id: uc.created_at for unit_id, uc in uc_map.items()}
+    )
+
+    rows = []
+    for unit in units:
+        uc = uc_map.get(unit.id)
+        renter = unit.active_renters[0] if unit.active_renters else None
+
+        current_charge = uc.total_charge_month if uc else 0
+
+        # جمع عددی بدهی‌های معوقه
+        previous_debt_total = sum(previous_debts.get(unit.id, {}).values())
+
+        rows.append({
+            'unit': unit,
+            'renter': renter,
+            'is_paid': uc.is_paid if uc else False,
+            'is_notified': uc.send_notification if uc else False,
+            'send_sms': uc.send_sms if uc else False,
+            'sms_date': uc.send_sms_date if uc else None,
+            'current_charge': current_charge,
+            'previous_debt': previous_debt_total,  # عددی
+            'total_payable': current_charge + previous_debt_total,
+        })
+
+    page_units.object_list = rows
+    return page_units
@@ -0,0 +1,235 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+
+from admin_panel.models import Announcement, Expense, Fund, IncomeCategory, UnifiedCharge
+from admin_panel.services.occupancy import occupancy_stats
+from notifications.models import SupportUser
+from user_app.models import MyHouse, Unit, User
+
+# ورودی کش عمر طولانی دارد؛ تازگی آن با نسخه‌ها سنجیده می‌شود نه با انقضا
+DASHBOARD_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+# snapshot قدیمی‌تر از این حتی بدون رویداد هم در پس‌زمینه دوباره ساخته می‌شود
+# (برای تغییرهایی که سیگنال ندارند، مثل update گروهی روی مدل‌های دیگر)
+DASHBOARD_SNAPSHOT_MAX_AGE = 60 * 5
+# قفل ساخت مجدد؛ در این مدت فقط یک تسک برای هر مدیر ثبت می‌شود
+DASHBOARD_REBUILD_LOCK_TIMEOUT = 60
+
+TICKET_FIELDS = ('id', 'subject', 'ticket_no', 'created_at', 'updated_at',
+                 'is_call', 'is_closed', 'is_waiting', 'is_answer', 'is_sent')
+
+
+def dashboard_snapshot_key(user_id):
+    return f"middle_dashboard:{user_id}"
+
+
+def dashboard_rebuild_key(user_id):
+    return f"middle_dashboard:{user_id}:rebuilding"
+
+
+def house_version_key(house_id):
+    return f"middle_dashboard_version:house:{house_id}"
+
+
+def user_version_key(user_id):
+    return f"middle_dashboard_version:user:{user_id}"
+
+
+# ------------------------------------------------------------------
+# نسخه‌ها
+# ------------------------------------------------------------------
+def touch_dashboards(house_ids=(), user_ids=()):
+    """
+    نسخه داشبورد ساختمان‌ها (و مدیرانی که رویدادشان به ساختمان خاصی وابسته نیست) عوض می‌شود؛
+    snapshot های ساخته‌شده با نسخه قبلی در درخواست بعدی کهنه حساب می‌شوند
+    """
+    keys = [house_version_key(house_id) for house_id in set(house_ids) if house_id]
+    keys += [user_version_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        token = uuid.uuid4().hex
+        cache.set_many({key: token for key in keys}, None)
+
+
+def _versions(scopes):
+    tokens = cache.get_many(scopes)
+    return [tokens.get(scope) for scope in scopes]
+
+
+def _is_stale(record):
+    if time.time() - record['built_at'] > DASHBOARD_SNAPSHOT_MAX_AGE:
+        return True
+    return _versions(record['scopes']) != record['versions']
+
+
+# ------------------------------------------------------------------
+# خواندن و ساخت
+# ------------------------------------------------------------------
+def get_dashboard_snapshot(user):
+    """
+    مقادیر داشبورد مدیر ساختمان؛ اگر بعد از ساخت snapshot رویدادی رسیده باشد همان snapshot
+    قبلی برگردانده و نسخه تازه در پس‌زمینه ساخته می‌شود (stale-while-revalidate).
+    فقط بار اول (یا پس از حذف کش) ساخت در همین درخواست انجام می‌شود.
+    """
+    record = cache.get(dashboard_snapshot_key(user.pk))
+    if record is None:
+        return rebuild_dashboard_snapshot(user)['data']
+    if _is_stale(record):
+        schedule_dashboard_rebuild(user.pk)
+    return record['data']
+
+
+def schedule_dashboard_rebuild(user_id):
+    # cache.add اتمیک است؛ درخواست‌های همزمان فقط یک تسک ثبت می‌کنند
+    if not cache.add(dashboard_rebuild_key(user_id), True, DASHBOARD_REBUILD_LOCK_TIMEOUT):
+        return
+
+    from middleAdmin_panel.tasks import rebuild_middle_dashboard
+    try:
+        rebuild_middle_dashboard.apply_async(args=(user_id,))
+    except Exception:
+        # صف در دسترس نیست؛ همین‌جا ساخته می‌شود
+        rebuild_dashboard_snapshot(User.objects.get(pk=user_id))
+
+
+def rebuild_dashboard_snapshot(user):
+    house_ids = list(MyHouse.objects.filter(user=user).order_by('pk').values_list('pk', flat=True))
+    scopes = [user_version_key(user.pk), *(house_version_key(house_id) for house_id in house_ids)]
+    # نسخه‌ها قبل از محاسبه خوانده می‌شوند؛ رویدادی که حین ساخت برسد snapshot را دوباره کهنه می‌کند
+    versions = _versions(scopes)
+
+    record = {
+        'scopes': scopes,
+        'versions': versions,
+        'built_at': time.time(),
+        'data': build_dashboard_snapshot(user),
+    }
+    cache.set(dashboard_snapshot_key(user.pk), record, DASHBOARD_SNAPSHOT_TIMEOUT)
+    cache.delete(dashboard_rebuild_key(user.pk))
+    return record
+
+
+def build_dashboard_snapshot(user):
+    """
+    همه اعداد و فهرست‌های داشبورد به‌صورت مقادیر ساده (dict و list)؛ هیچ QuerySet یا
+    نمونه مدلی در کش نمی‌رود
+    """
+    managed_users = user.managed_users.values_list('id', flat=True)
+
+    # =========================
+    # Announcements
+    # =========================
+    announcements = list(
+        Announcement.objects
+        .filter(is_active=True, user=user)
+        .order_by('-created_at')
+        .values('id', 'title', 'created_at')[:3]
+    )
+
+    # =========================
+    # Units
+    # =========================
+    units = Unit.objects.filter(myhouse__user=user, is_active=True)
+    # نمودار سکونت جداگانه از middle_occupancy_stats خوانده می‌شود؛ اینجا فقط تعداد و وجود داده
+    occupancy = occupancy_stats(units)
+
+    # =========================
+    # Expense Chart
+    # =========================
+    category_expenses = (
+        Expense.objects
+        .filter(house__user=user, is_active=True, is_paid=True)
+        .values('category__title')
+        .annotate(total_amount=Sum('amount'))
+        .order_by('-total_amount')
+    )
+    expense_chart_data = {
+        "labels": [item['category__title'] for item in category_expenses],
+        "data": [item['total_amount'] or 0 for item in category_expenses],
+    }
+
+    # =========================
+    # Income Chart
+    # =========================
+    income_by_category = (
+        IncomeCategory.objects
+        .filter(user=user, is_active=True)
+        .annotate(
+            total_amount=Sum('incomes__amount', filter=Q(incomes__is_paid=True, incomes__is_active=True)),
+            incomes_count=Count('incomes', filter=Q(incomes__is_paid=True, incomes__is_active=True)),
+        )
+        .filter(incomes_count__gt=0)
+        .values('subject', 'total_amount')
+    )
+    income_chart_data = {
+        "labels": [item['subject'] for item in income_by_category],
+        "data": [item['total_amount'] or 0 for item in income_by_category],
+    }
+
+    # =========================
+    # Tickets
+    # =========================
+    tickets = [
+        {**{name: ticket[name] for name in TICKET_FIELDS},
+         'user': {'full_name': ticket['user__full_name'], 'mobile': ticket['user__mobile']}}
+        for ticket in (
+            SupportUser.objects
+            .filter(Q(user=user) | Q(user__in=managed_users))
+            .order_by('-created_at')
+            .values(*TICKET_FIELDS, 'user__full_name', 'user__mobile')[:5]
+        )
+    ]
+
+    # =========================
+    # Fund Balance
+    # =========================
+    totals = (
+        Fund.objects
+        .filter(Q(user=user) | Q(user__in=managed_users))
+        .aggregate(total_income=Sum('debtor_amount'), total_expense=Sum('creditor_amount'))
+    )
+    balance = (totals['total_income'] or 0) - (totals['total_expense'] or 0)
+
+    # =========================
+    # Charges
+    # =========================
+    charges = UnifiedCharge.objects.filter(house__user=user, send_notification=True, unit__isnull=False)
+
+    unit_count_unpaid_charges = charges.filter(is_paid=False).count()
+
+    # ماه شمسی از ستون jalali_month (ماه پرداخت برای پرداخت‌شده‌ها، ماه اعلام برای بقیه)
+    monthly = (
+        charges
+        .filter(unit__in=units)
+        .filter(Q(is_paid=True, payment_date__isnull=False) | Q(is_paid=False, send_notification_date__isnull=False))
+        .order_by()
+        .values('is_paid', month=F('jalali_month'))
+        .annotate(count=Count('id'))
+    )
+
+    months = list(range(1, 13))
+    paid_counts = dict.fromkeys(months, 0)
+    unpaid_counts = dict.fromkeys(months, 0)
+    for item in monthly:
+        if item['month']:
+            (paid_counts if item['is_paid'] else unpaid_counts)[item['month']] = item['count']
+
+    paid_data = [paid_counts[m] for m in months]
+    unpaid_data = [unpaid_counts[m] for m in months]
+
+    return {
+        'announcements': announcements,
+        'unit_count': occupancy['total'],
+        'fund_amount': balance,
+        'tickets': tickets,
+        'unit_count_unpaid_charges': unit_count_unpaid_charges,
+        'has_unit_chart_data': bool(occupancy['total']),
+        'expense_chart_data': expense_chart_data,
+        'income_chart_data': income_chart_data,
+        'months': months,
+        'paid_data': paid_data,
+        'unpaid_data': unpaid_data,
+        'has_charge_data': any(paid_data) or any(unpaid_data),
+        'has_income_chart_data': any(amount > 0 for amount in income_chart_data["data"]),
+    }
@@ -4,7 +4,9 @@ from django.contrib.auth import update_session_auth_hash
 from django.utils import timezone
 
 from admin_panel.models import Fund
+from admin_panel.services.house_analytics import mark_stale
 from middleAdmin_panel.services.bank_services import BankTransactionService
+from middleAdmin_panel.services.dashboard_snapshot import touch_dashboards
 from user_app.models import User, Renter, MyHouse
 
 
@@ -25,7 +27,6 @@ class UnitUpdateService:
                 self.unit.owner_name = self.form.cleaned_data.get('owner_name')
                 self.unit.owner_mobile = self.form.cleaned_data.get('owner_mobile')
                 self.unit.is_renter = False
-                self.unit.save(update_fields=['owner_name', 'owner_mobile', 'is_renter'])
 
             self._update_owner_user()
             self._update_unit(owner_changed=owner_changed)
@@ -40,27 +41,27 @@ class UnitUpdateService:
 
             self._handle_owner_charge()
             self._handle_renter_charge()
-            self._update_people_count()
+
+            # یک ذخیره برای همه تغییرات واحد؛ نفرات و پارکینگ و سابقه سکونت در Unit.save
+            self.unit.save()
 
     # ------------------------------
 
     def _check_owner_changed(self):
-        old_unit = type(self.unit).objects.get(pk=self.unit.pk)
-        print("OLD NAME:", old_unit.owner_name)
-        print("NEW NAME:", self.form.cleaned_data.get('owner_name'))
-        print("OLD MOBILE:", old_unit.owner_mobile)
-        print("NEW MOBILE:", self.form.cleaned_data.get('owner_mobile'))
-
-        old_name = (old_unit.owner_name or "").strip()
+        # مقادیر ذخیره‌شده از snapshot واحد؛ فرم پیش از این مقادیر جدید را روی نمونه گذاشته است
+        old_name = (self.unit.get_previous_value('owner_name') or "").strip()
         new_name = (self.form.cleaned_data.get('owner_name') or "").strip()
 
-        old_mobile = (old_unit.owner_mobile or "").strip()
+        old_mobile = (self.unit.get_previous_value('owner_mobile') or "").strip()
         new_mobile = (self.form.cleaned_data.get('owner_mobile') or "").strip()
 
         return old_name != new_name or old_mobile != new_mobile
 
     def _deactivate_renters(self):
         self.unit.renters.filter(renter_is_active=True).update(renter_is_active=False)
+        self.unit.active_renter = None
+        mark_stale(self.unit.myhouse_id)
+        touch_dashboards(house_ids=[self.unit.myhouse_id])
 
     def _update_owner_user(self):
         user = self.unit.user
@@ -98,7 +99,6 @@ class UnitUpdateService:
             # فقط وقتی مالک تغییر نکرده، مقدار فرم را اعمال کن
             self.unit.is_renter = self.form.cleaned_data.get('is_renter')
         self.unit.owner_bank = self.form.cleaned_data.get('owner_bank')
-        self.unit.save(update_fields=['is_renter', 'owner_bank'])
 
     def _update_or_create_renter(self):
         renter_mobile = self.form.cleaned_data.get('renter_mobile')
@@ -247,18 +247,3 @@ class UnitUpdateService:
             gateway="شارژ واحد",
             house=self.unit.myhouse
         )
-
-    def _update_people_count(self):
-        renter = self.unit.get_active_renter()
-
-        if renter and renter.renter_people_count not in [None, '']:
-            self.unit.people_count = int(renter.renter_people_count)
-        else:
-            try:
-                self.unit.people_count = int(self.unit.owner_people_count)
-            except (TypeError, ValueError):
-                self.unit.people_count = 0
-
-        self.unit.save(update_fields=['people_count'])
-
-
@@ -0,0 +1,44 @@
+from celery import shared_task
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+
+from user_app.models import User
+from .services.charge_issuance_services import ChargeIssuanceService, ISSUANCE_STATE_TIMEOUT, issuance_state_key
+from .services.dashboard_snapshot import dashboard_rebuild_key, rebuild_dashboard_snapshot
+
+
+@shared_task(bind=True, name='middleAdmin_panel.tasks.issue_charge_units')
+def issue_charge_units(self, content_type_id, charge_id, user_id):
+    """
+    صدور UnifiedCharge های یک شارژ برای ساختمان‌های بزرگ؛ پیشرفت کار در کش نوشته می‌شود
+    تا صفحه اطلاع‌رسانی آن را نمایش دهد. در صورت خطا وضعیت 'failed' ثبت می‌شود.
+    """
+    key = issuance_state_key(content_type_id, charge_id)
+
+    def report(done, total):
+        cache.set(key, {'task_id': self.request.id, 'state': 'running', 'done': done, 'total': total},
+                  ISSUANCE_STATE_TIMEOUT)
+
+    try:
+        charge = ContentType.objects.get_for_id(content_type_id).get_object_for_this_type(pk=charge_id)
+        user = User.objects.get(pk=user_id)
+        created = ChargeIssuanceService(charge=charge, user=user).issue(progress=report)
+    except Exception:
+        state = cache.get(key) or {}
+        cache.set(key, {'task_id': self.request.id, 'state': 'failed', 'done': state.get('done', 0),
+                        'total': state.get('total', 0)}, ISSUANCE_STATE_TIMEOUT)
+        raise
+    cache.delete(key)
+    return created
+
+
+@shared_task(name='middleAdmin_panel.tasks.rebuild_middle_dashboard')
+def rebuild_middle_dashboard(user_id):
+    """
+    ساخت snapshot تازه داشبورد مدیر ساختمان پس از رویدادهای مالی؛ تا پایان آن snapshot قبلی نمایش داده می‌شود
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        cache.delete(dashboard_rebuild_key(user_id))
+        return
+    rebuild_dashboard_snapshot(user)
@@ -6,6 +6,7 @@ from middleAdmin_panel import views
 
 urlpatterns = [
     path('middle-dashboard', views.middle_admin_dashboard, name='middle_admin_dashboard'),
+    path('middle-dashboard/occupancy/', views.middle_occupancy_stats, name='middle_occupancy_stats'),
     path('login-middleAdmin/', views.middle_admin_login_view, name='login_middle_admin'),
     path('log-out/', views.logout__middle_admin, name='logout_middle_admin'),
     path('switch-to-resident/', views.switch_to_resident, name='switch_to_resident'),
@@ -215,7 +216,7 @@ urlpatterns = [
     path('middle-add-fixed-Charge', views.MiddleFixChargeCreateView.as_view(), name='middle_add_fixed_charge'),
     path('charge/middle/edit/<int:pk>/', views.middle_fix_charge_edit, name='middle_charge_edit'),
     path('charge/middle/delete/<int:pk>/', views.middle_fix_charge_delete, name='middle_fix_charge_delete'),
-    path('fix-charge/<int:pk>/notify/', views.middle_fix_charge_notification_view,
+    path('fix-charge/<int:pk>/notify/', views.middle_charge_notification_view, {'charge_type': 'fix'},
          name='middle_add_fix_charge_notify'),
     path('charge/middle/notify/remove/<int:pk>/', views.middle_remove_send_notification_fix,
          name='middle_remove_send_notification_ajax'),
@@ -224,7 +225,7 @@ urlpatterns = [
     path('middle-add-area-charge', views.MiddleAreaChargeCreateView.as_view(), name='middle_add_area_charge'),
     path('area/middle/charge/edit/<int:pk>/', views.middle_area_charge_edit, name='middle_charge_area_edit'),
     path('area/middle/charge/delete/<int:pk>/', views.middle_area_charge_delete, name='middle_charge-area_delete'),
-    path('charge/middle/area/notify/<int:pk>/', views.middle_area_charge_notification_view,
+    path('charge/middle/area/notify/<int:pk>/', views.middle_charge_notification_view, {'charge_type': 'area'},
          name='middle_add_show_notification_area_charge_form'),
     path('middle-remove-send-notification-area/<int:pk>/', views.middle_remove_send_notification_area,
          name='middle_remove_send_notification_area'),
@@ -234,7 +235,7 @@ urlpatterns = [
     path('person/middle/charge/edit/<int:pk>/', views.middle_person_charge_edit, name='middle_charge_person_edit'),
     path('person/middle/charge/delete/<int:pk>/', views.middle_person_charge_delete,
          name='middle_charge-person_delete'),
-    path('charge/middle/person/notify/<int:pk>/', views.middle_person_charge_notification_view,
+    path('charge/middle/person/notify/<int:pk>/', views.middle_charge_notification_view, {'charge_type': 'person'},
          name='middle_add_show_notification_person_charge_form'),
     path('middle-remove-send-notification-person/<int:pk>/', views.middle_remove_send_notification_person,
          name='middle_remove_send_notification_person'),
@@ -246,7 +247,8 @@ urlpatterns = [
          name='middle_charge_fix_area_edit'),
     path('fix/area/middle/charge/delete/<int:pk>/', views.middle_fix_area_charge_delete,
          name='middle_charge-fix_area_delete'),
-    path('fix/area/middle/charge/notify/<int:pk>/', views.middle_show_fix_area_charge_notification_form,
+    path('fix/area/middle/charge/notify/<int:pk>/', views.middle_charge_notification_view,
+         {'charge_type': 'fix_area'},
          name='middle_add_show_notification_fix_area_charge_form'),
     path('middle-remove-send-notification-fix-area/<int:pk>/', views.middle_remove_send_notification_fix_area,
          name='middle_remove_send_notification_fix_area'),
@@ -258,7 +260,8 @@ urlpatterns = [
          name='middle_charge_fix_person_edit'),
     path('fix/person/middle/charge/delete/<int:pk>/', views.middle_fix_person_charge_delete,
          name='middle_charge_fix_person_delete'),
-    path('charge/middle/fix/person/notify/<int:pk>/', views.middle_show_fix_person_charge_notification_form,
+    path('charge/middle/fix/person/notify/<int:pk>/', views.middle_charge_notification_view,
+         {'charge_type': 'fix_person'},
          name='middle_add_show_notification_fix_person_charge_form'),
     path('middle-remove-send-notification-fix-person/<int:pk>/', views.middle_remove_send_notification_fix_person,
          name='middle_remove_send_notification_fix_person'),
@@ -270,7 +273,8 @@ urlpatterns = [
          name='middle_charge_area_person_edit'),
     path('area/person/middle/charge/delete/<int:pk>/', views.middle_person_area_charge_delete,
          name='middle_charge_area_person_delete'),
-    path('area/person/middle/notify/<int:pk>/', views.middle_show_person_area_charge_notification_form,
+    path('area/person/middle/notify/<int:pk>/', views.middle_charge_notification_view,
+         {'charge_type': 'person_area'},
          name='middle_add_show_notification_person_area_charge_form'),
     path('middle-remove-send-notification-person-area/<int:pk>/', views.middle_remove_send_notification_person_area,
          name='middle_remove_send_notification_person_area'),
@@ -282,7 +286,8 @@ urlpatterns = [
          name='middle_charge_area_person_fix_edit'),
     path('fix/area/person/charge/delete/<int:pk>/', views.middle_person_area_fix_delete,
          name='middle_charge_area_person_fix_delete'),
-    path('charge/middle/fix/person/area/notify/<int:pk>/', views.middle_show_fix_person_area_charge_notification_form,
+    path('charge/middle/fix/person/area/notify/<int:pk>/', views.middle_charge_notification_view,
+         {'charge_type': 'fix_person_area'},
          name='middle_add_show_notification_fix_person_area_charge_form'),
     path('middle-remove-send-notification-fix-person-area/<int:pk>/',
          views.middle_remove_send_notification_fix_person_area,
@@ -295,7 +300,8 @@ urlpatterns = [
          name='middle_charge_variable_fix_edit'),
     path('variable/fix/middle/charge/delete/<int:pk>/', views.middle_variable_fix_charge_delete,
          name='middle_charge_variable_fix_delete'),
-    path('charge/fix/variable/middle/charge/notify/<int:pk>/', views.middle_show_fix_variable_notification_form,
+    path('charge/fix/variable/middle/charge/notify/<int:pk>/', views.middle_charge_notification_view,
+         {'charge_type': 'fix_variable'},
          name='middle_add_show_notification_fix_variable_charge_form'),
     path('middle-remove-send-notification-fix-variable-charge/<int:pk>/',
          views.middle_remove_send_notification_fix_variable,
@@ -318,7 +324,12 @@ urlpatterns = [
         'charge/<int:pk>/toggle-unit/',
         views.toggle_unit_selection,
         name='toggle_unit_selection'
-    )
+    ),
+    path(
+        'charge/<str:charge_type>/<int:pk>/issuance-status/',
+        views.middle_charge_issuance_status,
+        name='middle_charge_issuance_status'
+    ),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,4 +1,3 @@
-import io
 import json
 import logging
 import os
@@ -9,16 +8,12 @@ from decimal import Decimal, InvalidOperation
 from itertools import chain
 from dateutil.relativedelta import relativedelta
 from django.apps import apps
-from django.conf.urls.static import static
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
-from django.db.models.functions import ExtractMonth
 from django.utils import timezone
 import jdatetime
-import openpyxl
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
@@ -27,17 +22,15 @@ from django.db import transaction, IntegrityError, models
 from django.db.models import ProtectedError, Count, Q, Sum, F, Prefetch, Case, When, IntegerField, FilteredRelation
 from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
-from django.template.loader import get_template, render_to_string
+from django.template.loader import get_template
 from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import CreateView, UpdateView, DetailView, ListView
-from openpyxl.styles import PatternFill, Alignment, Font
-from pypdf import PdfWriter
 from sweetify import sweetify
-from weasyprint import CSS, HTML
 
+from absharProject.excel_export import ExcelExport, Column, RowNumber, first_of
 from admin_panel import helper
 from admin_panel.forms import announcementForm, BankForm, UnitForm, ExpenseCategoryForm, ExpenseForm, \
     IncomeCategoryForm, IncomeForm, ReceiveMoneyForm, PayerMoneyForm, PropertyForm, MaintenanceForm, FixChargeForm, \
@@ -54,9 +47,15 @@ from admin_panel.models import Announcement, ExpenseCategory, Expense, Fund, Exp
     UnifiedCharge, SmsCredit, SubscriptionPlan, Subscription, CivilManage, CivilDocument, CivilInstallment, \
     SewageManage, SewageDocument, SewageInstallment, BankFund, Coupon, CouponUsage
 from admin_panel.services.calculators import CALCULATORS
+from admin_panel.services.occupancy import OCCUPANCY_BUCKETS, occupancy_by_house, sum_occupancy
 from middleAdmin_panel.services.bank_services import BankTransactionService
+from middleAdmin_panel.services.charge_issuance_services import ChargeIssuanceService, ISSUABLE_CHARGE_MODELS, \
+    get_issuance_state
+from middleAdmin_panel.services.charge_notification_services import build_notification_rows
+from middleAdmin_panel.services.dashboard_snapshot import get_dashboard_snapshot
 from middleAdmin_panel.services.unit_services import UnitUpdateService
-from notifications.models import Notification, SupportUser
+from reports.services.pdf_jobs import PdfJob, PagedPdfJob
+from notifications.models import Notification
 from notifications.services.sms_service import SmsService
 from polls.templatetags.poll_extras import show_jalali
 
@@ -279,16 +278,6 @@ def switch_to_resident(request):
 # ================================================================
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def middle_admin_dashboard(request):
-    cache_key = f"middle_dashboard_{request.user.id}"
-    cached_context = cache.get(cache_key)
-
-    if cached_context:
-        return render(
-            request,
-            'middleShared/home_template.html',
-            cached_context
-        )
-
     now = timezone.now().date()
 
     # =========================
@@ -320,303 +309,17 @@ def middle_admin_dashboard(request):
     ):
         return redirect('buy_subscription')
 
-    # =========================
-    # Managed Users
-    # =========================
-    managed_users = request.user.managed_users.values_list(
-        'id',
-        flat=True
-    )
-
     # =========================
     # Resident Unit
     # =========================
     resident_unit = get_single_resident_building(request.user)
 
-    # =========================
-    # Announcements
-    # =========================
-    announcements = (
-        Announcement.objects
-        .filter(
-            is_active=True,
-            user=request.user
-        )
-        .only(
-            'id',
-            'title',
-            'created_at'
-        )
-        .order_by('-created_at')[:3]
-    )
-
-    # =========================
-    # Units
-    # =========================
-    units = (
-        Unit.objects
-        .filter(
-            myhouse__user=request.user,
-            is_active=True
-        )
-        .select_related('myhouse')
-        .distinct()
-    )
-
-    unit_count = units.count()
-
-    # =========================
-    # Unit Status Statistics
-    # =========================
-    empty_units_count = units.filter(
-        status_residence='empty'
-    ).count()
-
-    renter_units_count = (
-        units.filter(
-            renters__renter_is_active=True
-        )
-        .distinct()
-        .count()
-    )
-
-    owner_units_count = (
-        units.exclude(
-            status_residence='empty'
-        )
-        .exclude(
-            renters__renter_is_active=True
-        )
-        .distinct()
-        .count()
-    )
-
-    unit_status_stats = {
-        'owner': owner_units_count,
-        'renter': renter_units_count,
-        'empty': empty_units_count,
-    }
-
-    has_unit_chart_data = any(unit_status_stats.values())
-
-    # =========================
-    # Expense Chart
-    # =========================
-    category_expenses = (
-        Expense.objects
-        .filter(
-            house__user=request.user,
-            is_active=True,
-            is_paid=True
-        )
-        .values('category__title')
-        .annotate(
-            total_amount=Sum('amount')
-        )
-        .order_by('-total_amount')
-    )
-
-    expense_chart_data = {
-        "labels": [
-            item['category__title']
-            for item in category_expenses
-        ],
-        "data": [
-            item['total_amount'] or 0
-            for item in category_expenses
-        ]
-    }
-
-    # =========================
-    # Income Chart
-    # =========================
-    income_by_category = (
-        IncomeCategory.objects
-        .filter(
-            user=request.user,
-            is_active=True
-        )
-        .annotate(
-            total_amount=Sum(
-                'incomes__amount',
-                filter=Q(
-                    incomes__is_paid=True,
-                    incomes__is_active=True
-                )
-            ),
-            incomes_count=Count(
-                'incomes',
-                filter=Q(
-                    incomes__is_paid=True,
-                    incomes__is_active=True
-                )
-            )
-        )
-        .filter(
-            incomes_count__gt=0
-        )
-    )
-
-    income_chart_data = {
-        "labels": [
-            cat.subject
-            for cat in income_by_category
-        ],
-        "data": [
-            cat.total_amount or 0
-            for cat in income_by_category
-        ]
-    }
-
-    has_income_chart_data = any(
-        amount > 0
-        for amount in income_chart_data["data"]
-    )
-
-    # =========================
-    # Tickets
-    # =========================
-    tickets = (
-        SupportUser.objects
-        .select_related('user')
-        .filter(
-            Q(user=request.user)
-            | Q(user__in=managed_users)
-        )
-        .order_by('-created_at')[:5]
-    )
-
-    # =========================
-    # Fund Balance
-    # =========================
-    totals = (
-        Fund.objects
-        .filter(
-            Q(user=request.user)
-            | Q(user__in=managed_users)
-        )
-        .aggregate(
-            total_income=Sum('debtor_amount'),
-            total_expense=Sum('creditor_amount')
-        )
-    )
-
-    balance = (
-            (totals['total_income'] or 0)
-            - (totals['total_expense'] or 0)
-    )
-
-    # =========================
-    # Unpaid Charges Count
-    # =========================
-    unit_count_unpaid_charges = (
-        UnifiedCharge.objects
-        .filter(
-            house__user=request.user,
-            send_notification=True,
-            is_paid=False,
-            unit__isnull=False
-        )
-        .count()
-    )
-
-    # =========================
-    # Monthly Paid Charges
-    # =========================
-    paid_charges = (
-        UnifiedCharge.objects
-        .filter(
-            house__user=request.user,
-            send_notification=True,
-            unit__in=units,
-            is_paid=True,
-            payment_date__isnull=False
-        )
-        .annotate(
-            month=ExtractMonth('payment_date')
-        )
-        .values('month')
-        .annotate(
-            count=Count('id')
-        )
-    )
-
-    # =========================
-    # Monthly Unpaid Charges
-    # =========================
-    unpaid_charges = (
-        UnifiedCharge.objects
-        .filter(
-            house__user=request.user,
-            send_notification=True,
-            unit__in=units,
-            is_paid=False,
-            send_notification_date__isnull=False
-        )
-        .annotate(
-            month=ExtractMonth('send_notification_date')
-        )
-        .values('month')
-        .annotate(
-            count=Count('id')
-        )
-    )
-
-    paid_counts = {i: 0 for i in range(1, 13)}
-    unpaid_counts = {i: 0 for i in range(1, 13)}
-
-    for item in paid_charges:
-        if item['month']:
-            paid_counts[item['month']] = item['count']
-
-    for item in unpaid_charges:
-        if item['month']:
-            unpaid_counts[item['month']] = item['count']
-
-    months = list(range(1, 13))
-
-    paid_data = [
-        paid_counts[m]
-        for m in months
-    ]
-
-    unpaid_data = [
-        unpaid_counts[m]
-        for m in months
-    ]
-
-    has_charge_data = any(paid_data) or any(unpaid_data)
-
-    # =========================
-    # Context
-    # =========================
+    # مقادیر ساده از snapshot کش‌شده (middleAdmin_panel.services.dashboard_snapshot)
     context = {
-        'announcements': announcements,
-        'unit_count': unit_count,
-        'fund_amount': balance,
-        'tickets': tickets,
-        'unit_count_unpaid_charges': unit_count_unpaid_charges,
+        **get_dashboard_snapshot(request.user),
         'resident_unit': resident_unit,
-        'ownerRenterStats': unit_status_stats,
-        'has_unit_chart_data': has_unit_chart_data,
-        'expense_chart_data': expense_chart_data,
-        'income_chart_data': income_chart_data,
-        'months': months,
-        'paid_data': paid_data,
-        'unpaid_data': unpaid_data,
-        'has_charge_data': has_charge_data,
-        'has_income_chart_data': has_income_chart_data,
     }
 
-    # =========================
-    # Cache
-    # =========================
-    cache.set(
-        cache_key,
-        context,
-        timeout=300
-    )
-
     return render(
         request,
         'middleShared/home_template.html',
@@ -624,6 +327,26 @@ def middle_admin_dashboard(request):
     )
 
 
+
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def middle_occupancy_stats(request):
+    """
+    آمار سکونت (مالک، مستاجر، خالی) واحدهای ساختمان‌های مدیر به تفکیک ساختمان و جمع کل؛
+    نمودار داشبورد آن را ناهمگام می‌خواند. با ?house= فقط یک ساختمان.
+    """
+    houses = MyHouse.objects.filter(user=request.user).order_by('pk')
+    house_id = request.GET.get('house', '')
+    if house_id.isdigit():
+        houses = houses.filter(pk=house_id)
+
+    names = dict(houses.values_list('pk', 'name'))
+    stats = occupancy_by_house(Unit.objects.filter(myhouse_id__in=names))
+    empty = dict.fromkeys(OCCUPANCY_BUCKETS, 0)
+    return JsonResponse({
+        **sum_occupancy(stats.values()),
+        'houses': [{'id': pk, 'name': name, **stats.get(pk, empty)} for pk, name in names.items()],
+    })
+
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def middle_admin_login_view(request):
     if request.method == 'POST':
@@ -1647,6 +1370,12 @@ def to_jalali(date_obj):
     return jalali_date.strftime('%Y/%m/%d')
 
 
+def bank_account_label(obj):
+    if obj.bank and obj.bank.account_no:
+        return f"{obj.bank.bank_name} - {obj.bank.account_no}"
+    return ""
+
+
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def export_units_excel(request):
     units = Unit.objects.filter(user__manager=request.user).order_by('unit')
@@ -1655,8 +1384,8 @@ def export_units_excel(request):
         'unit': 'unit__icontains',
         'owner_name': 'owner_name__icontains',
         'owner_mobile': 'owner_mobile__icontains',
-        'renter_name': 'renter_name__icontains',
-        'renter_mobile': 'renter_mobile__icontains',
+        'renter_name': 'renters__renter_name__icontains',
+        'renter_mobile': 'renters__renter_mobile__icontains',
         'status_residence': 'status_residence__icontains',
         'area': 'area__icontains',
         'bedrooms_count': 'bedrooms_count__icontains',
@@ -1670,69 +1399,46 @@ def export_units_excel(request):
             filter_expression = {lookup: value}
             units = units.filter(**filter_expression)
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست واحدها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=22)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = [
-        'واحد', 'طبقه', 'متراژ', 'تعداد خواب', 'شماره تلفن',
-        'تعداد پارکینگ', 'شماره پارکینگ', 'موقعیت پارکینک', 'وضعیت سکونت',
-        'نام مالک', 'تلفن مالک', 'کد ملی مالک', 'تاریخ خرید', 'تعداد نفرات',
-        'نام مستاجر', 'تلفن مستاجر', 'کد ملی مستاجر',
-        'تاریخ اجاره', 'تاریخ پایان', 'شماره قرارداد', 'اجاره دهنده', 'شارژ اولیه',
-    ]
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, unit in enumerate(units, start=3):
-        ws.cell(row=row_num, column=1, value=unit.unit)
-        ws.cell(row=row_num, column=2, value=unit.floor_number)
-        ws.cell(row=row_num, column=3, value=unit.area)
-        ws.cell(row=row_num, column=4, value=unit.bedrooms_count)
-        ws.cell(row=row_num, column=5, value=unit.unit_phone)
-        ws.cell(row=row_num, column=6, value=unit.parking_count)
-        ws.cell(row=row_num, column=7, value=unit.parking_number)
-        ws.cell(row=row_num, column=8, value=unit.parking_place)
-        ws.cell(row=row_num, column=9, value=unit.status_residence)
-        ws.cell(row=row_num, column=10, value=unit.owner_name)
-        ws.cell(row=row_num, column=11, value=unit.owner_mobile)
-        ws.cell(row=row_num, column=12, value=unit.owner_national_code)
-        ws.cell(row=row_num, column=13, value=to_jalali(unit.purchase_date))
-        ws.cell(row=row_num, column=14, value=unit.people_count)
-        renter = unit.renters.first()  # or .last(), or use filtering for current renter
-        if renter:
-            ws.cell(row=row_num, column=15, value=renter.renter_name)
-            ws.cell(row=row_num, column=16, value=renter.renter_mobile)
-            ws.cell(row=row_num, column=17, value=renter.renter_national_code)
-            ws.cell(row=row_num, column=18, value=to_jalali(renter.start_date))
-            ws.cell(row=row_num, column=19, value=to_jalali(renter.end_date))
-            ws.cell(row=row_num, column=20, value=renter.contract_number)
-            ws.cell(row=row_num, column=21, value=renter.estate_name)
-            ws.cell(row=row_num, column=22, value=renter.first_charge_renter)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    units = units.distinct()
+
+    # اطلاعات مستاجر از اولین مستاجر فعال هر واحد؛ همه با یک کوئری پیش‌خوانده می‌شوند
+    export = ExcelExport(
+        title="لیست واحدها",
+        sheet_title="units",
+        filename='units.xlsx',
+        prefetch_related=(
+            Prefetch(
+                'renters',
+                queryset=Renter.objects.filter(renter_is_active=True).order_by('pk'),
+                to_attr='active_renters'
+            ),
+        ),
+        columns=[
+            Column('واحد', 'unit'),
+            Column('طبقه', 'floor_number'),
+            Column('متراژ', 'area'),
+            Column('تعداد خواب', 'bedrooms_count'),
+            Column('شماره تلفن', 'unit_phone'),
+            Column('تعداد پارکینگ', 'parking_counts'),
+            Column('شماره پارکینگ', 'parking_number'),
+            Column('موقعیت پارکینک', 'parking_place'),
+            Column('وضعیت سکونت', 'status_residence'),
+            Column('نام مالک', 'owner_name'),
+            Column('تلفن مالک', 'owner_mobile'),
+            Column('کد ملی مالک', 'owner_national_code'),
+            Column('تاریخ خرید', 'purchase_date', to_jalali),
+            Column('تعداد نفرات', 'people_count'),
+            Column('نام مستاجر', first_of('active_renters', 'renter_name')),
+            Column('تلفن مستاجر', first_of('active_renters', 'renter_mobile')),
+            Column('کد ملی مستاجر', first_of('active_renters', 'renter_national_code')),
+            Column('تاریخ اجاره', first_of('active_renters', 'start_date'), to_jalali),
+            Column('تاریخ پایان', first_of('active_renters', 'end_date'), to_jalali),
+            Column('شماره قرارداد', first_of('active_renters', 'contract_number')),
+            Column('اجاره دهنده', first_of('active_renters', 'estate_name')),
+            Column('شارژ اولیه', first_of('active_renters', 'first_charge_renter')),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=units.xlsx'
-    wb.save(response)
-    return response
+    return export.response(units)
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -1759,38 +1465,21 @@ def export_units_pdf(request):
             units = units.filter(**filter_expression)
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-    """)
+        }
+    """
 
     # Render template
     template = get_template("unit_templates/unit_pdf.html")
     context = {
         'units': units,
-        'font_path': font_url,
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-    page_pdf.seek(0)
-
-    # Create response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="filtered_units.pdf"'
-    pdf_merger.write(response)
-
-    return response
+    return PdfJob(request, template=template, context=context, filename='filtered_units.pdf',
+                  stylesheets=[css]).response()
 
 
 # ================================= Expense Views ==============================
@@ -2133,15 +1822,9 @@ def expense_cancel_pay_view(request, expense_id):
                 print(f'bank_fund: {bank_fund}')
 
                 if bank_fund:
-                    bank = bank_fund.bank
-
-                    # اصلاح موجودی بانک
-                    if bank_fund.transaction_type == 'withdraw':
-                        bank.current_balance -= bank_fund.amount
-                    else:
-                        bank.current_balance += bank_fund.amount
-
-                    bank.save(update_fields=['current_balance'])
+                    # اصلاح موجودی بانک (برگشت برداشت = افزایش موجودی) با عبارت دیتابیسی
+                    delta = bank_fund.amount if bank_fund.transaction_type == 'withdraw' else -bank_fund.amount
+                    Bank.objects.filter(pk=bank_fund.bank_id).update(current_balance=F('current_balance') + delta)
 
                     bank_fund.delete()
 
@@ -2314,41 +1997,22 @@ def middle_export_expense_pdf(request):
     print(expenses)
 
     # Font setup
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # Render HTML template
     template = get_template("middle_expense_templates/expense_pdf.html")
     context = {
         'expenses': expenses,
-        'font_path': font_url,
         'house': house,
         'today': timezone.now()
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="expenses.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='expenses.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -2386,50 +2050,25 @@ def middle_export_expense_excel(request):
     except ValueError:
         expenses = Expense.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "expenses"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست هزینه‌ها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=10)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع هزینه', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'پرداخت به', 'شماره حساب',
-               'تاریخ پرداخت', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, expense in enumerate(expenses, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=expense.category.title)
-        ws.cell(row=row_num, column=3, value=expense.description)
-        ws.cell(row=row_num, column=4, value=expense.doc_no)
-        ws.cell(row=row_num, column=5, value=expense.amount)
-        ws.cell(row=row_num, column=6, value=show_jalali(expense.date))
-        ws.cell(row=row_num, column=7, value=expense.receiver_name)
-        ws.cell(row=row_num, column=8, value=expense.bank.bank_name)
-        ws.cell(row=row_num, column=9, value=show_jalali(expense.payment_date))
-        ws.cell(row=row_num, column=10, value=expense.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست هزینه‌ها",
+        sheet_title="expenses",
+        filename='expenses.xlsx',
+        select_related=('category', 'bank'),
+        columns=[
+            RowNumber(),
+            Column('موضوع هزینه', 'category.title'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_no'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'date', show_jalali),
+            Column('پرداخت به', 'receiver_name'),
+            Column('شماره حساب', 'bank.bank_name'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=expenses.xlsx'
-    wb.save(response)
-    return response
+    return export.response(expenses)
 
 
 # =========================== Income Views =========================
@@ -2616,7 +2255,7 @@ class MiddleIncomeView(CreateView):
         context['categories'] = IncomeCategory.objects.filter(user=self.request.user)
         context['banks'] = Bank.objects.filter(user=self.request.user)
         managed_users = User.objects.filter(Q(manager=self.request.user) | Q(pk=self.request.user.pk))
-        context['units'] = Unit.objects.filter(is_active=True, user__in=managed_users)
+        context['units'] = Unit.objects.filter(is_active=True, user__in=managed_users).with_active_renter()
 
         return context
 
@@ -2923,42 +2562,23 @@ def export_income_pdf(request):
         incomes = Income.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("middle_income_templates/income_pdf.html")
     context = {
         'incomes': incomes,
-        'font_path': font_url,
         'house': house,
         'today': timezone.now()
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="incomes.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='incomes.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -2993,51 +2613,26 @@ def export_income_excel(request):
             to_date = jdatetime.datetime.strptime(to_date_str, '%Y/%m/%d').togregorian().date()
             incomes = incomes.filter(doc_date__lte=to_date)
     except ValueError:
-        expenses = Expense.objects.none()
+        incomes = Income.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "incomes"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست درآمدها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع درآمد', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات', 'پرداخت کننده',
-               'تاریخ پرداخت']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, income in enumerate(incomes, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=income.category.subject)
-        ws.cell(row=row_num, column=3, value=income.description)
-        ws.cell(row=row_num, column=4, value=income.doc_number)
-        ws.cell(row=row_num, column=5, value=income.amount)
-        ws.cell(row=row_num, column=6, value=show_jalali(income.doc_date))
-        ws.cell(row=row_num, column=7, value=income.details)
-        ws.cell(row=row_num, column=8, value=income.payer_name)
-        ws.cell(row=row_num, column=9, value=show_jalali(income.payment_date))
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست درآمدها",
+        sheet_title="incomes",
+        filename='incomes.xlsx',
+        select_related=('category',),
+        columns=[
+            RowNumber(),
+            Column('موضوع درآمد', 'category.subject'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'doc_date', show_jalali),
+            Column('توضیحات', 'details'),
+            Column('پرداخت کننده', 'payer_name'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=incomes.xlsx'
-    wb.save(response)
-    return response
+    return export.response(incomes)
 
 
 # ============================ ReceiveMoneyView ==========================
@@ -3538,45 +3133,23 @@ def export_receive_pdf(request):
         receives = ReceiveMoney.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("MiddleReceiveMoney/receive_pdf.html")
     context = {
         'receives': receives,
-        'font_path': font_url,
         'house': house,
         'today': timezone.now()
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    # response['Content-Disposition'] = f'attachment; filename="receives.pdf"'
-    response['Content-Disposition'] = (
-        f'attachment; filename="receives_{int(time.time())}.pdf"'
-    )
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='receives.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -3612,58 +3185,25 @@ def export_receive_excel(request):
     except ValueError:
         receives = ReceiveMoney.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "receives"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اسناد دریافتنی")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=10)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شماره جساب', 'دریافت کننده', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات',
-               'تاریخ پرداخت', 'شماره پیگیری']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, receive in enumerate(receives, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        bank_account = ""
-        if receive.bank and receive.bank.account_no:
-            bank_account = f"{receive.bank.bank_name} - {receive.bank.account_no}"
-        payer_name = (
-            str(receive.unit)
-            if receive.unit
-            else receive.payer_name
-        )
-        ws.cell(row=row_num, column=2, value=bank_account)
-        ws.cell(row=row_num, column=3, value=payer_name)
-        ws.cell(row=row_num, column=4, value=receive.description)
-        ws.cell(row=row_num, column=5, value=receive.doc_number)
-        ws.cell(row=row_num, column=6, value=receive.amount)
-        ws.cell(row=row_num, column=7, value=show_jalali(receive.doc_date))
-        ws.cell(row=row_num, column=8, value=receive.details)
-        ws.cell(row=row_num, column=9, value=show_jalali(receive.payment_date))
-        ws.cell(row=row_num, column=10, value=receive.transaction_reference)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اسناد دریافتنی",
+        sheet_title="receives",
+        filename='receive_doc.xlsx',
+        select_related=('bank', 'unit__user'),
+        columns=[
+            RowNumber(),
+            Column('شماره جساب', bank_account_label),
+            Column('دریافت کننده', lambda receive: str(receive.unit) if receive.unit else receive.payer_name),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'doc_date', show_jalali),
+            Column('توضیحات', 'details'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شماره پیگیری', 'transaction_reference'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=receive_doc.xlsx'
-    wb.save(response)
-    return response
+    return export.response(receives)
 
 
 # ============================ PaymentMoneyView ==========================
@@ -4217,42 +3757,23 @@ def export_pay_pdf(request):
         payments = PayMoney.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("MiddlePayMoney/pay_pdf.html")
     context = {
         'payments': payments,
-        'font_path': font_url,
         'house': house,
         'today': timezone.now()
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="payments.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='payments.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -4289,60 +3810,25 @@ def export_pay_excel(request):
     except ValueError:
         payments = PayMoney.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "payments"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اسناد پرداختنی")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=10)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شماره جساب', 'دریافت کننده', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات',
-               'تاریخ پرداخت', 'شماره پیگیری']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, payment in enumerate(payments, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        bank_account = ""
-        if payment.bank and payment.bank.account_no:
-            bank_account = f"{payment.bank.bank_name} - {payment.bank.account_no}"
-
-        receiver_name = (
-            str(payment.unit)
-            if payment.unit
-            else payment.receiver_name
-        )
-
-        ws.cell(row=row_num, column=2, value=bank_account)
-        ws.cell(row=row_num, column=3, value=receiver_name)
-        ws.cell(row=row_num, column=4, value=payment.description)
-        ws.cell(row=row_num, column=5, value=payment.document_number)
-        ws.cell(row=row_num, column=6, value=payment.amount)
-        ws.cell(row=row_num, column=7, value=show_jalali(payment.document_date))
-        ws.cell(row=row_num, column=8, value=payment.details)
-        ws.cell(row=row_num, column=9, value=show_jalali(payment.payment_date))
-        ws.cell(row=row_num, column=10, value=payment.transaction_reference)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اسناد پرداختنی",
+        sheet_title="payments",
+        filename='payment.xlsx',
+        select_related=('bank', 'unit__user'),
+        columns=[
+            RowNumber(),
+            Column('شماره جساب', bank_account_label),
+            Column('دریافت کننده', lambda payment: str(payment.unit) if payment.unit else payment.receiver_name),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'document_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'document_date', show_jalali),
+            Column('توضیحات', 'details'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شماره پیگیری', 'transaction_reference'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=payment.xlsx'
-    wb.save(response)
-    return response
+    return export.response(payments)
 
 
 # ============================ PropertyView ==========================
@@ -6191,63 +5677,35 @@ def toggle_unit_selection(request, pk):
     })
 
 
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_fix_charge_notification_view(request, pk):
-    charge = get_object_or_404(FixCharge, id=pk, user=request.user)
-
-    house = MyHouse.objects.filter(user=request.user).first()
+# قالب صفحه اطلاع‌رسانی هر نوع شارژ
+NOTIFICATION_TEMPLATES = {
+    'fix': 'middleCharge/notify_fix_charge_template.html',
+    'area': 'middleCharge/notify_area_charge_template.html',
+    'person': 'middleCharge/notify_person_charge_template.html',
+    'fix_area': 'middleCharge/notify_area_fix_charge_template.html',
+    'fix_person': 'middleCharge/notify_person_fix_charge_template.html',
+    'person_area': 'middleCharge/notify_person_area_charge_template.html',
+    'fix_person_area': 'middleCharge/notify_fix_person_area_charge_template.html',
+    'fix_variable': 'middleCharge/notify_fix_variable_charge_template.html',
+}
 
-    units = Unit.objects.filter(
-        Q(user=request.user) |
-        Q(user__manager=request.user),
-        is_active=True,
-        myhouse=house
-    ).distinct().order_by('unit')
 
-    content_type = ContentType.objects.get_for_model(FixCharge)
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def middle_charge_notification_view(request, pk, charge_type):
+    """
+    صفحه اطلاع‌رسانی مشترک همه انواع شارژ (ثابت، متراژی، نفری و ترکیبی)
+    """
+    charge_model = ISSUABLE_CHARGE_MODELS[charge_type]
+    charge = get_object_or_404(charge_model, id=pk, user=request.user)
 
     # -----------------------------
     # ساخت UnifiedCharge فقط برای واحدهای جدید
     # -----------------------------
-    existing_uc_unit_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id,
-        unit__in=units
-    ).values_list('unit_id', flat=True)
-
-    new_units = units.exclude(id__in=existing_uc_unit_ids)
-
-    calculator = CALCULATORS.get(charge.charge_type)
-
-    with transaction.atomic():
-        for unit in new_units:
-            base_amount = calculator.calculate(unit, charge)
-            civil_amount = charge.civil or 0
-            other_amount = charge.other_cost_amount or 0
-            total = base_amount + civil_amount + other_amount
+    issuance_service = ChargeIssuanceService(charge=charge, user=request.user)
+    content_type = issuance_service.content_type
+    issuance = issuance_service.start()
 
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                house=unit.myhouse,
-                bank=None,
-                amount=base_amount,
-                charge_type=charge.charge_type,
-                base_charge=total,
-                main_charge=charge,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil_amount,
-                other_cost_amount=other_amount,
-                penalty_amount=0,
-                total_charge_month=total,
-                details=charge.details or '',
-                title=charge.name,
-                send_notification=False,
-                send_notification_date=None,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
+    units = issuance_service.units().order_by('unit')
 
     # -----------------------------
     # FILTERS
@@ -6274,7 +5732,11 @@ def middle_fix_charge_notification_view(request, pk):
     # -----------------------------
     # PAGINATION
     # -----------------------------
-    per_page = int(request.GET.get('per_page', 30))
+    try:
+        per_page = int(request.GET.get('per_page', 30))
+    except ValueError:
+        per_page = 30
+
     paginator = Paginator(units, per_page)
     page_units = paginator.get_page(request.GET.get('page'))
 
@@ -6283,6 +5745,7 @@ def middle_fix_charge_notification_view(request, pk):
     # -----------------------------
     session_key = f"charge_{pk}_selected_units"
     selected_units = set(request.session.get(session_key, []))
+
     # -----------------------------
     # POST: SEND NOTIFICATION / SMS
     # -----------------------------
@@ -6299,7 +5762,7 @@ def middle_fix_charge_notification_view(request, pk):
             content_type=content_type,
             object_id=charge.id,
             unit_id__in=selected
-        ).select_related("unit")
+        ).select_related("unit", "unit__active_renter")
 
         if not qs.exists():
             messages.info(request, 'اطلاعیه‌ای برای ارسال وجود ندارد')
@@ -6340,45 +5803,45 @@ def middle_fix_charge_notification_view(request, pk):
                 f'اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد'
             )
 
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-            request.session[session_key] = []
-            request.session.modified = True
-            return redirect(request.path)
+        # پاکسازی انتخاب‌ها بعد از ارسال
+        request.session[session_key] = []
+        request.session.modified = True
+        return redirect(request.path)
 
     # -----------------------------
     # BUILD CONTEXT DATA
     # -----------------------------
-    uc_map = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id,
-        unit_id__in=[u.id for u in page_units]
-    ).select_related('unit', 'unit__user', 'bank')
+    build_notification_rows(page_units, content_type, charge)
+
+    return render(request, NOTIFICATION_TEMPLATES[charge_type], {
+        'charge': charge,
+        'page_obj': page_units,
+        'selected_units': selected_units,  # مهم برای checkbox sync
+        'issuance': issuance,
+        'issuance_status_url': reverse('middle_charge_issuance_status', args=[charge_type, charge.id]),
+    })
 
-    uc_dict = {uc.unit_id: uc for uc in uc_map}
 
-    for i, unit in enumerate(page_units.object_list):
-        uc = uc_dict.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def middle_charge_issuance_status(request, charge_type, pk):
+    """
+    وضعیت صدور پس‌زمینه شارژ برای نوار پیشرفت صفحه اطلاع‌رسانی
+    """
+    charge_model = ISSUABLE_CHARGE_MODELS.get(charge_type)
+    if not charge_model:
+        return JsonResponse({'error': 'نوع شارژ نامعتبر است.'}, status=404)
 
-        current_charge = uc.total_charge_month if uc else 0
-        previous_debt = sum(uc.get_previous_debt_by_type().values()) if uc else 0
+    charge = get_object_or_404(charge_model, id=pk, user=request.user)
+    content_type = ContentType.objects.get_for_model(charge_model)
+    state = get_issuance_state(content_type.id, charge.id)
 
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt,
-            'total_payable': current_charge + previous_debt,
-        }
+    if not state:
+        return JsonResponse({'state': 'done'})
 
-    return render(request, 'middleCharge/notify_fix_charge_template.html', {
-        'charge': charge,
-        'page_obj': page_units,
-        'selected_units': selected_units,  # مهم برای checkbox sync
+    return JsonResponse({
+        'state': state['state'],
+        'done': state['done'],
+        'total': state['total'],
     })
 
 
@@ -6722,250 +6185,45 @@ def middle_area_charge_delete(request, pk):
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_area_charge_notification_view(request, pk):
-    charge = get_object_or_404(AreaCharge, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(AreaCharge)
+def middle_remove_send_notification_area(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
 
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
+    charge = get_object_or_404(AreaCharge, id=pk, user=request.user)
+    selected_units = request.POST.getlist('units[]')
 
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
+    if not selected_units:
+        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
 
-    new_units = units.exclude(id__in=existing_ids)
+    try:
+        with transaction.atomic():
+            content_type = ContentType.objects.get_for_model(AreaCharge)
 
-    calculator = CALCULATORS.get(charge.charge_type)
+            # رکوردهایی که باید غیرفعال شوند
+            if selected_units == ['all']:
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
+            else:
+                try:
+                    selected_unit_ids = [int(uid) for uid in selected_units]
+                except ValueError:
+                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
 
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    unit_id__in=selected_unit_ids,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
 
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                house=unit.myhouse,
-                base_charge=total,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
-
-    # ------------------ جستجو ------------------
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
-
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
-
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
-
-    elif resident_type == 'renter':
-
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
-
-    elif resident_type == 'empty':
-
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
-
-    # ------------------ pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
-
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST ------------------
-    if request.method == "POST":
-
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, 'هیچ واحدی انتخاب نشده')
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, 'اطلاعیه‌ای برای ارسال وجود ندارد')
-            return redirect(request.path)
-
-        # ثبت اعلان سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال SMS ----------
-        if send_type == "sms":
-
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f'اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد'
-                )
-            else:
-                messages.error(request, result.message)
-
-        else:
-            messages.success(
-                request,
-                f'اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد'
-            )
-
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-            request.session[session_key] = []
-            request.session.modified = True
-            return redirect(request.path)
-
-    # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
-
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
-
-        total_payable = current_charge + previous_debt_total
-
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
-
-    return render(request, 'middleCharge/notify_area_charge_template.html', {
-        "charge": charge,
-        "page_obj": page_units,
-        "selected_units": selected_units
-
-        # "paginator": paginator,
-    })
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_remove_send_notification_area(request, pk):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
-
-    charge = get_object_or_404(AreaCharge, id=pk, user=request.user)
-    selected_units = request.POST.getlist('units[]')
-
-    if not selected_units:
-        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
-
-    try:
-        with transaction.atomic():
-            content_type = ContentType.objects.get_for_model(AreaCharge)
-
-            # رکوردهایی که باید غیرفعال شوند
-            if selected_units == ['all']:
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-            else:
-                try:
-                    selected_unit_ids = [int(uid) for uid in selected_units]
-                except ValueError:
-                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
-
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    unit_id__in=selected_unit_ids,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-
-            updated_count = qs.update(
-                send_notification=False,
-                send_notification_date=None
+            updated_count = qs.update(
+                send_notification=False,
+                send_notification_date=None
             )
 
             # اگر هیچ رکوردی با send_notification=True باقی نماند → شارژ را غیرفعال کن
@@ -7241,287 +6499,85 @@ def middle_person_charge_delete(request, pk):
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_person_charge_notification_view(request, pk):
-    charge = get_object_or_404(PersonCharge, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(PersonCharge)
+def middle_remove_send_notification_person(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
 
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
+    charge = get_object_or_404(PersonCharge, id=pk, user=request.user)
+    selected_units = request.POST.getlist('units[]')
 
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
+    if not selected_units:
+        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
 
-    new_units = units.exclude(id__in=existing_ids)
+    try:
+        with transaction.atomic():
+            content_type = ContentType.objects.get_for_model(PersonCharge)
 
-    calculator = CALCULATORS.get(charge.charge_type)
+            # رکوردهایی که باید غیرفعال شوند
+            if selected_units == ['all']:
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
+            else:
+                try:
+                    selected_unit_ids = [int(uid) for uid in selected_units]
+                except ValueError:
+                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
 
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    unit_id__in=selected_unit_ids,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
 
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                base_charge=total,
-                house=unit.myhouse,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
+            updated_count = qs.update(
+                send_notification=False,
+                send_notification_date=None
             )
 
-    # ------------------ جستجو ------------------
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
+            # اگر هیچ رکوردی با send_notification=True باقی نماند → شارژ را غیرفعال کن
+            if not UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    send_notification=True
+            ).exists():
+                charge.send_notification = False
+                charge.save()
 
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
+        session_key = f"charge_{pk}_selected_units"
 
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
+        if updated_count:
+            request.session.pop(session_key, None)
+            request.session.modified = True
 
-    elif resident_type == 'renter':
+            return JsonResponse({
+                'success': f'{updated_count} اطلاعیه غیرفعال شد.'
+            })
+        else:
+            return JsonResponse({'info': 'رکوردی برای غیرفعال کردن یافت نشد.'})
 
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
+    except Exception as e:
+        return JsonResponse({'error': f'خطایی هنگام غیرفعال کردن اطلاعیه‌ها رخ داد: {str(e)}'}, status=500)
 
-    elif resident_type == 'empty':
 
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
+# ==================== Fix Area Charge    =============================
+@method_decorator(middle_admin_required, name='dispatch')
+class MiddleFixAreaChargeCreateView(CreateView):
+    model = FixAreaCharge
+    template_name = 'middleCharge/fix_area_charge_template.html'
+    form_class = FixAreaChargeForm
+    success_url = reverse_lazy('middle_add_fix_area_charge')
 
-    # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
+    def form_valid(self, form):
+        charge_name = form.cleaned_data.get('name')
 
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
-
-        else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
-
-        # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
-
-    # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
-
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
-
-        total_payable = current_charge + previous_debt_total
-
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
-
-    return render(request, "middleCharge/notify_person_charge_template.html", {
-        "charge": charge,
-        "page_obj": page_units,
-        "selected_units": selected_units
-        # "paginator": paginator,
-    })
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_remove_send_notification_person(request, pk):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
-
-    charge = get_object_or_404(PersonCharge, id=pk, user=request.user)
-    selected_units = request.POST.getlist('units[]')
-
-    if not selected_units:
-        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
-
-    try:
-        with transaction.atomic():
-            content_type = ContentType.objects.get_for_model(PersonCharge)
-
-            # رکوردهایی که باید غیرفعال شوند
-            if selected_units == ['all']:
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-            else:
-                try:
-                    selected_unit_ids = [int(uid) for uid in selected_units]
-                except ValueError:
-                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
-
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    unit_id__in=selected_unit_ids,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-
-            updated_count = qs.update(
-                send_notification=False,
-                send_notification_date=None
-            )
-
-            # اگر هیچ رکوردی با send_notification=True باقی نماند → شارژ را غیرفعال کن
-            if not UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    send_notification=True
-            ).exists():
-                charge.send_notification = False
-                charge.save()
-
-        session_key = f"charge_{pk}_selected_units"
-
-        if updated_count:
-            request.session.pop(session_key, None)
-            request.session.modified = True
-
-            return JsonResponse({
-                'success': f'{updated_count} اطلاعیه غیرفعال شد.'
-            })
-        else:
-            return JsonResponse({'info': 'رکوردی برای غیرفعال کردن یافت نشد.'})
-
-    except Exception as e:
-        return JsonResponse({'error': f'خطایی هنگام غیرفعال کردن اطلاعیه‌ها رخ داد: {str(e)}'}, status=500)
-
-
-# ==================== Fix Area Charge    =============================
-@method_decorator(middle_admin_required, name='dispatch')
-class MiddleFixAreaChargeCreateView(CreateView):
-    model = FixAreaCharge
-    template_name = 'middleCharge/fix_area_charge_template.html'
-    form_class = FixAreaChargeForm
-    success_url = reverse_lazy('middle_add_fix_area_charge')
-
-    def form_valid(self, form):
-        charge_name = form.cleaned_data.get('name')
-
-        # گرفتن کاربران تحت مدیریت
-        managed_users = self.request.user.managed_users.all()
+        # گرفتن کاربران تحت مدیریت
+        managed_users = self.request.user.managed_users.all()
 
         unit_count = UnifiedCharge.objects.filter(
             user=self.request.user,
@@ -7765,295 +6821,91 @@ def middle_fix_area_charge_delete(request, pk):
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_show_fix_area_charge_notification_form(request, pk):
-    charge = get_object_or_404(FixAreaCharge, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(FixAreaCharge)
+def middle_remove_send_notification_fix_area(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
 
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
+    charge = get_object_or_404(FixAreaCharge, id=pk, user=request.user)
+    selected_units = request.POST.getlist('units[]')
 
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
+    if not selected_units:
+        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
 
-    new_units = units.exclude(id__in=existing_ids)
+    try:
+        with transaction.atomic():
+            content_type = ContentType.objects.get_for_model(FixAreaCharge)
 
-    calculator = CALCULATORS.get(charge.charge_type)
+            # رکوردهایی که باید غیرفعال شوند
+            if selected_units == ['all']:
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
+            else:
+                try:
+                    selected_unit_ids = [int(uid) for uid in selected_units]
+                except ValueError:
+                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
 
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
+                qs = UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    unit_id__in=selected_unit_ids,
+                    is_paid=False,
+                    send_notification=True  # فقط رکوردهای فعال
+                )
 
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                house=unit.myhouse,
-                base_charge=total,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
+            updated_count = qs.update(
+                send_notification=False,
+                send_notification_date=None
             )
 
-    # جستجو
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
+            # اگر هیچ رکوردی با send_notification=True باقی نماند → شارژ را غیرفعال کن
+            if not UnifiedCharge.objects.filter(
+                    content_type=content_type,
+                    object_id=charge.id,
+                    send_notification=True
+            ).exists():
+                charge.send_notification = False
+                charge.save()
 
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
+        session_key = f"charge_{pk}_selected_units"
 
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
+        if updated_count:
+            request.session.pop(session_key, None)
+            request.session.modified = True
 
-    elif resident_type == 'renter':
+            return JsonResponse({
+                'success': f'{updated_count} اطلاعیه غیرفعال شد.'
+            })
+        else:
+            return JsonResponse({'info': 'رکوردی برای غیرفعال کردن یافت نشد.'})
 
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
+    except Exception as e:
+        return JsonResponse({'error': f'خطایی هنگام غیرفعال کردن اطلاعیه‌ها رخ داد: {str(e)}'}, status=500)
 
-    elif resident_type == 'empty':
 
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
+# ======================= Fix Person Charge  ==========================
+@method_decorator(middle_admin_required, name='dispatch')
+class MiddleFixPersonChargeCreateView(CreateView):
+    model = FixPersonCharge
+    template_name = 'middleCharge/fix_person_charge_template.html'
+    form_class = FixPersonChargeForm
+    success_url = reverse_lazy('middle_add_fix_person_charge')
 
-    # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
+    def form_valid(self, form):
+        charge_name = form.cleaned_data.get('name')
 
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
+        # گرفتن کاربران تحت مدیریت
+        managed_users = self.request.user.managed_users.all()
 
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
-
-        else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
-
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
-
-        # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
-
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
-
-        total_payable = current_charge + previous_debt_total
-
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
-
-    context = {
-        'charge': charge,
-        'page_obj': page_units,
-        "selected_units": selected_units
-        # 'paginator': paginator,
-    }
-
-    return render(request, 'middleCharge/notify_area_fix_charge_template.html', context)
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_remove_send_notification_fix_area(request, pk):
-    if request.method != 'POST':
-        return JsonResponse({'error': 'فقط درخواست‌های POST مجاز است.'}, status=400)
-
-    charge = get_object_or_404(FixAreaCharge, id=pk, user=request.user)
-    selected_units = request.POST.getlist('units[]')
-
-    if not selected_units:
-        return JsonResponse({'warning': 'هیچ واحدی انتخاب نشده است.'})
-
-    try:
-        with transaction.atomic():
-            content_type = ContentType.objects.get_for_model(FixAreaCharge)
-
-            # رکوردهایی که باید غیرفعال شوند
-            if selected_units == ['all']:
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-            else:
-                try:
-                    selected_unit_ids = [int(uid) for uid in selected_units]
-                except ValueError:
-                    return JsonResponse({'error': 'شناسه واحد نامعتبر است.'}, status=400)
-
-                qs = UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    unit_id__in=selected_unit_ids,
-                    is_paid=False,
-                    send_notification=True  # فقط رکوردهای فعال
-                )
-
-            updated_count = qs.update(
-                send_notification=False,
-                send_notification_date=None
-            )
-
-            # اگر هیچ رکوردی با send_notification=True باقی نماند → شارژ را غیرفعال کن
-            if not UnifiedCharge.objects.filter(
-                    content_type=content_type,
-                    object_id=charge.id,
-                    send_notification=True
-            ).exists():
-                charge.send_notification = False
-                charge.save()
-
-        session_key = f"charge_{pk}_selected_units"
-
-        if updated_count:
-            request.session.pop(session_key, None)
-            request.session.modified = True
-
-            return JsonResponse({
-                'success': f'{updated_count} اطلاعیه غیرفعال شد.'
-            })
-        else:
-            return JsonResponse({'info': 'رکوردی برای غیرفعال کردن یافت نشد.'})
-
-    except Exception as e:
-        return JsonResponse({'error': f'خطایی هنگام غیرفعال کردن اطلاعیه‌ها رخ داد: {str(e)}'}, status=500)
-
-
-# ======================= Fix Person Charge  ==========================
-@method_decorator(middle_admin_required, name='dispatch')
-class MiddleFixPersonChargeCreateView(CreateView):
-    model = FixPersonCharge
-    template_name = 'middleCharge/fix_person_charge_template.html'
-    form_class = FixPersonChargeForm
-    success_url = reverse_lazy('middle_add_fix_person_charge')
-
-    def form_valid(self, form):
-        charge_name = form.cleaned_data.get('name')
-
-        # گرفتن کاربران تحت مدیریت
-        managed_users = self.request.user.managed_users.all()
-
-        unit_count = UnifiedCharge.objects.filter(
-            user=self.request.user,
-            unit__is_active=True
-        ).values('unit').distinct().count()
-        form.instance.unit_count = unit_count
+        unit_count = UnifiedCharge.objects.filter(
+            user=self.request.user,
+            unit__is_active=True
+        ).values('unit').distinct().count()
+        form.instance.unit_count = unit_count
 
         units = Unit.objects.filter(
             is_active=True
@@ -8288,208 +7140,6 @@ def middle_fix_person_charge_delete(request, pk):
     return redirect(reverse('middle_add_fix_person_charge'))
 
 
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_show_fix_person_charge_notification_form(request, pk):
-    charge = get_object_or_404(FixPersonCharge, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(FixPersonCharge)
-
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
-
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
-
-    new_units = units.exclude(id__in=existing_ids)
-
-    calculator = CALCULATORS.get(charge.charge_type)
-
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
-
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                base_charge=total,
-                house=unit.myhouse,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
-
-    # جستجو
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
-
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
-
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
-
-    elif resident_type == 'renter':
-
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
-
-    elif resident_type == 'empty':
-
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
-
-        # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
-
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
-
-        else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
-
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
-
-        # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
-
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
-
-        total_payable = current_charge + previous_debt_total
-
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
-
-    context = {
-        'charge': charge,
-        'page_obj': page_units,  # حالا فقط واحدهای دارای UnifiedCharge هستند
-        "selected_units": selected_units
-        # 'paginator': paginator,
-    }
-    return render(request, 'middleCharge/notify_person_fix_charge_template.html', context)
-
-
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def middle_remove_send_notification_fix_person(request, pk):
     if request.method != 'POST':
@@ -8733,283 +7383,81 @@ def middle_person_area_charge_edit(request, pk):
                     messages.error(request, 'نوع شارژ پشتیبانی نمی‌شود.')
                     return redirect('middle_add_fix_person_charge')
 
-                unified_charges = []
-
-                for unit in units:
-                    # محاسبه مبلغ پایه برای هر واحد
-                    base_amount = calculator.calculate(unit, charge)
-                    civil_amount = charge.civil or 0
-                    other_amount = charge.other_cost_amount or 0
-                    total_monthly = base_amount + civil_amount + other_amount
-
-                    # آپدیت یا ایجاد UnifiedCharge برای این واحد
-                    UnifiedCharge.objects.update_or_create(
-                        user=request.user,
-                        house=unit.myhouse,
-                        unit=unit,
-                        content_type=ContentType.objects.get_for_model(ChargeByPersonArea),
-                        object_id=charge.id,
-                        defaults={
-                            'bank': None,
-                            'charge_type': charge.charge_type,
-                            'main_charge': charge,
-                            'amount': base_amount,
-                            'base_charge': total_monthly,
-                            'penalty_percent': charge.payment_penalty_amount or 0,
-                            'civil': civil_amount,
-                            'other_cost_amount': other_amount,
-                            'penalty_amount': 0,
-                            'total_charge_month': total_monthly,
-                            'details': charge.details or '',
-                            'title': charge.name,
-                            'send_notification': False,
-                            'send_notification_date': None,
-                            'payment_deadline_date': charge.payment_deadline,
-                        }
-                    )
-
-                messages.success(request, 'شارژ با موفقیت ویرایش شد.')
-                return redirect('middle_add_person_area_charge')
-        else:
-            messages.error(request, 'خطا در ویرایش فرم. لطفا دوباره تلاش کنید.')
-    else:
-        form = FixChargeForm(instance=charge)
-
-    return render(request, 'middleCharge/person_area_charge_template.html', {'form': form, 'charge': charge})
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_person_area_charge_delete(request, pk):
-    charge = get_object_or_404(ChargeByPersonArea, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(ChargeByPersonArea)
-
-    # بررسی اینکه هیچ رکورد UnifiedCharge با is_paid=True وجود نداشته باشد
-    if UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            is_paid=True
-    ).exists():
-        messages.error(request, "امکان حذف شارژ وجود ندارد چون پرداخت شارژ توسط واحد ثبت شده است.")
-        return redirect(reverse('middle_add_person_area_charge'))
-
-    # چک کردن وجود رکوردهایی که send_notification == True هستند
-    if UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            send_notification=True
-    ).exists():
-        messages.error(request, "برای این شارژ اطلاعیه صادر شده است. ابتدا اطلاعیه شارژ را حذف و مجدداً تلاش نمایید!")
-        return redirect(reverse('middle_add_person_area_charge'))
-
-    try:
-        charge.delete()
-        messages.success(request, f'{charge.name} با موفقیت حذف گردید!')
-    except ProtectedError:
-        messages.error(request, "امکان حذف این شارژ به دلیل وابستگی وجود ندارد!")
-
-    return redirect(reverse('middle_add_person_area_charge'))
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_show_person_area_charge_notification_form(request, pk):
-    charge = get_object_or_404(ChargeByPersonArea, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(ChargeByPersonArea)
-
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
-
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
-
-    new_units = units.exclude(id__in=existing_ids)
-
-    calculator = CALCULATORS.get(charge.charge_type)
-
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
-
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                house=unit.myhouse,
-                base_charge=total,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
-
-    # جستجو
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
-
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
-
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
-
-    elif resident_type == 'renter':
-
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
-
-    elif resident_type == 'empty':
-
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
-
-    # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
-
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
+                unified_charges = []
 
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
+                for unit in units:
+                    # محاسبه مبلغ پایه برای هر واحد
+                    base_amount = calculator.calculate(unit, charge)
+                    civil_amount = charge.civil or 0
+                    other_amount = charge.other_cost_amount or 0
+                    total_monthly = base_amount + civil_amount + other_amount
 
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
+                    # آپدیت یا ایجاد UnifiedCharge برای این واحد
+                    UnifiedCharge.objects.update_or_create(
+                        user=request.user,
+                        house=unit.myhouse,
+                        unit=unit,
+                        content_type=ContentType.objects.get_for_model(ChargeByPersonArea),
+                        object_id=charge.id,
+                        defaults={
+                            'bank': None,
+                            'charge_type': charge.charge_type,
+                            'main_charge': charge,
+                            'amount': base_amount,
+                            'base_charge': total_monthly,
+                            'penalty_percent': charge.payment_penalty_amount or 0,
+                            'civil': civil_amount,
+                            'other_cost_amount': other_amount,
+                            'penalty_amount': 0,
+                            'total_charge_month': total_monthly,
+                            'details': charge.details or '',
+                            'title': charge.name,
+                            'send_notification': False,
+                            'send_notification_date': None,
+                            'payment_deadline_date': charge.payment_deadline,
+                        }
+                    )
 
+                messages.success(request, 'شارژ با موفقیت ویرایش شد.')
+                return redirect('middle_add_person_area_charge')
         else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
+            messages.error(request, 'خطا در ویرایش فرم. لطفا دوباره تلاش کنید.')
+    else:
+        form = FixChargeForm(instance=charge)
 
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
+    return render(request, 'middleCharge/person_area_charge_template.html', {'form': form, 'charge': charge})
 
-        # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
 
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def middle_person_area_charge_delete(request, pk):
+    charge = get_object_or_404(ChargeByPersonArea, id=pk, user=request.user)
+    content_type = ContentType.objects.get_for_model(ChargeByPersonArea)
+
+    # بررسی اینکه هیچ رکورد UnifiedCharge با is_paid=True وجود نداشته باشد
+    if UnifiedCharge.objects.filter(
             content_type=content_type,
             object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
+            is_paid=True
+    ).exists():
+        messages.error(request, "امکان حذف شارژ وجود ندارد چون پرداخت شارژ توسط واحد ثبت شده است.")
+        return redirect(reverse('middle_add_person_area_charge'))
 
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
+    # چک کردن وجود رکوردهایی که send_notification == True هستند
+    if UnifiedCharge.objects.filter(
+            content_type=content_type,
+            object_id=charge.id,
+            send_notification=True
+    ).exists():
+        messages.error(request, "برای این شارژ اطلاعیه صادر شده است. ابتدا اطلاعیه شارژ را حذف و مجدداً تلاش نمایید!")
+        return redirect(reverse('middle_add_person_area_charge'))
 
-        total_payable = current_charge + previous_debt_total
+    try:
+        charge.delete()
+        messages.success(request, f'{charge.name} با موفقیت حذف گردید!')
+    except ProtectedError:
+        messages.error(request, "امکان حذف این شارژ به دلیل وابستگی وجود ندارد!")
 
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
-    context = {
-        'charge': charge,
-        'page_obj': page_units,  # حالا فقط واحدهای دارای UnifiedCharge هستند
-        "selected_units": selected_units
-        # 'paginator': paginator,
-    }
-    return render(request, 'middleCharge/notify_person_area_charge_template.html', context)
+    return redirect(reverse('middle_add_person_area_charge'))
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -9272,267 +7720,64 @@ def middle_person_area_fix_charge_edit(request, pk):
                         content_type=ContentType.objects.get_for_model(ChargeByFixPersonArea),
                         object_id=charge.id,
                         defaults={
-                            'bank': None,
-                            'charge_type': charge.charge_type,
-                            'main_charge': charge,
-                            'amount': base_amount,
-                            'base_charge': total_monthly,
-                            'penalty_percent': charge.payment_penalty_amount or 0,
-                            'civil': civil_amount,
-                            'other_cost_amount': other_amount,
-                            'penalty_amount': 0,
-                            'total_charge_month': total_monthly,
-                            'details': charge.details or '',
-                            'title': charge.name,
-                            'send_notification': False,
-                            'send_notification_date': None,
-                            'payment_deadline_date': charge.payment_deadline,
-                        }
-                    )
-
-                messages.success(request, 'شارژ با موفقیت ویرایش شد.')
-                return redirect('middle_add_person_area_fix_charge')
-        else:
-            messages.error(request, 'خطا در ویرایش فرم. لطفا دوباره تلاش کنید.')
-    else:
-        form = FixChargeForm(instance=charge)
-        return render(request, 'middleCharge/person_area_fix_charge_template.html',
-                      {'form': form, 'charge': charge})
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_person_area_fix_delete(request, pk):
-    charge = get_object_or_404(ChargeByFixPersonArea, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(ChargeByFixPersonArea)
-
-    # بررسی اینکه هیچ رکورد UnifiedCharge با is_paid=True وجود نداشته باشد
-    if UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            is_paid=True
-    ).exists():
-        messages.error(request, "امکان حذف شارژ وجود ندارد چون پرداخت شارژ توسط واحد ثبت شده است.")
-        return redirect(reverse('middle_add_person_area_fix_charge'))
-
-    # چک کردن وجود رکوردهایی که send_notification == True هستند
-    if UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            send_notification=True
-    ).exists():
-        messages.error(request, "برای این شارژ اطلاعیه صادر شده است. ابتدا اطلاعیه شارژ را حذف و مجدداً تلاش نمایید!")
-        return redirect(reverse('middle_add_person_area_fix_charge'))
-
-    try:
-        charge.delete()
-        messages.success(request, f'{charge.name} با موفقیت حذف گردید!')
-    except ProtectedError:
-        messages.error(request, "امکان حذف این شارژ به دلیل وابستگی وجود ندارد!")
-
-    return redirect(reverse('middle_add_person_area_fix_charge'))
-
-
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_show_fix_person_area_charge_notification_form(request, pk):
-    charge = get_object_or_404(ChargeByFixPersonArea, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(ChargeByFixPersonArea)
-
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
-
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
-
-    new_units = units.exclude(id__in=existing_ids)
-
-    calculator = CALCULATORS.get(charge.charge_type)
-
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
-
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                house=unit.myhouse,
-                base_charge=total,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
-
-    # جستجو
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
-
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
-
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
-
-    elif resident_type == 'renter':
-
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
-
-    elif resident_type == 'empty':
-
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
-
-    # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
-
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
+                            'bank': None,
+                            'charge_type': charge.charge_type,
+                            'main_charge': charge,
+                            'amount': base_amount,
+                            'base_charge': total_monthly,
+                            'penalty_percent': charge.payment_penalty_amount or 0,
+                            'civil': civil_amount,
+                            'other_cost_amount': other_amount,
+                            'penalty_amount': 0,
+                            'total_charge_month': total_monthly,
+                            'details': charge.details or '',
+                            'title': charge.name,
+                            'send_notification': False,
+                            'send_notification_date': None,
+                            'payment_deadline_date': charge.payment_deadline,
+                        }
+                    )
 
+                messages.success(request, 'شارژ با موفقیت ویرایش شد.')
+                return redirect('middle_add_person_area_fix_charge')
         else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
+            messages.error(request, 'خطا در ویرایش فرم. لطفا دوباره تلاش کنید.')
+    else:
+        form = FixChargeForm(instance=charge)
+        return render(request, 'middleCharge/person_area_fix_charge_template.html',
+                      {'form': form, 'charge': charge})
 
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
 
-        # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def middle_person_area_fix_delete(request, pk):
+    charge = get_object_or_404(ChargeByFixPersonArea, id=pk, user=request.user)
+    content_type = ContentType.objects.get_for_model(ChargeByFixPersonArea)
 
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
+    # بررسی اینکه هیچ رکورد UnifiedCharge با is_paid=True وجود نداشته باشد
+    if UnifiedCharge.objects.filter(
             content_type=content_type,
             object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt_total = sum(uc.get_previous_debt_by_type().values()) if uc else 0
+            is_paid=True
+    ).exists():
+        messages.error(request, "امکان حذف شارژ وجود ندارد چون پرداخت شارژ توسط واحد ثبت شده است.")
+        return redirect(reverse('middle_add_person_area_fix_charge'))
 
-        total_payable = current_charge + previous_debt_total
+    # چک کردن وجود رکوردهایی که send_notification == True هستند
+    if UnifiedCharge.objects.filter(
+            content_type=content_type,
+            object_id=charge.id,
+            send_notification=True
+    ).exists():
+        messages.error(request, "برای این شارژ اطلاعیه صادر شده است. ابتدا اطلاعیه شارژ را حذف و مجدداً تلاش نمایید!")
+        return redirect(reverse('middle_add_person_area_fix_charge'))
 
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt_total,  # عددی
-            'total_payable': total_payable,
-        }
+    try:
+        charge.delete()
+        messages.success(request, f'{charge.name} با موفقیت حذف گردید!')
+    except ProtectedError:
+        messages.error(request, "امکان حذف این شارژ به دلیل وابستگی وجود ندارد!")
 
-    context = {
-        'charge': charge,
-        'page_obj': page_units,  # حالا فقط واحدهای دارای UnifiedCharge هستند
-        "selected_units": selected_units
-        # 'paginator': paginator,
-    }
-    return render(request, 'middleCharge/notify_fix_person_area_charge_template.html', context)
+    return redirect(reverse('middle_add_person_area_fix_charge'))
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -9866,210 +8111,6 @@ def middle_variable_fix_charge_delete(request, pk):
     return redirect(reverse('middle_add_variable_fix_charge'))
 
 
-@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
-def middle_show_fix_variable_notification_form(request, pk):
-    charge = get_object_or_404(ChargeFixVariable, id=pk, user=request.user)
-    content_type = ContentType.objects.get_for_model(ChargeFixVariable)
-
-    # ------------------ واحدها ------------------
-    units = Unit.objects.filter(
-        is_active=True
-    ).filter(
-        Q(user=request.user) | Q(user__manager=request.user)
-    ).distinct().order_by('unit')
-
-    # ------------------ ساخت UnifiedCharge ------------------
-    existing_ids = UnifiedCharge.objects.filter(
-        content_type=content_type,
-        object_id=charge.id
-    ).values_list('unit_id', flat=True)
-
-    new_units = units.exclude(id__in=existing_ids)
-
-    calculator = CALCULATORS.get(charge.charge_type)
-
-    with transaction.atomic():
-        for unit in new_units:
-            base = calculator.calculate(unit, charge)
-            civil = charge.civil or 0
-            other = charge.other_cost_amount or 0
-            total = base + civil + other
-
-            UnifiedCharge.objects.create(
-                user=request.user,
-                unit=unit,
-                amount=base,
-                house=unit.myhouse,
-                base_charge=total,
-                total_charge_month=total,
-                title=charge.name,
-                main_charge=charge,
-                charge_type=charge.charge_type,
-                penalty_percent=charge.payment_penalty_amount,
-                civil=civil,
-                other_cost_amount=other,
-                payment_deadline_date=charge.payment_deadline,
-                content_type=content_type,
-                object_id=charge.id,
-            )
-
-    # جستجو
-    search_query = request.GET.get('search', '').strip()
-    resident_type = request.GET.get('resident_type', '').strip()
-
-    # -----------------------------
-    # Search
-    # -----------------------------
-    if search_query:
-        units = units.filter(
-            Q(unit__icontains=search_query) |
-            Q(owner_name__icontains=search_query) |
-            Q(renters__renter_name__icontains=search_query)
-        ).distinct()
-
-    # -----------------------------
-    # Filter Resident Type
-    # -----------------------------
-    if resident_type == 'owner':
-
-        # فقط مالک
-        units = units.exclude(
-            renters__renter_is_active=True
-        )
-
-    elif resident_type == 'renter':
-
-        # فقط مستاجر فعال
-        units = units.filter(
-            renters__renter_is_active=True
-        ).distinct()
-
-    elif resident_type == 'empty':
-
-        # واحد خالی
-        units = units.filter(
-            status_residence='empty'
-        )
-
-    # ------------------ Pagination ------------------
-    try:
-        per_page = int(request.GET.get('per_page', 30))
-    except ValueError:
-        per_page = 30
-
-    paginator = Paginator(units, per_page)
-    page_units = paginator.get_page(request.GET.get('page'))
-
-    # -----------------------------
-    # SESSION SELECTION STATE
-    # -----------------------------
-    session_key = f"charge_{pk}_selected_units"
-    selected_units = set(request.session.get(session_key, []))
-
-    # ------------------ POST: ارسال اطلاعیه یا پیامک ------------------
-    if request.method == "POST":
-        send_type = request.POST.get("send_type", "notify")
-        selected = request.POST.getlist("units")
-
-        if not selected:
-            messages.warning(request, "هیچ واحدی انتخاب نشده")
-            return redirect(request.path)
-
-        qs = UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=selected
-        ).select_related("unit")
-
-        if not qs.exists():
-            messages.info(request, "اطلاعیه‌ای برای ارسال وجود ندارد")
-            return redirect(request.path)
-
-        # ثبت اطلاعیه سیستمی
-        qs.update(
-            send_notification=True,
-            send_notification_date=timezone.now().date()
-        )
-
-        # ---------- ارسال پیامک ----------
-        if send_type == "sms":
-            result = SmsService.send_for_unified_charges(
-                user=request.user,
-                unified_charges=qs,
-                meta_callback=lambda total_sms, total_price: qs.update(
-                    send_sms=True,
-                    send_sms_date=timezone.now().date(),
-                    sms_count=total_sms,
-                    sms_price=Decimal(settings.SMS_PRICE),
-                    sms_total_price=total_price
-                )
-            )
-
-            if result.success:
-                messages.success(
-                    request,
-                    f"اطلاعیه سیستمی و پیامکی برای {qs.count()} واحد ارسال شد"
-                )
-            else:
-                messages.error(request, result.message)
-
-        else:
-            messages.success(
-                request,
-                f"اطلاعیه سیستمی برای {qs.count()} واحد ثبت شد"
-            )
-
-            # پاکسازی انتخاب‌ها بعد از ارسال موفق
-        request.session[session_key] = []
-        request.session.modified = True
-        return redirect(request.path)
-
-        # ------------------ آماده‌سازی template ------------------
-    unit_ids = [unit.id for unit in page_units.object_list]
-
-    uc_map = {
-        uc.unit_id: uc
-        for uc in UnifiedCharge.objects.filter(
-            content_type=content_type,
-            object_id=charge.id,
-            unit_id__in=unit_ids
-        ).select_related('unit', 'unit__user')
-    }
-
-    # حالا uc_map همان uc_dict است
-    for i, unit in enumerate(page_units):
-        uc = uc_map.get(unit.id)
-        renter = unit.renters.filter(renter_is_active=True).first()
-
-        current_charge = uc.total_charge_month if uc else 0
-
-        # جمع عددی بدهی‌های معوقه
-        previous_debt = sum(uc.get_previous_debt_by_type().values()) if uc else 0
-        print(f'p-{previous_debt}')
-
-        total_payable = current_charge + previous_debt
-
-        page_units.object_list[i] = {
-            'unit': unit,
-            'renter': renter,
-            'is_paid': uc.is_paid if uc else False,
-            'is_notified': uc.send_notification if uc else False,
-            'send_sms': uc.send_sms if uc else False,
-            'sms_date': uc.send_sms_date if uc else None,
-            'current_charge': current_charge,
-            'previous_debt': previous_debt,  # عددی
-            'total_payable': total_payable,
-        }
-
-    context = {
-        'charge': charge,
-        'page_obj': page_units,  # حالا فقط واحدهای دارای UnifiedCharge هستند
-        "selected_units": selected_units
-        # 'paginator': paginator,
-    }
-    return render(request, 'middleCharge/notify_fix_variable_charge_template.html', context)
-
-
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def middle_remove_send_notification_fix_variable(request, pk):
     if request.method != 'POST':
@@ -10421,37 +8462,24 @@ def middle_base_charges_pdf(request):
         charges_data.append(data)
 
     # 🧾 HTML برای PDF
-    html_string = render_to_string(
-        'middleCharge/middle_charges_list_pdf.html',
-        {
-            'charges': charges_data,
-            'query': query,
-            'today': datetime.now(),
-            'house': house,
-            'unit_count': unit_count,
-            'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-        }
-    )
+    context = {
+        'charges': charges_data,
+        'query': query,
+        'today': datetime.now(),
+        'house': house,
+        'unit_count': unit_count
+    }
 
     # 🎨 فونت و CSS
-    font_url = request.build_absolute_uri(static('fonts/Vazir.ttf'))
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        @font-face {{
-            font-family: 'Vazir';
-            src: url('{font_url}');
-        }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'Vazir', sans-serif;
-        }}
-    """)
-
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf(stylesheets=[css])
+        }
+    """
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="charge_main.pdf"'
-    return response
+    return PdfJob(request, template='middleCharge/middle_charges_list_pdf.html', context=context,
+                  filename='charge_main.pdf', stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -10463,7 +8491,7 @@ def middle_base_charges_excel(request):
     ).count()
 
     # 🔹 منبع یکسان با HTML و PDF
-    charges = get_all_base_charges()
+    charges = get_all_base_charges(request.user)
 
     # 🔍 جستجو
     query = request.GET.get('q', '').strip()
@@ -10477,66 +8505,48 @@ def middle_base_charges_excel(request):
         ]
 
     # -------------------------
-    # Create Excel workbook
+    # تعداد واحدهای اعلام‌شده هر شارژ؛ یک کوئری برای هر نوع شارژ به جای یک کوئری برای هر ردیف
     # -------------------------
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Main Charges"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value="لیست شارژهای اصلی ساختمان")
-    title_cell.font = Font(bold=True, size=16)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-
-    # Headers
-    headers = ['#', 'عنوان', 'تاریخ ثبت', 'جریمه دیرکرد(%)', 'مهلت پرداخت', 'توضیحات', 'اعلام شارژ']
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True)
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-
-    # Data
-    row = 3
-    for index, charge in enumerate(charges, start=1):
-        notified_count = (
-            charge.unified_charges
+    grouped_ids = defaultdict(list)
+    for charge in charges:
+        grouped_ids[ContentType.objects.get_for_model(charge.__class__).id].append(charge.id)
+
+    notified_counts = {}
+    for content_type_id, object_ids in grouped_ids.items():
+        rows = (
+            UnifiedCharge.objects
             .filter(
+                content_type_id=content_type_id,
+                object_id__in=object_ids,
                 send_notification=True,
                 send_notification_date__isnull=False,
                 unit__isnull=False
             )
-            .values_list('unit_id', flat=True)
-            .distinct()
-            .count()
-        )
-
-        ws.cell(row=row, column=1, value=index)
-        ws.cell(row=row, column=2, value=charge.name)
-        ws.cell(row=row, column=3, value=show_jalali(charge.created_at))
-        ws.cell(row=row, column=4, value=getattr(charge, 'payment_penalty_amount', None))
-        ws.cell(row=row, column=5, value=show_jalali(getattr(charge, 'payment_deadline', None)))
-        ws.cell(row=row, column=6, value=getattr(charge, 'details', ''))
-        ws.cell(
-            row=row,
-            column=7,
-            value=f"{notified_count} از {unit_count} واحد"
+            .values('object_id')
+            .annotate(notified_count=Count('unit', distinct=True))
         )
-        row += 1
-
-    # -------------------------
-    # Response
-    # -------------------------
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        for row in rows:
+            notified_counts[(content_type_id, row['object_id'])] = row['notified_count']
+
+    def notified_label(charge):
+        content_type_id = ContentType.objects.get_for_model(charge.__class__).id
+        return f"{notified_counts.get((content_type_id, charge.id), 0)} از {unit_count} واحد"
+
+    export = ExcelExport(
+        title="لیست شارژهای اصلی ساختمان",
+        sheet_title="Main Charges",
+        filename='main_charges.xlsx',
+        columns=[
+            RowNumber(),
+            Column('عنوان', 'name'),
+            Column('تاریخ ثبت', 'created_at', show_jalali),
+            Column('جریمه دیرکرد(%)', lambda charge: getattr(charge, 'payment_penalty_amount', None)),
+            Column('مهلت پرداخت', lambda charge: getattr(charge, 'payment_deadline', None), show_jalali),
+            Column('توضیحات', lambda charge: getattr(charge, 'details', '')),
+            Column('اعلام شارژ', notified_label),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=main_charges.xlsx'
-    wb.save(response)
-    return response
+    return export.response(charges)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -10557,10 +8567,8 @@ def charge_units_list(request, app_label, model_name, charge_id):
         # هر حالت غیرمنتظره
         unified_qs = model.objects.none()
 
-    # 🔥 آپدیت جریمه همه UnifiedCharge ها
-    for uc in unified_qs:
-        if hasattr(uc, 'update_penalty'):
-            uc.update_penalty(save=True)
+    # جریمه روز جاری فقط داخل SELECT محاسبه می‌شود (بدون ذخیره)
+    unified_qs = unified_qs.with_penalty()
 
     # -------------------------
     # 🔍 جستجو
@@ -10569,7 +8577,7 @@ def charge_units_list(request, app_label, model_name, charge_id):
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user')
+    ).select_related('unit', 'unit__user', 'unit__active_renter')
 
     if query:
         search_q = (
@@ -10589,7 +8597,7 @@ def charge_units_list(request, app_label, model_name, charge_id):
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user').order_by('unit__unit')
+    ).select_related('unit', 'unit__user', 'unit__active_renter').order_by('unit__unit')
 
     # -------------------------
     # 📄 pagination
@@ -10633,7 +8641,7 @@ def charge_units_list_pdf(request, app_label, model_name, charge_id):
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user')
+    ).select_related('unit', 'unit__user', 'unit__active_renter')
 
     if query:
         search_q = (
@@ -10655,36 +8663,23 @@ def charge_units_list_pdf(request, app_label, model_name, charge_id):
 
     unified_charges = unified_charges.order_by('-created_at')
 
-    html_string = render_to_string(
-        'middleCharge/middle_charges_detail_pdf.html',
-        {
-            'charge': charge,
-            'unified_charges': unified_charges,
-            'query': query,
-            'today': datetime.now(),
-            'house': house,
-            'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-
-        }
-    )
+    context = {
+        'charge': charge,
+        'unified_charges': unified_charges,
+        'query': query,
+        'today': datetime.now(),
+        'house': house
+    }
 
-    font_url = request.build_absolute_uri(static('fonts/Vazir.ttf'))
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        @font-face {{
-            font-family: 'Vazir';
-            src: url('{font_url}');
-        }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'Vazir', sans-serif;
-        }}
-    """)
-
-    pdf = HTML(string=html_string).write_pdf(stylesheets=[css])
+        }
+    """
 
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="charge_units.pdf"'
-    return response
+    return PdfJob(request, template='middleCharge/middle_charges_detail_pdf.html', context=context,
+                  filename='charge_units.pdf', stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -10699,7 +8694,13 @@ def charge_units_list_excel(request, app_label, model_name, charge_id):
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user')
+    ).select_related('unit', 'unit__user').prefetch_related(
+        Prefetch(
+            'unit__renters',
+            queryset=Renter.objects.filter(renter_is_active=True).order_by('pk'),
+            to_attr='active_renters'
+        )
+    )
 
     if query:
         search_q = (
@@ -10723,51 +8724,23 @@ def charge_units_list_excel(request, app_label, model_name, charge_id):
 
     # Excel
     # -------------------------
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Charge Units"
-    ws.sheet_view.rightToLeft = True
-
-    # عنوان اصلی
-    title_cell = ws.cell(row=1, column=1, value="لیست تراکنش های من")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)  # 9 ستون
-
-    # هدرها
-    headers = [
-        '#', 'واحد', 'مالک / مستاجر', 'مبلغ پایه', 'جریمه',
-        'مبلغ نهایی', 'تاریخ اعلام', 'مهلت پرداخت', 'وضعیت پرداخت'
-    ]
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # داده‌ها
-    row = 3  # داده‌ها از ردیف بعد از هدر شروع می‌شوند
-    for index, uc in enumerate(unified_charges, start=1):
-        ws.cell(row=row, column=1, value=index)
-        ws.cell(row=row, column=2, value=uc.title)
-        ws.cell(row=row, column=3, value=uc.unit.get_label())
-        ws.cell(row=row, column=4, value=uc.base_charge)
-        ws.cell(row=row, column=5, value=uc.penalty_amount)
-        ws.cell(row=row, column=6, value=uc.total_charge_month)
-        ws.cell(row=row, column=7, value=show_jalali(uc.send_notification_date))
-        ws.cell(row=row, column=8, value=show_jalali(uc.payment_deadline_date))
-        ws.cell(row=row, column=9, value="پرداخت شده" if uc.is_paid else "پرداخت نشده")
-        row += 1
-
-    # پاسخ Excel
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست تراکنش های من",
+        sheet_title="Charge Units",
+        filename='middle_charge_units.xlsx',
+        columns=[
+            RowNumber(),
+            Column('واحد', 'title'),
+            Column('مالک / مستاجر', 'unit.get_label'),
+            Column('مبلغ پایه', 'base_charge'),
+            Column('جریمه', 'penalty_amount'),
+            Column('مبلغ نهایی', 'total_charge_month'),
+            Column('تاریخ اعلام', 'send_notification_date', show_jalali),
+            Column('مهلت پرداخت', 'payment_deadline_date', show_jalali),
+            Column('وضعیت پرداخت', lambda uc: "پرداخت شده" if uc.is_paid else "پرداخت نشده"),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=middle_charge_units.xlsx'
-    wb.save(response)
-    return response
+    return export.response(unified_charges)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -10778,30 +8751,21 @@ def charge_units_pdf(request, charge_id):
     if request.user.is_authenticated:
         house = MyHouse.objects.filter(residents=request.user).order_by('-created_at').first()
     bank = Bank.get_default(request.user, house)
-    html_string = render_to_string('middleCharge/single_charge_pdf.html', {
+    context = {
         'charge': charge,
         'units': units,
         'house': house,
-        'bank': bank,
-        'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-    })
-    css = CSS(string=f"""
-        @page {{ size: A5 portrait; margin: 0.8cm; }}
-        body {{
+        'bank': bank
+    }
+    css = """
+        @page { size: A5 portrait; margin: 0.8cm; }
+        body {
             font-family: 'Vazir', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'Vazira', sans-serif;
-
-        }}
-    """)
+        }
+    """
 
-    pdf_file = io.BytesIO()
-    HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment;filename=charge_unit:{charge.unit.unit}.pdf'
-    return response
+    return PdfJob(request, template='middleCharge/single_charge_pdf.html', context=context,
+                  filename=f'charge_unit:{charge.unit.unit}.pdf', stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -10816,62 +8780,44 @@ def all_invoices_pdf(request, app_label, model_name, charge_id):
     charges = (
         charge.unified_charges
         .filter(send_notification_date__isnull=False)
-        .select_related('unit', 'unit__user')
+        .select_related('unit', 'unit__user', 'unit__active_renter')
         .order_by('unit__unit')
     )
     bank = Bank.get_default(request.user, house)
 
-    html_string = render_to_string(
-        'middleCharge/all_invoices_pdf.html',
-        {
-            'charge': charge,
-            'charges': charges,
-            'today': datetime.now(),
-            'house': house,
-            'bank': bank,
-            'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-        }
-    )
+    # هر صورتحساب جداگانه رندر و کش می‌شود؛ پس از پرداخت یک واحد فقط صفحه همان واحد دوباره ساخته می‌شود
+    context = {
+        'charge': charge,
+        'charges': charges,
+        'house': house,
+        'bank': bank
+    }
 
-    font_base = request.build_absolute_uri('/static/fonts/')
-    css = CSS(string=f"""
-        @page {{
+    css = """
+        @page {
             size: A5 portrait;
             margin: 1cm;
-        }}
+        }
         
-    @font-face {{
-        font-family: 'Vazir';
-        src: url('{font_base}Vazir-Regular.ttf') format('truetype');
-        font-weight: 400;
-    }}
 
-    @font-face {{
-        font-family: 'Vazir';
-        src: url('{font_base}Vazir-Bold.ttf') format('truetype');
-        font-weight: 700;
-    }}
 
 
-    body {{
+    body {
         font-family: 'Vazir';
         direction: rtl;
-    }}
+    }
 
-    h1, h2, h3 {{
+    h1, h2, h3 {
         font-weight: 700;
-    }}
+    }
 
-    .page-break {{
+    .page-break {
         page-break-after: always;
-    }}
-""")
-
-    pdf = HTML(string=html_string).write_pdf(stylesheets=[css])
+    }
+"""
 
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="all_invoices.pdf"'
-    return response
+    return PagedPdfJob(request, template='middleCharge/all_invoices_pdf.html', context=context, page_key='charges',
+                       filename='all_invoices.pdf', stylesheets=[css]).response()
 
 
 # =================================================================================================
@@ -10959,14 +8905,13 @@ def middle_show_send_sms_form(request, pk):
     sms = get_object_or_404(SmsManagement, id=pk, user=request.user)
     house = MyHouse.objects.filter(user=request.user)
     units = (Unit.objects.filter(is_active=True, user__manager=request.user, myhouse__in=house)
-             .prefetch_related('renters').order_by('unit'))
+             .with_active_renter().order_by('unit'))
 
     units_with_details = []
     for unit in units:
-        active_renter = unit.renters.filter(renter_is_active=True).first()
         units_with_details.append({
             'unit': unit,
-            'active_renter': active_renter
+            'active_renter': unit.active_renter
         })
     all_sms = SmsManagement.objects.filter(user=request.user, send_notification=False, pk=pk).order_by(
         '-created_at')
@@ -11119,6 +9064,10 @@ class MiddleSmsListView(ListView):
                 Q(subject__icontains=query) |
                 Q(message__icontains=query)
             )
+        # برچسب واحدهای ارسالی (get_label) بدون کوئری جدا برای مستاجر هر واحد
+        queryset = queryset.prefetch_related(
+            Prefetch('notified_units', queryset=Unit.objects.with_active_renter())
+        )
         return queryset.order_by('-created_at')
 
     def get_context_data(self, **kwargs):
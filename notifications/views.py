@@ -721,13 +721,12 @@ def middle_show_message_form(request, pk):
     message = get_object_or_404(MessageToUser, id=pk, user=request.user)
     house = MyHouse.objects.filter(user=request.user).first()
     units = Unit.objects.filter(Q(user=request.user) | Q(user__in=managed_users),
-                                is_active=True, myhouse=house).prefetch_related('renters').order_by('unit')
+                                is_active=True, myhouse=house).with_active_renter().order_by('unit')
     units_with_details = []
     for unit in units:
-        active_renter = unit.renters.filter(renter_is_active=True).first()
         units_with_details.append({
             'unit': unit,
-            'active_renter': active_renter
+            'active_renter': unit.active_renter
         })
     all_messages = MessageToUser.objects.filter(user=request.user,
                                                 send_notification=False, pk=pk).order_by(
@@ -814,8 +813,7 @@ class MiddleMessageToUserListView(ListView):
         # Prefetch read_statuses و unit مرتبط
         read_statuses_prefetch = Prefetch(
             'read_statuses',
-            queryset=MessageReadStatus.objects.select_related('unit__user')
-            .prefetch_related('unit__renters')
+            queryset=MessageReadStatus.objects.select_related('unit__user', 'unit__active_renter')
         )
 
         qs = MessageToUser.objects.filter(
@@ -1,20 +1,17 @@
 import datetime
-import io
 import re
 from decimal import Decimal
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, ProtectedError, Sum, Count
-from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.template.loader import get_template
 from django.utils import timezone
 from django.views.generic import ListView
-from pypdf import PdfWriter
-from weasyprint import CSS, HTML
 
+from absharProject.pdf_rendering import pdf_response
 from user_app.models import Unit, User
 from .models import Poll, Question, Choice, MyHouse, Vote
 from .forms import PollCreateForm
@@ -227,42 +224,23 @@ def polls_list_pdf(request):
 
     polls = polls.order_by('-created_at')
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-               @page {{ size: A4 landscape; margin: 1cm; }}
-               body {{
+    css = """
+               @page { size: A4 landscape; margin: 1cm; }
+               body {
                    font-family: 'BYekan', sans-serif;
-               }}
-               @font-face {{
-                   font-family: 'BYekan';
-                   src: url('{font_url}');
-               }}
-           """)
+               }
+           """
 
     # Render HTML template
     template = get_template("polls_report_pdf.html")
     context = {
-        'font_path': font_url,
         'polls': polls,
         'query': query,
         'house': house,
         'today': timezone.now(),
     }
     html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="polls_list_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return pdf_response(request, html, filename='polls_list_report.pdf', stylesheets=[css])
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
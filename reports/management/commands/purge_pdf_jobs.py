@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reports.services.pdf_jobs import PDF_JOB_MAX_AGE_DAYS, purge_pdf_jobs
+
+
+class Command(BaseCommand):
+    help = "حذف فایل‌های PDF ساخته‌شده قدیمی از پوشه pdf_jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=PDF_JOB_MAX_AGE_DAYS, help='فایل‌های قدیمی‌تر از این تعداد روز حذف می‌شوند')
+
+    def handle(self, *args, **options):
+        count = purge_pdf_jobs(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} PDF job files."))
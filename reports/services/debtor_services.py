@@ -0,0 +1,211 @@
+from django.db import connections
+from django.db.models import BigIntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+from admin_panel.models import UnifiedCharge, CivilInstallment, SewageInstallment
+from admin_panel.services.penalties import payable_total_expression
+from user_app.models import Renter, Unit
+
+# ترتیب‌های مجاز گزارش → عبارت ORDER BY روی نتیجه گروه‌بندی‌شده
+DEBTOR_ORDERINGS = {
+    'unit_id': 'unit_id ASC',
+    '-unit_id': 'unit_id DESC',
+    '-total_debt': 'total_debt DESC, unit_id ASC',
+}
+
+DEBTOR_DETAILS = ('charges', 'civil_installments', 'sewage_installments')
+
+
+def _zero():
+    return Value(0, output_field=BigIntegerField())
+
+
+class DebtorReport:
+    """
+    گزارش بدهکاران یک مدیر: بدهی شارژ (با جریمه روز)، اقساط عمرانی و فاضلاب پرداخت‌نشده
+    با یک UNION ALL از سه جدول، داخل دیتابیس بر اساس واحد جمع زده، مرتب و صفحه‌بندی می‌شود.
+    از بیرون مثل یک لیست رفتار می‌کند (count و برش) تا مستقیم به Paginator داده شود.
+    """
+
+    def __init__(self, *, user, query='', ordering='-unit_id', as_of=None, details=DEBTOR_DETAILS):
+        if ordering not in DEBTOR_ORDERINGS:
+            raise ValueError(f"Unsupported ordering: {ordering}")
+
+        self.user = user
+        self.query = query
+        self.ordering = ordering
+        self.as_of = as_of or timezone.now().date()
+        self.details = details
+        self._summary = None
+
+    # -------------------------------
+    # منابع بدهی
+    # -------------------------------
+    def unit_filter(self):
+        if not self.query:
+            return Q()
+        # جستجو روی واحد با زیرکوئری انجام می‌شود تا join با مستاجرین ردیف‌ها را تکرار نکند
+        matching_units = Unit.objects.filter(
+            Q(unit__icontains=self.query) |
+            Q(owner_name__icontains=self.query) |
+            Q(renters__renter_name__icontains=self.query)
+        ).values('pk')
+        return Q(unit_id__in=matching_units)
+
+    def charges(self):
+        return UnifiedCharge.objects.filter(
+            self.unit_filter(), is_paid=False, unit__isnull=False, user=self.user
+        )
+
+    def civil_installments(self):
+        return CivilInstallment.objects.filter(
+            self.unit_filter(), is_paid=False, unit__isnull=False, civil_manage__user=self.user
+        )
+
+    def sewage_installments(self):
+        return SewageInstallment.objects.filter(
+            self.unit_filter(), is_paid=False, unit__isnull=False, sewage_manage__user=self.user
+        )
+
+    def union(self):
+        """
+        سه منبع، هر کدام از قبل بر اساس واحد گروه‌بندی‌شده، با ستون‌های یکسان
+        (unit_id, monthly_debt, civil_debt, sewage_debt)
+        """
+        charges = self.charges().order_by().values('unit_id').annotate(
+            monthly_debt=Sum(payable_total_expression(self.as_of)),
+            civil_debt=_zero(),
+            sewage_debt=_zero(),
+        )
+        civil = self.civil_installments().order_by().values('unit_id').annotate(
+            monthly_debt=_zero(),
+            civil_debt=Sum('amount'),
+            sewage_debt=_zero(),
+        )
+        sewage = self.sewage_installments().order_by().values('unit_id').annotate(
+            monthly_debt=_zero(),
+            civil_debt=_zero(),
+            sewage_debt=Sum('amount'),
+        )
+        return charges.union(civil, sewage, all=True)
+
+    def _execute(self, sql_template, extra_params=()):
+        union = self.union()
+        connection = connections[union.db]
+        union_sql, params = union.query.get_compiler(connection=connection).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(sql_template.format(union=union_sql), (*params, *extra_params))
+            return cursor.fetchall()
+
+    # -------------------------------
+    # رفتار شبیه لیست برای Paginator
+    # -------------------------------
+    def summary(self):
+        """
+        (تعداد واحدهای بدهکار، جمع کل بدهی) با یک کوئری
+        """
+        if self._summary is None:
+            count, total = self._execute(
+                "SELECT COUNT(DISTINCT unit_id), "
+                "COALESCE(SUM(monthly_debt + civil_debt + sewage_debt), 0) FROM ({union}) debts"
+            )[0]
+            self._summary = (count, total)
+        return self._summary
+
+    def count(self):
+        return self.summary()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    @property
+    def total_debt(self):
+        return self.summary()[1]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        return self.rows(offset=start, limit=max(stop - start, 0))
+
+    def rows(self, offset=0, limit=None):
+        paging, params = '', ()
+        if limit is not None:
+            paging, params = ' LIMIT %s OFFSET %s', (limit, offset)
+
+        totals = self._execute(
+            "SELECT unit_id, SUM(monthly_debt), SUM(civil_debt), SUM(sewage_debt), "
+            "SUM(monthly_debt + civil_debt + sewage_debt) AS total_debt "
+            "FROM ({union}) debts GROUP BY unit_id "
+            f"ORDER BY {DEBTOR_ORDERINGS[self.ordering]}{paging}",
+            params
+        )
+        rows = [
+            {
+                'id': unit_id,
+                'label': '',
+                'monthly_debt': monthly_debt or 0,
+                'civil_debt': civil_debt or 0,
+                'sewage_debt': sewage_debt or 0,
+                'total_debt': total_debt or 0,
+                'charges': [],
+                'civil_installments': [],
+                'sewage_installments': [],
+            }
+            for unit_id, monthly_debt, civil_debt, sewage_debt, total_debt in totals
+        ]
+        self._attach_labels(rows)
+        self._attach_details(rows)
+        return rows
+
+    def iter_rows(self, chunk_size=500):
+        """
+        همه واحدهای بدهکار به ترتیب گزارش، دسته به دسته (برای خروجی‌ها)
+        """
+        offset = 0
+        while True:
+            chunk = self.rows(offset=offset, limit=chunk_size)
+            yield from chunk
+            if len(chunk) < chunk_size:
+                break
+            offset += chunk_size
+
+    # -------------------------------
+    # برچسب و جزئیات واحدهای همین صفحه
+    # -------------------------------
+    def _attach_labels(self, rows):
+        active_renter_name = Renter.objects.filter(
+            unit=OuterRef('pk'), renter_is_active=True
+        ).order_by('pk').values('renter_name')[:1]
+
+        units = {
+            unit['pk']: unit
+            for unit in Unit.objects.filter(pk__in=[row['id'] for row in rows]).annotate(
+                active_renter_name=Subquery(active_renter_name)
+            ).values('pk', 'unit', 'owner_name', 'active_renter_name')
+        }
+        for row in rows:
+            unit = units.get(row['id'])
+            if unit:
+                row['label'] = f"واحد {unit['unit']} - {unit['active_renter_name'] or unit['owner_name']}"
+
+    def _attach_details(self, rows):
+        by_id = {row['id']: row for row in rows}
+        if not by_id:
+            return
+
+        if 'charges' in self.details:
+            for charge in self.charges().filter(unit_id__in=by_id).with_penalty(self.as_of).order_by('-created_at'):
+                by_id[charge.unit_id]['charges'].append(charge)
+
+        if 'civil_installments' in self.details:
+            for item in self.civil_installments().filter(unit_id__in=by_id).select_related('civil_manage'):
+                by_id[item.unit_id]['civil_installments'].append(item)
+
+        if 'sewage_installments' in self.details:
+            for item in self.sewage_installments().filter(unit_id__in=by_id).select_related('sewage_manage'):
+                by_id[item.unit_id]['sewage_installments'].append(item)
@@ -0,0 +1,293 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse
+from django.shortcuts import render
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+from pypdf import PdfWriter
+
+from absharProject.pdf_rendering import render_pdf
+
+# فایل‌های PDF آماده زیر MEDIA_ROOT/pdf_jobs/<user_id>/<digest>.pdf نگهداری می‌شوند
+PDF_JOBS_DIR = 'pdf_jobs'
+# HTML بزرگ‌تر از این (تعداد کاراکتر) در Celery ساخته می‌شود و درخواست منتظر نمی‌ماند
+PDF_JOB_ASYNC_THRESHOLD = 200_000
+# اگر worker از کار بیفتد، وضعیت کار بعد از این مدت پاک می‌شود تا بتوان دوباره درخواست داد
+PDF_JOB_STATE_TIMEOUT = 60 * 30
+# مقادیری از context که فقط زمان ساخت را نشان می‌دهند و در کلید محتوا حساب نمی‌شوند
+PDF_JOB_VOLATILE_CONTEXT = ('today',)
+# فایل‌ها و صفحه‌های کش‌شده قدیمی‌تر از این تعداد روز در پاک‌سازی دوره‌ای حذف می‌شوند
+PDF_JOB_MAX_AGE_DAYS = 7
+
+
+def pdf_job_state_key(user_id, digest):
+    return f"pdf_job:{user_id}:{digest}"
+
+
+def pdf_job_dir(user_id):
+    return os.path.join(settings.MEDIA_ROOT, PDF_JOBS_DIR, str(user_id))
+
+
+def pdf_job_path(user_id, digest):
+    return os.path.join(pdf_job_dir(user_id), f"{digest}.pdf")
+
+
+def pdf_job_source_path(user_id, digest):
+    return os.path.join(pdf_job_dir(user_id), f"{digest}.json")
+
+
+def get_pdf_job_state(user_id, digest):
+    """
+    وضعیت کار: 'done' اگر فایل آماده است، وضعیت ثبت‌شده در کش، یا None اگر چنین کاری نیست
+    """
+    if os.path.exists(pdf_job_path(user_id, digest)):
+        return {'state': 'done'}
+    return cache.get(pdf_job_state_key(user_id, digest))
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def content_digest(*parts):
+    content = hashlib.sha256()
+    for part in parts:
+        content.update(part.encode('utf-8'))
+        content.update(b'\0')
+    return content.hexdigest()
+
+
+def pdf_page_path(user_id, digest):
+    return os.path.join(pdf_job_dir(user_id), 'pages', f"{digest}.pdf")
+
+
+def render_pages(user_id, pages, stylesheets, base_url):
+    """
+    ساخت PDF جداگانه هر صفحه (مثلاً صورتحساب هر واحد) و برگرداندن مسیر فایل‌ها به ترتیب صفحات.
+    هر صفحه با هش محتوای خودش نگهداری می‌شود، پس بعد از تغییر یک شارژ فقط همان صفحه دوباره ساخته
+    می‌شود؛ صفحه‌های جاافتاده در چند پردازه موازی رندر می‌شوند.
+    """
+    paths = [pdf_page_path(user_id, content_digest(page, *stylesheets, base_url)) for page in pages]
+    missing = {path: page for path, page in zip(paths, pages) if not os.path.exists(path)}
+
+    workers = min(settings.PDF_RENDER_WORKERS, len(missing))
+    # پردازه‌های daemon (مثل worker های Celery) اجازه ساختن پردازه فرزند ندارند
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = pool.map(render_pdf, missing.values(), repeat(stylesheets), repeat(base_url))
+            for path, data in zip(missing, rendered):
+                _write_atomic(path, data)
+    else:
+        for path, page in missing.items():
+            _write_atomic(path, render_pdf(page, stylesheets, base_url))
+    return paths
+
+
+def merge_pdfs(paths):
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def build_pdf(source, user_id):
+    if 'pages' in source:
+        return merge_pdfs(render_pages(user_id, source['pages'], source['stylesheets'], source['base_url']))
+    return render_pdf(source['html'], source['stylesheets'], source['base_url'])
+
+
+def build_pdf_job(user_id, digest):
+    """
+    ساخت PDF از ورودی ذخیره‌شده یک کار (بدنه تسک Celery)
+    """
+    source_path = pdf_job_source_path(user_id, digest)
+    with open(source_path, encoding='utf-8') as source_file:
+        source = json.load(source_file)
+
+    _write_atomic(pdf_job_path(user_id, digest), build_pdf(source, user_id))
+    os.unlink(source_path)
+
+
+def purge_pdf_jobs(max_age_days):
+    """
+    حذف فایل‌های ساخته‌شده قدیمی‌تر از max_age_days روز؛ تعداد فایل‌های حذف‌شده برمی‌گردد
+    """
+    root = os.path.join(settings.MEDIA_ROOT, PDF_JOBS_DIR)
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+    return removed
+
+
+class PdfJob:
+    """
+    خروجی PDF یک view با WeasyPrint: فایل ساخته‌شده بر اساس هش محتوا (HTML، CSS و base_url)
+    نگهداری می‌شود و تا وقتی ورودی‌ها عوض نشده‌اند دوباره ساخته نمی‌شود. خروجی‌های بزرگ در Celery
+    ساخته می‌شوند و کاربر صفحه انتظاری می‌بیند که پس از آماده شدن فایل را دانلود می‌کند.
+    """
+
+    def __init__(self, request, *, template, context, filename, stylesheets=(), base_url=None,
+                 volatile=PDF_JOB_VOLATILE_CONTEXT):
+        self.request = request
+        self.user_id = request.user.pk
+        self.template = get_template(template) if isinstance(template, str) else template
+        self.context = context
+        self.filename = filename
+        self.stylesheets = list(stylesheets)
+        self.base_url = base_url or request.build_absolute_uri()
+        self.volatile = volatile
+
+    @cached_property
+    def html(self):
+        return self.template.render(self.context)
+
+    @cached_property
+    def stable_html(self):
+        """
+        HTML با مقادیر volatile (مثل زمان گزارش) خالی، تا هر دقیقه فایل تازه‌ای ساخته نشود و فقط
+        روز آن‌ها در کلید بماند؛ اگر فایل از قبل موجود باشد فقط همین یک بار رندر انجام می‌شود
+        """
+        volatile = [key for key in self.volatile if key in self.context]
+        if not volatile:
+            return self.html
+        return self.template.render({**self.context, **dict.fromkeys(volatile)})
+
+    def volatile_dates(self):
+        """
+        روز مقادیر volatile؛ در کلید فایل حساب می‌شود تا فایل روزهای قبل با تاریخ قدیمی برگردانده نشود
+        """
+        values = (self.context[key] for key in self.volatile if key in self.context)
+        return [str(value.date() if isinstance(value, datetime) else value) for value in values]
+
+    @cached_property
+    def digest(self):
+        return content_digest(self.stable_html, *self.volatile_dates(), *self.stylesheets, self.base_url)
+
+    def source(self):
+        """
+        ورودی لازم برای ساخت فایل (در تسک Celery به‌صورت JSON ذخیره می‌شود)
+        """
+        return {'html': self.html, 'stylesheets': self.stylesheets, 'base_url': self.base_url}
+
+    def render_size(self):
+        """
+        حجم کاری که باید رندر شود؛ بالاتر از PDF_JOB_ASYNC_THRESHOLD به صف فرستاده می‌شود
+        """
+        return len(self.html)
+
+    @property
+    def path(self):
+        return pdf_job_path(self.user_id, self.digest)
+
+    def file_response(self, path):
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=self.filename,
+                            content_type='application/pdf')
+
+    def response(self):
+        digest = self.digest
+        path = self.path
+        if os.path.exists(path):
+            return self.file_response(path)
+
+        if self.render_size() < PDF_JOB_ASYNC_THRESHOLD:
+            _write_atomic(path, build_pdf(self.source(), self.user_id))
+            return self.file_response(path)
+
+        state = self.enqueue(digest)
+        if state['state'] == 'done':
+            return self.file_response(path)
+        return self.waiting_response(digest, state)
+
+    def enqueue(self, digest):
+        """
+        ثبت تسک ساخت (فقط یک بار برای هر هش) و برگرداندن وضعیت کار؛ اگر صف در دسترس نباشد همین‌جا ساخته می‌شود
+        """
+        key = pdf_job_state_key(self.user_id, digest)
+        state = {'task_id': str(uuid.uuid4()), 'state': 'pending'}
+        # کار ناموفق قبلی جلوی تلاش دوباره را نمی‌گیرد
+        if (cache.get(key) or {}).get('state') == 'failed':
+            cache.delete(key)
+        # cache.add اتمیک است؛ درخواست‌های همزمان فقط یک تسک ثبت می‌کنند
+        if not cache.add(key, state, PDF_JOB_STATE_TIMEOUT):
+            return cache.get(key) or state
+
+        _write_atomic(pdf_job_source_path(self.user_id, digest), json.dumps(self.source()).encode('utf-8'))
+
+        from reports.tasks import render_pdf_job
+        try:
+            render_pdf_job.apply_async(args=(self.user_id, digest), task_id=state['task_id'])
+        except Exception:
+            cache.delete(key)
+            build_pdf_job(self.user_id, digest)
+        return get_pdf_job_state(self.user_id, digest) or state
+
+    def waiting_response(self, digest, state):
+        return render(self.request, 'pdf_job_wait.html', {
+            'filename': self.filename,
+            'state': state['state'],
+            'status_url': reverse('pdf_job_status', args=[digest]),
+            'download_url': f"{reverse('pdf_job_download', args=[digest])}?{urlencode({'filename': self.filename})}",
+        })
+
+
+class PagedPdfJob(PdfJob):
+    """
+    PdfJob برای سندهایی که از صفحه‌های مستقل ساخته می‌شوند (مثل صورتحساب همه واحدها):
+    قالب برای هر عضو context[page_key] جداگانه رندر می‌شود، هر صفحه با هش خودش کش و در چند پردازه
+    ساخته می‌شود و نتیجه با pypdf به هم چسبانده می‌شود. مقادیر volatile در صفحه‌ها خالی می‌مانند
+    تا فایل هر صفحه بین درخواست‌ها قابل استفاده باشد.
+    """
+
+    def __init__(self, request, *, page_key, **kwargs):
+        super().__init__(request, **kwargs)
+        self.page_key = page_key
+
+    @cached_property
+    def pages(self):
+        context = {**self.context, **dict.fromkeys(self.volatile)}
+        return [self.template.render({**context, self.page_key: [item]}) for item in self.context[self.page_key]]
+
+    @cached_property
+    def digest(self):
+        return content_digest(*self.pages, *self.stylesheets, self.base_url)
+
+    def source(self):
+        return {'pages': self.pages, 'stylesheets': self.stylesheets, 'base_url': self.base_url}
+
+    def render_size(self):
+        """
+        فقط صفحه‌هایی که فایل آماده ندارند حساب می‌شوند
+        """
+        return sum(
+            len(page) for page in self.pages
+            if not os.path.exists(pdf_page_path(self.user_id, content_digest(page, *self.stylesheets, self.base_url)))
+        )
@@ -0,0 +1,30 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .services.pdf_jobs import (
+    PDF_JOB_MAX_AGE_DAYS, PDF_JOB_STATE_TIMEOUT, build_pdf_job, pdf_job_state_key, purge_pdf_jobs,
+)
+
+
+@shared_task(bind=True, name='reports.tasks.render_pdf_job')
+def render_pdf_job(self, user_id, digest):
+    """
+    ساخت PDF یک کار در پس‌زمینه؛ پس از ذخیره فایل، وضعیت کار از کش پاک می‌شود
+    و صفحه انتظار فایل آماده را دانلود می‌کند.
+    """
+    key = pdf_job_state_key(user_id, digest)
+    cache.set(key, {'task_id': self.request.id, 'state': 'running'}, PDF_JOB_STATE_TIMEOUT)
+    try:
+        build_pdf_job(user_id, digest)
+    except Exception:
+        cache.set(key, {'task_id': self.request.id, 'state': 'failed'}, PDF_JOB_STATE_TIMEOUT)
+        raise
+    cache.delete(key)
+
+
+@shared_task(name='reports.tasks.purge_old_pdf_jobs')
+def purge_old_pdf_jobs(max_age_days=PDF_JOB_MAX_AGE_DAYS):
+    """
+    پاک‌سازی دوره‌ای پوشه pdf_jobs (فایل‌های ساخته‌شده و صفحه‌های کش‌شده)؛ در CELERY_BEAT_SCHEDULE ثبت شده است
+    """
+    return purge_pdf_jobs(max_age_days)
@@ -1,6 +1,6 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.urls import path
+from django.urls import path, re_path
 
 from reports import views
 from reports.views import civil_sent_units
@@ -29,6 +29,9 @@ urlpatterns = [
     ),
     path('charges/notify/list/', views.charge_notify_report_list, name='charge_notify_report_list'),
 
+    re_path(r'^pdf-jobs/(?P<digest>[0-9a-f]{64})/status/$', views.pdf_job_status, name='pdf_job_status'),
+    re_path(r'^pdf-jobs/(?P<digest>[0-9a-f]{64})/download/$', views.pdf_job_download, name='pdf_job_download'),
+
     # Civil Charge Urls
 
     path('charges/civil/list/', views.civil_charge_report_list, name='middle_charge_civil_report_list'),
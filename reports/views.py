@@ -1,10 +1,9 @@
-import io
+import os
 from collections import defaultdict
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 import jdatetime
-import openpyxl
 from django.apps import apps
 from django.conf import settings
 from django.contrib import messages
@@ -12,31 +11,34 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
 from django.core.paginator import Paginator
 from django.db import models
-from django.db.models import Q, Sum, F, Count, OuterRef, Subquery
+from django.db.models import Q, Sum, F, Count, OuterRef, Subquery, Prefetch
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, JsonResponse, FileResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.template.context_processors import static
-from django.template.loader import get_template, render_to_string
+from django.template.loader import get_template
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView
 from django.views.generic.edit import FormMixin
 
+from absharProject.excel_export import ExcelExport, ExcelSheetWriter, Column, RowNumber
+from absharProject.keyset_pagination import KeysetPaginator, KeysetPaginationMixin
 from admin_panel.forms import UnifiedChargePaymentForm
 from admin_panel.models import Fund, Expense, Income, Property, ExpenseCategory, IncomeCategory, Maintenance, \
     UnifiedCharge, PersonCharge, FixPersonCharge, FixAreaCharge, AreaCharge, \
     FixCharge, ChargeByPersonArea, ChargeFixVariable, ChargeByFixPersonArea, PayMoney, ReceiveMoney, AdminFund, \
     CivilManage, CivilInstallment, SewageManage, SewageInstallment, BankFund
+from admin_panel.services.document_search import search_documents
+from admin_panel.services.ledger_rollups import balance_totals, sum_categories
 from middleAdmin_panel.views import middle_admin_required
 from polls.templatetags.poll_extras import show_jalali, jalali_to_gregorian, show_jalali_date_time, show_jalali_date, \
     show_jalali_date_excel
+from reports.services.debtor_services import DebtorReport
+from reports.services.pdf_jobs import PdfJob, get_pdf_job_state, pdf_job_path
 from user_app.forms import UnitReportForm, MiddlePayCivilForm
-from user_app.models import Unit, MyHouse, UnitResidenceHistory, Bank, User, UserPayMoney
-from openpyxl.styles import PatternFill, Font, Alignment
-from pypdf import PdfWriter
-from weasyprint import HTML, CSS
+from user_app.models import Unit, MyHouse, UnitResidenceHistory, Bank, User, UserPayMoney, Renter
+from openpyxl.styles import Font
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -81,6 +83,10 @@ def to_jalali(date_obj):
     return jalali_date.strftime('%Y/%m/%d')
 
 
+def fund_bank_label(fund):
+    return f"{fund.bank.bank_name} - {fund.bank.account_no}" if fund.bank else ''
+
+
 @method_decorator(middle_admin_required, name='dispatch')
 class MiddleBankList(ListView):
     model = Bank
@@ -134,18 +140,10 @@ def fund_middle_turnover(request):
 
     funds = Fund.objects.select_related('bank', 'content_type', 'unit').filter(
         Q(unit__user=manager) | Q(unit__user__manager=manager) | Q(user=manager)
-    ).order_by('-id')
+    )
 
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(payer_name__icontains=query) |
-            Q(receiver_name__icontains=query) |
-            Q(transaction_no__icontains=query) |
-            Q(creditor_amount__icontains=query) |
-            Q(debtor_amount__icontains=query) |
-            Q(bank__bank_name__icontains=query)
-        )
+        funds = search_documents(funds, query)
 
     totals = funds.aggregate(
         total_debtor=Sum('debtor_amount'),
@@ -154,8 +152,8 @@ def fund_middle_turnover(request):
 
     balance = (totals['total_debtor'] or 0) - (totals['total_creditor'] or 0)
 
-    paginator = Paginator(funds, paginate)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    paginator = KeysetPaginator(funds, paginate)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'fund_middle_turnover.html', {
         'funds': page_obj,
@@ -180,15 +178,7 @@ def export_middle_report_pdf(request):
     # فیلترها
     query = request.GET.get('q', '').strip()
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(unit__unit__icontains=query) |
-            Q(payer_name__icontains=query) |
-            Q(receiver_name__icontains=query) |
-            Q(payment_gateway__icontains=query) |
-            Q(debtor_amount__icontains=query) |
-            Q(creditor_amount__icontains=query)
-        )
+        funds = search_documents(funds, query)
     # for field, lookup in filter_fields.items():
     #     value = request.GET.get(field)
     #     if value:
@@ -202,29 +192,24 @@ def export_middle_report_pdf(request):
     balance = (totals['total_income'] or 0) - (totals['total_expense'] or 0)
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     template = get_template("middle_report_pdf.html")
     context = {
@@ -232,18 +217,11 @@ def export_middle_report_pdf(request):
         'query': query,
         'totals': totals,
         'balance': balance,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
-    html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="fund_report.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename='fund_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -252,44 +230,22 @@ def export_middle_report_excel(request):
     report = Fund.objects.filter(Q(user=manager) | Q(user__manager=manager)).order_by('-payment_date')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"گردش مالی صندوق ")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=5)
-
-    # Headers
-    headers = [' بانک', 'تاریخ پرداخت', 'شرح', 'پرداخت کننده/واریز کننده', 'روش پرداخت', 'بدهکار', 'بستانکار']
-
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(report, start=3):
-        ws.cell(row=row_num, column=1, value=f"{fund.bank.bank_name} - {fund.bank.account_no}")
-        ws.cell(row=row_num, column=2, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=3, value=fund.payment_description)
-        ws.cell(row=row_num, column=4, value=f"{fund.payer_name} - {fund.receiver_name}")
-        ws.cell(row=row_num, column=5, value=fund.payment_gateway)
-        ws.cell(row=row_num, column=6, value=fund.debtor_amount)
-        ws.cell(row=row_num, column=7, value=fund.creditor_amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="گردش مالی صندوق ",
+        sheet_title="units",
+        filename='fund-report.xlsx',
+        select_related=('bank',),
+        columns=[
+            Column(' بانک', fund_bank_label),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('پرداخت کننده/واریز کننده', lambda fund: f"{fund.payer_name} - {fund.receiver_name}"),
+            Column('روش پرداخت', 'payment_gateway'),
+            Column('بدهکار', 'debtor_amount'),
+            Column('بستانکار', 'creditor_amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=fund-report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(report)
 
 
 # -------------------- Admin ------------------------------
@@ -307,15 +263,7 @@ def admin_fund_turnover(request):
     )
 
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(payer_name__icontains=query) |
-            Q(receiver_name__icontains=query) |
-            Q(transaction_no__icontains=query) |
-            Q(creditor_amount__icontains=query) |
-            Q(debtor_amount__icontains=query) |
-            Q(bank__bank_name__icontains=query)
-        )
+        funds = search_documents(funds, query)
 
     totals = funds.aggregate(
         total_debtor=Sum('debtor_amount'),
@@ -348,15 +296,7 @@ def admin_export_middle_report_pdf(request):
     # فیلترها
     query = request.GET.get('q', '').strip()
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(unit__unit__icontains=query) |
-            Q(payer_name__icontains=query) |
-            Q(receiver_name__icontains=query) |
-            Q(payment_gateway__icontains=query) |
-            Q(debtor_amount__icontains=query) |
-            Q(creditor_amount__icontains=query)
-        )
+        funds = search_documents(funds, query)
 
     # محاسبه totals و balance
     totals = funds.aggregate(
@@ -366,29 +306,24 @@ def admin_export_middle_report_pdf(request):
     balance = (totals['total_income'] or 0) - (totals['total_expense'] or 0)
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     template = get_template("admin_report_pdf.html")
     context = {
@@ -396,18 +331,11 @@ def admin_export_middle_report_pdf(request):
         'query': query,
         'totals': totals,
         'balance': balance,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
-    html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="admin_fund_report.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename='admin_fund_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -416,49 +344,27 @@ def admin_export_middle_report_excel(request):
     report = Fund.objects.filter(Q(user=manager) | Q(user__manager=manager)).order_by('-payment_date')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"گردش مالی صندوق ")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=5)
-
-    # Headers
-    headers = [' بانک', 'تاریخ پرداخت', 'شرح', 'پرداخت کننده/واریز کننده', 'روش پرداخت', 'بدهکار', 'بستانکار']
-
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(report, start=3):
-        ws.cell(row=row_num, column=1, value=f"{fund.bank.bank_name} - {fund.bank.account_no}")
-        ws.cell(row=row_num, column=2, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=3, value=fund.payment_description)
-        ws.cell(row=row_num, column=4, value=f"{fund.payer_name} - {fund.receiver_name}")
-        ws.cell(row=row_num, column=5, value=fund.payment_gateway)
-        ws.cell(row=row_num, column=6, value=fund.debtor_amount)
-        ws.cell(row=row_num, column=7, value=fund.creditor_amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="گردش مالی صندوق ",
+        sheet_title="units",
+        filename='fund-report.xlsx',
+        select_related=('bank',),
+        columns=[
+            Column(' بانک', fund_bank_label),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('پرداخت کننده/واریز کننده', lambda fund: f"{fund.payer_name} - {fund.receiver_name}"),
+            Column('روش پرداخت', 'payment_gateway'),
+            Column('بدهکار', 'debtor_amount'),
+            Column('بستانکار', 'creditor_amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=fund-report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(report)
 
 
 # ========================================================================
 @method_decorator(middle_admin_required, name='dispatch')
-class UnitReportsTurnOver(FormMixin, ListView):
+class UnitReportsTurnOver(KeysetPaginationMixin, FormMixin, ListView):
     model = Fund
     form_class = UnitReportForm
     template_name = 'unit_reports.html'
@@ -518,42 +424,21 @@ def export_units_report_excel(request):
     report = Fund.objects.filter(user=unit_user).order_by('doc_number')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"گردش مالی واحد {unit.unit}")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
-
-    # Headers
-    headers = [' بانک', 'تاریخ پرداخت', 'شرح', 'روش پرداخت', 'بدهکار', 'بستانکار']
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(report, start=3):
-        ws.cell(row=row_num, column=1, value=f"{fund.bank.bank_name} - {fund.bank.account_no}")
-        ws.cell(row=row_num, column=2, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=3, value=fund.payment_description)
-        ws.cell(row=row_num, column=4, value=fund.payment_gateway)
-        ws.cell(row=row_num, column=5, value=fund.debtor_amount)
-        ws.cell(row=row_num, column=6, value=fund.creditor_amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title=f"گردش مالی واحد {unit.unit}",
+        sheet_title="units",
+        filename=f'fund_unit_{unit.unit}_report.xlsx',
+        select_related=('bank',),
+        columns=[
+            Column(' بانک', fund_bank_label),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('روش پرداخت', 'payment_gateway'),
+            Column('بدهکار', 'debtor_amount'),
+            Column('بستانکار', 'creditor_amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=fund_unit_{unit.unit}_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(report)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -583,49 +468,36 @@ def export_units_report_pdf(request):
             funds = funds.filter(**{lookup: value})
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # Render template
     template = get_template("unit_report_pdf.html")
     context = {
         'funds': funds,
         'unit': unit,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
 
-    html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    # Response
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="fund_unit_{unit.unit}_report.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename=f'fund_unit_{unit.unit}_report.pdf',
+                  stylesheets=[css]).response()
 
 
 # ======================================================================================
@@ -657,12 +529,7 @@ def fund_turnover_user(request):
     )
 
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(payment_gateway__icontains=query) |
-            Q(transaction_no__icontains=query) |
-            Q(amount__icontains=query)
-        )
+        funds = search_documents(funds, query)
 
     funds = funds.order_by('-created_at')
 
@@ -692,41 +559,19 @@ def export_user_report_excel(request):
     report = Fund.objects.filter(user=user).order_by('doc_number')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"لیست تراکنش های من ")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=5)
-
-    # Headers
-    headers = ['تاریخ پرداخت', 'شرح', 'روش پرداخت', 'شماره تراکنش', 'مبلغ']
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(report, start=3):
-        ws.cell(row=row_num, column=1, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=2, value=fund.payment_description)
-        ws.cell(row=row_num, column=3, value=fund.payment_gateway)
-        ws.cell(row=row_num, column=4, value=fund.transaction_no)
-        ws.cell(row=row_num, column=5, value=fund.amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست تراکنش های من ",
+        sheet_title="units",
+        filename='fund_user_report.xlsx',
+        columns=[
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('روش پرداخت', 'payment_gateway'),
+            Column('شماره تراکنش', 'transaction_no'),
+            Column('مبلغ', 'amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=fund_user_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(report)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -745,59 +590,39 @@ def export_user_report_pdf(request):
     # فیلترها از GET
     query = request.GET.get('q', '').strip()
     if query:
-        funds = funds.filter(
-            Q(payment_description__icontains=query) |
-            Q(payment_gateway__icontains=query) |
-            Q(transaction_no__icontains=query) |
-            Q(payment_date__icontains=query) |
-            Q(amount__icontains=query)
-
-        )
+        funds = search_documents(funds, query)
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # Render template
     template = get_template("user_report_pdf.html")
     context = {
         'funds': funds,
         'query': query,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
 
-    html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    # Response
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="fund_user_report.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename='fund_user_report.pdf',
+                  stylesheets=[css]).response()
 
 
 # ============================================================
@@ -807,7 +632,9 @@ def charge_notify_report_list(request):
 
     charges = (
         UnifiedCharge.objects
-        .filter(user=request.user, send_notification=True).order_by('-created_at'))
+        .filter(user=request.user, send_notification=True)
+        .select_related('unit', 'unit__active_renter')
+        .order_by('-created_at'))
 
     # 🔍 فیلتر جستجو
     if search:
@@ -865,7 +692,7 @@ def charge_units_list_report_pdf(request):
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user')
+    ).select_related('unit', 'unit__user', 'unit__active_renter')
 
     if query:
         search_q = (
@@ -887,47 +714,40 @@ def charge_units_list_report_pdf(request):
 
     unified_charges = unified_charges.order_by('-created_at')
 
-    html_string = render_to_string(
-        'middleCharge/middle_charges_detail_pdf.html',
-        {
-            'unified_charges': unified_charges,
-            'query': query,
-            'today': datetime.now(),
-            'house': house,
-            'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-
-        }
-    )
+    context = {
+        'unified_charges': unified_charges,
+        'query': query,
+        'today': datetime.now(),
+        'house': house
+    }
 
-    font_url = request.build_absolute_uri(static('fonts/Vazir.ttf'))
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        @font-face {{
-            font-family: 'Vazir';
-            src: url('{font_url}');
-        }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'Vazir', sans-serif;
-        }}
-    """)
-
-    pdf = HTML(string=html_string).write_pdf(stylesheets=[css])
+        }
+    """
 
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="charge_units_report.pdf"'
-    return response
+    return PdfJob(request, template='middleCharge/middle_charges_detail_pdf.html', context=context,
+                  filename='charge_units_report.pdf', stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
 def charge_units_list_report_excel(request):
-    unified_qs = UnifiedCharge.objects.all()
+    unified_qs = UnifiedCharge.objects.filter(user=request.user)
 
     # 🔍 جستجو
     query = request.GET.get('q', '').strip()
 
     unified_charges = unified_qs.filter(
         send_notification_date__isnull=False
-    ).select_related('unit', 'unit__user')
+    ).select_related('unit', 'unit__user').prefetch_related(
+        Prefetch(
+            'unit__renters',
+            queryset=Renter.objects.filter(renter_is_active=True).order_by('pk'),
+            to_attr='active_renters'
+        )
+    )
 
     if query:
         search_q = (
@@ -952,51 +772,23 @@ def charge_units_list_report_excel(request):
     # -------------------------
     # Excel
     # -------------------------
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Charge Units"
-    ws.sheet_view.rightToLeft = True
-
-    # عنوان اصلی
-    title_cell = ws.cell(row=1, column=1, value="لیست تراکنش های من")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)  # 9 ستون
-
-    # هدرها
-    headers = [
-        '#', 'واحد', 'مالک / مستاجر', 'مبلغ پایه', 'جریمه',
-        'مبلغ نهایی', 'تاریخ اعلام', 'مهلت پرداخت', 'وضعیت پرداخت'
-    ]
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # داده‌ها
-    row = 3  # داده‌ها از ردیف بعد از هدر شروع می‌شوند
-    for index, uc in enumerate(unified_charges, start=1):
-        ws.cell(row=row, column=1, value=index)
-        ws.cell(row=row, column=2, value=uc.title)
-        ws.cell(row=row, column=3, value=uc.unit.get_label)
-        ws.cell(row=row, column=4, value=uc.base_charge)
-        ws.cell(row=row, column=5, value=uc.penalty_amount)
-        ws.cell(row=row, column=6, value=uc.total_charge_month)
-        ws.cell(row=row, column=7, value=show_jalali_date_excel(uc.send_notification_date))
-        ws.cell(row=row, column=8, value=show_jalali_date_excel(uc.payment_deadline_date))
-        ws.cell(row=row, column=9, value="پرداخت شده" if uc.is_paid else "پرداخت نشده")
-        row += 1
-
-    # پاسخ Excel
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست تراکنش های من",
+        sheet_title="Charge Units",
+        filename='charge_units_report.xlsx',
+        columns=[
+            RowNumber(),
+            Column('واحد', 'title'),
+            Column('مالک / مستاجر', 'unit.get_label'),
+            Column('مبلغ پایه', 'base_charge'),
+            Column('جریمه', 'penalty_amount'),
+            Column('مبلغ نهایی', 'total_charge_month'),
+            Column('تاریخ اعلام', 'send_notification_date', show_jalali_date_excel),
+            Column('مهلت پرداخت', 'payment_deadline_date', show_jalali_date_excel),
+            Column('وضعیت پرداخت', lambda uc: "پرداخت شده" if uc.is_paid else "پرداخت نشده"),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=charge_units_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(unified_charges)
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -1007,31 +799,22 @@ def charge_units_report_pdf(request, charge_id):
     if request.user.is_authenticated:
         house = MyHouse.objects.filter(residents=request.user).order_by('-created_at').first()
     bank = Bank.get_default(request.user, house)
-    html_string = render_to_string('middleCharge/single_charge_pdf.html', {
+    context = {
         'charge': charge,
         'units': units,
         'house': house,
-        'bank': bank,
-        'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
-    })
+        'bank': bank
+    }
 
-    font_url = request.build_absolute_uri(static('fonts/Vazir.ttf'))
-    css = CSS(string=f"""
-          @page {{ size: A5 portrait; margin: 1cm; }}
-          @font-face {{
-              font-family: 'Vazir';
-              src: url('{font_url}');
-          }}
-          body {{
+    css = """
+          @page { size: A5 portrait; margin: 1cm; }
+          body {
               font-family: 'Vazir', sans-serif;
-          }}
-      """)
+          }
+      """
 
-    pdf = HTML(string=html_string).write_pdf(stylesheets=[css])
-
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="charge_units_report.pdf"'
-    return response
+    return PdfJob(request, template='middleCharge/single_charge_pdf.html', context=context,
+                  filename='charge_units_report.pdf', stylesheets=[css]).response()
 
 
 # =============================================================
@@ -1277,42 +1060,23 @@ def middle_civil_list_report_pdf(request):
 
     civil_charges = civil_charges.order_by('-created_at')
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-               @page {{ size: A4 landscape; margin: 1cm; }}
-               body {{
+    css = """
+               @page { size: A4 landscape; margin: 1cm; }
+               body {
                    font-family: 'BYekan', sans-serif;
-               }}
-               @font-face {{
-                   font-family: 'BYekan';
-                   src: url('{font_url}');
-               }}
-           """)
+               }
+           """
 
     # Render HTML template
     template = get_template("civil_charge_report_pdf.html")
     context = {
-        'font_path': font_url,
         'civil_charges': civil_charges,
         'query': query,
         'house': house,
         'today': datetime.now(),
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="civil_charge_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='civil_charge_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -1353,43 +1117,24 @@ def middle_civil_installments_report_pdf(request, civil_id, unit_id):
 
     installments_civil = installments.order_by('id')
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # Render HTML template
     template = get_template("civil_charge_installments_report_pdf.html")
     context = {
-        'font_path': font_url,
         'installments': installments_civil,
         'query': query,
         'unit': unit,
         'house': house,
         'today': datetime.now(),
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="civil_installments_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='civil_installments_report.pdf',
+                  stylesheets=[css]).response()
 
 
 # =============================================================
@@ -1634,42 +1379,23 @@ def middle_sewage_list_report_pdf(request):
 
     sewage_costs = sewage_costs.order_by('-created_at')
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-               @page {{ size: A4 landscape; margin: 1cm; }}
-               body {{
+    css = """
+               @page { size: A4 landscape; margin: 1cm; }
+               body {
                    font-family: 'BYekan', sans-serif;
-               }}
-               @font-face {{
-                   font-family: 'BYekan';
-                   src: url('{font_url}');
-               }}
-           """)
+               }
+           """
 
     # Render HTML template
     template = get_template("sewage_report_pdf.html")
     context = {
-        'font_path': font_url,
         'sewage_costs': sewage_costs,
         'query': query,
         'house': house,
         'today': datetime.now(),
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="sewage_list_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='sewage_list_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -1710,43 +1436,24 @@ def middle_sewage_installments_report_pdf(request, sewage_id, unit_id):
 
     installments_sewage = installments.order_by('id')
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # Render HTML template
     template = get_template("sewage_installments_report_pdf.html")
     context = {
-        'font_path': font_url,
         'installments': installments_sewage,
         'query': query,
         'unit': unit,
         'house': house,
         'today': datetime.now(),
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="sewage_installments_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='sewage_installments_report.pdf',
+                  stylesheets=[css]).response()
 
 
 # ===========================================================
@@ -1755,204 +1462,9 @@ def debtor_units_report(request):
     query = request.GET.get('q', '').strip()
 
     # ------------------------------------
-    # شارژهای پرداخت نشده
-    # ------------------------------------
-    charges = (
-        UnifiedCharge.objects
-        .filter(
-            is_paid=False,
-            unit__isnull=False,
-            user=request.user
-        )
-        .select_related('unit')
-        .order_by('-created_at')
-    )
-
-    # ------------------------------------
-    # اقساط عمرانی پرداخت نشده
-    # ------------------------------------
-    civil_installments = (
-        CivilInstallment.objects
-        .filter(
-            is_paid=False,
-            unit__isnull=False,
-            civil_manage__user=request.user
-        )
-        .select_related(
-            'unit',
-            'civil_manage'
-        )
-    )
-
-    # ------------------------------------
-    # اقساط فاضلاب پرداخت نشده
-    # ------------------------------------
-    sewage_installments = (
-        SewageInstallment.objects
-        .filter(
-            is_paid=False,
-            unit__isnull=False,
-            sewage_manage__user=request.user
-        )
-        .select_related(
-            'unit',
-            'sewage_manage'
-        )
-    )
-
-    # ------------------------------------
-    # جستجو
-    # ------------------------------------
-    if query:
-        search_filter = (
-            Q(unit__unit__icontains=query) |
-            Q(unit__owner_name__icontains=query) |
-            Q(unit__renters__renter_name__icontains=query)
-        )
-
-        charges = charges.filter(search_filter).distinct()
-
-        civil_installments = (
-            civil_installments
-            .filter(search_filter)
-            .distinct()
-        )
-
-        sewage_installments = (
-            sewage_installments
-            .filter(search_filter)
-            .distinct()
-        )
-
-    # ------------------------------------
-    # بروزرسانی جریمه شارژها
-    # ------------------------------------
-    for charge in charges:
-        charge.update_penalty()
-
-        charge.save(
-            update_fields=[
-                'total_charge_month',
-                'penalty_amount'
-            ]
-        )
-
-    # ------------------------------------
-    # ساخت دیکشنری واحدها
-    # ------------------------------------
-    units = defaultdict(lambda: {
-        'id': None,
-        'label': '',
-
-        'monthly_debt': 0,
-        'civil_debt': 0,
-        'sewage_debt': 0,
-        'total_debt': 0,
-
-        'charges': [],
-        'civil_installments': [],
-        'sewage_installments': [],
-    })
-
-    # ------------------------------------
-    # بدهی شارژ ماهیانه
-    # ------------------------------------
-    for charge in charges:
-        unit = charge.unit
-
-        renter = unit.get_active_renter()
-
-        label = (
-            f"واحد {unit.unit} - {renter.renter_name}"
-            if renter else
-            f"واحد {unit.unit} - {unit.owner_name}"
-        )
-
-        data = units[unit.id]
-
-        data['id'] = unit.id
-        data['label'] = label
-
-        data['monthly_debt'] += (
-            charge.total_charge_month or 0
-        )
-
-        data['charges'].append(charge)
-
-    # ------------------------------------
-    # بدهی عمرانی
-    # ------------------------------------
-    for installment in civil_installments:
-        unit = installment.unit
-
-        renter = unit.get_active_renter()
-
-        label = (
-            f"واحد {unit.unit} - {renter.renter_name}"
-            if renter else
-            f"واحد {unit.unit} - {unit.owner_name}"
-        )
-
-        data = units[unit.id]
-
-        data['id'] = unit.id
-        data['label'] = label
-
-        data['civil_debt'] += installment.amount
-
-        data['civil_installments'].append(
-            installment
-        )
-
-    # ------------------------------------
-    # بدهی فاضلاب
-    # ------------------------------------
-    for installment in sewage_installments:
-        unit = installment.unit
-
-        renter = unit.get_active_renter()
-
-        label = (
-            f"واحد {unit.unit} - {renter.renter_name}"
-            if renter else
-            f"واحد {unit.unit} - {unit.owner_name}"
-        )
-
-        data = units[unit.id]
-
-        data['id'] = unit.id
-        data['label'] = label
-
-        data['sewage_debt'] += installment.amount
-
-        data['sewage_installments'].append(
-            installment
-        )
-
-    # ------------------------------------
-    # محاسبه جمع کل بدهی هر واحد
-    # ------------------------------------
-    for data in units.values():
-        data['total_debt'] = (
-            data['monthly_debt']
-            + data['civil_debt']
-            + data['sewage_debt']
-        )
-
-    # ------------------------------------
-    # مرتب سازی بر اساس بیشترین بدهی
+    # بدهی شارژ، عمرانی و فاضلاب هر واحد؛ جمع، ترتیب و صفحه‌بندی داخل دیتابیس
     # ------------------------------------
-
-    units_with_debt = sorted(
-        units.values(),
-        key=lambda x: x['id'],
-        reverse=True
-    )
-
-    total_debt_all_units = sum(
-        unit['total_debt']
-        for unit in units_with_debt
-    )
+    report = DebtorReport(user=request.user, query=query)
 
     # ------------------------------------
     # صفحه بندی
@@ -1964,7 +1476,7 @@ def debtor_units_report(request):
     page_number = request.GET.get('page', 1)
 
     paginator = Paginator(
-        units_with_debt,
+        report,
         paginate_by
     )
 
@@ -1977,7 +1489,7 @@ def debtor_units_report(request):
         'debtor_creditor_report.html',
         {
             'units_with_debt': page_obj.object_list,
-            'total_debt_all_units': total_debt_all_units,
+            'total_debt_all_units': report.total_debt,
             'page_obj': page_obj,
             'query': query,
         }
@@ -1990,84 +1502,34 @@ def export_debtor_report_pdf(request):
     house = None
     if request.user.is_authenticated:
         house = MyHouse.objects.filter(residents=request.user).order_by('-created_at').first()
-    # -------------------------
-    # Unpaid charges
-    # -------------------------
-    charges = UnifiedCharge.objects.filter(is_paid=False, unit__isnull=False).select_related('unit')
-
-    # -------------------------
-    # Apply search query
-    # -------------------------
-    if query:
-        charges = charges.filter(
-            Q(unit__unit__icontains=query) |
-            Q(unit__owner_name__icontains=query) |
-            Q(unit__renters__renter_name__icontains=query)
-        ).distinct()
-
-    # -------------------------
-    # Update penalties
-    # -------------------------
-    for charge in charges:
-        charge.update_penalty()
-        charge.save(update_fields=['total_charge_month', 'penalty_amount'])
 
     # -------------------------
-    # Organize charges per unit
+    # Debtor units (shared with debtor_units_report)
     # -------------------------
-    units = defaultdict(lambda: {'id': None, 'label': '', 'total_debt': 0, 'charges': []})
-    for charge in charges:
-        unit = charge.unit
-        renter = unit.get_active_renter()
-        label = f"واحد {unit.unit} - {renter.renter_name}" if renter else f"واحد {unit.unit} - {unit.owner_name}"
-
-        data = units[unit.id]
-        data['id'] = unit.id
-        data['label'] = label
-        data['total_debt'] += charge.total_charge_month or 0
-        data['charges'].append(charge)
-
-    # -------------------------
-    # Sort units by unit number
-    # -------------------------
-    units_with_debt = sorted(units.values(), key=lambda x: x['id'])
-
-    # -------------------------
-    # Total debt all units
-    # -------------------------
-    total_debt_all_units = sum(unit['total_debt'] for unit in units_with_debt)
+    report = DebtorReport(user=request.user, query=query, ordering='unit_id', details=('charges',))
+    total_debt_all_units = report.total_debt
 
     # -------------------------
     # Render HTML template
     # -------------------------
+    # خود گزارش (نه یک generator) داده می‌شود تا برای محاسبه هش و ساخت PDF دوباره پیمایش شود
     template = get_template("debtor_report_pdf.html")
     context = {
-        'units_with_debt': units_with_debt,
+        'units_with_debt': report,
         'total_debt_all_units': total_debt_all_units,
         'today': datetime.now(),
         'house': house,
     }
-    html = template.render(context)
 
     # -------------------------
     # Generate PDF
     # -------------------------
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{ font-family: 'BYekan', sans-serif; }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-    """)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="debtor_report.pdf"'
-    return response
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body { font-family: 'BYekan', sans-serif; }
+    """
+    return PdfJob(request, template=template, context=context, filename='debtor_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -2075,106 +1537,56 @@ def export_debtor_report_excel(request):
     query = request.GET.get('q', '').strip()
 
     # -------------------------
-    # Unpaid charges
+    # Debtor units (shared with debtor_units_report)
     # -------------------------
-    charges = UnifiedCharge.objects.filter(is_paid=False, unit__isnull=False).select_related('unit')
-
-    # Apply search query
-    if query:
-        charges = charges.filter(
-            Q(unit__unit__icontains=query) |
-            Q(unit__owner_name__icontains=query) |
-            Q(unit__renters__renter_name__icontains=query)
-        ).distinct()
-
-    # Update penalties
-    for charge in charges:
-        charge.update_penalty()
-        charge.save(update_fields=['total_charge_month', 'penalty_amount'])
-
-    # Organize charges per unit
-    units = defaultdict(lambda: {'id': None, 'label': '', 'total_debt': 0, 'charges': []})
-    for charge in charges:
-        unit = charge.unit
-        renter = unit.get_active_renter()
-        label = f"واحد {unit.unit} - {renter.renter_name}" if renter else f"واحد {unit.unit} - {unit.owner_name}"
-
-        data = units[unit.id]
-        data['id'] = unit.id
-        data['label'] = label
-        data['total_debt'] += charge.total_charge_month or 0
-        data['charges'].append(charge)
-
-    # Sort units by unit number
-    units_with_debt = sorted(units.values(), key=lambda x: x['id'])
-    total_debt_all_units = sum(u['total_debt'] for u in units_with_debt)
+    report = DebtorReport(user=request.user, query=query, ordering='unit_id', details=('charges',))
+    units_with_debt = report.iter_rows()
+    total_debt_all_units = report.total_debt
 
     # -------------------------
     # Create Excel workbook
     # -------------------------
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Debtor Report"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value="گزارش بدهکاران")
-    title_cell.font = Font(bold=True, size=16)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
+    writer = ExcelSheetWriter("Debtor Report")
+    writer.title("گزارش بدهکاران", 7)
 
     # Total debt summary
-    ws.cell(row=2, column=1, value="جمع کل بدهی همه واحدها")
-    ws.cell(row=2, column=2, value=total_debt_all_units)
-    ws.cell(row=2, column=2).font = Font(bold=True, color="FF0000")  # Red
-
-    current_row = 4
-
-    # Headers for unit charges
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True)
+    writer.append([
+        "جمع کل بدهی همه واحدها",
+        writer.cell(total_debt_all_units, font=Font(bold=True, color="FF0000")),  # Red
+    ])
+    writer.blank()
 
+    headers = ['#', 'شرح', 'شارژ ماهیانه', 'جریمه', 'قابل پرداخت', 'مهلت پرداخت']
     for unit in units_with_debt:
         # Unit title
-        ws.cell(row=current_row, column=1, value=f"{unit['label']} - جمع بدهی: {unit['total_debt']}")
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=7)
-        current_row += 1
-
-        # Column headers
-        headers = ['#', 'شرح', 'شارژ ماهیانه', 'جریمه', 'قابل پرداخت', 'مهلت پرداخت']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=current_row, column=col_num, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        current_row += 1
+        writer.merged((
+            f"{unit['label']} - جمع بدهی: {unit['total_debt']} "
+            f"(شارژ: {unit['monthly_debt']}، عمرانی: {unit['civil_debt']}، فاضلاب: {unit['sewage_debt']})"
+        ), 7)
+        writer.header(headers)
 
         # Charges
         for idx, charge in enumerate(unit['charges'], start=1):
-            ws.cell(row=current_row, column=1, value=idx)
-            ws.cell(row=current_row, column=2, value=charge.title)
-            ws.cell(row=current_row, column=3, value=charge.amount)
-            ws.cell(row=current_row, column=4, value=charge.penalty_amount or 0)
-            ws.cell(row=current_row, column=5, value=charge.total_charge_month)
-            ws.cell(row=current_row, column=6, value=show_jalali(charge.payment_deadline_date))
-            current_row += 1
+            writer.append([
+                idx,
+                charge.title,
+                charge.amount,
+                charge.effective_penalty or 0,
+                charge.payable_total,
+                show_jalali(charge.payment_deadline_date),
+            ])
 
-        current_row += 1  # Empty row between units
+        writer.blank()  # Empty row between units
 
     # -------------------------
     # Return Excel response
     # -------------------------
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=debtor_report.xlsx'
-    wb.save(response)
-    return response
+    return writer.response('debtor_report.xlsx')
 
 
 # ======================================================
 @method_decorator(middle_admin_required, name='dispatch')
-class HistoryUnitReports(FormMixin, ListView):
+class HistoryUnitReports(KeysetPaginationMixin, FormMixin, ListView):
     model = UnitResidenceHistory
     form_class = UnitReportForm
     template_name = 'unit_history_reports.html'
@@ -2245,29 +1657,24 @@ def export_unit_history_report_pdf(request):
         )
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # Template PDF (باید جدولی مطابق unit_histories داشته باشد)
     template = get_template("unit_history_report_pdf.html")
@@ -2275,18 +1682,10 @@ def export_unit_history_report_pdf(request):
         'unit': unit,
         'unit_histories': unit_histories,
         'today': datetime.now(),
-        'font_path': font_url,
         'house': house
     }
-    html = template.render(context)
-
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="unit_{unit.unit}_history.pdf"'
-    return response
+    return PdfJob(request, template=template, context=context, filename=f'unit_{unit.unit}_history.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -2306,52 +1705,29 @@ def export_unit_history_report_excel(request):
         return HttpResponse("هیچ سابقه سکونتی برای این واحد وجود ندارد.", status=404)
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"واحد {unit.unit}"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"سوابق سکونت واحد {unit.unit}")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-
-    # Headers
-    headers = ['ردیف', 'نوع سکونت', 'نام', 'موبایل', 'تعداد نفرات', 'از تاریخ', 'تا تاریخ']
-
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
-
-    # Write data
-    for row_num, h in enumerate(histories, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # ردیف
-        ws.cell(row=row_num, column=2, value='مالک' if h.resident_type == 'owner' else 'مستاجر')
-        ws.cell(row=row_num, column=3, value=h.name)
-        ws.cell(row=row_num, column=4, value=h.mobile)
-        ws.cell(row=row_num, column=5, value=h.people_count)
-        ws.cell(row=row_num, column=6, value=show_jalali(h.from_date))
-        ws.cell(row=row_num, column=7, value=show_jalali(h.to_date) if h.to_date else 'اکنون')
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title=f"سوابق سکونت واحد {unit.unit}",
+        sheet_title=f"واحد {unit.unit}",
+        filename=f'unit_{unit.unit}_history.xlsx',
+        columns=[
+            RowNumber('ردیف'),
+            Column('نوع سکونت', lambda h: 'مالک' if h.resident_type == 'owner' else 'مستاجر'),
+            Column('نام', 'name'),
+            Column('موبایل', 'mobile'),
+            Column('تعداد نفرات', 'people_count'),
+            Column('از تاریخ', 'from_date', show_jalali),
+            Column('تا تاریخ', lambda h: show_jalali(h.to_date) if h.to_date else 'اکنون'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=unit_{unit.unit}_history.xlsx'
-    wb.save(response)
-    return response
+    return export.response(histories)
 
 
 # ====================================================================
 @method_decorator(middle_admin_required, name='dispatch')
-class ReportExpenseView(ListView):
+class ReportExpenseView(KeysetPaginationMixin, ListView):
     model = Expense
     template_name = 'expense_reports.html'
+    paginate_by = 40
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -2410,25 +1786,10 @@ class ReportExpenseView(ListView):
 
         context = super().get_context_data(**kwargs)
 
-        expenses = self.get_queryset()
-
-        paginator = Paginator(expenses, 40)
-
-        page_number = self.request.GET.get('page')
-
-        page_obj = paginator.get_page(page_number)
-
-        context['page_obj'] = page_obj
-
-        # تعداد فیلتر شده
-        context['total_expense'] = expenses.count()
-
-        # جمع مبلغ فیلتر شده
-        context['total_amount'] = (
-                expenses.aggregate(
-                    total=Sum('amount')
-                )['total'] or 0
-        )
+        # تعداد و جمع مبلغ فیلتر شده در یک کوئری
+        totals = self.object_list.aggregate(count=Count('id'), total=Sum('amount'))
+        context['total_expense'] = totals['count']
+        context['total_amount'] = totals['total'] or 0
 
         context['categories'] = ExpenseCategory.objects.filter(
             user=self.request.user
@@ -2483,42 +1844,23 @@ def export_expense_report_pdf(request):
     print(expenses)
 
     # Font setup
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # Render HTML template
     template = get_template("expense_report_pdf.html")
     context = {
         'expenses': expenses,
-        'font_path': font_url,
         'total_amount': total_amount,
         'house': house,
         'today': datetime.now(),
     }
-    html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="expenses_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='expenses_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -2556,50 +1898,25 @@ def export_expense_report_excel(request):
     except ValueError:
         expenses = Expense.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "expenses"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست هزینه‌ها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع هزینه', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'پرداخت به', 'شماره حساب',
-               'تاریخ پرداخت', 'توضیحات']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, expense in enumerate(expenses, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=expense.category.title)
-        ws.cell(row=row_num, column=3, value=expense.description)
-        ws.cell(row=row_num, column=4, value=expense.doc_no)
-        ws.cell(row=row_num, column=5, value=expense.amount)
-        ws.cell(row=row_num, column=6, value=show_jalali(expense.date))
-        ws.cell(row=row_num, column=7, value=expense.receiver_name)
-        ws.cell(row=row_num, column=8, value=expense.bank)
-        ws.cell(row=row_num, column=9, value=show_jalali(expense.payment_date))
-        ws.cell(row=row_num, column=10, value=expense.details)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست هزینه‌ها",
+        sheet_title="expenses",
+        filename='expenses_report.xlsx',
+        select_related=('category', 'bank'),
+        columns=[
+            RowNumber(),
+            Column('موضوع هزینه', 'category.title'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_no'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'date', show_jalali),
+            Column('پرداخت به', 'receiver_name'),
+            Column('شماره حساب', 'bank.bank_name'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('توضیحات', 'details'),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=expenses_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(expenses)
 
 
 # =======================================================
@@ -2769,7 +2086,7 @@ class ReportIncomeView(ListView):
         context['units'] = Unit.objects.filter(
             is_active=True,
             user__in=managed_users
-        )
+        ).with_active_renter()
 
         return context
 
@@ -2810,42 +2127,23 @@ def export_income_report_pdf(request):
         incomes = Income.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("income_report_pdf.html")
     context = {
         'incomes': incomes,
-        'font_path': font_url,
         'house': house,
         'today': datetime.now()
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="incomes_report.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='incomes_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -2880,51 +2178,26 @@ def export_income_report_excel(request):
             to_date = jdatetime.datetime.strptime(to_date_str, '%Y/%m/%d').togregorian().date()
             incomes = incomes.filter(doc_date__lte=to_date)
     except ValueError:
-        expenses = Expense.objects.none()
+        incomes = Income.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "incomes"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست درآمدها")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'موضوع درآمد', 'شرح سند', ' شماره سند', 'مبلغ', 'تاریخ سند', 'توضیحات', 'پرداخت کننده',
-               'تاریخ پرداخت']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, income in enumerate(incomes, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=income.category.subject)
-        ws.cell(row=row_num, column=3, value=income.description)
-        ws.cell(row=row_num, column=4, value=income.doc_number)
-        ws.cell(row=row_num, column=5, value=income.amount)
-        ws.cell(row=row_num, column=6, value=show_jalali(income.doc_date))
-        ws.cell(row=row_num, column=7, value=income.details)
-        ws.cell(row=row_num, column=8, value=income.payer_name)
-        ws.cell(row=row_num, column=9, value=show_jalali(income.payment_date))
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست درآمدها",
+        sheet_title="incomes",
+        filename='incomes.xlsx',
+        select_related=('category',),
+        columns=[
+            RowNumber(),
+            Column('موضوع درآمد', 'category.subject'),
+            Column('شرح سند', 'description'),
+            Column(' شماره سند', 'doc_number'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ سند', 'doc_date', show_jalali),
+            Column('توضیحات', 'details'),
+            Column('پرداخت کننده', 'payer_name'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=incomes.xlsx'
-    wb.save(response)
-    return response
+    return export.response(incomes)
 
 
 # ========================================================
@@ -3031,43 +2304,24 @@ def export_property_report_pdf(request):
         properties = Property.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("report_property_pdf.html")
     context = {
         'properties': properties,
-        'font_path': font_url,
         'house': house,
         'today': datetime.now()
 
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="properties_report.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='properties_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -3104,54 +2358,25 @@ def export_property_report_excel(request):
     except ValueError:
         properties = Property.objects.none()
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "properties"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست اموال ساختمان")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=8)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'نام اموال', 'تعداد', 'واحد', ' شماره اموال', ' موقعیت ', 'ارزش', 'تاریخ خرید',
-               'توضیحات', 'وضعیت پرداخت', 'تاریخ پرداخت']
-
-    bank = Bank.objects.filter(user=request.user)
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, property in enumerate(properties, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=property.property_name)
-        ws.cell(row=row_num, column=3, value=property.count)
-        ws.cell(row=row_num, column=4, value=property.property_unit)
-        ws.cell(row=row_num, column=5, value=property.property_code)
-        ws.cell(row=row_num, column=6, value=property.property_location)
-        ws.cell(row=row_num, column=7, value=property.property_price)
-        jalali_date = jdatetime.date.fromgregorian(date=property.property_purchase_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=8, value=jalali_date)
-        ws.cell(row=row_num, column=9, value=property.details)
-        ws.cell(row=row_num, column=10, value='پرداخت شده' if property.is_paid == '1' else 'پرداخت نشده')
-        ws.cell(row=row_num, column=11, value=show_jalali_date(property.payment_date))
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست اموال ساختمان",
+        sheet_title="properties",
+        filename='properties_report.xlsx',
+        columns=[
+            RowNumber(),
+            Column('نام اموال', 'property_name'),
+            Column('تعداد', 'count'),
+            Column('واحد', 'property_unit'),
+            Column(' شماره اموال', 'property_code'),
+            Column(' موقعیت ', 'property_location'),
+            Column('ارزش', 'property_price'),
+            Column('تاریخ خرید', 'property_purchase_date', to_jalali),
+            Column('توضیحات', 'details'),
+            Column('وضعیت پرداخت', lambda item: 'پرداخت شده' if item.is_paid else 'پرداخت نشده'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=properties_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(properties)
 
 
 # ==========================================================
@@ -3258,43 +2483,24 @@ def export_maintenance_report_pdf(request):
                 maintenances = maintenances.filter(**{lookup: value.strip()})
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-            @page {{ size: A4 landscape; margin: 1cm; }}
-            body {{
+    css = """
+            @page { size: A4 landscape; margin: 1cm; }
+            body {
                 font-family: 'BYekan', sans-serif;
-            }}
-            @font-face {{
-                font-family: 'BYekan';
-                src: url('{font_url}');
-            }}
-        """)
+            }
+        """
 
     # رندر قالب HTML
     template = get_template("report_maintenance_pdf.html")
     context = {
         'maintenances': maintenances,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
         'total_amount': total_amount
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="maintenances_report.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='maintenances_report.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -3322,53 +2528,25 @@ def export_maintenance_report_excel(request):
             else:
                 maintenances = maintenances.filter(**{lookup: value.strip()})
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "maintenances"
-    ws.sheet_view.rightToLeft = True
-
-    # ✅ Add title
-    title_cell = ws.cell(row=1, column=1, value="لیست هزینه های تعمیرات و نگهداری")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=9)
-
-    # ✅ Style setup
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold
-    header_font = Font(bold=True, color="000000")  # Black bold text
-
-    headers = ['#', 'شرح کار', 'تاریخ شروع', ' تاریخ پایان', ' اجرت/دستمزد ', 'شرکت خدماتی', 'شماره فاکتور',
-               'توضیحات', 'آخرین وضعیت', 'وضعیت پرداخت', 'تاریخ پرداخت']
-
-    # ✅ Write header (row 2)
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # ✅ Write data (start from row 3)
-    for row_num, maintenance in enumerate(maintenances, start=3):
-        ws.cell(row=row_num, column=1, value=row_num - 2)  # index starts from 1
-        ws.cell(row=row_num, column=2, value=maintenance.maintenance_description)
-        jalali_date = jdatetime.date.fromgregorian(date=maintenance.maintenance_start_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=3, value=jalali_date)
-        jalali_date = jdatetime.date.fromgregorian(date=maintenance.maintenance_end_date).strftime('%Y/%m/%d')
-        ws.cell(row=row_num, column=4, value=jalali_date)
-        ws.cell(row=row_num, column=5, value=maintenance.maintenance_price)
-        ws.cell(row=row_num, column=6, value=maintenance.service_company)
-        ws.cell(row=row_num, column=7, value=maintenance.maintenance_document_no)
-        ws.cell(row=row_num, column=8, value=maintenance.details)
-        ws.cell(row=row_num, column=9, value=maintenance.maintenance_status)
-        ws.cell(row=row_num, column=10, value='پرداخت نشده' if maintenance.is_paid == 'True' else 'پرداخت شده')
-        ws.cell(row=row_num, column=9, value=maintenance.payment_date)
-
-    # ✅ Return file
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست هزینه های تعمیرات و نگهداری",
+        sheet_title="maintenances",
+        filename='maintenances_report.xlsx',
+        columns=[
+            RowNumber(),
+            Column('شرح کار', 'maintenance_description'),
+            Column('تاریخ شروع', 'maintenance_start_date', to_jalali),
+            Column(' تاریخ پایان', 'maintenance_end_date', to_jalali),
+            Column(' اجرت/دستمزد ', 'maintenance_price'),
+            Column('شرکت خدماتی', 'service_company'),
+            Column('شماره فاکتور', 'maintenance_document_no'),
+            Column('توضیحات', 'details'),
+            Column('آخرین وضعیت', 'maintenance_status'),
+            Column('وضعیت پرداخت', lambda item: 'پرداخت شده' if item.is_paid else 'پرداخت نشده'),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+        ],
     )
-    response['Content-Disposition'] = 'attachment; filename=maintenances_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(maintenances)
 
 
 # =================================================
@@ -3458,7 +2636,7 @@ class PayReceiveReportView(ListView):
 
         context.update({
             'banks': Bank.objects.filter(user=self.request.user),
-            'units': Unit.objects.filter(is_active=True, user__in=managed_users),
+            'units': Unit.objects.filter(is_active=True, user__in=managed_users).with_active_renter(),
         })
 
         return context
@@ -3522,42 +2700,23 @@ def export_pay_receive_report_pdf(request):
         funds = Fund.objects.none()
 
     # مسیر فونت
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-                @page {{ size: A4 landscape; margin: 1cm; }}
-                body {{
+    css = """
+                @page { size: A4 landscape; margin: 1cm; }
+                body {
                     font-family: 'BYekan', sans-serif;
-                }}
-                @font-face {{
-                    font-family: 'BYekan';
-                    src: url('{font_url}');
-                }}
-            """)
+                }
+            """
 
     # رندر قالب HTML
     template = get_template("pay_receive_report_pdf.html")
     context = {
         'funds': funds,
-        'font_path': font_url,
         'house': house,
         'today': datetime.now()
     }
 
-    html = template.render(context)
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # تولید پاسخ PDF
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="pay_receive_reports.pdf"'
-
-    pdf_merger.write(response)
-    return response
+    return PdfJob(request, template=template, context=context, filename='pay_receive_reports.pdf',
+                  stylesheets=[css]).response()
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -3566,42 +2725,25 @@ def export_pay_receive_report_excel(request):
     funds = Fund.objects.filter(
         Q(user=manager) | Q(user__manager=manager)
     ).filter(
-        Q(is_received=True) | Q(is_paid=True)
+        Q(is_received_money=True) | Q(is_paid_money=True)
     ).order_by('-payment_date')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Headers
-    headers = [' بانک', 'تاریخ پرداخت', 'شرح', 'پرداخت کننده/واریز کننده', 'شماره سند', 'بدهکار', 'بستانکار']
-
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(funds, start=3):
-        ws.cell(row=row_num, column=1, value=f"{fund.bank.bank_name} - {fund.bank.account_no}")
-        ws.cell(row=row_num, column=2, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=3, value=fund.payment_description)
-        ws.cell(row=row_num, column=4, value=f"{fund.payer_name} - {fund.receiver_name}")
-        ws.cell(row=row_num, column=5, value=fund.doc_number)
-        ws.cell(row=row_num, column=6, value=fund.debtor_amount)
-        ws.cell(row=row_num, column=7, value=fund.creditor_amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        sheet_title="units",
+        filename='report_pay_receive.xlsx',
+        select_related=('bank',),
+        columns=[
+            Column(' بانک', fund_bank_label),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('پرداخت کننده/واریز کننده', lambda fund: f"{fund.payer_name} - {fund.receiver_name}"),
+            Column('شماره سند', 'doc_number'),
+            Column('بدهکار', 'debtor_amount'),
+            Column('بستانکار', 'creditor_amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=report_pay_receive.xlsx'
-    wb.save(response)
-    return response
+    return export.response(funds)
 
 # =========================================================
 @method_decorator(middle_admin_required, name='dispatch')
@@ -3685,170 +2827,75 @@ def house_balance_view(request):
         balance=Subquery(last_balance.values('balance_after')[:1])
     )
 
-    funds = (
-        Fund.objects
-        .select_related('bank', 'content_type')
-        .filter(Q(user=request.user) | Q(user__manager=request.user), **payment_filter)
-        .order_by('-payment_date')
-    )
+    # جمع گروه‌ها از جدول تجمیعی ماهانه (admin_panel.services.ledger_rollups)
+    house_id = house.id if house else None
+    totals = balance_totals(house_id, start_date, end_date, bank_id)
 
-    totals = funds.aggregate(
-        total_income=Sum('debtor_amount'),
-        total_expense=Sum('creditor_amount'),
-    )
     # موجودی صندوق
-    balance = (totals['total_income'] or 0) - (totals['total_expense'] or 0)
+    balance = totals['fund', 'in'] - totals['fund', 'out']
 
-
-    total_charge_unpaid = \
-        UnifiedCharge.objects.filter(is_paid=False, user=request.user, **payment_filter).aggregate(
-            Sum('total_charge_month'))[
-            'total_charge_month__sum']
+    # شارژها و اقساط پرداخت نشده با جریمه روزانه تغییر می‌کنند و مستقیم خوانده می‌شوند
+    total_charge_unpaid = UnifiedCharge.objects.filter(
+        is_paid=False, house_id=house_id, **payment_filter
+    ).aggregate(total=Sum('total_charge_month'))['total'] or 0
 
     # اقساط عمرانی پرداخت نشده
-    total_civil_unpaid = (
-                             CivilInstallment.objects.filter(
-                                 is_paid=False,
-                                 civil_manage__user=request.user
-                             )
-                             .aggregate(total=Sum('amount'))
-                         )['total'] or 0
+    total_civil_unpaid = CivilInstallment.objects.filter(
+        is_paid=False, house_id=house_id
+    ).aggregate(total=Sum('amount'))['total'] or 0
 
     # اقساط فاضلاب پرداخت نشده
-    total_sewage_unpaid = (
-                              SewageInstallment.objects.filter(
-                                  is_paid=False,
-                                  sewage_manage__user=request.user
-                              )
-                              .aggregate(total=Sum('amount'))
-                          )['total'] or 0
+    total_sewage_unpaid = SewageInstallment.objects.filter(
+        is_paid=False, house_id=house_id
+    ).aggregate(total=Sum('amount'))['total'] or 0
 
     # جمع کل بدهی واحدها
-    total_units_debt = (
-            total_charge_unpaid or 0
-            + total_civil_unpaid or 0
-            + total_sewage_unpaid or 0
-    )
+    total_units_debt = total_charge_unpaid + total_civil_unpaid + total_sewage_unpaid
 
     # =================================== part 2 =====================
 
-    total_incomes_exclude_unpaid = Income.objects.filter(is_paid=False,
-                                                         user=request.user,
-                                                         **doc_income_filter
-                                                         ).aggregate(Sum('amount'))[
-        'amount__sum']
-
-    total_expenses_exclude_unpaid = Expense.objects.filter(
-        is_paid=False,
-        user=request.user,
-        **doc_expense_filter
-    ).aggregate(Sum('amount'))[
-        'amount__sum']
+    total_incomes_exclude_unpaid = totals['income_unpaid', 'in']
+    total_expenses_exclude_unpaid = totals['expense_unpaid', 'out']
 
     # ================================ part 3 ==========================
-    total_incomes = Income.objects.filter(user=request.user, **payment_filter, is_paid=True).aggregate(Sum('amount'))[
-        'amount__sum']
-
-    total_receive_money = ReceiveMoney.objects.filter(user=request.user, **payment_filter).aggregate(Sum('amount'))[
-        'amount__sum']
-
-    total_unit_pay = UserPayMoney.objects.filter(
-        Q(user=request.user) | Q(user__manager=request.user), **payment_filter).aggregate(Sum('amount'))[
-        'amount__sum']
-
-    total_charges = \
-        UnifiedCharge.objects.filter(user=request.user, **payment_filter).exclude().aggregate(
-            Sum('total_charge_month'))[
-            'total_charge_month__sum']
-
-    total_civil = \
-        CivilInstallment.objects.filter(is_paid=True, house=house, **payment_filter).aggregate(Sum('amount'))[
-            'amount__sum']
-
-    total_assets = (
-            (total_incomes or 0)
-            + (total_receive_money or 0)
-            + (total_unit_pay or 0)
-            + (total_charges or 0)
-            + (total_civil or 0)
-    )
-
-    # ----------------------------------------- part 4 -----------------------
+    total_incomes = totals['income', 'in']
+    total_receive_money = sum_categories(totals, 'receive_money', 'receive_money_unpaid')
+    total_unit_pay = totals['unit_pay', 'in']
+    total_charges = totals['charge', 'in'] + total_charge_unpaid
+    total_civil = totals['civil', 'in']
 
-    total_expenses = \
-        Expense.objects.filter(user=request.user, category__is_default=False, **payment_filter, is_paid=True).aggregate(
-            Sum('amount'))[
-            'amount__sum']
+    total_assets = total_incomes + total_receive_money + total_unit_pay + total_charges + total_civil
 
-    total_pay_money = PayMoney.objects.filter(user=request.user, **payment_filter, ).aggregate(Sum('amount'))[
-        'amount__sum']
-    total_maintenances = \
-        Maintenance.objects.filter(user=request.user, **payment_filter, is_paid=True).aggregate(
-            Sum('maintenance_price'))[
-            'maintenance_price__sum']
-
-    total_properties = \
-        Property.objects.filter(user=request.user, **payment_filter, is_paid=True).aggregate(Sum('property_price'))[
-            'property_price__sum']
-
-    utility_expenses = Expense.objects.filter(
-        user=request.user,
-        is_paid=True,
-        category__title__in=[
-            'هزینه آب',
-            'هزینه برق',
-            'هزینه گاز'
-        ],
-        **payment_filter
-    ).aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-
-    salary_expenses = Expense.objects.filter(
-        user=request.user,
-        is_paid=True,
-        category__title__in=[
-            'هزینه حقوق و دستمزد',
-        ],
-        **payment_filter
-    ).aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-
-    insurance_expenses = Expense.objects.filter(
-        user=request.user,
-        is_paid=True,
-        category__title__in=[
-            'هزینه بیمه',
-        ],
-        **payment_filter
-    ).aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    # ----------------------------------------- part 4 -----------------------
 
-    total_sewage = \
-        SewageInstallment.objects.filter(is_paid=True, house=house, **payment_filter).aggregate(Sum('amount'))[
-            'amount__sum']
+    total_expenses = totals['expense', 'out']
+    total_pay_money = sum_categories(totals, 'pay_money', 'pay_money_unpaid')
+    total_maintenances = totals['maintenance', 'out']
+    total_properties = totals['property', 'out']
+    utility_expenses = totals['expense_utility', 'out']
+    salary_expenses = totals['expense_salary', 'out']
+    insurance_expenses = totals['expense_insurance', 'out']
+    total_sewage = totals['sewage', 'out']
 
     total_debts = (
-            (total_pay_money or 0)
-            + (total_expenses or 0)
-            + (total_maintenances or 0)
-            + (total_properties or 0)
-            + (utility_expenses or 0)
-            + (salary_expenses or 0)
-            + (insurance_expenses or 0)
-            + (total_sewage or 0)
+            total_pay_money
+            + total_expenses
+            + total_maintenances
+            + total_properties
+            + utility_expenses
+            + salary_expenses
+            + insurance_expenses
+            + total_sewage
     )
 
     # ----------------------------------------- part 5 --------------------------
 
-    total_amount_assets_debts = (total_assets or 0) - (total_debts or 0)
+    total_amount_assets_debts = total_assets - total_debts
     total_status = (
-            (balance or 0)
-            + (total_incomes_exclude_unpaid or 0)
-            + (total_units_debt or 0)
-            - (total_expenses_exclude_unpaid or 0)
+            balance
+            + total_incomes_exclude_unpaid
+            + total_units_debt
+            - total_expenses_exclude_unpaid
     )
 
     context = {
@@ -3895,41 +2942,19 @@ def middleFund_report_excel(request):
     report = AdminFund.objects.filter(user=user).order_by('-payment_date')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"لیست تراکنش های من ")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=5)
-
-    # Headers
-    headers = ['تاریخ پرداخت', 'شرح', 'روش پرداخت', 'شماره تراکنش', 'مبلغ']
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, fund in enumerate(report, start=3):
-        ws.cell(row=row_num, column=1, value=show_jalali(fund.payment_date))
-        ws.cell(row=row_num, column=2, value=fund.payment_description)
-        ws.cell(row=row_num, column=3, value=fund.payment_gateway)
-        ws.cell(row=row_num, column=4, value=fund.transaction_no)
-        ws.cell(row=row_num, column=5, value=fund.amount)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست تراکنش های من ",
+        sheet_title="units",
+        filename='middle_fund_report.xlsx',
+        columns=[
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شرح', 'payment_description'),
+            Column('روش پرداخت', 'payment_gateway'),
+            Column('شماره تراکنش', 'transaction_no'),
+            Column('مبلغ', 'amount'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=middle_fund_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(report)
 
 
 @login_required(login_url=settings.LOGIN_URL_ADMIN)
@@ -3959,49 +2984,67 @@ def middleFund_report_pdf(request):
         )
 
     # PDF settings
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # Render template
     template = get_template("user_report_pdf.html")
     context = {
         'funds': funds,
         'query': query,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
 
-    html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
+    return PdfJob(request, template=template, context=context, filename='fund_middle_report.pdf',
+                  stylesheets=[css]).response()
+
 
-    # Response
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="fund_middle_report.pdf"'
-    return response
 
 
 
+# -------------------------------
+# کارهای پس‌زمینه PDF
+# -------------------------------
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def pdf_job_status(request, digest):
+    """
+    وضعیت ساخت یک PDF برای صفحه انتظار
+    """
+    state = get_pdf_job_state(request.user.pk, digest)
+    if not state:
+        return JsonResponse({'state': 'missing'}, status=404)
+    if state['state'] == 'done':
+        return JsonResponse({'state': 'done', 'download_url': reverse('pdf_job_download', args=[digest])})
+    return JsonResponse({'state': state['state']})
+
+
+@login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
+def pdf_job_download(request, digest):
+    """
+    دانلود PDF ساخته‌شده؛ هر کاربر فقط به فایل‌های خودش دسترسی دارد
+    """
+    path = pdf_job_path(request.user.pk, digest)
+    if not os.path.exists(path):
+        raise Http404
+
+    filename = os.path.basename(request.GET.get('filename', '')) or 'report.pdf'
+    if not filename.lower().endswith('.pdf'):
+        filename += '.pdf'
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
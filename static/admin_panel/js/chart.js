@@ -610,11 +610,20 @@ window.addEventListener("DOMContentLoaded", function () {
 // =========================================
 document.addEventListener("DOMContentLoaded", function () {
 
-    const ownerRenterStats = JSON.parse(
-        document.getElementById("owner_renter_json").textContent
-    );
+    const canvas = document.getElementById('doughnutChart');
+    if (!canvas || !canvas.dataset.url) {
+        return;
+    }
+
+    // آمار سکونت جدا از صفحه از middle_occupancy_stats خوانده می‌شود
+    fetch(canvas.dataset.url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+        .then(response => response.json())
+        .then(ownerRenterStats => drawOwnerRenterChart(canvas, ownerRenterStats));
+});
 
-    const ctx = document.getElementById('doughnutChart').getContext('2d');
+function drawOwnerRenterChart(canvas, ownerRenterStats) {
+
+    const ctx = canvas.getContext('2d');
 
     new Chart(ctx, {
         type: 'doughnut',
@@ -645,7 +654,7 @@ document.addEventListener("DOMContentLoaded", function () {
         }
     });
 
-});
+}
 
 // ======
 
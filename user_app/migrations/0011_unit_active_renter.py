@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_active_renters(apps, schema_editor):
+    """
+    active_renter واحدهای موجود؛ معادل UnitQuerySet.sync_active_renters
+    """
+    Unit = apps.get_model('user_app', 'Unit')
+    Renter = apps.get_model('user_app', 'Renter')
+
+    Unit.objects.update(active_renter=Subquery(
+        Renter.objects.filter(unit=OuterRef('pk'), renter_is_active=True).order_by('pk').values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_app', '0010_alter_housepaymentgateway_gateway_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='active_renter',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user_app.renter', verbose_name='مستاجر فعال'),
+        ),
+        migrations.RunPython(fill_active_renters, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ import json
 
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import OuterRef, Q, Subquery
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 
@@ -218,6 +219,24 @@ class HousePaymentGateway(models.Model):
         return f"{self.house.name} - {self.gateway_type}"
 
 
+class UnitQuerySet(models.QuerySet):
+    def with_active_renter(self):
+        """
+        مستاجر فعال هر واحد در همان کوئری (JOIN روی active_renter)؛ get_label و get_active_renter
+        دیگر کوئری جدا نمی‌زنند
+        """
+        return self.select_related('active_renter')
+
+    def sync_active_renters(self):
+        """
+        active_renter واحدهای queryset از روی جدول مستاجرین با یک UPDATE؛
+        اولین مستاجر فعال (کمترین شناسه) یا NULL
+        """
+        return self.update(active_renter=Subquery(
+            Renter.objects.filter(unit=OuterRef('pk'), renter_is_active=True).order_by('pk').values('pk')[:1]
+        ))
+
+
 class Unit(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='کاربر')
     unit = models.IntegerField(verbose_name='واحد')
@@ -256,6 +275,16 @@ class Unit(models.Model):
     owner_transaction_no = models.CharField(max_length=30, null=True, blank=True)
 
     is_active = models.BooleanField(default=True, verbose_name='فعال/غیر فعال')
+    # نسخه denormalized مستاجر فعال؛ با ذخیره و update مستاجرین همگام می‌شود
+    active_renter = models.ForeignKey(
+        'Renter', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name='مستاجر فعال'
+    )
+
+    objects = UnitQuerySet.as_manager()
+
+    # مقادیر ستون‌ها در آخرین خواندن یا ذخیره (from_db و save)؛ مبنای get_dirty_fields
+    _snapshot = None
 
     class Meta:
         unique_together = ('user', 'unit')
@@ -269,7 +298,12 @@ class Unit(models.Model):
         return f"واحد {self.unit} - {self.owner_name}"
 
     def get_active_renter(self):
-        return self.renters.filter(renter_is_active=True).first()
+        # اگر مستاجرهای فعال از قبل با Prefetch(to_attr='active_renters') خوانده شده باشند، کوئری جدا لازم نیست
+        if hasattr(self, 'active_renters'):
+            return next(iter(self.active_renters), None)
+        if self.active_renter_id is None:
+            return None
+        return self.active_renter
 
     @property
     def get_label(self):
@@ -296,131 +330,190 @@ class Unit(models.Model):
         else:
             self.people_count = int(self.owner_people_count or 0)
 
-    def _close_current_resident(self, date):
-        UnitResidenceHistory.objects.filter(
-            unit=self,
-            to_date__isnull=True
-        ).update(to_date=date)
-
-    def save(self, *args, **kwargs):
-        today = timezone.now().date()
-        is_new = self.pk is None
-
-        old = None
-        if not is_new:
-            old = Unit.objects.get(pk=self.pk)
-
-        # محاسبه پارکینگ
-        count = 0
-        if self.extra_parking_first:
-            count += 1
-        if self.extra_parking_second:
-            count += 1
-        self.parking_counts = count
-
-        # ذخیره اولیه
-        super().save(*args, **kwargs)
+    # ------------------------------------------------------------------
+    # ردیابی تغییرات
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self, fields=None):
+        """
+        مقادیر فیلدهای خوانده‌شده (یا ذخیره‌شده) برای مقایسه در ذخیره بعدی؛ فیلدهای deferred ثبت نمی‌شوند
+        """
+        snapshot = {} if fields is None or self._snapshot is None else self._snapshot
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or {field.name, field.attname} & fields):
+                snapshot[field.attname] = self.__dict__[field.attname]
+        self._snapshot = snapshot
+
+    def _previous_state(self):
+        """
+        مقادیر ردیف در آخرین خواندن یا ذخیره؛ نمونه‌ای که از پایگاه داده خوانده نشده یک‌بار خوانده می‌شود
+        """
+        if self._snapshot is None and self.pk is not None:
+            attnames = [field.attname for field in self._meta.concrete_fields]
+            self._snapshot = Unit.objects.filter(pk=self.pk).values(*attnames).first() or {}
+        return self._snapshot or {}
+
+    def get_previous_value(self, field_name):
+        return self._previous_state().get(self._meta.get_field(field_name).attname)
+
+    def get_dirty_fields(self):
+        """
+        نام فیلدهایی که مقدارشان با آخرین خواندن یا ذخیره فرق دارد
+        """
+        previous = self._previous_state()
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (field.attname not in previous or previous[field.attname] != self.__dict__[field.attname])
+        ]
+
+    def _owner_identity_changed(self, previous):
+        """
+        (نام تغییر کرده، موبایل تغییر کرده) نسبت به مقادیر قبلی
+        """
+        return (
+            (previous.get('owner_name') or "") != (self.owner_name or ""),
+            (previous.get('owner_mobile') or "") != (self.owner_mobile or ""),
+        )
 
-        # بروزرسانی نفرات
-        self.update_people_count()
-        super().save(update_fields=['people_count', 'parking_counts'])
+    # ------------------------------------------------------------------
+    # سابقه سکونت
+    # ------------------------------------------------------------------
+    def _close_current_resident(self, date, resident_type=None):
+        histories = UnitResidenceHistory.objects.filter(unit=self, to_date__isnull=True)
+        if resident_type:
+            histories = histories.filter(resident_type=resident_type)
+        histories.update(to_date=date)
+
+    def _create_owner_history(self, date):
+        UnitResidenceHistory.objects.create(
+            unit=self,
+            resident_type='owner',
+            name=self.owner_name,
+            mobile=self.owner_mobile,
+            people_count=int(self.owner_people_count or 0),
+            from_date=date,
+            changed_by=self.user
+        )
 
-        # مستاجر فعال
-        active_renter = self.get_active_renter()
+    def _create_renter_history(self, renter, date):
+        UnitResidenceHistory.objects.create(
+            unit=self,
+            resident_type='renter',
+            renter=renter,
+            name=renter.renter_name,
+            mobile=renter.renter_mobile,
+            people_count=int(renter.renter_people_count or 0),
+            from_date=renter.start_date or date,
+            changed_by=self.user
+        )
 
-        # -----------------------
-        # واحد جدید
-        # -----------------------
-        if is_new:
-            UnitResidenceHistory.objects.create(
+    def _record_residence_change(self, previous, written, today):
+        """
+        سابقه سکونت فقط وقتی هویت مالک (نام/موبایل ذخیره‌شده) یا مستاجر فعال عوض شده باشد؛
+        تغییر مشخصات همان مستاجر در Renter.save به سابقه باز او منتقل می‌شود
+        """
+        name_changed, mobile_changed = self._owner_identity_changed(previous)
+        if written is not None:
+            name_changed = name_changed and 'owner_name' in written
+            mobile_changed = mobile_changed and 'owner_mobile' in written
+        renter_changed = previous.get('active_renter_id') != self.active_renter_id
+
+        closed = False
+        if name_changed or mobile_changed:
+            last_owner = UnitResidenceHistory.objects.filter(
                 unit=self,
                 resident_type='owner',
-                name=self.owner_name,
-                mobile=self.owner_mobile,
-                people_count=int(self.owner_people_count or 0),
-                from_date=today,
-                changed_by=self.user
-            )
-            if active_renter:
-                UnitResidenceHistory.objects.create(
-                    unit=self,
-                    resident_type='renter',
-                    renter=active_renter,
-                    name=active_renter.renter_name,
-                    mobile=active_renter.renter_mobile,
-                    people_count=int(active_renter.renter_people_count or 0),
-                    from_date=active_renter.start_date or today,
-                    changed_by=self.user
-                )
-            return
-
-        # -----------------------
-        # بروزرسانی مالک
-        # -----------------------
-        last_owner = UnitResidenceHistory.objects.filter(
-            unit=self,
-            resident_type='owner',
-        ).first()
-
-        if old and last_owner:
-            old_name = old.owner_name or ""
-            new_name = self.owner_name or ""
-            old_mobile = old.owner_mobile or ""
-            new_mobile = self.owner_mobile or ""
+                to_date__isnull=True,
+            ).order_by('-pk').first()
 
             # اگر تغییر کامل (نام و موبایل) داشتیم → رکورد جدید بساز
-            if old_name != new_name and old_mobile != new_mobile:
+            if last_owner and name_changed and mobile_changed:
                 self._close_current_resident(today)
-                if active_renter:
-                    Renter.objects.filter(pk=active_renter.pk).update(
+                closed = True
+                if self.active_renter_id:
+                    Renter.objects.filter(pk=self.active_renter_id).update(
                         renter_is_active=False,
                         end_date=today
                     )
-                UnitResidenceHistory.objects.create(
-                    unit=self,
-                    resident_type='owner',
-                    name=self.owner_name,
-                    mobile=self.owner_mobile,
-                    people_count=int(self.owner_people_count or 0),
-                    from_date=today,
-                    changed_by=self.user
-                )
+                    self.active_renter = None
+                    renter_changed = False
+                self._create_owner_history(today)
             # اگر فقط نام یا موبایل تغییر کرده → بروزرسانی رکورد موجود
-            elif old_name != new_name or old_mobile != new_mobile:
+            elif last_owner:
                 last_owner.name = self.owner_name
                 last_owner.mobile = self.owner_mobile
                 last_owner.people_count = int(self.owner_people_count or 0)
                 last_owner.save(update_fields=['name', 'mobile', 'people_count'])
 
-        # -----------------------
-        # بروزرسانی مستاجر
-        # -----------------------
-        if active_renter:
-            last_renter = UnitResidenceHistory.objects.filter(
-                unit=self,
-                resident_type='renter',
-                to_date__isnull=True
-            ).first()
-
-            if last_renter and last_renter.renter == active_renter:
-                # فقط بروزرسانی رکورد موجود
-                last_renter.name = active_renter.renter_name
-                last_renter.mobile = active_renter.renter_mobile
-                last_renter.people_count = int(active_renter.renter_people_count or 0)
-                last_renter.save(update_fields=['name', 'mobile', 'people_count'])
-            else:
+        if renter_changed:
+            active_renter = self.active_renter
+            if active_renter:
                 # مستاجر جدید → رکورد قبلی بسته شود و رکورد جدید ایجاد شود
                 self._close_current_resident(today)
-                UnitResidenceHistory.objects.create(
-                    unit=self,
-                    resident_type='renter',
-                    renter=active_renter,
-                    name=active_renter.renter_name,
-                    mobile=active_renter.renter_mobile,
-                    people_count=int(active_renter.renter_people_count or 0),
-                    from_date=active_renter.start_date or today,
-                    changed_by=self.user
-                )
+                self._create_renter_history(active_renter, today)
+            elif not closed:
+                # مستاجر رفته است
+                self._close_current_resident(today, resident_type='renter')
+
+    def save(self, *args, **kwargs):
+        today = timezone.now().date()
+        is_new = self.pk is None
+        loaded = self._snapshot is not None
+        previous = {} if is_new else self._previous_state()
+        if not is_new and not loaded:
+            # نمونه‌ای که در حافظه ساخته شده؛ مستاجر فعال همان مقدار همگام‌شده ردیف است
+            self.active_renter_id = previous.get('active_renter_id')
+
+        # فیلدهای مشتق‌شده پیش از تنها INSERT/UPDATE محاسبه می‌شوند
+        self.parking_counts = int(bool(self.extra_parking_first)) + int(bool(self.extra_parking_second))
+        self.update_people_count()
+
+        written = None
+        if not is_new and previous:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # فقط فیلدهای تغییرکرده نوشته می‌شوند؛ active_renter را همگام‌سازی مستاجرین می‌نویسد
+                written = set(self.get_dirty_fields()) - {'active_renter'}
+            else:
+                derived = {'people_count', 'parking_counts'} & set(self.get_dirty_fields())
+                written = set(update_fields) | derived
+            kwargs['update_fields'] = written
+
+        super().save(*args, **kwargs)
+
+        if is_new:
+            self._create_owner_history(today)
+            if self.active_renter:
+                self._create_renter_history(self.active_renter, today)
+        else:
+            self._record_residence_change(previous, written, today)
+
+        # مقادیر ذخیره‌شده مبنای مقایسه ذخیره بعدی‌اند؛ مستاجر فعال همیشه (ثبت‌شده در سابقه)
+        self._take_snapshot(None if written is None else written | {'active_renter'})
+
+
+class RenterQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        update گروهی روی وضعیت یا واحد مستاجر، active_renter واحدهای قبلی و جدید را همگام می‌کند
+        """
+        if not {'renter_is_active', 'unit', 'unit_id'} & set(kwargs):
+            return super().update(**kwargs)
+        unit_ids = set(self.exclude(unit__isnull=True).values_list('unit_id', flat=True))
+        rows = super().update(**kwargs)
+        new_unit = kwargs.get('unit_id', kwargs.get('unit'))
+        if new_unit is not None:
+            unit_ids.add(getattr(new_unit, 'pk', new_unit))
+        if unit_ids:
+            Unit.objects.filter(pk__in=unit_ids).sync_active_renters()
+        return rows
 
 
 class Renter(models.Model):
@@ -450,11 +543,13 @@ class Renter(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='')
     renter_is_active = models.BooleanField(default=True, verbose_name='')
 
+    objects = RenterQuerySet.as_manager()
+
     def __str__(self):
         return self.renter_name
 
     def save(self, *args, **kwargs):
-        # is_new = self.pk is None
+        is_new = self.pk is None
         # old = None
         # if not is_new:
         #     old = Renter.objects.get(pk=self.pk)
@@ -462,6 +557,19 @@ class Renter(models.Model):
         super().save(*args, **kwargs)
         # today = timezone.now().date()
 
+        # مشخصات همین مستاجر در سابقه باز او (تعویض مستاجر را Unit.save ثبت می‌کند)
+        if not is_new:
+            UnitResidenceHistory.objects.filter(renter=self, to_date__isnull=True).update(
+                name=self.renter_name or '',
+                mobile=self.renter_mobile or '',
+                people_count=int(self.renter_people_count or 0)
+            )
+
+        # واحد فعلی و واحدی که پیش‌تر این مستاجر را فعال داشت
+        Unit.objects.filter(Q(pk=self.unit_id) | Q(active_renter_id=self.pk)).sync_active_renters()
+        if Renter.unit.is_cached(self) and self.unit is not None:
+            self.unit.refresh_from_db(fields=['active_renter'])
+
 
 class UnitResidenceHistory(models.Model):
     RESIDENT_TYPE_CHOICES = (
@@ -1,10 +1,8 @@
-import io
 import json
 import os
 from datetime import datetime
 
 import jdatetime
-import openpyxl
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.conf import settings
@@ -16,7 +14,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.paginator import Paginator
 from django.db import transaction
 from django.db.models import Q, Sum, ProtectedError, Count, Case, When, IntegerField, F
-from django.http import HttpResponseRedirect, HttpResponse, JsonResponse, HttpResponseForbidden
+from django.http import HttpResponseRedirect, JsonResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import get_template
 from django.urls import reverse, reverse_lazy
@@ -25,10 +23,9 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView, CreateView, ListView, DetailView
-from openpyxl.styles import Font, Alignment, PatternFill
-from pypdf import PdfWriter
-from weasyprint import CSS, HTML
 
+from absharProject.excel_export import ExcelExport, Column
+from absharProject.pdf_rendering import pdf_response
 from admin_panel.forms import UnifiedChargePaymentForm
 from middleAdmin_panel.views import middle_admin_required
 from notifications.models import Notification, SupportUser
@@ -289,7 +286,7 @@ def user_panel(request):
         units = (
             Unit.objects
             .filter(user__manager=user, is_active=True)
-            .prefetch_related('renters')
+            .with_active_renter()
         )
         announcements = (
             Announcement.objects
@@ -300,7 +297,7 @@ def user_panel(request):
         units = (
             Unit.objects
             .filter(user=user, is_active=True)
-            .prefetch_related('renters')
+            .with_active_renter()
         )
         announcements = (
             Announcement.objects
@@ -314,7 +311,7 @@ def user_panel(request):
     units_with_details = [
         {
             "unit": unit,
-            "active_renter": unit.renters.filter(renter_is_active=True).first()
+            "active_renter": unit.active_renter
         }
         for unit in units
     ]
@@ -496,22 +493,16 @@ def export_charge_civil_pdf(request):
     if house:
         bank = Bank.objects.filter(house=house, is_default=True, is_active=True).first()
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-                 @page {{ size: A4 landscape; margin: 1cm; }}
-                 body {{
+    css = """
+                 @page { size: A4 landscape; margin: 1cm; }
+                 body {
                      font-family: 'BYekan', sans-serif;
-                 }}
-                 @font-face {{
-                     font-family: 'BYekan';
-                     src: url('{font_url}');
-                 }}
-             """)
+                 }
+             """
 
     # Render HTML template
     template = get_template("user_civil_charge_pdf.html")
     context = {
-        'font_path': font_url,
         'civil_charges': civil_charges,
         'bank': bank,
         'unit': unit,
@@ -519,20 +510,7 @@ def export_charge_civil_pdf(request):
         'today': datetime.now(),
     }
     html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="civil_charge_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return pdf_response(request, html, filename='civil_charge_report.pdf', stylesheets=[css])
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -641,22 +619,16 @@ def export_installments_civil_pdf(request, civil_id, unit_id):
     if house:
         bank = Bank.objects.filter(house=house, is_default=True, is_active=True).first()
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-                 @page {{ size: A4 landscape; margin: 1cm; }}
-                 body {{
+    css = """
+                 @page { size: A4 landscape; margin: 1cm; }
+                 body {
                      font-family: 'BYekan', sans-serif;
-                 }}
-                 @font-face {{
-                     font-family: 'BYekan';
-                     src: url('{font_url}');
-                 }}
-             """)
+                 }
+             """
 
     # Render HTML template
     template = get_template("user_installment_civil_charge_pdf.html")
     context = {
-        'font_path': font_url,
         'installments': installments,
         'bank': bank,
         'civil': civil,
@@ -665,20 +637,7 @@ def export_installments_civil_pdf(request, civil_id, unit_id):
         'today': datetime.now(),
     }
     html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="installments_civil_charge_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return pdf_response(request, html, filename='installments_civil_charge_report.pdf', stylesheets=[css])
 
 
 # ================ Sewage View =====================
@@ -826,22 +785,16 @@ def export_sewage_pdf(request):
     if house:
         bank = Bank.objects.filter(house=house, is_default=True, is_active=True).first()
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-                 @page {{ size: A4 landscape; margin: 1cm; }}
-                 body {{
+    css = """
+                 @page { size: A4 landscape; margin: 1cm; }
+                 body {
                      font-family: 'BYekan', sans-serif;
-                 }}
-                 @font-face {{
-                     font-family: 'BYekan';
-                     src: url('{font_url}');
-                 }}
-             """)
+                 }
+             """
 
     # Render HTML template
     template = get_template("user_sewage_pdf.html")
     context = {
-        'font_path': font_url,
         'sewages': sewages,
         'bank': bank,
         'unit': unit,
@@ -849,20 +802,7 @@ def export_sewage_pdf(request):
         'today': datetime.now(),
     }
     html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="sewage_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return pdf_response(request, html, filename='sewage_report.pdf', stylesheets=[css])
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -971,22 +911,16 @@ def export_installments_sewage_pdf(request, sewage_id, unit_id):
     if house:
         bank = Bank.objects.filter(house=house, is_default=True, is_active=True).first()
 
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-                 @page {{ size: A4 landscape; margin: 1cm; }}
-                 body {{
+    css = """
+                 @page { size: A4 landscape; margin: 1cm; }
+                 body {
                      font-family: 'BYekan', sans-serif;
-                 }}
-                 @font-face {{
-                     font-family: 'BYekan';
-                     src: url('{font_url}');
-                 }}
-             """)
+                 }
+             """
 
     # Render HTML template
     template = get_template("user_installment_sewage_pdf.html")
     context = {
-        'font_path': font_url,
         'installments': installments,
         'bank': bank,
         'sewage': sewage,
@@ -995,20 +929,7 @@ def export_installments_sewage_pdf(request, sewage_id, unit_id):
         'today': datetime.now(),
     }
     html = template.render(context)
-
-    # Generate PDF
-    page_pdf = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(page_pdf, stylesheets=[css])
-
-    page_pdf.seek(0)
-
-    # Generate the final PDF response
-    pdf_merger = PdfWriter()
-    pdf_merger.append(page_pdf)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="installments_sewage_report.pdf"'
-    pdf_merger.write(response)
-    return response
+    return pdf_response(request, html, filename='installments_sewage_report.pdf', stylesheets=[css])
 
 
 # ======================== Charges ===================
@@ -1029,10 +950,7 @@ def fetch_user_charges(request):
     charges = UnifiedCharge.objects.filter(
         unit__in=units,
         send_notification=True,
-    ).select_related('unit')
-
-    for charge in charges:
-        charge.update_penalty()
+    ).select_related('unit', 'unit__active_renter').with_penalty()
 
     if query:
         charges = charges.filter(
@@ -1079,28 +997,17 @@ def export_charge_pdf(request, pk):
     template = get_template('middleCharge/single_charge_pdf.html')
     html_string = template.render({'charge': charge,
                                    'house': house,
-                                   'bank': bank,
-                                   'font_url': request.build_absolute_uri('/static/fonts/Vazir.ttf')
+                                   'bank': bank
                                    })
 
-    css = CSS(string=f"""
-        @page {{ size: A5 portrait; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A5 portrait; margin: 1cm; }
+        body {
             font-family: 'Vazir', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'Vazira', sans-serif;
-    
-        }}
-    """)
-
-    pdf_file = io.BytesIO()
-    HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
+        }
+    """
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment;filename=charge_unit:{charge.unit.unit}.pdf'
-    return response
+    return pdf_response(request, html_string, filename=f'charge_unit:{charge.unit.unit}.pdf', stylesheets=[css])
 
 
 # ==============================================
@@ -1485,48 +1392,35 @@ def export_user_pay_money_pdf(request):
             payments = payments.filter(**{lookup: value})
 
     # تنظیمات PDF
-    font_url = request.build_absolute_uri('/static/fonts/BYekan.ttf')
-    css = CSS(string=f"""
-        @page {{ size: A4 landscape; margin: 1cm; }}
-        body {{
+    css = """
+        @page { size: A4 landscape; margin: 1cm; }
+        body {
             font-family: 'BYekan', sans-serif;
-        }}
-        @font-face {{
-            font-family: 'BYekan';
-            src: url('{font_url}');
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #000;
             padding: 5px;
             text-align: center;
-        }}
-        th {{
+        }
+        th {
             background-color: #FFD700;
-        }}
-    """)
+        }
+    """
 
     # Render template
     template = get_template("user_pay_pdf.html")
     context = {
         'payments': payments,
-        'font_path': font_url,
         'today': datetime.now(),
         'house': house,
     }
 
     html = template.render(context)
-    pdf_file = io.BytesIO()
-    HTML(string=html, base_url=request.build_absolute_uri()).write_pdf(pdf_file, stylesheets=[css])
-    pdf_file.seek(0)
-
-    # Response
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="userpaymoney_report.pdf"'
-    return response
+    return pdf_response(request, html, filename='userpaymoney_report.pdf', stylesheets=[css])
 
 
 @login_required(login_url=settings.LOGIN_URL_MIDDLE_ADMIN)
@@ -1535,43 +1429,22 @@ def export_user_pay_money_excel(request):
     payments = UserPayMoney.objects.filter(user=request.user).order_by('-register_date')
 
     # Create Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "units"
-    ws.sheet_view.rightToLeft = True
-
-    # Title
-    title_cell = ws.cell(row=1, column=1, value=f"لیست پرداخت های من")
-    title_cell.font = Font(bold=True, size=18)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=7)
-
-    # Headers
-    headers = [' بانک', 'شرح', 'مبلغ', 'تاریخ ثبت', 'تاریخ پرداخت', 'شماره رهگیری', 'روش پرداخت']
-    header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    for col_num, column_title in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col_num, value=column_title)
-        cell.fill = header_fill
-        cell.font = header_font
-
-    # Write data
-    for row_num, pay in enumerate(payments, start=3):
-        ws.cell(row=row_num, column=1, value=pay.bank.bank_name if pay.bank else '')
-        ws.cell(row=row_num, column=2, value=pay.description)
-        ws.cell(row=row_num, column=3, value=pay.amount)
-        ws.cell(row=row_num, column=4, value=show_jalali(pay.register_date))
-        ws.cell(row=row_num, column=5, value=show_jalali(pay.payment_date))
-        ws.cell(row=row_num, column=6, value=pay.transaction_reference)
-        ws.cell(row=row_num, column=7, value=pay.payment_gateway)
-
-    # Return response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export = ExcelExport(
+        title="لیست پرداخت های من",
+        sheet_title="units",
+        filename='userpaymoney_report.xlsx',
+        select_related=('bank',),
+        columns=[
+            Column(' بانک', 'bank.bank_name'),
+            Column('شرح', 'description'),
+            Column('مبلغ', 'amount'),
+            Column('تاریخ ثبت', 'register_date', show_jalali),
+            Column('تاریخ پرداخت', 'payment_date', show_jalali),
+            Column('شماره رهگیری', 'transaction_reference'),
+            Column('روش پرداخت', 'payment_gateway'),
+        ],
     )
-    response['Content-Disposition'] = f'attachment; filename=userpaymoney_report.xlsx'
-    wb.save(response)
-    return response
+    return export.response(payments)
 
 
 # ======================================================================